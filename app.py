@@ -1,13 +1,24 @@
-from modules.cau_meal import CAUMealAPI
+from modules.cau_meal import cau_meal_api
+from modules.meal_query import handle_meal_range_request
 from modules.postech_meal import get_postech_meal
 from modules.weather import get_weather_api
 from modules.message_handler import MessageHandler  # 추가
-from modules.memory import message_memory, get_all_reminders, check_reminders  # 추가
-from flask import Flask, jsonify, request
+from modules.memory import get_all_reminders, check_reminders  # 추가
+from modules.cache import cache_stats
+from modules.message_api import handle_message_request, handle_batch_request
+from modules.rate_limit import check_route, http_status, limited_result
+from modules.metrics import REQUEST_SECONDS, PROMETHEUS_CONTENT_TYPE, render_prometheus
+from modules.scheduler import start_prefetch_jobs
+from modules.response_packs import start_pack_watcher
+from modules.push import parse_last_id, parse_rooms, poll_result, poll_timeout, push_broker
+from modules.upstream import upstream_status
+from modules.logger import get_logger, fields
+from flask import Flask, Response, g, jsonify, request
 from flask_cors import CORS
 import sys
 import os
 import logging
+import time
 from datetime import datetime
 import os
 
@@ -29,24 +40,51 @@ app = Flask(__name__)
 CORS(app)
 app.config['JSON_AS_ASCII'] = False
 
+logger = get_logger("app")
+access_logger = get_logger("access")
+
 # 서비스 인스턴스
-cau_service = CAUMealAPI()
+cau_service = cau_meal_api
 message_handler = MessageHandler()  # 추가
 
 # 접속 로그를 위한 미들웨어
 
 
 @app.before_request
-def log_request_info():
-    """모든 요청에 대한 로그 기록"""
-    client_ip = request.environ.get(
-        'HTTP_X_FORWARDED_FOR', request.remote_addr)
-    user_agent = request.headers.get('User-Agent', 'Unknown')
-    timestamp = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+def start_request_timer():
+    g.request_start = time.perf_counter()
+
 
-    log_message = f"🌐 접속: {client_ip} → {request.method} {request.path} | User-Agent: {user_agent}"
-    app.logger.info(log_message)
-    print(f"[{timestamp}] {log_message}")
+@app.before_request
+def limit_lookup_routes():
+    """학식/날씨 조회 API 레이트 리밋 (접속 IP별, 넘으면 429)"""
+    retry_after = check_route(request.path, request.environ.get('HTTP_X_FORWARDED_FOR', request.remote_addr))
+    if retry_after:
+        result = limited_result(retry_after)
+        status, headers = http_status(result)
+        return jsonify(result), status, headers
+
+
+@app.after_request
+def log_request_info(response):
+    """모든 요청에 대한 접속 로그 + 라우트별 처리 시간 기록 (/metrics)"""
+    start = g.get('request_start')
+    if start is None:
+        return response
+
+    elapsed = time.perf_counter() - start
+    route = request.url_rule.rule if request.url_rule else "unmatched"
+    REQUEST_SECONDS.observe(elapsed, (request.method, route, response.status_code))
+
+    access_logger.info("🌐 접속", extra=fields(
+        ip=request.environ.get('HTTP_X_FORWARDED_FOR', request.remote_addr),
+        method=request.method,
+        path=request.path,
+        status=response.status_code,
+        elapsed_ms=round(elapsed * 1000, 2),
+        user_agent=request.headers.get('User-Agent', 'Unknown'),
+    ))
+    return response
 
 
 @app.route('/api/bot/silence', methods=['POST'])
@@ -55,16 +93,13 @@ def bot_silence_control():
     try:
         data = request.get_json()
         action = data.get('action')
+        room = data.get('room', '기본방')
 
         if action == "silence":
-            from datetime import datetime, timedelta
-            message_handler.bot_state['isSilent'] = True
-            message_handler.bot_state['silentUntil'] = datetime.now(
-            ) + timedelta(minutes=10)
+            message_handler.room_state.silence(room)
             return jsonify({"success": True, "data": "10분 동안 조용히 한다"})
         elif action == "unsilence":
-            message_handler.bot_state['isSilent'] = False
-            message_handler.bot_state['silentUntil'] = None
+            message_handler.room_state.unsilence(room)
             return jsonify({"success": True, "data": "조용 모드 해제됐다"})
         else:
             return jsonify({"success": False, "error": "잘못된 액션이다"})
@@ -79,8 +114,7 @@ def home():
         'HTTP_X_FORWARDED_FOR', request.remote_addr)
     timestamp = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
 
-    print(f"🎉 [{timestamp}] 홈페이지 접속! IP: {client_ip}")
-    app.logger.info(f"홈페이지 접속 - IP: {client_ip}")
+    logger.info("🎉 홈페이지 접속", extra=fields(ip=client_ip))
 
     return jsonify({
         "message": "크하학 API 서버가 작동 중입니다! 🎉",
@@ -154,79 +188,73 @@ def unified_meal():
         return jsonify({"success": False, "error": str(e)})
 
 
+@app.route('/api/meal/range', methods=['GET'])
+def meal_range():
+    """중앙대 학식 범위 조회 (날짜 범위 × 캠퍼스 × 식사 타입, 업스트림은 동시에 호출)"""
+    try:
+        return jsonify(handle_meal_range_request(request.args))
+    except Exception as e:
+        return jsonify({"success": False, "error": str(e)})
+
+
 # 메시지 처리 엔드포인트 추가
 @app.route('/api/message', methods=['POST'])
 def process_message():
     """메시지 처리 API"""
     try:
         data = request.get_json()
+    except Exception as e:
+        return jsonify({"success": False, "error": str(e)})
 
-        if not data:
-            return jsonify({"success": False, "error": "JSON 데이터가 필요하다"})
-
-        msg = data.get('message', '').strip()
-        sender = data.get('sender', '익명')
-        room = data.get('room', '기본방')
-
-        if not msg:
-            return jsonify({"success": False, "error": "메시지가 비어있다"})
-
-        # 먼저 메모리 기능 체크
-        memory_response = message_memory(msg, room, sender)
-        if memory_response:
-            return jsonify({
-                "success": True,
-                "data": {
-                    "response": memory_response,
-                    "type": "memory",
-                    "sender": sender,
-                    "room": room,
-                    "original_message": msg
-                }
-            })
+    result = handle_message_request(data, message_handler)
+    status, headers = http_status(result)
+    return jsonify(result), status, headers
 
-        # 메모리 기능이 없으면 일반 메시지 처리
-        response = message_handler.process_message(msg, sender, room)
-
-        if response:
-            return jsonify({
-                "success": True,
-                "data": {
-                    "response": response,
-                    "type": "message",
-                    "sender": sender,
-                    "room": room,
-                    "original_message": msg
-                }
-            })
-        else:
-            return jsonify({
-                "success": True,
-                "data": {
-                    "response": None,
-                    "message": "처리할 수 없는 메시지다"
-                }
-            })
 
+@app.route('/api/messages/batch', methods=['POST'])
+def process_message_batch():
+    """메시지 배치 처리 API (방 안은 순서대로, 방끼리는 동시에)"""
+    try:
+        data = request.get_json()
     except Exception as e:
         return jsonify({"success": False, "error": str(e)})
 
+    return jsonify(handle_batch_request(data, message_handler))
+
 
 # 봇 상태 확인 엔드포인트 추가
 @app.route('/api/bot/status', methods=['GET'])
 def bot_status():
-    """봇 상태 확인"""
+    """봇 상태 확인 (room 파라미터로 방 지정, 없으면 기본방, 업스트림별 서킷 브레이커 상태 포함)"""
     try:
+        room = request.args.get('room', '기본방')
         status = {
             "isActive": message_handler.bot_state['isActive'],
-            "ailaCount": message_handler.bot_state['ailaCount'],
-            "yoshiCount": message_handler.bot_state['yoshiCount']
+            **message_handler.room_state.status(room),
+            "upstreams": upstream_status()
         }
         return jsonify({"success": True, "data": status})
     except Exception as e:
         return jsonify({"success": False, "error": str(e)})
 
 
+# 업스트림 캐시 통계
+@app.route('/api/cache/stats', methods=['GET'])
+def cache_stats_api():
+    """캐시 적중/미스 통계"""
+    try:
+        return jsonify({"success": True, "data": cache_stats()})
+    except Exception as e:
+        return jsonify({"success": False, "error": str(e)})
+
+
+# Prometheus 메트릭
+@app.route('/metrics', methods=['GET'])
+def metrics():
+    """라우트/핸들러/업스트림 지연 시간 히스토그램 (Prometheus 텍스트 형식)"""
+    return Response(render_prometheus(), content_type=PROMETHEUS_CONTENT_TYPE)
+
+
 # 봇 제어 엔드포인트 추가 (관리자용)
 @app.route('/api/bot/control', methods=['POST'])
 def bot_control():
@@ -281,6 +309,23 @@ def check_reminders_api():
         return jsonify({"success": False, "error": str(e)})
 
 
+# 리마인드 푸시 (long-poll): 이벤트가 오거나 timeout이 될 때까지 응답을 잡아 둔다
+@app.route('/api/push/poll', methods=['GET'])
+def push_poll():
+    """방별 리마인드 이벤트 long-poll (?room=방&room=방 또는 room=*, since=마지막 이벤트 id, timeout=초)
+
+    sync 워커 하나를 timeout 동안 잡고 있으므로 구독자가 많으면 gevent 워커(그린렛 하나만 잡는다)나
+    ASGI의 /api/push/stream을 쓴다.
+    """
+    try:
+        rooms = parse_rooms(request.args.getlist('room'))
+        last_id = parse_last_id(request.args.get('since'))
+        events = push_broker.wait(rooms, last_id, poll_timeout(request.args.get('timeout')))
+        return jsonify({"success": True, "data": poll_result(events, last_id)})
+    except Exception as e:
+        return jsonify({"success": False, "error": str(e)})
+
+
 # 메모리 관리 API
 @app.route('/api/memory/list', methods=['GET'])
 def list_memories():
@@ -351,12 +396,13 @@ def webhook_reminder():
 
         if data and data.get('type') == 'reminder':
             message = data.get('message', '')
-            timestamp = data.get('timestamp', '')
 
-            print(f"🔔 리마인드 알림 수신: {message}")
+            # room/reminders는 방별 묶음 전송(modules/delivery.py) 형식, 없으면 기존 형식
+            logger.info("🔔 리마인드 알림 수신", extra=fields(
+                room=data.get('room'), count=len(data.get('reminders') or []), message=message))
 
             # 여기서 실제 카카오톡 메시지 전송 로직을 추가할 수 있다
-            # 예: 특정 방에 메시지 전송
+            # 예: data['room'] 방에 message 전송
 
             return jsonify({"success": True, "message": "리마인드 알림을 받았다"})
         else:
@@ -374,7 +420,7 @@ def test_connection():
         'HTTP_X_FORWARDED_FOR', request.remote_addr)
     timestamp = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
 
-    print(f"🧪 [{timestamp}] 테스트 페이지 접속! IP: {client_ip}")
+    logger.info("🧪 테스트 페이지 접속", extra=fields(ip=client_ip))
 
     return f"""
     <html>
@@ -406,6 +452,10 @@ if __name__ == '__main__':
     except Exception as e:
         print(f"❌ 스케줄러 시작 실패: {e}")
 
+    # 학식/날씨 미리 가져오기 작업 + 응답 팩 감시 시작 (gunicorn은 post_fork 훅에서)
+    start_prefetch_jobs()
+    start_pack_watcher()
+
     print("🚀 크하학 API 서버를 시작한다...")
     print("📝 모든 접속과 요청이 로그로 기록된다.")
     app.run(host='0.0.0.0', port=8080, debug=False)
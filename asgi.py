@@ -0,0 +1,423 @@
+"""
+크하학 API 서버 - ASGI(FastAPI) 버전
+
+app.py(Flask)와 같은 엔드포인트, 같은 JSON 응답을 제공한다.
+업스트림(기상청/포항공대/중앙대) 호출은 httpx 비동기 클라이언트로 하므로
+업스트림이 느려도 프로세스 하나가 수백 개의 메시지를 동시에 붙잡고 있을 수 있다.
+
+실행: uvicorn asgi:app --host 0.0.0.0 --port 8080
+"""
+
+import time
+from contextlib import asynccontextmanager
+from datetime import datetime
+
+from fastapi import FastAPI, Request
+from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import HTMLResponse, JSONResponse, Response, StreamingResponse
+
+from modules.async_http import close_async_clients
+from modules.cache import cache_stats
+from modules.cau_meal import cau_meal_api
+from modules.meal_query import handle_meal_range_request_async
+from modules.memory import get_all_reminders, check_reminders
+from modules.message_api import handle_message_request_async, handle_batch_request_async
+from modules.rate_limit import check_route, http_status, limited_result
+from modules.logger import get_logger, fields
+from modules.message_handler import MessageHandler
+from modules.metrics import REQUEST_SECONDS, PROMETHEUS_CONTENT_TYPE, render_prometheus
+from modules.postech_meal import get_postech_meal_async
+from modules.scheduler import start_prefetch_jobs, start_reminder_scheduler
+from modules.response_packs import start_pack_watcher
+from modules.push import parse_last_id, parse_rooms, poll_result, poll_timeout, push_broker, sse_stream
+from modules.upstream import upstream_status
+from modules.weather import get_weather_api_async
+
+
+@asynccontextmanager
+async def lifespan(app):
+    # 학식/날씨 미리 가져오기 작업 시작
+    start_prefetch_jobs()
+    # 리마인드 체크 시작 (울리면 /api/push 구독자에게 바로 보낸다)
+    start_reminder_scheduler()
+    # 응답 팩 파일이 바뀌면 다시 읽기
+    start_pack_watcher()
+    yield
+    await close_async_clients()
+
+
+app = FastAPI(title="크하학 API", lifespan=lifespan)
+app.add_middleware(CORSMiddleware, allow_origins=["*"], allow_methods=["*"], allow_headers=["*"])
+
+logger = get_logger("asgi")
+access_logger = get_logger("access")
+
+# 서비스 인스턴스
+cau_service = cau_meal_api
+message_handler = MessageHandler()
+
+
+def _client_ip(request):
+    return request.headers.get('x-forwarded-for') or (request.client.host if request.client else None)
+
+
+async def _json_body(request):
+    """요청 JSON (없거나 잘못된 JSON이면 None)"""
+    try:
+        return await request.json()
+    except Exception:
+        return None
+
+
+@app.middleware("http")
+async def limit_lookup_routes(request: Request, call_next):
+    """학식/날씨 조회 API 레이트 리밋 (접속 IP별, 넘으면 429) - 접속 로그 미들웨어 안쪽에서 돈다"""
+    retry_after = check_route(request.url.path, _client_ip(request))
+    if retry_after:
+        result = limited_result(retry_after)
+        status, headers = http_status(result)
+        return JSONResponse(result, status_code=status, headers=headers)
+    return await call_next(request)
+
+
+@app.middleware("http")
+async def log_request_info(request: Request, call_next):
+    """모든 요청에 대한 접속 로그 + 라우트별 처리 시간 기록 (/metrics)"""
+    start = time.perf_counter()
+    response = await call_next(request)
+
+    elapsed = time.perf_counter() - start
+    route = request.scope.get('route')
+    route_path = route.path if route is not None else "unmatched"
+    REQUEST_SECONDS.observe(elapsed, (request.method, route_path, response.status_code))
+
+    access_logger.info("🌐 접속", extra=fields(
+        ip=_client_ip(request),
+        method=request.method,
+        path=request.url.path,
+        status=response.status_code,
+        elapsed_ms=round(elapsed * 1000, 2),
+        user_agent=request.headers.get('user-agent', 'Unknown'),
+    ))
+    return response
+
+
+@app.post('/api/bot/silence')
+async def bot_silence_control(request: Request):
+    """조용 기능 제어"""
+    try:
+        data = await _json_body(request)
+        action = data.get('action')
+        room = data.get('room', '기본방')
+
+        if action == "silence":
+            message_handler.room_state.silence(room)
+            return {"success": True, "data": "10분 동안 조용히 한다"}
+        elif action == "unsilence":
+            message_handler.room_state.unsilence(room)
+            return {"success": True, "data": "조용 모드 해제됐다"}
+        else:
+            return {"success": False, "error": "잘못된 액션이다"}
+
+    except Exception as e:
+        return {"success": False, "error": str(e)}
+
+
+@app.get('/')
+async def home(request: Request):
+    client_ip = _client_ip(request)
+    timestamp = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+
+    logger.info("🎉 홈페이지 접속", extra=fields(ip=client_ip))
+
+    return {
+        "message": "크하학 API 서버가 작동 중입니다! 🎉",
+        "status": "running",
+        "access_time": timestamp,
+        "client_ip": client_ip,
+        "success": "접속 성공!"
+    }
+
+
+@app.get('/api/weather')
+async def weather():
+    try:
+        result = await get_weather_api_async()
+        return {"success": True, "data": result}
+    except Exception as e:
+        return {"success": False, "error": str(e)}
+
+
+@app.get('/api/postech/meal')
+async def postech_meal(type: str = None):
+    try:
+        result = await get_postech_meal_async(type)
+        return {"success": True, "data": result}
+    except Exception as e:
+        return {"success": False, "error": str(e)}
+
+
+@app.get('/api/cau/meal')
+async def cau_meal(campus: str = '서울', type: str = '중식'):
+    try:
+        result = await cau_service.get_meal_data_async(campus=campus, meal_type=type)
+        formatted = cau_service.format_meal_output(result)
+        return {"success": True, "data": formatted}
+    except Exception as e:
+        return {"success": False, "error": str(e)}
+
+
+@app.get('/api/meal')
+async def unified_meal(university: str = 'postech', type: str = None, campus: str = '서울'):
+    """통합 학식 API - 대학 구분해서 제공"""
+    try:
+        if university.lower() == 'cau' or university.lower() == '중앙대':
+            result = await cau_service.get_meal_data_async(campus=campus, meal_type=type or '중식')
+            formatted = cau_service.format_meal_output(result)
+            return {
+                "success": True,
+                "data": formatted,
+                "university": "중앙대학교",
+                "campus": campus
+            }
+        else:
+            result = await get_postech_meal_async(type)
+            return {
+                "success": True,
+                "data": result,
+                "university": "포항공과대학교"
+            }
+    except Exception as e:
+        return {"success": False, "error": str(e)}
+
+
+@app.get('/api/meal/range')
+async def meal_range(request: Request):
+    """중앙대 학식 범위 조회 (날짜 범위 × 캠퍼스 × 식사 타입, 업스트림은 동시에 호출)"""
+    try:
+        return await handle_meal_range_request_async(request.query_params)
+    except Exception as e:
+        return {"success": False, "error": str(e)}
+
+
+@app.post('/api/message')
+async def process_message(request: Request):
+    """메시지 처리 API"""
+    data = await _json_body(request)
+    result = await handle_message_request_async(data, message_handler)
+    status, headers = http_status(result)
+    return JSONResponse(result, status_code=status, headers=headers)
+
+
+@app.post('/api/messages/batch')
+async def process_message_batch(request: Request):
+    """메시지 배치 처리 API (방 안은 순서대로, 방끼리는 동시에)"""
+    data = await _json_body(request)
+    return await handle_batch_request_async(data, message_handler)
+
+
+@app.get('/api/bot/status')
+async def bot_status(room: str = '기본방'):
+    """봇 상태 확인 (room 파라미터로 방 지정, 없으면 기본방, 업스트림별 서킷 브레이커 상태 포함)"""
+    try:
+        status = {
+            "isActive": message_handler.bot_state['isActive'],
+            **message_handler.room_state.status(room),
+            "upstreams": upstream_status()
+        }
+        return {"success": True, "data": status}
+    except Exception as e:
+        return {"success": False, "error": str(e)}
+
+
+@app.get('/api/cache/stats')
+async def cache_stats_api():
+    """캐시 적중/미스 통계"""
+    try:
+        return {"success": True, "data": cache_stats()}
+    except Exception as e:
+        return {"success": False, "error": str(e)}
+
+
+@app.get('/metrics')
+async def metrics():
+    """라우트/핸들러/업스트림 지연 시간 히스토그램 (Prometheus 텍스트 형식)"""
+    return Response(render_prometheus(), media_type=PROMETHEUS_CONTENT_TYPE)
+
+
+@app.post('/api/bot/control')
+async def bot_control(request: Request):
+    """봇 제어 (활성화/비활성화)"""
+    try:
+        data = await _json_body(request)
+        action = data.get('action')
+        sender = data.get('sender', '')
+
+        # 박정욱만 제어 가능
+        if sender != "박정욱":
+            return {"success": False, "error": "권한이 없다"}
+
+        if action == "activate":
+            message_handler.bot_state['isActive'] = True
+            return {"success": True, "data": "봇이 활성화됐다"}
+        elif action == "deactivate":
+            message_handler.bot_state['isActive'] = False
+            return {"success": True, "data": "봇이 비활성화됐다"}
+        else:
+            return {"success": False, "error": "잘못된 액션이다"}
+
+    except Exception as e:
+        return {"success": False, "error": str(e)}
+
+
+@app.get('/api/reminders')
+async def get_reminders_api(room: str = None):
+    """설정된 리마인드 조회"""
+    try:
+        result = get_all_reminders(room)
+        return {"success": True, "data": result}
+    except Exception as e:
+        return {"success": False, "error": str(e)}
+
+
+@app.get('/api/reminders/check')
+async def check_reminders_api():
+    """현재 실행할 리마인드 체크"""
+    try:
+        result = check_reminders()
+        if result:
+            return {"success": True, "data": result, "hasReminders": True}
+        else:
+            return {"success": True, "data": "실행할 리마인드가 없다", "hasReminders": False}
+    except Exception as e:
+        return {"success": False, "error": str(e)}
+
+
+@app.get('/api/push/stream')
+async def push_stream(request: Request):
+    """방별 리마인드 이벤트 SSE (?room=방&room=방 또는 room=*, 재연결 시 Last-Event-ID)"""
+    rooms = parse_rooms(request.query_params.getlist('room'))
+    last_id = parse_last_id(request.headers.get('last-event-id') or request.query_params.get('since'))
+    return StreamingResponse(
+        sse_stream(rooms, last_id, request.is_disconnected),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@app.get('/api/push/poll')
+async def push_poll(request: Request):
+    """방별 리마인드 이벤트 long-poll (?room=방 또는 room=*, since=마지막 이벤트 id, timeout=초)"""
+    try:
+        rooms = parse_rooms(request.query_params.getlist('room'))
+        last_id = parse_last_id(request.query_params.get('since'))
+        events = await push_broker.wait_async(rooms, last_id, poll_timeout(request.query_params.get('timeout')))
+        return {"success": True, "data": poll_result(events, last_id)}
+    except Exception as e:
+        return {"success": False, "error": str(e)}
+
+
+@app.get('/api/memory/list')
+async def list_memories():
+    """저장된 메모리 조회"""
+    try:
+        from modules.memory import get_all_room_memories, get_all_personal_memories
+
+        return {
+            "success": True,
+            "data": {
+                "room_memories": get_all_room_memories(),
+                "personal_memories": get_all_personal_memories()
+            }
+        }
+    except Exception as e:
+        return {"success": False, "error": str(e)}
+
+
+@app.post('/api/scheduler/start')
+async def start_scheduler(request: Request):
+    """리마인드 스케줄러 시작"""
+    try:
+        from modules.scheduler import start_reminder_scheduler
+
+        data = await _json_body(request) or {}
+        start_reminder_scheduler(data.get('callback_url'))
+        return {"success": True, "message": "리마인드 스케줄러가 시작됐다"}
+    except Exception as e:
+        return {"success": False, "error": str(e)}
+
+
+@app.post('/api/scheduler/stop')
+async def stop_scheduler():
+    """리마인드 스케줄러 정지"""
+    try:
+        from modules.scheduler import stop_reminder_scheduler
+
+        stop_reminder_scheduler()
+        return {"success": True, "message": "리마인드 스케줄러가 정지됐다"}
+    except Exception as e:
+        return {"success": False, "error": str(e)}
+
+
+@app.get('/api/scheduler/status')
+async def scheduler_status():
+    """스케줄러 상태 확인"""
+    try:
+        from modules.scheduler import get_scheduler_status
+
+        return {"success": True, "data": get_scheduler_status()}
+    except Exception as e:
+        return {"success": False, "error": str(e)}
+
+
+@app.post('/api/webhook/reminder')
+async def webhook_reminder(request: Request):
+    """리마인드 웹훅 수신"""
+    try:
+        data = await _json_body(request)
+
+        if data and data.get('type') == 'reminder':
+            logger.info("🔔 리마인드 알림 수신", extra=fields(
+                room=data.get('room'), count=len(data.get('reminders') or []), message=data.get('message', '')))
+            return {"success": True, "message": "리마인드 알림을 받았다"}
+        else:
+            return {"success": False, "error": "잘못된 웹훅 데이터다"}
+
+    except Exception as e:
+        return {"success": False, "error": str(e)}
+
+
+@app.get('/test', response_class=HTMLResponse)
+async def test_connection(request: Request):
+    """접속 테스트용 간단한 페이지"""
+    client_ip = _client_ip(request)
+    timestamp = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+
+    logger.info("🧪 테스트 페이지 접속", extra=fields(ip=client_ip))
+
+    return f"""
+    <html>
+    <head><title>크하학 서버 접속 테스트</title></head>
+    <body style="font-family: Arial; padding: 20px;">
+        <h1>🎉 접속 성공!</h1>
+        <p><strong>접속 시간:</strong> {timestamp}</p>
+        <p><strong>접속 IP:</strong> {client_ip}</p>
+        <p><strong>서버 상태:</strong> 정상 작동 중 (ASGI)</p>
+        <hr>
+        <h2>API 테스트</h2>
+        <ul>
+            <li><a href="/api/weather">날씨 정보</a></li>
+            <li><a href="/api/postech/meal">포항공대 학식</a></li>
+            <li><a href="/api/cau/meal">중앙대 학식</a></li>
+            <li><a href="/api/bot/status">봇 상태</a></li>
+        </ul>
+    </body>
+    </html>
+    """
+
+
+if __name__ == '__main__':
+    import uvicorn
+
+    print("🚀 크하학 API 서버(ASGI)를 시작한다...")
+    uvicorn.run(app, host='0.0.0.0', port=8080)
@@ -1,10 +1,32 @@
 # Gunicorn 설정
+import os
+
 bind = "127.0.0.1:8080"
-workers = 4
-worker_class = "sync"
-worker_connections = 1000
+workers = int(os.getenv("GUNICORN_WORKERS", "4"))
+# sync (기본): 워커 하나가 요청 하나씩 (업스트림을 기다리는 동안 워커가 논다)
+# gevent: 워커 하나가 요청을 그린렛으로 worker_connections개까지 동시에 (modules/green.py)
+worker_class = os.getenv("GUNICORN_WORKER_CLASS", "sync")
+# gevent 워커 하나가 동시에 잡는 연결 수 (sync 워커에서는 쓰지 않는다)
+worker_connections = int(os.getenv("GUNICORN_WORKER_CONNECTIONS", "1000"))
 timeout = 30
 keepalive = 2
-max_requests = 1000
-max_requests_jitter = 100
-preload_app = True
+# 이만큼 처리한 워커는 새로 띄운다 (메모리 누수 대비). gevent 워커는 같은 시간에 수십 배를 처리하고
+# preload 없이 다시 뜰 때 앱 전체를 다시 import하므로 (그동안 잡고 있던 long-poll도 끊긴다) 훨씬 드물게 한다
+max_requests = int(os.getenv("GUNICORN_MAX_REQUESTS", "50000" if worker_class == "gevent" else "1000"))
+max_requests_jitter = max_requests // 10
+# gevent 워커는 fork 뒤에 monkey patch를 하므로 앱을 마스터에서 미리 불러오면 패치 전의 진짜 스레드/락이 남는다
+preload_app = worker_class != "gevent"
+
+
+def post_worker_init(worker):
+    """워커가 앱을 불러온 뒤 학식/날씨 미리 가져오기 작업 + 리마인드 스케줄러 + 응답 팩 감시 시작
+    (gevent면 패치 뒤라 그린렛으로 돈다)
+
+    미리 가져오기와 리마인드 스케줄러는 잠금을 잡은 워커 하나만 돌리고, 나머지는 그 워커가 재시작할 때 이어받으려고 기다린다.
+    리마인드 웹훅은 REMINDER_CALLBACK_URL로 보낸다 (없으면 /api/push 구독자에게만 보낸다).
+    """
+    from modules.scheduler import start_leader_reminder_scheduler, start_prefetch_jobs
+    from modules.response_packs import start_pack_watcher
+    start_prefetch_jobs()
+    start_leader_reminder_scheduler(os.getenv("REMINDER_CALLBACK_URL") or None)
+    start_pack_watcher()
@@ -1,5 +1,147 @@
 import datetime
 import random
+from collections import Counter
+from functools import lru_cache
+
+from modules.dispatcher import PRIORITY_EMOTION
+
+SLEEP_KEYWORDS = ["졸려", "졸리", "잠", "자야지", "피곤", "잠와", "잠온", "꿀잠"]
+FOOD_QUESTION_KEYWORDS = ["뭐먹", "머먹"]
+FOOD_WORDS = ["맛있", "맛없", "배고파", "배불러", "먹고싶", "달달"]
+STUDY_WORDS = ["시험", "과제", "공부", "숙제", "발표", "프로젝트"]
+LATE_NIGHT_STUDY_WORDS = ["공부", "과제", "숙제", "발표", "프로젝트"]
+ANGER_CHARS = "ㅡㅗㅢㅣ"
+SURPRISE_WORDS = ["헉", "어머", "우와"]
+AEGYO_WORDS = ["뿌잉", "츄", "헤헤", "히히", "뽀뽀", "야옹", "멍멍", "응애"]
+TYPO_PATTERNS = {
+    "ㅁㄴㅇㄹ": "뭔말",
+    "ㅇㄱㄹㅇ": "이거레알",
+    "ㅂㅂㅂㄱ": "빨리빨리",
+    "ㄴㄴ": "노노",
+    "ㅇㅇ": "응응",
+    "ㅋㅋㄹㅃㅃ": "크크루삥뽕"
+}
+WEATHER_WORDS = {
+    "비": "우울하네요",
+    "눈": "낭만적이네요",
+    "더워": "시원한 곳 가세요",
+    "추워": "따뜻하게 입으세요",
+    "바람": "바람 쐬러 나가세요",
+    "햇살": "좋은 날씨네요",
+    "구름": "흐린 날이네요"
+}
+BOT_KEYWORDS = ["크하학", "봇", "AI", "인공지능", "챗봇", "로봇", "너", "넌"]
+COMPLIMENTS = ["귀여워", "똑똑해", "잘해", "좋아", "멋져", "예뻐", "사랑해", "고마워", "최고"]
+
+# 글자 종류 (개수를 세는 체크들)
+CRY_CHARS = "ㅠㅜ"
+LAUGH_CHARS = "ㅋㄱㄲㄴㅌㅎ"
+STRESS_CHARS = ";:,."
+
+# 키워드 그룹 → 단어 목록 (체크들이 그룹 이름으로 묻는다)
+KEYWORD_GROUPS = {
+    "leave": ["나가"],
+    "sleep": SLEEP_KEYWORDS,
+    "food_question": FOOD_QUESTION_KEYWORDS,
+    "food": FOOD_WORDS,
+    "study": STUDY_WORDS,
+    "late_night_study": LATE_NIGHT_STUDY_WORDS,
+    "surprise": SURPRISE_WORDS,
+    "aegyo": AEGYO_WORDS,
+    "typo": list(TYPO_PATTERNS),
+    "weather": list(WEATHER_WORDS),
+    "bot": BOT_KEYWORDS,
+    "compliment": COMPLIMENTS,
+}
+
+
+# 글자 종류가 이보다 많으면 글자 반복 체크는 글자마다 세지 않고 한 번에 센다 (Counter)
+SMALL_ALPHABET = 64
+ASCII_UPPERCASE = b"ABCDEFGHIJKLMNOPQRSTUVWXYZ"
+_UNCHECKED = object()
+
+
+class MessageFeatures:
+    """메시지 특징 (글자별 개수, 대문자 수, 키워드 그룹), 체크들은 메시지 대신 이것을 본다
+
+    특징마다 처음 필요할 때 C로 한 번만 계산하고 기억한다 (str.count, set, Counter, 부분 문자열 검색).
+    체크를 몇 개 부르든 같은 글자/그룹을 다시 세지 않으므로 비용은 메시지 길이에만 비례한다.
+    """
+
+    __slots__ = ("msg", "length", "_classes", "_counts", "_upper", "_groups")
+
+    def __init__(self, msg):
+        self.msg = msg
+        self.length = len(msg)
+        self._classes = {}    # 글자 종류(문자열) → 총 개수 (물어본 종류만)
+        self._counts = None   # 전체 글자별 개수 (글자 종류가 많을 때만)
+        self._upper = None
+        self._groups = {}     # 그룹 → 처음 나온 단어 또는 None
+
+    def count(self, chars):
+        """chars에 있는 글자들이 나온 총 횟수"""
+        classes = self._classes
+        total = classes.get(chars)
+        if total is None:
+            total = classes[chars] = sum(map(self.msg.count, chars))
+        return total
+
+    def has_char(self, chars):
+        """chars 중 한 글자라도 있는지 (이미 센 종류면 개수로, 아니면 처음 나온 곳에서 멈추는 검색)"""
+        total = self._classes.get(chars)
+        if total is not None:
+            return total > 0
+        return any(map(self.msg.__contains__, chars))
+
+    @property
+    def upper(self):
+        """대문자 수"""
+        if self._upper is None:
+            msg = self.msg
+            if msg.isascii():
+                encoded = msg.encode()
+                self._upper = len(encoded) - len(encoded.translate(None, ASCII_UPPERCASE))
+            elif self._counts is not None:
+                self._upper = sum(count for char, count in self._counts.items() if char.isupper())
+            else:
+                self._upper = sum(1 for char in msg if char.isupper())
+        return self._upper
+
+    def repeated_char(self, minimum=5):
+        """minimum번 이상 나온 글자(문자만) 하나 (없으면 None)"""
+        msg = self.msg
+        distinct = set(msg)
+        if len(distinct) <= SMALL_ALPHABET:
+            for char in distinct:
+                if char.isalpha() and msg.count(char) >= minimum:
+                    return char
+            return None
+
+        # 글자 종류가 많으면 글자마다 세는 것(종류 × 길이)보다 한 번에 세는 게 싸다
+        if self._counts is None:
+            self._counts = Counter(msg)
+        for char, count in self._counts.items():
+            if count >= minimum and char.isalpha():
+                return char
+        return None
+
+    def first(self, group):
+        """그룹에서 메시지에 나온 첫 단어 (목록 순서, 없으면 None)"""
+        groups = self._groups
+        found = groups.get(group, _UNCHECKED)
+        if found is _UNCHECKED:
+            msg = self.msg
+            found = groups[group] = next((word for word in KEYWORD_GROUPS[group] if word in msg), None)
+        return found
+
+    def has(self, group):
+        return self.first(group) is not None
+
+
+@lru_cache(maxsize=256)
+def message_features(msg):
+    """메시지 특징 (같은 메시지를 여러 체크가 봐도 한 번만 계산)"""
+    return MessageFeatures(msg)
 
 
 def check_cry_laugh_stress_message(msg):
@@ -12,7 +154,7 @@ def check_all_patterns(msg):
     current_hour = datetime.datetime.now().hour
 
     # 나가라는 말에 대한 반응 (최우선 처리)
-    if "나가" in msg:
+    if message_features(msg).has("leave"):
         return "죄송합니다"
 
     sleep_result = check_sleep_mention(msg)
@@ -29,11 +171,6 @@ def check_all_patterns(msg):
     if food_result:
         return food_result
 
-    # 잠/졸림 관련 체크 추가
-    sleep_result = check_sleep_mention(msg)
-    if sleep_result:
-        return sleep_result
-
     # 공부 관련 체크 추가
     study_result = check_study_mention(msg)
     if study_result:
@@ -91,13 +228,43 @@ def check_all_patterns(msg):
     return None
 
 
+def register_emotion_triggers(dispatcher, priority=PRIORITY_EMOTION):
+    """디스패처에 감정 표현 트리거 등록 (check_all_patterns와 같은 순서)"""
+    add = dispatcher.add_substring
+
+    add(["나가"], lambda msg: "죄송합니다", priority, name="emotion:leave")
+    add(SLEEP_KEYWORDS, check_sleep_mention, priority, name="emotion:sleep")
+    add(["ㅠ", "ㅜ", "ㅋ", "ㅎ", ";"], check_basic_emotions, priority, name="emotion:basic")
+    add(FOOD_QUESTION_KEYWORDS + FOOD_WORDS, check_food_mention, priority, name="emotion:food")
+    add(STUDY_WORDS, check_study_mention, priority, name="emotion:study")
+    add(list(ANGER_CHARS), check_anger, priority, name="emotion:anger")
+    add(["!"] + SURPRISE_WORDS, check_surprise, priority, name="emotion:surprise")
+
+    # 글자 수 비율/횟수 기반이라 키워드로 표현할 수 없는 규칙
+    dispatcher.add_predicate(lambda msg: len(msg) > 5, check_caps_lock,
+                             priority, name="emotion:caps_lock")
+    dispatcher.add_predicate(lambda msg: len(msg) >= 5, check_repeat_chars,
+                             priority, name="emotion:repeat_chars")
+
+    add(["?", "？"], check_question_spam, priority, name="emotion:question_spam")
+    add(AEGYO_WORDS, check_aegyo, priority, name="emotion:aegyo")
+    add(list(TYPO_PATTERNS), check_typos, priority, name="emotion:typos")
+    add(LATE_NIGHT_STUDY_WORDS,
+        lambda msg: check_time_sensitive(msg, datetime.datetime.now().hour),
+        priority, name="emotion:time_sensitive")
+    add(list(WEATHER_WORDS), check_weather_mood, priority, name="emotion:weather_mood")
+    add(BOT_KEYWORDS, check_bot_mention, priority, name="emotion:bot_mention")
+    add(COMPLIMENTS, check_compliment, priority, name="emotion:compliment")
+
+
 def check_basic_emotions(msg):
     """기본 감정 체크 (기존 로직)"""
-    if "ㅠ" in msg or "ㅜ" in msg:
+    features = message_features(msg)
+    if features.has_char(CRY_CHARS):
         return check_cry(msg)
-    elif "ㅋ" in msg or "ㅎ" in msg:
+    elif features.has_char("ㅋㅎ"):
         return check_laugh(msg)
-    elif ";" in msg:
+    elif features.has_char(";"):
         return check_stress(msg)
     return None
 
@@ -105,7 +272,7 @@ def check_basic_emotions(msg):
 def check_cry(msg):
     """울음 체크"""
     messages = ["ㅠㅠㅠㅜㅜㅠ", "왜 우시는 거예요?", "ㅋㅋ얘 운다"]
-    if sum(msg.count(char) for char in "ㅠㅜ") >= 2:
+    if message_features(msg).count(CRY_CHARS) >= 2:
         return random.choice(messages)
     return None
 
@@ -113,84 +280,75 @@ def check_cry(msg):
 def check_laugh(msg):
     """웃음 체크"""
     messages = ["뭘 웃어요;;", "ㅋㄱㅋㄱㅋㄱㅋㄱㅋㄱㅋㄱㅋㅋ", "이게 웃겨요?"]
-    if sum(msg.count(char) for char in "ㅋㄱㄲㄴㅌㅎ") >= 5:
+    if message_features(msg).count(LAUGH_CHARS) >= 5:
         return random.choice(messages)
     return None
 
 
 def check_stress(msg):
     """스트레스 체크"""
-    if sum(msg.count(char) for char in ";:,.") >= 4:
+    if message_features(msg).count(STRESS_CHARS) >= 4:
         return "어림도 없지"
     return None
 
 
 def check_anger(msg):
     """화남 체크"""
-    anger_chars = "ㅡㅗㅢㅣ"
-    if sum(msg.count(char) for char in anger_chars) >= 3:
+    if message_features(msg).count(ANGER_CHARS) >= 3:
         return random.choice(["화내지 마세요", "진정하세요", "왜 화나셨어요"])
     return None
 
 
 def check_surprise(msg):
     """놀람 체크"""
-    if msg.count("!") >= 3 or "헉" in msg or "어머" in msg or "우와" in msg:
+    features = message_features(msg)
+    if features.count("!") >= 3 or features.has("surprise"):
         return random.choice(["뭘 그렇게 놀라요", "놀랄 일도 아닌데", "헉 뭐가 놀라워요"])
     return None
 
 
 def check_caps_lock(msg):
     """대문자 도배"""
-    if len([c for c in msg if c.isupper()]) >= len(msg) * 0.7 and len(msg) > 5:
+    features = message_features(msg)
+    if features.upper >= features.length * 0.7 and features.length > 5:
         return "소리 지르지 마세요"
     return None
 
 
 def check_repeat_chars(msg):
-    """글자 반복"""
-    for char in set(msg):
-        if msg.count(char) >= 5 and char.isalpha():
-            return f"{char} 그만 써요"
+    """글자 반복 (5번 넘게 나온 글자 중 처음 나온 것)"""
+    char = message_features(msg).repeated_char(5)
+    if char is not None:
+        return f"{char} 그만 써요"
     return None
 
 
 def check_question_spam(msg):
     """물음표 도배"""
-    if msg.count("?") >= 3 or msg.count("？") >= 3:
+    features = message_features(msg)
+    if features.count("?") >= 3 or features.count("？") >= 3:
         return "질문이 너무 많아요"
     return None
 
 
 def check_aegyo(msg):
     """애교 체크"""
-    aegyo_words = ["뿌잉", "츄", "헤헤", "히히", "뽀뽀", "야옹", "멍멍", "응애"]
-    if any(word in msg for word in aegyo_words):
+    if message_features(msg).has("aegyo"):
         return random.choice(["애교 그만;;", "귀여운척 하지 마세요;;", "응애 나 애기"])
     return None
 
 
 def check_typos(msg):
     """오타 감지"""
-    typo_patterns = {
-        "ㅁㄴㅇㄹ": "뭔말",
-        "ㅇㄱㄹㅇ": "이거레알",
-        "ㅂㅂㅂㄱ": "빨리빨리",
-        "ㄴㄴ": "노노",
-        "ㅇㅇ": "응응",
-        "ㅋㅋㄹㅃㅃ": "크크루삥뽕"
-    }
-    for typo, correction in typo_patterns.items():
-        if typo in msg:
-            return f"{correction}이라고 하세요"
+    typo = message_features(msg).first("typo")
+    if typo is not None:
+        return f"{TYPO_PATTERNS[typo]}이라고 하세요"
     return None
 
 
 def check_sleep_mention(msg):
     """잠/졸림 관련 체크 강화"""
-    sleep_keywords = ["졸려", "졸리", "잠", "자야지", "피곤", "잠와", "잠온", "꿀잠"]
-
-    if any(word in msg for word in sleep_keywords):
+    if message_features(msg).has("sleep"):
         current_hour = datetime.datetime.now().hour
 
         if current_hour < 6:
@@ -210,7 +368,8 @@ def check_time_sensitive(msg, current_hour):
     """시간대별 반응"""
     # 기존 점심/공부 관련 로직
     if current_hour >= 22 or current_hour < 6:
-        if any(word in msg for word in ["공부", "과제", "숙제", "발표", "프로젝트"]):
+        word = message_features(msg).first("late_night_study")
+        if word is not None:
             responses = ["늦게까지 고생이 많네요", "잠깐 쉬세요", f"이 시간에 {word}는 너무 힘들죠"]
             return random.choice(responses)
 
@@ -219,25 +378,15 @@ def check_time_sensitive(msg, current_hour):
 
 def check_weather_mood(msg):
     """날씨 관련"""
-    weather_words = {
-        "비": "우울하네요",
-        "눈": "낭만적이네요",
-        "더워": "시원한 곳 가세요",
-        "추워": "따뜻하게 입으세요",
-        "바람": "바람 쐬러 나가세요",
-        "햇살": "좋은 날씨네요",
-        "구름": "흐린 날이네요"
-    }
-    for word, response in weather_words.items():
-        if word in msg:
-            return response
+    word = message_features(msg).first("weather")
+    if word is not None:
+        return WEATHER_WORDS[word]
     return None
 
 
 def check_bot_mention(msg):
     """봇 언급"""
-    bot_keywords = ["크하학", "봇", "AI", "인공지능", "챗봇", "로봇", "너", "넌"]
-    if any(word in msg for word in bot_keywords):
+    if message_features(msg).has("bot"):
         return random.choice([
             "저를 부르셨나요?",
             "네 뭐든지 물어보세요",
@@ -249,8 +398,7 @@ def check_bot_mention(msg):
 
 def check_compliment(msg):
     """칭찬 감지"""
-    compliments = ["귀여워", "똑똑해", "잘해", "좋아", "멋져", "예뻐", "사랑해", "고마워", "최고"]
-    if any(word in msg for word in compliments):
+    if message_features(msg).has("compliment"):
         return random.choice([
             "고마워요 헤헤",
             "저도 좋아해요",
@@ -262,8 +410,10 @@ def check_compliment(msg):
 
 def check_food_mention(msg):
     """음식 언급"""
+    features = message_features(msg)
+
     # 뭐먹을지 물어보는 경우
-    if "뭐먹" in msg or "머먹" in msg:
+    if features.has("food_question"):
         foods = [
             # 한식
             "돼지갈비!!", "황금볶음밥!!", "미역국!!", "닭갈비!!", "떡볶이!!",
@@ -289,8 +439,7 @@ def check_food_mention(msg):
         return random.choice(foods)
 
     # 일반적인 음식 관련 단어들
-    food_words = ["맛있", "맛없", "배고파", "배불러", "먹고싶", "달달"]
-    if any(word in msg for word in food_words):
+    if features.has("food"):
         return random.choice([
             "저도 먹고 싶어요",
             "맛있겠네요",
@@ -302,8 +451,7 @@ def check_food_mention(msg):
 
 def check_study_mention(msg):
     """공부 관련"""
-    study_words = ["시험", "과제", "공부", "숙제", "발표", "프로젝트"]
-    if any(word in msg for word in study_words):
+    if message_features(msg).has("study"):
         return random.choice([
             "화이팅하세요!",
             "열심히 하시네요",
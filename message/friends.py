@@ -1,164 +0,0 @@
-import datetime
-import random
-
-
-def check_friends_message(msg):
-    """친구들 이름이 포함된 메시지 체크"""
-
-    friends_responses = {
-        "하리": [
-            "허리 조심 하리 조심 허리 조심 하리 조심",
-            "담배 피러 가자",
-            "죽어.. 걍",
-        ],
-        "줄리앤": [
-            "줄리앤은 진짜 잘 먹는다. 접시까지 씹어먹음, 왁왁왁왁",
-            "줄리앤...? 냉장고 빈 이유 밝혀짐",
-            "아 배고프다 편의점 갈 사람",
-        ],
-        "샐리": [
-            "I'm Sally, How you doin? 😉",
-            "샐리 등장",
-            "Sally mode 풀가동",
-        ],
-        "카린": [
-            "Pray for Karyn",
-            "Karyn for Pray",
-            "카린 mode 풀가동",
-        ],
-        "에린": [
-            "나는 마르코입니다.",
-            "What!?!?!?",
-            "여러뿐 잠시 쉬었다 갈게요",
-        ],
-        "런도": [
-            "Run Do Run Do Run Do",
-            "아 배고프다 편의점 갈 사람",
-        ],
-        "테더": [
-            "Let me introduce myself, I'm Tether.",
-            "Tether is good.",
-            "I'm The Best Coin Ever",
-        ],
-        "아이퍼": [
-            "담배피러 가자",
-            "아이퍼는 열정! 열정은 아이퍼!",
-            "아이퍼는 연기처럼 사라짐",
-            "담배보다 중독적인 아이퍼 등장",
-            "뭐해 바보야 ㅋㅋ",
-        ],
-        "김예준": [
-            "바보 바보 바보",
-            "바보 바보 바보 바보 바보 바보 바보 바보 바보 바보 바보 바보",
-            "바보",
-            "바보 바보",
-            "바보 바보 바보 바보 바보 바보",
-        ],
-        "모니카": [
-            "하이 가원이~ 근데 너 누구야?",
-            "모니카...? 갑자기 텐션 200%",
-            "모니카는 이름값 하네",
-        ],
-        "예린": [
-            "예린아 파이팅",
-            "예린이는 할 수 있어.",
-            "예린이 말 잘 듣자.",
-            "ㅋㅋㅋㅋㅋㅋㅋㅋㅋㅋㅋㅋㅋㅋㅋㅋㅋㅋㅋㅋㅋㅋㅋㅋㅋㅋㅋㅋ",
-        ],
-        "혜준": [
-            "혜준아, 다리 조심",
-            "혜준아 무릎 조심",
-            "혜준아, 오늘 운동 가?",
-        ],
-        "승욱": [
-            "승욱이형 치킨 사주세요.",
-            "승욱이형 피자 사주세요.",
-        ],
-        "태경": [
-            "태경이형 치킨 먹고 싶어요...",
-            "태경이형 최고",
-        ],
-        "진혁": [
-            "진혁이형 치킨 사주세요",
-            "진혁아, 오늘 운동 가?",
-        ],
-        "강민": [
-            "강민이형 피자 사주세요",
-            "강민아 다시 전문하사 하자",
-        ],
-        "도현": [
-            "도현아 전역 언제함?",
-            "도현아 아직 전역 안했어?",
-        ],
-        "은지": [
-            "은지 바보",
-            "은지, 오늘 운동 함?",
-        ],
-        "재희": [
-            f"재희가 입대한지 {(datetime.date.today() - datetime.date(2025, 6, 9)).days:d}일 ㅋㅋㅋㅋㅋㅋㅋㅋㅋㅋㅋㅋㅋ",
-            f"재희 전역까지 {(datetime.date(2026, 12, 9) - datetime.date.today()).days:d}일"
-        ],
-        "체대 준수": [
-            "아 배고프다. 편의점 갈 사람",
-            "재밌는 얘기 해봐",
-        ],
-        "예공 준수": [
-            "스키장 가고 싶다.",
-            "스키장 가고 싶다. 스키장 가고 싶다.",
-        ],
-        "준수": [
-            "어떤 준수임?"
-        ],
-        "예정": [
-            "왘ㅋㅋ",
-            "운동하러 갈 사람~?",
-            "난 햄버거 2개 먹을 거야. 기억해.",
-        ],
-        "정규": [
-            "부산 오셈",
-        ],
-        "민경": [
-            "바보바보바보바보바보바보바보바보바보바보바보바보바보바보",
-            "바보바보바보바보바보바보바보바보바보바보바보바보",
-            "Sally mode 풀가동",
-        ],
-        "우진": [
-            "우진아 너 동기들은 너가 이제 추가해줘.",
-            "우진이의 전문하사 지원을 응원한다!",
-            f"전역까지는 {(datetime.date(2025, 12, 23)-datetime.date.today()).days:d}일 남음.",
-            f"{(datetime.date(2025, 12, 23)-datetime.date.today()).days:d} \n {(datetime.date(2025, 12, 23)-datetime.date.today()).days:d} \n {(datetime.date(2025, 12, 23)-datetime.date.today()).days:d}",
-        ],
-        "제이슨": [
-            "내일 러닝 갈 사람? 아일라도 간대",
-            "아가리또",
-        ],
-        "섭": [
-            "헤이헤이",
-            "호이호이",
-        ],
-        "레몬": [
-            "크하학봇은 레몬을 좋아해요.",
-            "크하학은 레몬이 지배했다. 크하학",
-        ],
-        "길": "국민의 길! 가자!",
-        "넬": "깻잎 그냥 내가 다 먹을 거임.",
-        "제제": "크하학",
-        "글로니": "흐흠…!!! 막이래~",
-        "이든": "아직 파악 못 함.",
-        "스노우": "정신 안 차림?",
-        "파웰": "왜 자꾸 불러요 😭😭😭",
-
-        # 추가로 원하는 친구들 여기에 추가
-        # "친구이름": ["응답1", "응답2", "응답3"],
-    }
-
-    # 메시지에 친구 이름이 포함되어 있는지 체크
-    for friend_name in friends_responses.keys():
-        if friend_name in msg:
-            response = friends_responses[friend_name]
-            if isinstance(response, list):
-                return random.choice(response)
-            else:
-                return response
-
-    return None
@@ -0,0 +1,37 @@
+"""
+비동기 HTTP 클라이언트 (ASGI 경로용)
+
+업스트림(기상청/포항공대/중앙대)마다 httpx.AsyncClient 하나를 이벤트 루프별로 만들어
+커넥션 풀을 재사용한다. asgi.py가 종료될 때 close_async_clients()로 정리한다.
+snapshot=(업스트림 이름, 기준 URL)을 주면 UPSTREAM_MODE가 record/replay일 때 기록/재생 transport를 끼운다 (snapshots.py).
+"""
+
+import asyncio
+
+import httpx
+
+from modules.snapshots import snapshot_transport, snapshots_enabled
+
+# (이름, 이벤트 루프 id) → AsyncClient
+_clients = {}
+
+
+def get_async_client(name, snapshot=None, **kwargs):
+    """이름별 공용 AsyncClient (처음 부를 때의 kwargs로 생성)"""
+    key = (name, id(asyncio.get_running_loop()))
+    client = _clients.get(key)
+    if client is None or client.is_closed:
+        kwargs.setdefault("limits", httpx.Limits(max_connections=100, max_keepalive_connections=20))
+        if snapshot and snapshots_enabled():
+            # transport를 직접 넘기면 verify/limits는 transport 쪽에 줘야 한다
+            transport_kwargs = {name: kwargs.pop(name) for name in ("verify", "limits") if name in kwargs}
+            kwargs["transport"] = snapshot_transport(*snapshot, **transport_kwargs)
+        client = _clients[key] = httpx.AsyncClient(**kwargs)
+    return client
+
+
+async def close_async_clients():
+    """현재 이벤트 루프의 클라이언트 모두 닫기"""
+    loop_id = id(asyncio.get_running_loop())
+    for key in [key for key in _clients if key[1] == loop_id]:
+        await _clients.pop(key).aclose()
@@ -0,0 +1,238 @@
+"""
+방별 봇 상태 (조용 모드, 아일라/요시 카운터)
+
+MessageHandler는 백엔드가 무엇이든 같은 인터페이스만 사용한다.
+    is_silent(room) / silence(room) / unsilence(room)
+    incr(room, counter, sender, reset_at=None)  - 카운터 증가 후 값 반환
+    status(room)                                - /api/bot/status 응답용 dict
+
+백엔드 선택 (환경 변수):
+    BOT_STATE_BACKEND=memory (기본) - 프로세스 메모리, 방 해시로 락을 나눠 방끼리 경합하지 않는다
+    BOT_STATE_BACKEND=sqlite        - 저장소와 같은 SQLite 파일, gunicorn 워커끼리 상태를 공유한다
+
+오래 안 쓴 방/보낸 사람은 LRU + 유휴 시간(BOT_STATE_IDLE_TTL, 기본 하루) 기준으로 지운다.
+"""
+
+import os
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+
+from dotenv import load_dotenv
+
+from modules.storage import SqliteBackend, get_storage
+
+load_dotenv()
+
+SILENCE_MINUTES = 10
+
+MAX_ROOMS = int(os.getenv('BOT_STATE_MAX_ROOMS', '4096'))
+MAX_SENDERS_PER_ROOM = int(os.getenv('BOT_STATE_MAX_SENDERS', '256'))
+IDLE_TTL = float(os.getenv('BOT_STATE_IDLE_TTL', str(24 * 3600)))
+
+
+def _status(room, silent_until, counts):
+    """status() 응답 dict (두 백엔드 공용)"""
+    return {
+        "room": room,
+        "isSilent": silent_until is not None,
+        "silentUntil": silent_until.isoformat() if silent_until else None,
+        "ailaCount": counts.get("aila", {}),
+        "yoshiCount": counts.get("yoshi", {}),
+    }
+
+
+# ---- 메모리 백엔드 ----
+
+class _RoomState:
+    __slots__ = ("silent_until", "counters", "touched_at")
+
+    def __init__(self, now):
+        self.silent_until = None
+        self.counters = {}
+        self.touched_at = now
+
+
+class MemoryBotState:
+    """프로세스 메모리 방별 상태 (락 스트라이핑 + LRU/TTL 정리)"""
+
+    name = "memory"
+
+    def __init__(self, stripes=16, max_rooms=MAX_ROOMS, max_senders=MAX_SENDERS_PER_ROOM, idle_ttl=IDLE_TTL):
+        # 스트라이프마다 (락, 방 → _RoomState) - 다른 스트라이프의 방끼리는 락을 나누지 않는다
+        self._stripes = [(threading.Lock(), OrderedDict()) for _ in range(stripes)]
+        self._rooms_per_stripe = max(1, max_rooms // stripes)
+        self.max_senders = max_senders
+        self.idle_ttl = idle_ttl
+
+    def _stripe(self, room):
+        return self._stripes[hash(room) % len(self._stripes)]
+
+    def _room(self, rooms, room, create=True):
+        """방 상태 조회 (LRU 순서 갱신, 새로 만들 때 오래된 방 정리), 락 안에서 호출"""
+        now = time.monotonic()
+        state = rooms.get(room)
+        if state is None:
+            if not create:
+                return None
+            state = rooms[room] = _RoomState(now)
+            self._evict(rooms, now)
+        else:
+            rooms.move_to_end(room)
+            state.touched_at = now
+        return state
+
+    def _evict(self, rooms, now):
+        while rooms:
+            oldest = next(iter(rooms.values()))
+            if len(rooms) <= self._rooms_per_stripe and now - oldest.touched_at <= self.idle_ttl:
+                break
+            rooms.popitem(last=False)
+
+    def is_silent(self, room, now=None):
+        """조용 상태 확인 (시간이 지났으면 해제)"""
+        lock, rooms = self._stripe(room)
+        with lock:
+            state = self._room(rooms, room, create=False)
+            if state is None or state.silent_until is None:
+                return False
+            if (now or datetime.now()) > state.silent_until:
+                state.silent_until = None
+                return False
+            return True
+
+    def silence(self, room, minutes=SILENCE_MINUTES):
+        """조용 모드 설정, 해제 시각 반환"""
+        until = datetime.now() + timedelta(minutes=minutes)
+        lock, rooms = self._stripe(room)
+        with lock:
+            self._room(rooms, room).silent_until = until
+        return until
+
+    def unsilence(self, room):
+        lock, rooms = self._stripe(room)
+        with lock:
+            state = self._room(rooms, room, create=False)
+            if state is not None:
+                state.silent_until = None
+
+    def incr(self, room, counter, sender, reset_at=None):
+        """카운터 1 증가 후 값 반환 (reset_at에 도달하면 0으로 되돌린다)"""
+        lock, rooms = self._stripe(room)
+        with lock:
+            senders = self._room(rooms, room).counters.setdefault(counter, OrderedDict())
+            value = senders.pop(sender, 0) + 1
+            senders[sender] = 0 if reset_at is not None and value >= reset_at else value
+            while len(senders) > self.max_senders:
+                senders.popitem(last=False)
+            return value
+
+    def status(self, room):
+        lock, rooms = self._stripe(room)
+        with lock:
+            state = self._room(rooms, room, create=False)
+            if state is None:
+                return _status(room, None, {})
+            silent_until = state.silent_until if state.silent_until and datetime.now() <= state.silent_until else None
+            return _status(room, silent_until, {name: dict(senders) for name, senders in state.counters.items()})
+
+    def __len__(self):
+        return sum(len(rooms) for _, rooms in self._stripes)
+
+    def close(self):
+        pass
+
+
+# ---- SQLite 백엔드 ----
+
+class SqliteBotState:
+    """SQLite 방별 상태 (storage.SqliteBackend의 room_state / room_counters 테이블)"""
+
+    name = "sqlite"
+
+    SELECT_SILENT = "SELECT silent_until FROM room_state WHERE room = ?"
+    UPSERT_SILENT = (
+        "INSERT INTO room_state (room, silent_until, touched_at) VALUES (?, ?, ?) "
+        "ON CONFLICT (room) DO UPDATE SET silent_until = excluded.silent_until, touched_at = excluded.touched_at"
+    )
+    INCR = (
+        "INSERT INTO room_counters (room, counter, sender, value, touched_at) VALUES (?, ?, ?, 1, ?) "
+        "ON CONFLICT (room, counter, sender) DO UPDATE SET value = value + 1, touched_at = excluded.touched_at "
+        "RETURNING value"
+    )
+    RESET = "UPDATE room_counters SET value = 0 WHERE room = ? AND counter = ? AND sender = ?"
+    SELECT_COUNTS = "SELECT counter, sender, value FROM room_counters WHERE room = ?"
+    PURGE_COUNTERS = "DELETE FROM room_counters WHERE touched_at < ?"
+    PURGE_ROOMS = "DELETE FROM room_state WHERE touched_at < ? AND (silent_until IS NULL OR silent_until < ?)"
+
+    # 오래된 행 정리 주기 (초)
+    PURGE_INTERVAL = 300
+
+    def __init__(self, backend, idle_ttl=IDLE_TTL):
+        self.backend = backend
+        self.idle_ttl = idle_ttl
+        self._last_purge = 0.0
+
+    def is_silent(self, room, now=None):
+        row = self.backend.connection().execute(self.SELECT_SILENT, (room,)).fetchone()
+        if row is None or row[0] is None:
+            return False
+        return (now or datetime.now()).timestamp() <= row[0]
+
+    def silence(self, room, minutes=SILENCE_MINUTES):
+        until = datetime.now() + timedelta(minutes=minutes)
+        self.backend.connection().execute(self.UPSERT_SILENT, (room, until.timestamp(), time.time()))
+        return until
+
+    def unsilence(self, room):
+        self.backend.connection().execute(self.UPSERT_SILENT, (room, None, time.time()))
+
+    def incr(self, room, counter, sender, reset_at=None):
+        """카운터 1 증가 후 값 반환 (한 트랜잭션이라 워커끼리 동시에 올려도 값이 겹치지 않는다)"""
+        self._maybe_purge()
+        with self.backend.transaction() as conn:
+            value = conn.execute(self.INCR, (room, counter, sender, time.time())).fetchone()[0]
+            if reset_at is not None and value >= reset_at:
+                conn.execute(self.RESET, (room, counter, sender))
+        return value
+
+    def status(self, room):
+        conn = self.backend.connection()
+        row = conn.execute(self.SELECT_SILENT, (room,)).fetchone()
+        silent_until = None
+        if row is not None and row[0] is not None and time.time() <= row[0]:
+            silent_until = datetime.fromtimestamp(row[0])
+
+        counts = {}
+        for counter, sender, value in conn.execute(self.SELECT_COUNTS, (room,)):
+            counts.setdefault(counter, {})[sender] = value
+        return _status(room, silent_until, counts)
+
+    def _maybe_purge(self):
+        """유휴 시간이 지난 방/카운터 삭제 (PURGE_INTERVAL마다 한 번)"""
+        now = time.time()
+        if now - self._last_purge < self.PURGE_INTERVAL:
+            return
+        self._last_purge = now
+
+        cutoff = now - self.idle_ttl
+        with self.backend.transaction() as conn:
+            conn.execute(self.PURGE_COUNTERS, (cutoff,))
+            conn.execute(self.PURGE_ROOMS, (cutoff, now))
+
+    def close(self):
+        pass
+
+
+def create_bot_state(backend=None):
+    """환경 변수(BOT_STATE_BACKEND) 또는 인자로 방별 상태 백엔드 생성"""
+    backend = (backend or os.getenv('BOT_STATE_BACKEND', 'memory')).lower()
+    if backend == "memory":
+        return MemoryBotState()
+    if backend == "sqlite":
+        storage = get_storage()
+        if not isinstance(storage, SqliteBackend):
+            storage = SqliteBackend(import_json_from=None)
+        return SqliteBotState(storage)
+    raise ValueError(f"지원하지 않는 봇 상태 백엔드다: {backend} (가능: memory, sqlite)")
@@ -0,0 +1,291 @@
+"""
+업스트림 응답 캐시
+
+학식/날씨처럼 외부 API 결과를 잠깐 들고 있는 용도의 TTL 캐시.
+- 단일 요청(single-flight): 같은 키로 동시에 캐시 미스가 나면 업스트림 호출은 한 번만 한다
+- stale-while-revalidate: TTL이 지난 값은 바로 돌려주고 백그라운드에서 새로 가져온다
+- 적중/미스 카운터: cache_stats()로 모든 캐시의 통계를 볼 수 있다
+
+UPSTREAM_CACHE_DISABLED=1 이면 캐시를 거치지 않고 매번 업스트림을 호출한다.
+"""
+
+import asyncio
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# 이름 → TTLCache (통계 조회용)
+_caches = {}
+_caches_lock = threading.Lock()
+
+
+def cache_disabled():
+    """UPSTREAM_CACHE_DISABLED 환경 변수 확인"""
+    return os.getenv('UPSTREAM_CACHE_DISABLED', '').lower() in ('1', 'true', 'yes')
+
+
+class _Entry:
+    __slots__ = ("value", "expires_at", "stale_until")
+
+    def __init__(self, value, expires_at, stale_until):
+        self.value = value
+        self.expires_at = expires_at
+        self.stale_until = stale_until
+
+
+class _Flight:
+    """진행 중인 업스트림 호출 하나 (같은 키를 기다리는 스레드들이 결과를 공유)"""
+
+    __slots__ = ("done", "value", "error")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.value = None
+        self.error = None
+
+
+class TTLCache:
+    """single-flight + stale-while-revalidate TTL 캐시"""
+
+    def __init__(self, name, ttl, stale_ttl=None, max_entries=256):
+        """
+        Args:
+            name: 통계에 표시할 캐시 이름
+            ttl: 값이 신선한 시간(초)
+            stale_ttl: TTL이 지난 뒤에도 값을 돌려줄 수 있는 시간(초), None이면 제한 없음
+            max_entries: 최대 항목 수 (넘으면 가장 오래 안 쓴 항목부터 삭제)
+        """
+        self.name = name
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.max_entries = max_entries
+
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self._flights = {}
+        self._async_flights = {}    # asyncio 경로용 (키 → Future)
+        self._async_tasks = set()   # 백그라운드 갱신 태스크 (GC 방지용 참조)
+
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.coalesced = 0     # 이미 진행 중인 호출에 합류한 미스
+        self.loads = 0
+        self.errors = 0
+
+        with _caches_lock:
+            _caches[name] = self
+
+    def get_or_load(self, key, loader, ttl=None):
+        """캐시에서 값 조회, 없으면 loader()로 가져와 저장
+
+        TTL이 지난 값이 있으면 그 값을 바로 돌려주고 백그라운드에서 loader()를 다시 부른다.
+        값이 아예 없으면 loader()가 끝날 때까지 기다린다 (동시 요청은 한 번의 호출을 공유).
+        """
+        if cache_disabled():
+            return loader()
+
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and now < entry.expires_at:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry.value
+
+            if entry is not None and (entry.stale_until is None or now < entry.stale_until):
+                self._entries.move_to_end(key)
+                self.stale_hits += 1
+                self._refresh_locked(key, loader, ttl)
+                return entry.value
+
+            self.misses += 1
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight()
+            else:
+                self.coalesced += 1
+
+        if leader:
+            self._load(key, loader, ttl, flight)
+        else:
+            flight.done.wait()
+
+        if flight.error is not None:
+            raise flight.error
+        return flight.value
+
+    def refresh(self, key, loader, ttl=None):
+        """캐시 값과 상관없이 지금 loader()로 새로 가져와 저장 (미리 가져오기용)
+
+        같은 키의 호출이 이미 진행 중이면 새로 부르지 않고 그 결과를 기다린다.
+        실패하면 예외를 그대로 올리고, 저장된 값은 건드리지 않는다.
+        """
+        if cache_disabled():
+            return loader()
+
+        with self._lock:
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight()
+
+        if leader:
+            self._load(key, loader, ttl, flight)
+        else:
+            flight.done.wait()
+
+        if flight.error is not None:
+            raise flight.error
+        return flight.value
+
+    def refresh_in_background(self, key, loader, ttl=None):
+        """백그라운드에서 loader()로 값 새로 가져오기 (이미 진행 중이면 무시), 시작했으면 True"""
+        if cache_disabled():
+            return False
+        with self._lock:
+            return self._refresh_locked(key, loader, ttl)
+
+    def _refresh_locked(self, key, loader, ttl):
+        if key in self._flights:
+            return False
+        flight = self._flights[key] = _Flight()
+        threading.Thread(target=self._load, args=(key, loader, ttl, flight), daemon=True).start()
+        return True
+
+    def _load(self, key, loader, ttl, flight):
+        """loader() 호출 후 결과 저장, 기다리는 스레드 깨우기"""
+        try:
+            flight.value = loader()
+            self.set(key, flight.value, ttl)
+        except Exception as e:
+            flight.error = e
+            with self._lock:
+                self.errors += 1
+        finally:
+            with self._lock:
+                self._flights.pop(key, None)
+                if flight.error is None:
+                    self.loads += 1
+            flight.done.set()
+
+    async def get_or_load_async(self, key, loader, ttl=None):
+        """get_or_load의 asyncio 버전 (loader는 코루틴 함수)
+
+        동시 미스는 같은 이벤트 루프 안에서 한 번의 loader() 호출을 공유한다.
+        """
+        if cache_disabled():
+            return await loader()
+
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and now < entry.expires_at:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry.value
+
+            if entry is not None and (entry.stale_until is None or now < entry.stale_until):
+                self._entries.move_to_end(key)
+                self.stale_hits += 1
+                if key not in self._async_flights:
+                    future = self._async_flights[key] = asyncio.get_running_loop().create_future()
+                    task = asyncio.ensure_future(self._load_async(key, loader, ttl, future))
+                    self._async_tasks.add(task)
+                    task.add_done_callback(self._async_tasks.discard)
+                return entry.value
+
+            self.misses += 1
+            future = self._async_flights.get(key)
+            leader = future is None
+            if leader:
+                future = self._async_flights[key] = asyncio.get_running_loop().create_future()
+            else:
+                self.coalesced += 1
+
+        if leader:
+            await self._load_async(key, loader, ttl, future)
+        return await asyncio.shield(future)
+
+    async def _load_async(self, key, loader, ttl, future):
+        """loader() 호출 후 결과 저장, 기다리는 코루틴들에 결과 전달"""
+        try:
+            value = await loader()
+        except Exception as e:
+            with self._lock:
+                self.errors += 1
+                self._async_flights.pop(key, None)
+            future.set_exception(e)
+            # 기다리는 쪽이 없어도 "exception was never retrieved" 경고가 나지 않도록
+            future.exception()
+            return
+        except asyncio.CancelledError:
+            with self._lock:
+                self._async_flights.pop(key, None)
+            future.cancel()
+            raise
+
+        self.set(key, value, ttl)
+        with self._lock:
+            self.loads += 1
+            self._async_flights.pop(key, None)
+        future.set_result(value)
+
+    def set(self, key, value, ttl=None):
+        """값 직접 저장"""
+        ttl = self.ttl if ttl is None else ttl
+        now = time.monotonic()
+        stale_until = None if self.stale_ttl is None else now + ttl + self.stale_ttl
+        with self._lock:
+            self._entries[key] = _Entry(value, now + ttl, stale_until)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def peek(self, key, default=None):
+        """통계/TTL에 영향 없이 저장된 값 조회 (만료된 값도 반환)"""
+        with self._lock:
+            entry = self._entries.get(key)
+            return entry.value if entry is not None else default
+
+    def invalidate(self, key):
+        """항목 하나 삭제"""
+        with self._lock:
+            return self._entries.pop(key, None) is not None
+
+    def clear(self):
+        """전체 삭제"""
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        """적중/미스 카운터"""
+        with self._lock:
+            lookups = self.hits + self.stale_hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "stale_hits": self.stale_hits,
+                "misses": self.misses,
+                "coalesced": self.coalesced,
+                "loads": self.loads,
+                "errors": self.errors,
+                "hit_ratio": round((self.hits + self.stale_hits) / lookups, 3) if lookups else None,
+            }
+
+    def __len__(self):
+        with self._lock:
+            return len(self._entries)
+
+
+def cache_stats():
+    """모든 캐시의 통계 {이름: stats}"""
+    with _caches_lock:
+        caches = list(_caches.values())
+    return {cache.name: cache.stats() for cache in caches}
@@ -1,12 +1,79 @@
+import asyncio
+import contextvars
+import os
 import requests
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
+from requests.adapters import HTTPAdapter
+from urllib.parse import urlparse
 import json
 
+from modules.async_http import get_async_client
+from modules.cache import TTLCache
+from modules.logger import get_logger, fields
+from modules.snapshots import snapshot_session
+from modules.upstream import get_upstream
+
+logger = get_logger("cau_meal")
+
+# 중앙대 포털 주소 (부하 테스트 등에서 가짜 서버로 바꿀 수 있다)
+CAU_MEAL_API_URL = os.getenv('CAU_MEAL_API_URL', "https://mportal.cau.ac.kr")
+
+# 여러 날짜/캠퍼스/식사를 한 번에 조회할 때 동시에 부를 업스트림 호출 수
+# (기본값은 7일 × 2캠퍼스 × 3끼 = 42, 가장 큰 범위 조회도 한 번에 보낸다)
+MEAL_FETCH_WORKERS = int(os.getenv('CAU_MEAL_FETCH_WORKERS', '42'))
+
+_fetch_executor = None
+_fetch_executor_lock = threading.Lock()
+
+# 중앙대 포털 호출 (브레이커 + 지연 예산)
+cau_upstream = get_upstream("cau", urlparse(CAU_MEAL_API_URL).netloc, timeout=10)
+
+# 식사 시간대가 바뀌는 시각 (0시: 날짜 변경, 10시: 조식→중식, 15시: 중식→석식, 21시: 석식 끝)
+MEAL_BOUNDARY_HOURS = [0, 10, 15, 21]
+
+# (캠퍼스, 식사 타입, 날짜 오프셋) → 파싱된 학식 데이터
+# 다음 식사 시간대 경계까지만 유지하고, 지난 값은 다시 쓰지 않는다 (날짜 오프셋 의미가 바뀌므로)
+meal_cache = TTLCache("cau_meal", ttl=3600, stale_ttl=0, max_entries=64)
+
+
+class MealDataUnavailable(Exception):
+    """학식 데이터를 가져오지 못함 (캐시에 저장하지 않기 위해 사용)"""
+
+
+def _raise_for_server_error(response):
+    """5xx 응답은 예외로 (브레이커 실패로 세도록), 나머지는 _handle_meal_response가 처리"""
+    if response.status_code >= 500:
+        response.raise_for_status()
+    return response
+
+
+def _last_good_meal(key):
+    """업스트림 실패 시 마지막으로 받은 값 (만료됐어도 같은 날짜의 메뉴일 때만)"""
+    meal_data = meal_cache.peek(key)
+    if not meal_data:
+        return None
+    target_date = (datetime.now() + timedelta(days=key[2])).strftime('%Y-%m-%d')
+    return meal_data if meal_data.get('date') == target_date else None
+
+
+def seconds_until_next_meal_boundary(now=None):
+    """다음 식사 시간대 경계까지 남은 시간(초)"""
+    now = now or datetime.now()
+    for hour in MEAL_BOUNDARY_HOURS:
+        boundary = now.replace(hour=hour, minute=0, second=0, microsecond=0)
+        if boundary > now:
+            return (boundary - now).total_seconds()
+    tomorrow = now + timedelta(days=1)
+    boundary = tomorrow.replace(hour=MEAL_BOUNDARY_HOURS[0], minute=0, second=0, microsecond=0)
+    return (boundary - now).total_seconds()
+
 
 class CAUMealAPI:
     def __init__(self):
         self.session = requests.Session()
-        self.base_url = "https://mportal.cau.ac.kr"
+        self.base_url = CAU_MEAL_API_URL
 
         # 브라우저 헤더 설정
         self.headers = {
@@ -19,6 +86,13 @@ class CAUMealAPI:
         }
         self.session.headers.update(self.headers)
 
+        # 여러 스레드가 같은 세션을 쓰므로 커넥션 풀을 넉넉히 잡는다
+        adapter = HTTPAdapter(pool_connections=2, pool_maxsize=max(10, MEAL_FETCH_WORKERS))
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        # UPSTREAM_MODE=record/replay면 응답을 기록하거나 기록으로 응답한다
+        snapshot_session(self.session, "cau", self.base_url)
+
         # 캠퍼스 코드
         self.campus = {
             '서울': '1',
@@ -34,62 +108,117 @@ class CAUMealAPI:
 
     def get_meal_data(self, campus='서울', meal_type='중식', date_offset=0, debug=False):
         """
-        학식 데이터 가져오기
+        학식 데이터 가져오기 (다음 식사 시간대 경계까지 캐시)
 
         Args:
             campus: '서울' 또는 '안성'
             meal_type: '조식', '중식', '석식'
             date_offset: 0(오늘), -1(어제), 1(내일), ...
-            debug: True면 상세 디버그 정보 출력
+            debug: True면 상세 디버그 정보 출력 (캐시를 거치지 않음)
         """
+        if debug:
+            return self._request_meal_data(campus, meal_type, date_offset, debug)
+
+        def load():
+            meal_data = self._request_meal_data(campus, meal_type, date_offset)
+            if meal_data is None:
+                raise MealDataUnavailable(f"{campus} {meal_type} 학식 데이터를 가져오지 못했다")
+            return meal_data
+
+        key = (campus, meal_type, date_offset)
         try:
-            # API 엔드포인트
-            api_url = f"{self.base_url}/portlet/p005/p005.ajax"
-
-            # 요청 파라미터 (JavaScript의 vm.searchInfo와 동일)
-            params = {
-                'tabs': self.campus.get(campus, '1'),      # 캠퍼스
-                'tabs2': self.meal_time.get(meal_type, '20'),  # 식사시간
-                'daily': date_offset                        # 날짜 오프셋
-            }
+            return meal_cache.get_or_load(key, load, ttl=seconds_until_next_meal_boundary())
+        except MealDataUnavailable:
+            return _last_good_meal(key)
+
+    async def get_meal_data_async(self, campus='서울', meal_type='중식', date_offset=0):
+        """get_meal_data의 비동기 버전 (httpx, 같은 캐시 사용)"""
+        async def load():
+            meal_data = await self._request_meal_data_async(campus, meal_type, date_offset)
+            if meal_data is None:
+                raise MealDataUnavailable(f"{campus} {meal_type} 학식 데이터를 가져오지 못했다")
+            return meal_data
 
-            print(f"API 요청: {api_url}")
-            print(f"파라미터: {params}")
+        key = (campus, meal_type, date_offset)
+        try:
+            return await meal_cache.get_or_load_async(key, load, ttl=seconds_until_next_meal_boundary())
+        except MealDataUnavailable:
+            return _last_good_meal(key)
+
+    def _meal_request(self, campus, meal_type, date_offset):
+        """(API 엔드포인트, 요청 파라미터)"""
+        # API 엔드포인트
+        api_url = f"{self.base_url}/portlet/p005/p005.ajax"
+
+        # 요청 파라미터 (JavaScript의 vm.searchInfo와 동일)
+        params = {
+            'tabs': self.campus.get(campus, '1'),      # 캠퍼스
+            'tabs2': self.meal_time.get(meal_type, '20'),  # 식사시간
+            'daily': date_offset                        # 날짜 오프셋
+        }
 
-            # POST 요청 (JavaScript에서 $http.post 사용)
-            response = self.session.post(api_url, json=params, timeout=10)
+        logger.debug("API 요청", extra=fields(url=api_url, params=params))
+        return api_url, params
 
-            if response.status_code == 200:
-                data = response.json()
+    def _request_meal_data(self, campus, meal_type, date_offset, debug=False):
+        """API에서 학식 데이터 가져와 파싱"""
+        try:
+            api_url, params = self._meal_request(campus, meal_type, date_offset)
 
-                print(f"응답 성공: {len(data.get('list', []))}개 항목")
+            # POST 요청 (JavaScript에서 $http.post 사용)
+            response = cau_upstream.call(
+                lambda timeout: _raise_for_server_error(self.session.post(api_url, json=params, timeout=timeout)))
+            return self._handle_meal_response(response, campus, meal_type, date_offset, debug)
 
-                # 디버그 모드면 실제 응답 구조 출력
-                if debug:
-                    print("\n=== 디버그: 실제 응답 데이터 ===")
-                    print(f"전체 응답 키: {list(data.keys())}")
-                    print(f"isEmpty: {data.get('isEmpty')}")
+        except Exception as e:
+            logger.warning(f"API 호출 오류: {e}", extra=fields(campus=campus, meal_type=meal_type))
+            return None
 
-                    if 'list' in data and data['list']:
-                        print(f"첫 번째 항목: {data['list'][0]}")
-                        print(f"첫 번째 항목 키들: {list(data['list'][0].keys())}")
+    async def _request_meal_data_async(self, campus, meal_type, date_offset):
+        """_request_meal_data의 비동기 버전"""
+        try:
+            api_url, params = self._meal_request(campus, meal_type, date_offset)
 
-                        # 각 항목의 상세 내용 확인
-                        for i, item in enumerate(data['list'][:3]):  # 처음 3개만
-                            print(f"\n--- 항목 {i+1} ---")
-                            for key, value in item.items():
-                                print(f"{key}: {value}")
+            client = get_async_client("cau_meal", snapshot=("cau", self.base_url), timeout=10, headers=self.headers)
 
-                    print("=== 디버그 종료 ===\n")
+            async def send(timeout):
+                return _raise_for_server_error(await client.post(api_url, json=params, timeout=timeout))
 
-                return self.parse_meal_response(data, campus, meal_type, date_offset, debug)
-            else:
-                print(f"API 응답 오류: {response.status_code}")
-                print(f"응답 내용: {response.text}")
-                return None
+            response = await cau_upstream.call_async(send)
+            return self._handle_meal_response(response, campus, meal_type, date_offset)
 
         except Exception as e:
-            print(f"API 호출 오류: {e}")
+            logger.warning(f"API 호출 오류: {e}", extra=fields(campus=campus, meal_type=meal_type))
+            return None
+
+    def _handle_meal_response(self, response, campus, meal_type, date_offset, debug=False):
+        """HTTP 응답 (requests/httpx) → 파싱된 학식 데이터, 실패하면 None"""
+        if response.status_code == 200:
+            data = response.json()
+
+            logger.debug("응답 성공", extra=fields(items=len(data.get('list', []))))
+
+            # 디버그 모드면 실제 응답 구조 출력
+            if debug:
+                print("\n=== 디버그: 실제 응답 데이터 ===")
+                print(f"전체 응답 키: {list(data.keys())}")
+                print(f"isEmpty: {data.get('isEmpty')}")
+
+                if 'list' in data and data['list']:
+                    print(f"첫 번째 항목: {data['list'][0]}")
+                    print(f"첫 번째 항목 키들: {list(data['list'][0].keys())}")
+
+                    # 각 항목의 상세 내용 확인
+                    for i, item in enumerate(data['list'][:3]):  # 처음 3개만
+                        print(f"\n--- 항목 {i+1} ---")
+                        for key, value in item.items():
+                            print(f"{key}: {value}")
+
+                print("=== 디버그 종료 ===\n")
+
+            return self.parse_meal_response(data, campus, meal_type, date_offset, debug)
+        else:
+            logger.warning(f"API 응답 오류: {response.status_code}", extra=fields(body=response.text[:500]))
             return None
 
     def parse_meal_response(self, data, campus, meal_type, date_offset, debug=False):
@@ -113,7 +242,7 @@ class CAUMealAPI:
             meal_list = data.get('list', [])
 
             if not meal_list:
-                print("메뉴 데이터가 비어있다")
+                logger.debug("메뉴 데이터가 비어있다", extra=fields(campus=campus, meal_type=meal_type))
                 return meal_data
 
             # 식당별로 그룹화 (course별로도 분류)
@@ -182,7 +311,7 @@ class CAUMealAPI:
             return meal_data
 
         except Exception as e:
-            print(f"응답 파싱 오류: {e}")
+            logger.warning(f"응답 파싱 오류: {e}")
             return None
 
     def get_row_data(self, input_data):
@@ -213,7 +342,7 @@ class CAUMealAPI:
         return self.get_all_meals_today_with_offset(campus=campus, date_offset=0)
 
     def get_all_meals_today_with_offset(self, campus='서울', date_offset=0):
-        """특정 날짜의 모든 식사 정보 가져오기"""
+        """특정 날짜의 모든 식사 정보 가져오기 (조식/중식/석식 동시 조회)"""
         target_date = datetime.now() + timedelta(days=date_offset)
 
         all_meals = {
@@ -223,19 +352,38 @@ class CAUMealAPI:
         }
 
         meal_types = ['조식', '중식', '석식']
+        results = self.get_meals([(campus, meal_type, date_offset) for meal_type in meal_types])
 
-        for meal_type in meal_types:
-            print(f"\n=== {meal_type} 정보 가져오는 중 ===")
-            meal_data = self.get_meal_data(
-                campus=campus, meal_type=meal_type, date_offset=date_offset)
-
+        for meal_type, meal_data in zip(meal_types, results):
             if meal_data and not meal_data.get('isEmpty', True):
                 all_meals['meals'][meal_type] = meal_data
             else:
-                print(f"{meal_type} 정보 없음")
+                logger.debug(f"{meal_type} 정보 없음")
 
         return all_meals
 
+    def get_meals(self, targets):
+        """(캠퍼스, 식사 타입, 날짜 오프셋) 목록을 동시에 조회, 같은 순서의 결과 목록 반환 (실패는 None)"""
+        targets = list(targets)
+        if len(targets) <= 1:
+            return [self.get_meal_data(*target) for target in targets]
+
+        # 지연 예산(contextvar)이 작업 스레드에도 적용되도록 컨텍스트를 복사해 넘긴다
+        executor = _get_fetch_executor()
+        futures = [executor.submit(contextvars.copy_context().run, self.get_meal_data, *target)
+                   for target in targets]
+        return [future.result() for future in futures]
+
+    async def get_meals_async(self, targets):
+        """get_meals의 비동기 버전 (동시 호출 수는 MEAL_FETCH_WORKERS로 제한)"""
+        semaphore = asyncio.Semaphore(MEAL_FETCH_WORKERS)
+
+        async def fetch(target):
+            async with semaphore:
+                return await self.get_meal_data_async(*target)
+
+        return list(await asyncio.gather(*(fetch(target) for target in targets)))
+
     def format_meal_output(self, meal_data):
         """메뉴 데이터를 읽기 좋게 포맷팅"""
         if not meal_data:
@@ -400,47 +548,50 @@ def main():
     return {'breakfast': breakfast, 'lunch': lunch, 'dinner': dinner}
 
 
-def get_all_meals_today_with_offset(self, campus='서울', date_offset=0):
-    """특정 날짜의 모든 식사 정보 가져오기"""
-    target_date = datetime.now() + timedelta(days=date_offset)
-
-    all_meals = {
-        'date': target_date.strftime('%Y-%m-%d'),
-        'campus': campus,
-        'meals': {}
-    }
-
-    meal_types = ['조식', '중식', '석식']
-
-    for meal_type in meal_types:
-        print(f"\n=== {meal_type} 정보 가져오는 중 ===")
-        meal_data = self.get_meal_data(
-            campus=campus, meal_type=meal_type, date_offset=date_offset)
-
-        if meal_data and not meal_data.get('isEmpty', True):
-            all_meals['meals'][meal_type] = meal_data
-        else:
-            print(f"{meal_type} 정보 없음")
-
-    return all_meals
+def _get_fetch_executor():
+    global _fetch_executor
+    if _fetch_executor is None:
+        with _fetch_executor_lock:
+            if _fetch_executor is None:
+                _fetch_executor = ThreadPoolExecutor(max_workers=MEAL_FETCH_WORKERS, thread_name_prefix="cau-meal")
+    return _fetch_executor
 
 
-# 메소드를 클래스에 추가
-CAUMealAPI.get_all_meals_today_with_offset = get_all_meals_today_with_offset
-
-# 개별 함수들
+# 공용 클라이언트 (세션/커넥션 풀 재사용)
+cau_meal_api = CAUMealAPI()
 
 
 def get_today_lunch(campus='서울'):
     """오늘 점심 메뉴만 간단히 조회"""
-    api = CAUMealAPI()
-    return api.get_meal_data(campus=campus, meal_type='중식')
+    return cau_meal_api.get_meal_data(campus=campus, meal_type='중식')
 
 
 def get_today_dinner(campus='서울'):
     """오늘 저녁 메뉴만 간단히 조회"""
-    api = CAUMealAPI()
-    return api.get_meal_data(campus=campus, meal_type='석식')
+    return cau_meal_api.get_meal_data(campus=campus, meal_type='석식')
+
+
+def prefetch_meals(campuses=('서울', '안성')):
+    """두 캠퍼스의 오늘 조식/중식/석식을 새로 가져와 캐시에 넣기, 실패한 개수 반환
+
+    캐시에 값이 있어도 다시 가져온다 (늦게 올라온 메뉴 반영). 실패하면 기존 캐시 값을 그대로 둔다.
+    """
+    failed = 0
+    ttl = seconds_until_next_meal_boundary()
+    for campus in campuses:
+        for meal_type in cau_meal_api.meal_time:
+            def load(campus=campus, meal_type=meal_type):
+                meal_data = cau_meal_api._request_meal_data(campus, meal_type, 0)
+                if meal_data is None:
+                    raise MealDataUnavailable(f"{campus} {meal_type} 학식 데이터를 가져오지 못했다")
+                return meal_data
+
+            try:
+                meal_cache.refresh((campus, meal_type, 0), load, ttl=ttl)
+            except MealDataUnavailable:
+                failed += 1
+    logger.info("🍱 중앙대 학식 캐시 갱신", extra=fields(entries=len(meal_cache), failed=failed))
+    return failed
 
 
 if __name__ == "__main__":
@@ -0,0 +1,323 @@
+"""
+리마인드 전달 파이프라인 (웹훅)
+
+스케줄러 스레드는 실행 시각이 된 리마인드를 submit()으로 넣기만 하고 바로 돌아간다.
+- 방별로 묶어서 한 요청에 최대 DELIVERY_BATCH_SIZE개씩 보낸다
+- 전달 큐는 크기가 정해져 있다 (가득 차면 dead letter 파일로)
+- 워커 스레드 DELIVERY_WORKERS개가 공용 세션(커넥션 재사용)으로 보낸다
+- 실패하면 지수 백오프로 DELIVERY_MAX_RETRIES번까지 다시 보내고, 끝내 실패하면 dead letter 파일(JSON Lines)에 남긴다
+  (4xx 응답은 다시 보내도 같으므로 바로 dead letter, 408/429만 재시도)
+
+웹훅 payload (type/message는 기존 형식 그대로, room/reminders 추가):
+    {"type": "reminder", "room": "방 이름", "message": "⏰ 14:30 리마인드: ...\\n...",
+     "reminders": [{"datetime": ..., "content": ..., "room": ..., "sender": ...}, ...],
+     "timestamp": "2025-06-02T14:30:00.123456"}
+
+환경 변수:
+    DELIVERY_WORKERS=4              동시에 웹훅을 보낼 스레드 수
+    DELIVERY_QUEUE_SIZE=1000        전달 큐 크기 (리마인드 묶음 수)
+    DELIVERY_BATCH_SIZE=20          요청 하나에 담을 최대 리마인드 수
+    DELIVERY_MAX_RETRIES=5          재시도 횟수 (2초, 4초, 8초, ... 최대 5분)
+    DELIVERY_TIMEOUT=5              웹훅 요청 timeout(초)
+    DELIVERY_DEAD_LETTER_PATH=reminder_dead_letters.jsonl
+"""
+
+import heapq
+import itertools
+import json
+import os
+import queue
+import random
+import threading
+import time
+from datetime import datetime
+
+import requests
+from dotenv import load_dotenv
+from requests.adapters import HTTPAdapter
+
+from modules.logger import get_logger, fields
+from modules.memory import format_reminder
+from modules.metrics import DELIVERY_ATTEMPTS, DELIVERY_BACKLOG, DELIVERY_DEAD_LETTERS, DELIVERY_SECONDS
+
+load_dotenv()
+
+logger = get_logger("delivery")
+
+DELIVERY_WORKERS = int(os.getenv('DELIVERY_WORKERS', '4'))
+DELIVERY_QUEUE_SIZE = int(os.getenv('DELIVERY_QUEUE_SIZE', '1000'))
+DELIVERY_BATCH_SIZE = int(os.getenv('DELIVERY_BATCH_SIZE', '20'))
+DELIVERY_MAX_RETRIES = int(os.getenv('DELIVERY_MAX_RETRIES', '5'))
+DELIVERY_TIMEOUT = float(os.getenv('DELIVERY_TIMEOUT', '5'))
+DEAD_LETTER_PATH = os.getenv('DELIVERY_DEAD_LETTER_PATH', 'reminder_dead_letters.jsonl')
+
+# 재시도 대기: 2초, 4초, 8초, ... (최대 5분)
+DELIVERY_BACKOFF_BASE = 2
+DELIVERY_BACKOFF_MAX = 300
+
+# 4xx 중 다시 보내면 받아줄 수 있는 응답
+RETRYABLE_STATUS = {408, 429}
+
+
+class DeliveryError(Exception):
+    """웹훅 전송 실패 (retryable이 False면 다시 보내지 않는다)"""
+
+    def __init__(self, message, retryable=True):
+        super().__init__(message)
+        self.retryable = retryable
+
+
+class ReminderBatch:
+    """같은 방의 리마인드 묶음 (웹훅 요청 하나)"""
+
+    __slots__ = ("room", "reminders", "enqueued_at", "attempts", "last_error")
+
+    def __init__(self, room, reminders):
+        self.room = room
+        self.reminders = reminders
+        self.enqueued_at = time.monotonic()
+        self.attempts = 0
+        self.last_error = None
+
+    def payload(self):
+        return {
+            "type": "reminder",
+            "room": self.room,
+            "message": "\n".join(format_reminder(reminder) for reminder in self.reminders),
+            "reminders": self.reminders,
+            "timestamp": datetime.now().isoformat(),
+        }
+
+
+def group_reminders(reminders, batch_size=DELIVERY_BATCH_SIZE):
+    """리마인드 목록 → 방별 ReminderBatch 목록 (방은 처음 나온 순서, 방 안은 실행 시각 순서 그대로)"""
+    by_room = {}
+    for reminder in reminders:
+        by_room.setdefault(reminder.get("room"), []).append(reminder)
+
+    return [ReminderBatch(room, items[start:start + batch_size])
+            for room, items in by_room.items()
+            for start in range(0, len(items), batch_size)]
+
+
+class ReminderDelivery:
+    """웹훅 URL 하나로 리마인드를 보내는 큐 + 워커 풀"""
+
+    def __init__(self, url, workers=DELIVERY_WORKERS, queue_size=DELIVERY_QUEUE_SIZE,
+                 batch_size=DELIVERY_BATCH_SIZE, max_retries=DELIVERY_MAX_RETRIES, timeout=DELIVERY_TIMEOUT,
+                 backoff_base=DELIVERY_BACKOFF_BASE, backoff_max=DELIVERY_BACKOFF_MAX,
+                 dead_letter_path=DEAD_LETTER_PATH):
+        self.url = url
+        self.batch_size = batch_size
+        self.max_retries = max_retries
+        self.timeout = timeout
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.dead_letter_path = dead_letter_path
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max(1, workers))
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+        self._queue = queue.Queue(maxsize=queue_size)
+        # (다시 보낼 시각, 순번, 묶음) 힙
+        self._retries = []
+        self._retry_seq = itertools.count()
+        self._retry_cond = threading.Condition()
+        self._stopping = False
+
+        self._stats_lock = threading.Lock()
+        self._dead_letter_lock = threading.Lock()
+        self.delivered = 0
+        self.delivered_reminders = 0
+        self.dead_letters = 0
+
+        self._threads = [threading.Thread(target=self._run_worker, name=f"delivery-{i}", daemon=True)
+                         for i in range(workers)]
+        self._threads.append(threading.Thread(target=self._run_retries, name="delivery-retry", daemon=True))
+        for thread in self._threads:
+            thread.start()
+
+        DELIVERY_BACKLOG.set_function(self._backlog)
+
+    # ---- 넣기 ----
+
+    def submit(self, reminders):
+        """리마인드를 방별로 묶어 전달 큐에 넣고 바로 반환 (넣은 묶음 수)"""
+        batches = group_reminders(reminders, self.batch_size)
+        return sum(1 for batch in batches if self._enqueue(batch))
+
+    def _enqueue(self, batch):
+        if self._stopping:
+            self._dead_letter(batch, "stopped")
+            return False
+        try:
+            self._queue.put_nowait(batch)
+            return True
+        except queue.Full:
+            self._dead_letter(batch, "queue_full")
+            return False
+
+    # ---- 보내기 ----
+
+    def _run_worker(self):
+        while True:
+            batch = self._queue.get()
+            try:
+                if batch is None:
+                    return
+                self._deliver(batch)
+            except Exception as e:
+                logger.exception(f"❌ 리마인드 전송 워커 오류: {e}")
+            finally:
+                self._queue.task_done()
+
+    def _deliver(self, batch):
+        batch.attempts += 1
+        try:
+            self._post(batch.payload())
+        except Exception as e:
+            batch.last_error = f"{type(e).__name__}: {e}"
+            if not getattr(e, "retryable", True):
+                DELIVERY_ATTEMPTS.inc(("failed",))
+                self._dead_letter(batch, "rejected")
+            elif batch.attempts > self.max_retries:
+                DELIVERY_ATTEMPTS.inc(("failed",))
+                self._dead_letter(batch, "retries")
+            elif self._stopping:
+                DELIVERY_ATTEMPTS.inc(("failed",))
+                self._dead_letter(batch, "stopped")
+            else:
+                DELIVERY_ATTEMPTS.inc(("retry",))
+                self._schedule_retry(batch)
+            return
+
+        DELIVERY_ATTEMPTS.inc(("ok",))
+        DELIVERY_SECONDS.observe(time.monotonic() - batch.enqueued_at, ("ok",))
+        with self._stats_lock:
+            self.delivered += 1
+            self.delivered_reminders += len(batch.reminders)
+        logger.info("✅ 리마인드 전송", extra=fields(
+            room=batch.room, count=len(batch.reminders), attempts=batch.attempts))
+
+    def _post(self, payload):
+        response = self.session.post(self.url, json=payload, timeout=self.timeout)
+        if 200 <= response.status_code < 300:
+            return
+        retryable = response.status_code >= 500 or response.status_code in RETRYABLE_STATUS
+        raise DeliveryError(f"웹훅 응답 {response.status_code}", retryable)
+
+    # ---- 재시도 ----
+
+    def backoff_delay(self, attempts):
+        """attempts번 실패한 뒤 다시 보내기까지 대기 시간(초), ±20% 무작위"""
+        delay = min(self.backoff_max, self.backoff_base * (2 ** (attempts - 1)))
+        return delay * random.uniform(0.8, 1.2)
+
+    def _schedule_retry(self, batch):
+        delay = self.backoff_delay(batch.attempts)
+        logger.warning("🔄 리마인드 전송 실패, 다시 보낸다", extra=fields(
+            room=batch.room, attempt=batch.attempts, retry_in=round(delay, 1), error=batch.last_error))
+        with self._retry_cond:
+            if not self._stopping:
+                heapq.heappush(self._retries, (time.monotonic() + delay, next(self._retry_seq), batch))
+                self._retry_cond.notify()
+                return
+        self._dead_letter(batch, "stopped")
+
+    def _run_retries(self):
+        """재시도 시각이 된 묶음을 다시 전달 큐에 넣는다 (다음 재시도 시각까지 잠든다)"""
+        while True:
+            with self._retry_cond:
+                while not self._stopping:
+                    wait = self._retries[0][0] - time.monotonic() if self._retries else None
+                    if wait is not None and wait <= 0:
+                        break
+                    self._retry_cond.wait(wait)
+                if self._stopping:
+                    return
+
+                # 락 안에서 옮겨야 join()이 큐와 힙 사이에 있는 묶음을 놓치지 않는다
+                now = time.monotonic()
+                while self._retries and self._retries[0][0] <= now:
+                    self._enqueue(heapq.heappop(self._retries)[2])
+
+    # ---- dead letter ----
+
+    def _dead_letter(self, batch, reason):
+        """보내지 못한 묶음을 dead letter 파일에 한 줄로 남긴다"""
+        record = {
+            "failed_at": datetime.now().isoformat(timespec="seconds"),
+            "reason": reason,
+            "url": self.url,
+            "attempts": batch.attempts,
+            "error": batch.last_error,
+            "room": batch.room,
+            "reminders": batch.reminders,
+        }
+        try:
+            with self._dead_letter_lock, open(self.dead_letter_path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(record, ensure_ascii=False) + "\n")
+        except OSError as e:
+            logger.error(f"❌ dead letter 기록 오류: {e}", extra=fields(room=batch.room, reason=reason))
+
+        DELIVERY_DEAD_LETTERS.inc((reason,))
+        DELIVERY_SECONDS.observe(time.monotonic() - batch.enqueued_at, ("dead_letter",))
+        with self._stats_lock:
+            self.dead_letters += 1
+        logger.warning("📮 리마인드 전송 포기 (dead letter)", extra=fields(
+            room=batch.room, count=len(batch.reminders), reason=reason, attempts=batch.attempts,
+            error=batch.last_error))
+
+    # ---- 상태 / 종료 ----
+
+    def _backlog(self):
+        with self._retry_cond:
+            retrying = len(self._retries)
+        return {("queued",): self._queue.qsize(), ("retrying",): retrying}
+
+    def status(self):
+        backlog = self._backlog()
+        with self._stats_lock:
+            return {
+                "url": self.url,
+                "workers": len(self._threads) - 1,
+                "queued": backlog[("queued",)],
+                "retrying": backlog[("retrying",)],
+                "delivered": self.delivered,
+                "delivered_reminders": self.delivered_reminders,
+                "dead_letters": self.dead_letters,
+                "dead_letter_path": self.dead_letter_path,
+            }
+
+    def join(self, timeout=None):
+        """큐와 재시도 대기가 모두 빌 때까지 기다린다 (테스트/종료용), 다 비었으면 True"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while deadline is None or time.monotonic() < deadline:
+            backlog = self._backlog()
+            if not any(backlog.values()) and self._queue.unfinished_tasks == 0:
+                return True
+            time.sleep(0.01)
+        return False
+
+    def stop(self, timeout=10):
+        """큐에 남은 묶음은 보내고 멈춘다 (재시도 대기 중인 묶음은 dead letter로)"""
+        with self._retry_cond:
+            self._stopping = True
+            pending = [batch for _, _, batch in self._retries]
+            self._retries.clear()
+            self._retry_cond.notify_all()
+
+        for batch in pending:
+            self._dead_letter(batch, "stopped")
+
+        deadline = time.monotonic() + timeout
+        for _ in range(len(self._threads) - 1):
+            try:
+                self._queue.put(None, timeout=max(0.0, deadline - time.monotonic()))
+            except queue.Full:
+                break
+        for thread in self._threads:
+            thread.join(max(0.0, deadline - time.monotonic()))
+        self.session.close()
@@ -0,0 +1,275 @@
+"""
+메시지 디스패치 엔진
+
+각 메시지 모듈이 트리거(부분 문자열, 정확히 일치, 조건 함수)를 우선순위와 함께
+등록하면, 부분 문자열 트리거는 전부 하나의 Aho-Corasick 오토마톤으로 컴파일된다.
+메시지 한 번 훑기로 후보 규칙을 모두 찾고, 우선순위 순서대로 핸들러를 호출해
+처음으로 응답을 돌려준 규칙이 이긴다 (기존 if 체인과 같은 first-match 규칙).
+"""
+
+from collections import deque
+
+# 모듈별 우선순위 대역 (작을수록 먼저 체크)
+PRIORITY_CONTROL = 0      # 조용히 해 등 봇 제어
+PRIORITY_MEMORY = 100     # 메모리/리마인드
+PRIORITY_SPECIAL = 200    # 아일라, 요시 (상태 관리)
+PRIORITY_FRIENDS = 300    # 친구 이름
+PRIORITY_GRADUATE = 400   # 졸업/전역/아카데미
+PRIORITY_MEME = 500       # 밈
+PRIORITY_EMOTION = 600    # 감정 표현
+PRIORITY_BASIC = 700      # 기본 명령어 (도움말, 날씨, 학식)
+
+
+class AhoCorasick:
+    """여러 패턴을 한 번에 찾는 Aho-Corasick 오토마톤"""
+
+    def __init__(self):
+        self._goto = [{}]
+        self._fail = [0]
+        self._output = [set()]
+        self._compiled = False
+
+    def add(self, pattern, value):
+        """패턴과 매칭 시 돌려줄 값 등록"""
+        if not pattern:
+            raise ValueError("빈 패턴은 등록할 수 없다")
+
+        state = 0
+        for char in pattern:
+            next_state = self._goto[state].get(char)
+            if next_state is None:
+                next_state = len(self._goto)
+                self._goto.append({})
+                self._fail.append(0)
+                self._output.append(set())
+                self._goto[state][char] = next_state
+            state = next_state
+
+        self._output[state].add(value)
+        self._compiled = False
+
+    def compile(self):
+        """실패 링크 계산 (BFS)"""
+        queue = deque()
+        for next_state in self._goto[0].values():
+            self._fail[next_state] = 0
+            queue.append(next_state)
+
+        while queue:
+            state = queue.popleft()
+            for char, next_state in self._goto[state].items():
+                queue.append(next_state)
+
+                fail = self._fail[state]
+                while fail and char not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[next_state] = self._goto[fail].get(char, 0)
+
+                # 실패 링크 쪽 출력도 미리 합쳐둔다
+                self._output[next_state] |= self._output[self._fail[next_state]]
+
+        # 스캔할 때 set 생성 비용을 줄이기 위해 frozenset으로 고정
+        self._output = [frozenset(out) for out in self._output]
+        self._compiled = True
+
+    def search(self, text):
+        """text에 포함된 모든 패턴의 값 집합 반환"""
+        if not self._compiled:
+            self.compile()
+
+        goto = self._goto
+        fail = self._fail
+        output = self._output
+        found = set()
+        last = None
+        state = 0
+
+        for char in text:
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            out = output[state]
+            # 같은 상태에 머무는 도배(ㅋㅋㅋ...)는 같은 출력을 다시 합치지 않는다
+            if out and out is not last:
+                found |= out
+                last = out
+
+        return found
+
+
+class Rule:
+    """디스패치 규칙 하나"""
+
+    __slots__ = ('name', 'priority', 'order', 'handler', 'predicate', 'with_context', 'async_handler')
+
+    def __init__(self, name, priority, order, handler, predicate=None, with_context=False,
+                 async_handler=None):
+        self.name = name
+        self.priority = priority
+        self.order = order
+        self.handler = handler
+        self.predicate = predicate
+        self.with_context = with_context
+        self.async_handler = async_handler
+
+    def __call__(self, msg, sender, room):
+        if self.with_context:
+            return self.handler(msg, sender, room)
+        return self.handler(msg)
+
+    async def call_async(self, msg, sender, room):
+        """비동기 핸들러가 있으면 await, 없으면 동기 핸들러 그대로 호출 (CPU만 쓰는 규칙)"""
+        if self.async_handler is None:
+            return self(msg, sender, room)
+        if self.with_context:
+            return await self.async_handler(msg, sender, room)
+        return await self.async_handler(msg)
+
+    def __repr__(self):
+        return f"Rule({self.name!r}, priority={self.priority})"
+
+
+class MessageDispatcher:
+    """트리거 기반 메시지 디스패처"""
+
+    def __init__(self):
+        self._pending = []     # (rule, kind, patterns) 등록 순서대로
+        self._rules = []       # 우선순위 순으로 정렬된 규칙
+        self._automaton = None
+        self._casefold_automaton = None
+        self._exact = {}
+        self._predicates = frozenset()
+        self._compiled = False
+
+    # ---- 등록 ----
+
+    def _add(self, kind, patterns, handler, priority, name, predicate=None, with_context=False,
+             async_handler=None):
+        rule = Rule(
+            name=name or getattr(handler, '__name__', 'handler'),
+            priority=priority,
+            order=len(self._pending),
+            handler=handler,
+            predicate=predicate,
+            with_context=with_context,
+            async_handler=async_handler,
+        )
+        self._pending.append((rule, kind, tuple(patterns)))
+        self._compiled = False
+        return rule
+
+    def add_substring(self, keywords, handler, priority, name=None, ignore_case=False, with_context=False,
+                      async_handler=None):
+        """키워드 중 하나라도 메시지에 포함되면 핸들러 호출
+
+        async_handler: 업스트림을 부르는 규칙의 비동기 버전 (dispatch_async에서 사용)
+        """
+        kind = 'casefold' if ignore_case else 'substring'
+        if ignore_case:
+            keywords = [keyword.lower() for keyword in keywords]
+        return self._add(kind, keywords, handler, priority, name, with_context=with_context,
+                         async_handler=async_handler)
+
+    def add_exact(self, texts, handler, priority, name=None, with_context=False, async_handler=None):
+        """메시지가 텍스트 중 하나와 정확히 일치하면 핸들러 호출"""
+        return self._add('exact', texts, handler, priority, name, with_context=with_context,
+                         async_handler=async_handler)
+
+    def add_predicate(self, predicate, handler, priority, name=None, with_context=False, async_handler=None):
+        """조건 함수가 참이면 핸들러 호출 (키워드로 표현할 수 없는 규칙용)"""
+        return self._add('predicate', (), handler, priority, name,
+                         predicate=predicate, with_context=with_context, async_handler=async_handler)
+
+    # ---- 컴파일 ----
+
+    def compile(self):
+        """등록된 트리거를 오토마톤과 인덱스로 컴파일"""
+        ordered = sorted(self._pending, key=lambda item: (item[0].priority, item[0].order))
+
+        automaton = AhoCorasick()
+        casefold_automaton = AhoCorasick()
+        has_casefold = False
+        exact = {}
+        predicates = set()
+
+        for index, (rule, kind, patterns) in enumerate(ordered):
+            if kind == 'substring':
+                for pattern in patterns:
+                    automaton.add(pattern, index)
+            elif kind == 'casefold':
+                has_casefold = True
+                for pattern in patterns:
+                    casefold_automaton.add(pattern, index)
+            elif kind == 'exact':
+                for text in patterns:
+                    exact.setdefault(text, []).append(index)
+            elif kind == 'predicate':
+                predicates.add(index)
+
+        automaton.compile()
+        if has_casefold:
+            casefold_automaton.compile()
+
+        self._rules = [rule for rule, _, _ in ordered]
+        self._automaton = automaton
+        self._casefold_automaton = casefold_automaton if has_casefold else None
+        self._exact = exact
+        self._predicates = frozenset(predicates)
+        self._compiled = True
+        return self
+
+    # ---- 매칭 ----
+
+    def candidates(self, msg):
+        """메시지에 걸리는 후보 규칙 (우선순위 순)"""
+        if not self._compiled:
+            self.compile()
+
+        hits = self._automaton.search(msg)
+        if self._casefold_automaton is not None:
+            hits |= self._casefold_automaton.search(msg.lower())
+        exact = self._exact.get(msg)
+        if exact:
+            hits.update(exact)
+        if self._predicates:
+            hits |= self._predicates
+
+        rules = self._rules
+        return [rules[index] for index in sorted(hits)]
+
+    def dispatch_with_rule(self, msg, sender=None, room=None, candidates=None):
+        """(응답, 응답한 규칙) 반환. 아무 규칙도 응답하지 않으면 (None, None)
+
+        candidates: 이미 구한 candidates(msg) (없으면 여기서 검색한다)
+        """
+        if candidates is None:
+            candidates = self.candidates(msg)
+        for rule in candidates:
+            if rule.predicate is not None and not rule.predicate(msg):
+                continue
+            response = rule(msg, sender, room)
+            if response:
+                return response, rule
+        return None, None
+
+    def dispatch(self, msg, sender=None, room=None):
+        """응답 반환 (없으면 None)"""
+        response, _ = self.dispatch_with_rule(msg, sender, room)
+        return response
+
+    async def dispatch_with_rule_async(self, msg, sender=None, room=None, candidates=None):
+        """dispatch_with_rule의 비동기 버전 (규칙 순서/의미는 같다)"""
+        if candidates is None:
+            candidates = self.candidates(msg)
+        for rule in candidates:
+            if rule.predicate is not None and not rule.predicate(msg):
+                continue
+            response = await rule.call_async(msg, sender, room)
+            if response:
+                return response, rule
+        return None, None
+
+    async def dispatch_async(self, msg, sender=None, room=None):
+        """응답 반환 (없으면 None)"""
+        response, _ = await self.dispatch_with_rule_async(msg, sender, room)
+        return response
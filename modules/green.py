@@ -0,0 +1,30 @@
+"""
+gevent 워커 지원 (gunicorn.conf.py의 GUNICORN_WORKER_CLASS=gevent)
+
+gunicorn gevent 워커는 워커 프로세스가 시작할 때 monkey.patch_all()로 socket/ssl/threading/time/queue를 바꾼다.
+그 뒤에 import한 모듈은 requests 세션, threading.Thread/Lock/Event/Condition, time.sleep이 모두 그린렛 단위로
+양보하므로 업스트림을 기다리는 동안 같은 워커의 다른 요청이 돈다. 패치 전에 import하면 진짜 스레드/락이
+만들어져 그린렛끼리 락을 기다리다 워커 전체가 멈추므로, gevent 모드에서는 preload_app을 끄고
+백그라운드 작업(스케줄러, 응답 팩 감시)은 앱을 불러온 뒤(post_worker_init)에 시작한다.
+
+패치 뒤에는 threading.local도 그린렛마다 따로가 된다. 그린렛은 요청마다 새로 생기므로
+요청마다 새로 만들 필요가 없는 것(SQLite 연결, 메트릭 샤드)은 os_thread_local()로 OS 스레드마다 하나만 둔다.
+그린렛끼리 나눠 써도 되는 이유: 그 객체를 쓰는 구간(SQL 문 하나, 트랜잭션, dict 갱신) 안에는 양보 지점이 없다.
+"""
+
+import sys
+import threading
+
+
+def gevent_patched():
+    """gevent monkey patch가 threading에 적용됐는지"""
+    monkey = sys.modules.get("gevent.monkey")
+    return monkey is not None and monkey.is_module_patched("threading")
+
+
+def os_thread_local():
+    """OS 스레드마다 하나인 local (gevent 패치가 없으면 threading.local과 같다)"""
+    if gevent_patched():
+        from gevent.monkey import get_original
+        return get_original("_thread", "_local")()
+    return threading.local()
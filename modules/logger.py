@@ -0,0 +1,246 @@
+"""
+로깅 설정 (JSON 한 줄 로그 + 큐 기반 비동기 출력)
+
+요청을 처리하는 스레드는 로그 레코드를 큐에 넣기만 하고,
+포맷팅과 stdout 쓰기는 별도 쓰기 스레드가 모아서 한 번에 한다.
+큐가 가득 차면 로그를 버린다 (요청을 막지 않는다).
+
+사용법:
+    from modules.logger import get_logger, fields
+    logger = get_logger("weather")
+    logger.info("🌤️ 날씨 조회", extra=fields(location="포항", elapsed_ms=12.3))
+
+환경 변수:
+    LOG_FORMAT=json (기본) / text
+    LOG_LEVEL=INFO                            전체 기본 레벨
+    LOG_LEVELS=cau_meal=DEBUG,weather=WARNING 모듈별 레벨
+    LOG_DEBUG_SAMPLE=0.01                     DEBUG 로그 중 남길 비율 (기본: 개발 1.0, 그 외 0.01)
+    LOG_QUEUE_SIZE=10000                      큐 크기
+"""
+
+import atexit
+import json
+import logging
+import os
+import queue
+import random
+import sys
+import threading
+from datetime import datetime
+from logging.handlers import QueueHandler
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+ROOT_LOGGER = "khh"
+
+_setup_lock = threading.Lock()
+_handler = None
+_listener = None
+
+
+def fields(**kwargs):
+    """logger.info(..., extra=fields(key=value)) 용 구조화 필드"""
+    return {"fields": kwargs}
+
+
+class JsonFormatter(logging.Formatter):
+    """레코드 하나 → JSON 한 줄"""
+
+    def format(self, record):
+        entry = {
+            "ts": datetime.fromtimestamp(record.created).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        extra = getattr(record, "fields", None)
+        if extra:
+            entry.update(extra)
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class TextFormatter(logging.Formatter):
+    """개발용: [시각] 메시지 key=value ..."""
+
+    def format(self, record):
+        line = f"[{datetime.fromtimestamp(record.created).strftime('%Y-%m-%d %H:%M:%S')}] {record.getMessage()}"
+        extra = getattr(record, "fields", None)
+        if extra:
+            line += " | " + " ".join(f"{key}={value}" for key, value in extra.items())
+        if record.exc_info:
+            line += "\n" + self.formatException(record.exc_info)
+        return line
+
+
+class DebugSampler(logging.Filter):
+    """DEBUG 레코드는 rate 비율만 남긴다 (INFO 이상은 모두 통과)"""
+
+    def __init__(self, rate):
+        super().__init__()
+        self.rate = rate
+
+    def filter(self, record):
+        return record.levelno > logging.DEBUG or self.rate >= 1.0 or random.random() < self.rate
+
+
+class NonBlockingQueueHandler(QueueHandler):
+    """큐가 가득 차면 기다리지 않고 버리는 QueueHandler
+
+    포맷팅은 쓰기 스레드에서 하도록 prepare()에서 레코드를 그대로 넘긴다.
+    """
+
+    def __init__(self, log_queue, maxsize=10000):
+        super().__init__(log_queue)
+        self.maxsize = maxsize
+        self.dropped = 0
+
+    def handle(self, record):
+        # 큐 자체가 스레드 안전하므로 핸들러 락을 잡지 않는다
+        if self.filter(record):
+            self.emit(record)
+            return True
+        return False
+
+    def prepare(self, record):
+        return record
+
+    def enqueue(self, record):
+        # SimpleQueue는 크기 제한이 없어서 대략적인 길이로 판단한다
+        if self.queue.qsize() >= self.maxsize:
+            self.dropped += 1
+            return
+        self.queue.put_nowait(record)
+
+
+def _debug_sample_rate():
+    default = "1.0" if os.getenv('FLASK_ENV', '').lower() == 'development' else "0.01"
+    return float(os.getenv('LOG_DEBUG_SAMPLE', default))
+
+
+class BatchWriter:
+    """큐에서 레코드를 꺼내 포맷팅하고, 쌓인 만큼 한 번에 써서 flush도 한 번만 한다"""
+
+    _STOP = object()
+    MAX_BATCH = 512
+
+    def __init__(self, log_queue, stream, formatter):
+        self.queue = log_queue
+        self.stream = stream
+        self.formatter = formatter
+        self._thread = threading.Thread(target=self._run, name="log-writer", daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        """남은 로그를 모두 쓰고 종료"""
+        self.queue.put(self._STOP)
+        self._thread.join()
+
+    def _run(self):
+        while True:
+            batch = [self.queue.get()]
+            while len(batch) < self.MAX_BATCH:
+                try:
+                    batch.append(self.queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            stop = any(record is self._STOP for record in batch)
+            lines = []
+            for record in batch:
+                if record is self._STOP:
+                    continue
+                try:
+                    lines.append(self.formatter.format(record))
+                except Exception:
+                    pass
+            if lines:
+                try:
+                    self.stream.write("\n".join(lines) + "\n")
+                    self.stream.flush()
+                except Exception:
+                    pass
+            if stop:
+                return
+
+
+def _formatter():
+    if os.getenv('LOG_FORMAT', 'json').lower() == 'text':
+        return TextFormatter()
+    return JsonFormatter()
+
+
+def _apply_module_levels():
+    """LOG_LEVELS=cau_meal=DEBUG,weather=WARNING → khh.cau_meal, khh.weather 레벨"""
+    for item in os.getenv('LOG_LEVELS', '').split(','):
+        name, _, level = item.partition('=')
+        if name.strip() and level.strip():
+            logging.getLogger(f"{ROOT_LOGGER}.{name.strip()}").setLevel(level.strip().upper())
+
+
+def _start_listener():
+    """새 큐 + 쓰기 스레드 시작 (fork 후 자식에서도 호출)"""
+    global _listener
+    log_queue = queue.SimpleQueue()
+    _handler.queue = log_queue
+    _listener = BatchWriter(log_queue, sys.stdout, _formatter())
+    _listener.start()
+
+
+def _restart_after_fork():
+    # 부모의 쓰기 스레드는 fork 후 자식에 없다 → 자식용 큐/스레드를 새로 만든다
+    if _handler is not None:
+        _start_listener()
+
+
+def stop_logging():
+    """큐에 남은 로그를 모두 쓰고 쓰기 스레드 정지"""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+def setup_logging():
+    """khh 로거 설정 (여러 번 불러도 한 번만)"""
+    global _handler
+
+    if _handler is not None:
+        return
+
+    with _setup_lock:
+        if _handler is not None:
+            return
+
+        root = logging.getLogger(ROOT_LOGGER)
+        root.setLevel(os.getenv('LOG_LEVEL', 'INFO').upper())
+        root.propagate = False
+
+        # 출력하지 않는 호출 위치/스레드/프로세스 정보는 레코드마다 구하지 않는다
+        # (logging 문서의 최적화 항목)
+        logging._srcfile = None
+        logging.logThreads = False
+        logging.logProcesses = False
+        logging.logMultiprocessing = False
+
+        handler = NonBlockingQueueHandler(None, int(os.getenv('LOG_QUEUE_SIZE', '10000')))
+        handler.addFilter(DebugSampler(_debug_sample_rate()))
+        _handler = handler
+        _start_listener()
+        root.addHandler(handler)
+        _apply_module_levels()
+
+        if hasattr(os, 'register_at_fork'):
+            os.register_at_fork(after_in_child=_restart_after_fork)
+        atexit.register(stop_logging)
+
+
+def get_logger(name):
+    """모듈용 로거 (khh.<name>)"""
+    setup_logging()
+    return logging.getLogger(f"{ROOT_LOGGER}.{name}")
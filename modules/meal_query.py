@@ -0,0 +1,273 @@
+"""
+중앙대 학식 범위 조회 (여러 날짜 × 캠퍼스 × 식사 타입)
+
+GET /api/meal/range 와 채팅 명령어("중학 내일", "다학 이번주 점심", "중앙대 3일")가 같이 사용한다.
+조회할 칸(날짜, 캠퍼스, 식사)은 CAUMealAPI.get_meals로 한꺼번에 동시에 보내고,
+결과는 항상 날짜 → 캠퍼스(서울, 안성) → 식사(조식, 중식, 석식) 순서로 합친다.
+"""
+
+import os
+from datetime import datetime, timedelta
+
+from modules.cau_meal import cau_meal_api
+
+# 한 번에 조회할 수 있는 최대 일수
+MAX_RANGE_DAYS = int(os.getenv('MEAL_RANGE_MAX_DAYS', '7'))
+
+# 오늘 기준으로 조회할 수 있는 날짜 범위 (일)
+MAX_DATE_OFFSET = 30
+
+CAMPUSES = tuple(cau_meal_api.campus)           # ('서울', '안성')
+MEAL_TYPES = tuple(cau_meal_api.meal_time)      # ('조식', '중식', '석식')
+DAY_NAMES = ['월', '화', '수', '목', '금', '토', '일']
+
+MEAL_ICONS = {'조식': '🌅', '중식': '🍱', '석식': '🌙'}
+
+# 채팅 명령어: 첫 단어 → 캠퍼스
+COMMAND_CAMPUSES = {
+    "중학": ('서울',),
+    "다학": ('안성',),
+    "중앙대": CAMPUSES,
+}
+
+# 채팅 명령어: 식사 단어 → 식사 타입
+COMMAND_MEAL_TYPES = {
+    "조식": '조식', "아침": '조식',
+    "중식": '중식', "점심": '중식',
+    "석식": '석식', "저녁": '석식',
+}
+
+# 채팅 명령어: 기간 단어 → (시작 오프셋, 일수), 이번주는 오늘부터 일요일까지
+COMMAND_PERIODS = {
+    "오늘": (0, 1),
+    "내일": (1, 1),
+    "모레": (2, 1),
+    "일주일": (0, 7),
+}
+
+
+class MealQueryError(ValueError):
+    """잘못된 범위 조회 요청 (메시지는 사용자에게 그대로 보여준다)"""
+
+
+class MealRangeQuery:
+    """조회할 날짜 오프셋 × 캠퍼스 × 식사 타입 (모두 정해진 순서로 정렬)"""
+
+    __slots__ = ("offsets", "campuses", "meal_types")
+
+    def __init__(self, offsets, campuses=CAMPUSES, meal_types=MEAL_TYPES):
+        self.offsets = tuple(sorted(set(offsets)))
+        self.campuses = tuple(campus for campus in CAMPUSES if campus in campuses)
+        self.meal_types = tuple(meal_type for meal_type in MEAL_TYPES if meal_type in meal_types)
+
+    def targets(self):
+        """(캠퍼스, 식사 타입, 날짜 오프셋) 목록, 날짜 → 캠퍼스 → 식사 순서"""
+        return [(campus, meal_type, offset)
+                for offset in self.offsets
+                for campus in self.campuses
+                for meal_type in self.meal_types]
+
+    def __repr__(self):
+        return f"MealRangeQuery({self.offsets}, {self.campuses}, {self.meal_types})"
+
+
+def _split(value):
+    return [item.strip() for item in str(value).split(',') if item.strip()]
+
+
+def _parse_choices(value, choices, aliases, label):
+    """'서울,안성' / '전체' / 없음 → 선택지 튜플"""
+    if not value or value == '전체':
+        return choices
+
+    selected = []
+    for item in _split(value):
+        item = aliases.get(item, item)
+        if item not in choices:
+            raise MealQueryError(f"지원하지 않는 {label}: {item} (사용 가능: {', '.join(choices)})")
+        selected.append(item)
+    return tuple(selected)
+
+
+def _parse_date(value, today):
+    try:
+        return datetime.strptime(value, '%Y-%m-%d').date()
+    except ValueError:
+        raise MealQueryError(f"날짜 형식이 잘못됐다: {value} (예: {today.isoformat()})")
+
+
+def _range_offsets(start_offset, days):
+    if days < 1 or days > MAX_RANGE_DAYS:
+        raise MealQueryError(f"조회 기간은 1~{MAX_RANGE_DAYS}일이어야 한다")
+    if abs(start_offset) > MAX_DATE_OFFSET or abs(start_offset + days - 1) > MAX_DATE_OFFSET:
+        raise MealQueryError(f"오늘 기준 {MAX_DATE_OFFSET}일 안의 날짜만 조회할 수 있다")
+    return range(start_offset, start_offset + days)
+
+
+def parse_range_params(args, today=None):
+    """GET /api/meal/range 파라미터 → MealRangeQuery
+
+    start=2025-06-02 (기본 오늘), end=2025-06-08 또는 days=7 (기본 1일),
+    campus=서울,안성 (기본 전체), type=조식,중식,석식 (기본 전체)
+    """
+    today = today or datetime.now().date()
+
+    start = _parse_date(args['start'], today) if args.get('start') else today
+    if args.get('end'):
+        days = (_parse_date(args['end'], today) - start).days + 1
+    else:
+        try:
+            days = int(args.get('days') or 1)
+        except ValueError:
+            raise MealQueryError(f"days는 숫자여야 한다: {args.get('days')}")
+
+    offsets = _range_offsets((start - today).days, days)
+    campuses = _parse_choices(args.get('campus'), CAMPUSES, {}, "캠퍼스")
+    meal_types = _parse_choices(args.get('type'), MEAL_TYPES, COMMAND_MEAL_TYPES, "식사 타입")
+    return MealRangeQuery(offsets, campuses, meal_types)
+
+
+def parse_meal_command(msg, today=None):
+    """채팅 명령어 → MealRangeQuery, 범위 조회 명령어가 아니면 None
+
+    예) 중학 내일 / 다학 이번주 점심 / 중앙대 3일 저녁
+    """
+    words = msg.split()
+    if len(words) < 2 or words[0] not in COMMAND_CAMPUSES:
+        return None
+
+    today = today or datetime.now().date()
+    period = None
+    meal_types = []
+
+    for word in words[1:]:
+        if word == "학식":
+            continue
+        if word in COMMAND_MEAL_TYPES:
+            meal_types.append(COMMAND_MEAL_TYPES[word])
+        elif word in COMMAND_PERIODS:
+            period = COMMAND_PERIODS[word]
+        elif word == "이번주":
+            period = (0, 7 - today.weekday())
+        elif word.endswith("일") and word[:-1].isdigit():
+            period = (0, int(word[:-1]))
+        else:
+            return None
+
+    # 기간이 없으면 기존 단일 명령어("중앙대 점심" 등)의 몫
+    if period is None:
+        return None
+
+    start_offset, days = period
+    try:
+        offsets = _range_offsets(start_offset, days)
+    except MealQueryError:
+        return None
+    return MealRangeQuery(offsets, COMMAND_CAMPUSES[words[0]], meal_types or MEAL_TYPES)
+
+
+def build_range_result(query, results, today=None):
+    """조회 결과 목록 (query.targets() 순서) → 날짜별/캠퍼스별로 묶은 dict"""
+    today = today or datetime.now().date()
+    cells = iter(results)
+
+    days = []
+    for offset in query.offsets:
+        date = today + timedelta(days=offset)
+        campuses = []
+        for campus in query.campuses:
+            meals = {meal_type: next(cells) for meal_type in query.meal_types}
+            campuses.append({"campus": campus, "meals": meals})
+        days.append({"date": date.isoformat(), "day": DAY_NAMES[date.weekday()], "campuses": campuses})
+
+    return {
+        "start": days[0]["date"] if days else None,
+        "end": days[-1]["date"] if days else None,
+        "campuses": list(query.campuses),
+        "meal_types": list(query.meal_types),
+        "days": days,
+    }
+
+
+def fetch_meal_range(query, today=None):
+    """범위 조회 (업스트림 호출은 동시에)"""
+    return build_range_result(query, cau_meal_api.get_meals(query.targets()), today)
+
+
+async def fetch_meal_range_async(query, today=None):
+    """fetch_meal_range의 비동기 버전"""
+    return build_range_result(query, await cau_meal_api.get_meals_async(query.targets()), today)
+
+
+def _format_day_label(day):
+    return f"{day['date'][5:].replace('-', '/')}({day['day']})"
+
+
+def format_meal_range(result):
+    """범위 조회 결과 → 채팅용 텍스트 (코스별 메뉴를 한 줄로)"""
+    days = result["days"]
+    if not days:
+        return "학식 정보를 가져올 수 없다"
+
+    period = _format_day_label(days[0])
+    if len(days) > 1:
+        period += f" ~ {_format_day_label(days[-1])}"
+    lines = [f"📍 중앙대학교 학식 {period}\n"]
+
+    for day in days:
+        if len(days) > 1:
+            lines.append(f"\n📅 {_format_day_label(day)}\n")
+        for campus in day["campuses"]:
+            for meal_type, meal_data in campus["meals"].items():
+                lines.append(f"{MEAL_ICONS.get(meal_type, '🍽️')} {campus['campus']} {meal_type}:\n")
+                if not meal_data:
+                    lines.append("  학식 정보를 가져올 수 없다\n")
+                    continue
+                if meal_data.get('isEmpty', True) or not meal_data.get('restaurants'):
+                    lines.append("  메뉴 정보 없음\n")
+                    continue
+                for restaurant in meal_data['restaurants']:
+                    for course in restaurant.get('courses', []):
+                        name = " ".join(part for part in (restaurant['name'], course.get('course', '')) if part)
+                        price = f" ({course['price']})" if course.get('price') else ""
+                        lines.append(f"  🏪 {name}{price}: {', '.join(course.get('menus', []))}\n")
+
+    return "".join(lines).rstrip("\n")
+
+
+def handle_meal_range_request(args):
+    """GET /api/meal/range → 응답 dict"""
+    try:
+        query = parse_range_params(args)
+    except MealQueryError as e:
+        return {"success": False, "error": str(e)}
+
+    result = fetch_meal_range(query)
+    return {"success": True, "data": result, "text": format_meal_range(result)}
+
+
+async def handle_meal_range_request_async(args):
+    """handle_meal_range_request의 비동기 버전"""
+    try:
+        query = parse_range_params(args)
+    except MealQueryError as e:
+        return {"success": False, "error": str(e)}
+
+    result = await fetch_meal_range_async(query)
+    return {"success": True, "data": result, "text": format_meal_range(result)}
+
+
+def meal_range_reply(msg):
+    """채팅 명령어 응답 (범위 조회 명령어가 아니면 None)"""
+    query = parse_meal_command(msg)
+    if query is None:
+        return None
+    return format_meal_range(fetch_meal_range(query))
+
+
+async def meal_range_reply_async(msg):
+    """meal_range_reply의 비동기 버전"""
+    query = parse_meal_command(msg)
+    if query is None:
+        return None
+    return format_meal_range(await fetch_meal_range_async(query))
@@ -1,7 +1,21 @@
-import json
-import os
 from datetime import datetime, timedelta
 
+from modules.dispatcher import PRIORITY_MEMORY
+from modules.storage import get_storage
+
+# 저장소 백엔드 (STORAGE_BACKEND: sqlite 기본, json 선택 가능)
+storage = get_storage()
+
+# 방별 메모, 개인 메모
+room_memories = storage.room_memories
+personal_memories = storage.personal_memories
+
+# 리마인드 - 실행 시각 순으로 꺼낼 수 있는 큐
+reminder_queue = storage.reminders
+
+# message_memory가 반응하는 키워드 (디스패처 트리거)
+MEMORY_KEYWORDS = ["!기억", "뭐였", "뭐더라", "!삭제", "!리마인드", "내일", "오늘"]
+
 
 def message_memory(message, room, sender):
     """메모리 기능 메인 함수"""
@@ -20,26 +34,25 @@ def message_memory(message, room, sender):
     return None
 
 
+def register_memory_triggers(dispatcher, priority=PRIORITY_MEMORY):
+    """디스패처에 메모리/리마인드 트리거 등록"""
+    dispatcher.add_substring(
+        MEMORY_KEYWORDS,
+        lambda msg, sender, room: message_memory(msg, room, sender),
+        priority,
+        name="memory",
+        with_context=True,
+    )
+
+
 def message_remem(message, room):
     """방별 메모 저장"""
     # "!기억해" 또는 "!기억" 제거
     message = message.replace("!기억해", "").replace("!기억", "").strip()
 
     if len(message) != 0:
-        # rem.json 파일에서 기존 데이터 로드
-        if os.path.isfile("rem.json"):
-            with open("rem.json", "r", encoding="utf-8") as f:
-                rem_dict = json.load(f)
-        else:
-            rem_dict = {}
-
         # 방별로 메모 저장
-        rem_dict[room] = message
-
-        # JSON 파일에 저장
-        json_data = json.dumps(rem_dict, ensure_ascii=False, indent=4)
-        with open("rem.json", "w", encoding="utf-8") as f:
-            f.write(json_data)
+        room_memories.set(room, message)
 
         return f"'{message}' 기억했다"
 
@@ -48,21 +61,17 @@ def message_remem(message, room):
 
 def message_mem_return(sender):
     """개인별 메모 조회"""
-    if os.path.isfile("mem.json"):
-        with open("mem.json", "r", encoding="utf-8") as f:
-            mem_dict = json.load(f)
-        if sender in mem_dict:
-            return f"{mem_dict[sender]}\\m^^7"
+    content = personal_memories.get(sender)
+    if content is not None:
+        return f"{content}\\m^^7"
     return "기억나는 게 없다"
 
 
 def message_remem_return(room):
     """방별 메모 조회"""
-    if os.path.isfile("rem.json"):
-        with open("rem.json", "r", encoding="utf-8") as f:
-            rem_dict = json.load(f)
-        if room in rem_dict:
-            return f"{rem_dict[room]}\\m아마 이거일 듯?"
+    content = room_memories.get(room)
+    if content is not None:
+        return f"{content}\\m아마 이거일 듯?"
     return "이 방에서 기억한 게 없다"
 
 
@@ -73,43 +82,17 @@ def message_delete(message, room, sender):
 
     if message == "방별" or message == "":
         # 방별 메모 삭제
-        if os.path.isfile("rem.json"):
-            with open("rem.json", "r", encoding="utf-8") as f:
-                rem_dict = json.load(f)
-
-            if room in rem_dict:
-                deleted_content = rem_dict[room]
-                del rem_dict[room]
-
-                json_data = json.dumps(rem_dict, ensure_ascii=False, indent=4)
-                with open("rem.json", "w", encoding="utf-8") as f:
-                    f.write(json_data)
-
-                return f"'{deleted_content}' 삭제했다"
-            else:
-                return "이 방에서 기억한 게 없다"
-        else:
-            return "이 방에서 기억한 게 없다"
+        deleted_content = room_memories.pop(room)
+        if deleted_content is not None:
+            return f"'{deleted_content}' 삭제했다"
+        return "이 방에서 기억한 게 없다"
 
     elif message == "개인":
         # 개인별 메모 삭제
-        if os.path.isfile("mem.json"):
-            with open("mem.json", "r", encoding="utf-8") as f:
-                mem_dict = json.load(f)
-
-            if sender in mem_dict:
-                deleted_content = mem_dict[sender]
-                del mem_dict[sender]
-
-                json_data = json.dumps(mem_dict, ensure_ascii=False, indent=4)
-                with open("mem.json", "w", encoding="utf-8") as f:
-                    f.write(json_data)
-
-                return f"개인 메모 '{deleted_content}' 삭제했다"
-            else:
-                return "개인 메모가 없다"
-        else:
-            return "개인 메모가 없다"
+        deleted_content = personal_memories.pop(sender)
+        if deleted_content is not None:
+            return f"개인 메모 '{deleted_content}' 삭제했다"
+        return "개인 메모가 없다"
 
     else:
         return "사용법: !삭제 방별 또는 !삭제 개인"
@@ -160,12 +143,6 @@ def message_remind(message, room, sender):
             return "과거 시간으로는 리마인드를 설정할 수 없다"
 
         # 리마인드 저장
-        if os.path.isfile("reminders.json"):
-            with open("reminders.json", "r", encoding="utf-8") as f:
-                reminders = json.load(f)
-        else:
-            reminders = []
-
         reminder = {
             "datetime": remind_datetime.isoformat(),
             "content": reminder_content,
@@ -174,11 +151,7 @@ def message_remind(message, room, sender):
             "created_at": datetime.now().isoformat()
         }
 
-        reminders.append(reminder)
-
-        json_data = json.dumps(reminders, ensure_ascii=False, indent=4)
-        with open("reminders.json", "w", encoding="utf-8") as f:
-            f.write(json_data)
+        reminder_queue.add(reminder)
 
         formatted_time = remind_datetime.strftime("%m월 %d일 %H:%M")
         return f"'{reminder_content}' 리마인드를 {formatted_time}에 설정했다"
@@ -189,48 +162,25 @@ def message_remind(message, room, sender):
         return f"리마인드 설정 중 오류: {str(e)}"
 
 
-def check_reminders():
-    """현재 시간의 리마인드 체크"""
-    if not os.path.isfile("reminders.json"):
-        return None
-
-    try:
-        with open("reminders.json", "r", encoding="utf-8") as f:
-            reminders = json.load(f)
-
-        current_time = datetime.now()
-        triggered_reminders = []
-        remaining_reminders = []
+def pop_due_reminders():
+    """실행 시각이 된 리마인드 dict 목록 (힙에서 꺼낸다, 5분 넘게 지난 건 삭제만)"""
+    return reminder_queue.due()
 
-        for reminder in reminders:
-            remind_time = datetime.fromisoformat(reminder["datetime"])
 
-            # 현재 시간이 리마인드 시간을 지났는지 체크 (5분 이내)
-            time_diff = (current_time - remind_time).total_seconds()
+def format_reminder(reminder):
+    """리마인드 하나 → 알림 문자열"""
+    formatted_time = datetime.fromisoformat(reminder["datetime"]).strftime("%H:%M")
+    return f"⏰ {formatted_time} 리마인드: {reminder['content']}"
 
-            if 0 <= time_diff <= 300:  # 0~5분 이내
-                triggered_reminders.append(reminder)
-            elif time_diff < 0:  # 아직 시간이 안 됨
-                remaining_reminders.append(reminder)
-            # time_diff > 300이면 이미 지난 리마인드 (삭제)
 
-        # 남은 리마인드만 저장
-        if len(remaining_reminders) != len(reminders):
-            json_data = json.dumps(remaining_reminders,
-                                   ensure_ascii=False, indent=4)
-            with open("reminders.json", "w", encoding="utf-8") as f:
-                f.write(json_data)
+def check_reminders():
+    """현재 시간의 리마인드 체크"""
+    try:
+        triggered_reminders = pop_due_reminders()
 
         # 실행할 리마인드가 있으면 반환
         if triggered_reminders:
-            messages = []
-            for reminder in triggered_reminders:
-                formatted_time = datetime.fromisoformat(
-                    reminder["datetime"]).strftime("%H:%M")
-                messages.append(
-                    f"⏰ {formatted_time} 리마인드: {reminder['content']}")
-
-            return "\n".join(messages)
+            return "\n".join(format_reminder(reminder) for reminder in triggered_reminders)
 
     except Exception as e:
         return f"리마인드 체크 중 오류: {str(e)}"
@@ -240,15 +190,11 @@ def check_reminders():
 
 def get_all_reminders(room=None):
     """모든 리마인드 조회 (선택적으로 방별)"""
-    if not os.path.isfile("reminders.json"):
-        return "설정된 리마인드가 없다"
-
     try:
-        with open("reminders.json", "r", encoding="utf-8") as f:
-            reminders = json.load(f)
-
         if room:
-            reminders = [r for r in reminders if r.get("room") == room]
+            reminders = reminder_queue.for_room(room)
+        else:
+            reminders = reminder_queue.all()
 
         if not reminders:
             return "설정된 리마인드가 없다"
@@ -267,65 +213,27 @@ def get_all_reminders(room=None):
 
 def save_personal_memory(sender, content):
     """개인 메모 저장 (확장 기능)"""
-    if os.path.isfile("mem.json"):
-        with open("mem.json", "r", encoding="utf-8") as f:
-            mem_dict = json.load(f)
-    else:
-        mem_dict = {}
-
-    mem_dict[sender] = content
-
-    json_data = json.dumps(mem_dict, ensure_ascii=False, indent=4)
-    with open("mem.json", "w", encoding="utf-8") as f:
-        f.write(json_data)
+    personal_memories.set(sender, content)
 
 
 def get_all_room_memories():
     """모든 방 메모리 조회 (디버그용)"""
-    if os.path.isfile("rem.json"):
-        with open("rem.json", "r", encoding="utf-8") as f:
-            return json.load(f)
-    return {}
+    return room_memories.snapshot()
 
 
 def get_all_personal_memories():
     """모든 개인 메모리 조회 (디버그용)"""
-    if os.path.isfile("mem.json"):
-        with open("mem.json", "r", encoding="utf-8") as f:
-            return json.load(f)
-    return {}
+    return personal_memories.snapshot()
 
 
 def clear_room_memory(room):
     """특정 방 메모리 삭제"""
-    if os.path.isfile("rem.json"):
-        with open("rem.json", "r", encoding="utf-8") as f:
-            rem_dict = json.load(f)
-
-        if room in rem_dict:
-            del rem_dict[room]
-
-            json_data = json.dumps(rem_dict, ensure_ascii=False, indent=4)
-            with open("rem.json", "w", encoding="utf-8") as f:
-                f.write(json_data)
-            return True
-    return False
+    return room_memories.delete(room)
 
 
 def clear_personal_memory(sender):
     """특정 개인 메모리 삭제"""
-    if os.path.isfile("mem.json"):
-        with open("mem.json", "r", encoding="utf-8") as f:
-            mem_dict = json.load(f)
-
-        if sender in mem_dict:
-            del mem_dict[sender]
-
-            json_data = json.dumps(mem_dict, ensure_ascii=False, indent=4)
-            with open("mem.json", "w", encoding="utf-8") as f:
-                f.write(json_data)
-            return True
-    return False
+    return personal_memories.delete(sender)
 
 
 # 테스트 함수
@@ -0,0 +1,393 @@
+"""
+JSON 스냅샷 + 추가 전용(append-only) 저널 기반 키-값 저장소
+
+- 파일은 처음 접근할 때 한 번만 읽고, 조회는 메모리의 dict에서 바로 처리한다.
+- 변경은 저널 파일(<파일명>.journal)에 한 줄씩 추가만 하고,
+  백그라운드 스레드가 주기적으로 스냅샷(<파일명>)으로 합친다(compaction).
+- gunicorn 워커 여러 개가 같은 파일을 써도 변경이 사라지지 않도록
+  저널 추가/압축은 flock으로 직렬화하고, 조회 전에 다른 워커가 추가한 저널을 따라 읽는다.
+
+fsync 정책 (환경 변수 MEMORY_FSYNC):
+    always   - 변경마다 fsync (가장 안전, 가장 느림)
+    everysec - 1초마다 백그라운드에서 fsync (기본값)
+    no       - fsync 하지 않음 (OS에 맡김)
+"""
+
+import atexit
+import fcntl
+import json
+import os
+import threading
+import time
+import weakref
+
+from dotenv import load_dotenv
+
+from modules.logger import get_logger
+
+load_dotenv()
+
+logger = get_logger("memory_store")
+
+FSYNC_ALWAYS = "always"
+FSYNC_EVERYSEC = "everysec"
+FSYNC_NO = "no"
+FSYNC_POLICIES = (FSYNC_ALWAYS, FSYNC_EVERYSEC, FSYNC_NO)
+
+_MISSING = object()
+
+# 생성된 저장소 목록 (백그라운드 스레드, fork 후 초기화용)
+_stores = weakref.WeakSet()
+
+
+class MemoryStore:
+    """메모리 dict로 조회하고 저널로 기록하는 키-값 저장소"""
+
+    def __init__(self, path, fsync_policy=None, compact_interval=30.0, compact_threshold=1000,
+                 listener=None, upgrade=None):
+        """
+        Args:
+            path: 스냅샷 JSON 파일 경로 (예: "rem.json")
+            fsync_policy: "always" / "everysec" / "no" (기본값: MEMORY_FSYNC 또는 everysec)
+            compact_interval: 저널을 스냅샷으로 합치는 주기(초)
+            compact_threshold: 저널 레코드가 이만큼 쌓이면 주기를 기다리지 않고 합친다
+            listener: 데이터가 바뀔 때 알림 받을 객체
+                      (on_reload(data), on_set(key, value), on_delete(key))
+            upgrade: 스냅샷이 dict가 아닐 때(예전 형식) dict로 바꾸는 함수
+        """
+        policy = fsync_policy or os.getenv('MEMORY_FSYNC', FSYNC_EVERYSEC)
+        if policy not in FSYNC_POLICIES:
+            raise ValueError(f"지원하지 않는 fsync 정책이다: {policy} (가능: {', '.join(FSYNC_POLICIES)})")
+
+        self.path = path
+        self.fsync_policy = policy
+        self.compact_interval = compact_interval
+        self.compact_threshold = compact_threshold
+        self.listener = listener
+        self.upgrade = upgrade
+
+        self._lock = threading.RLock()
+        self._reset_state()
+        _stores.add(self)
+
+    def _reset_state(self):
+        """프로세스별 상태 초기화 (처음 생성 시, fork 직후)"""
+        self._loaded = False
+        self._data = {}
+        self._snapshot_path = None
+        self._journal_path = None
+        self._lock_path = None
+        self._snapshot_id = None     # 마지막으로 읽은 스냅샷의 (inode, mtime)
+        self._journal_offset = 0     # 저널에서 읽은 위치
+        self._journal_fd = None
+        self._pending_records = 0    # 압축 이후 쌓인 저널 레코드 수
+        self._dirty = False          # fsync 안 된 쓰기가 있는지
+        self._last_compact = time.monotonic()
+
+    # ---- 파일 접근 ----
+
+    def _ensure_loaded(self):
+        """처음 접근할 때 경로를 확정하고 스냅샷 + 저널 로드"""
+        if self._loaded:
+            return
+
+        # 경로는 처음 쓰는 시점의 작업 디렉토리 기준으로 확정한다
+        self._snapshot_path = os.path.abspath(self.path)
+        self._journal_path = self._snapshot_path + ".journal"
+        self._lock_path = self._snapshot_path + ".lock"
+        self._loaded = True
+
+        with self._file_lock(fcntl.LOCK_SH):
+            self._reload()
+
+    def _file_lock(self, mode):
+        return _FileLock(self._lock_path, mode)
+
+    def _stat_id(self, path):
+        try:
+            st = os.stat(path)
+        except FileNotFoundError:
+            return None
+        return (st.st_ino, st.st_mtime_ns)
+
+    def _reload(self):
+        """스냅샷을 다시 읽고 저널 전체를 재생"""
+        data = {}
+        self._snapshot_id = self._stat_id(self._snapshot_path)
+        if self._snapshot_id is not None:
+            with open(self._snapshot_path, "r", encoding="utf-8") as f:
+                content = f.read()
+            if content.strip():
+                data = json.loads(content)
+
+        upgraded = False
+        if not isinstance(data, dict):
+            if self.upgrade is None:
+                raise ValueError(f"{self.path}: 스냅샷이 dict 형식이 아니다")
+            data = self.upgrade(data)
+            upgraded = True
+
+        self._data = data
+        self._journal_offset = 0
+        # 예전 형식이었으면 다음 압축 때 dict로 다시 쓰도록 표시
+        self._pending_records = 1 if upgraded else 0
+        if self.listener is not None:
+            self.listener.on_reload(dict(data))
+        self._replay_tail()
+
+    def _replay_tail(self):
+        """다른 워커가 저널에 추가한 레코드 따라 읽기"""
+        try:
+            with open(self._journal_path, "rb") as f:
+                f.seek(self._journal_offset)
+                chunk = f.read()
+        except FileNotFoundError:
+            return
+
+        # 쓰는 중인 마지막 줄은 다음에 읽는다
+        end = chunk.rfind(b"\n")
+        if end < 0:
+            return
+
+        for line in chunk[:end].split(b"\n"):
+            if line.strip():
+                self._apply(json.loads(line))
+                self._pending_records += 1
+
+        self._journal_offset += end + 1
+
+    def _apply(self, record):
+        key = record["key"]
+        if record["op"] == "set":
+            self._data[key] = record["value"]
+            if self.listener is not None:
+                self.listener.on_set(key, record["value"])
+        elif record["op"] == "del":
+            if self._data.pop(key, _MISSING) is not _MISSING and self.listener is not None:
+                self.listener.on_delete(key)
+
+    def _refresh(self, locked=False):
+        """조회/변경 전에 디스크 변경 사항 반영 (보통은 stat 두 번으로 끝난다)"""
+        self._ensure_loaded()
+
+        try:
+            journal_size = os.stat(self._journal_path).st_size
+        except FileNotFoundError:
+            journal_size = 0
+
+        # 다른 워커가 압축해서 스냅샷이 바뀌었거나 저널이 비워졌으면 다시 읽는다
+        if (self._stat_id(self._snapshot_path) != self._snapshot_id
+                or journal_size < self._journal_offset):
+            if locked:
+                self._reload()
+            else:
+                with self._file_lock(fcntl.LOCK_SH):
+                    self._reload()
+        elif journal_size > self._journal_offset:
+            self._replay_tail()
+
+    def _append(self, record):
+        """저널에 레코드 한 줄 추가 (파일 락을 잡은 상태에서 호출)"""
+        if self._journal_fd is None:
+            self._journal_fd = os.open(
+                self._journal_path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+
+        line = (json.dumps(record, ensure_ascii=False) + "\n").encode("utf-8")
+        os.write(self._journal_fd, line)
+        self._journal_offset += len(line)
+        self._pending_records += 1
+
+        if self.fsync_policy == FSYNC_ALWAYS:
+            os.fsync(self._journal_fd)
+        else:
+            self._dirty = True
+
+        _ensure_background_thread()
+
+    def _mutate(self, record):
+        """다른 워커의 변경을 먼저 반영하고 레코드를 적용/기록"""
+        with self._lock:
+            self._ensure_loaded()
+            with self._file_lock(fcntl.LOCK_EX):
+                self._refresh(locked=True)
+                previous = self._data.get(record["key"], _MISSING)
+                if record["op"] == "del" and previous is _MISSING:
+                    return previous
+                self._apply(record)
+                self._append(record)
+                return previous
+
+    # ---- 공개 API ----
+
+    def refresh(self):
+        """다른 워커의 변경 사항 반영 (listener에 알림이 간다)"""
+        with self._lock:
+            self._refresh()
+
+    def get(self, key, default=None):
+        """값 조회"""
+        with self._lock:
+            self._refresh()
+            return self._data.get(key, default)
+
+    def __contains__(self, key):
+        with self._lock:
+            self._refresh()
+            return key in self._data
+
+    def __len__(self):
+        with self._lock:
+            self._refresh()
+            return len(self._data)
+
+    def snapshot(self):
+        """전체 데이터 복사본"""
+        with self._lock:
+            self._refresh()
+            return dict(self._data)
+
+    def set(self, key, value):
+        """값 저장"""
+        self._mutate({"op": "set", "key": key, "value": value})
+
+    def pop(self, key, default=None):
+        """값을 지우고 반환 (여러 워커가 동시에 pop해도 한 곳만 값을 받는다)"""
+        previous = self._mutate({"op": "del", "key": key})
+        return default if previous is _MISSING else previous
+
+    def delete(self, key):
+        """값 삭제, 지웠으면 True"""
+        return self._mutate({"op": "del", "key": key}) is not _MISSING
+
+    def flush(self):
+        """쓰기 대기 중인 저널 fsync"""
+        with self._lock:
+            if self._dirty and self._journal_fd is not None:
+                if self.fsync_policy != FSYNC_NO:
+                    os.fsync(self._journal_fd)
+                self._dirty = False
+
+    def compact(self):
+        """저널을 스냅샷으로 합치고 저널 비우기"""
+        with self._lock:
+            self._ensure_loaded()
+            with self._file_lock(fcntl.LOCK_EX):
+                self._refresh(locked=True)
+                if self._pending_records == 0 and self._snapshot_id is not None:
+                    self._last_compact = time.monotonic()
+                    return
+
+                tmp_path = f"{self._snapshot_path}.tmp.{os.getpid()}"
+                json_data = json.dumps(self._data, ensure_ascii=False, indent=4)
+                with open(tmp_path, "w", encoding="utf-8") as f:
+                    f.write(json_data)
+                    if self.fsync_policy != FSYNC_NO:
+                        f.flush()
+                        os.fsync(f.fileno())
+                os.replace(tmp_path, self._snapshot_path)
+
+                # 저널 비우기 (다른 워커는 스냅샷이 바뀐 걸 보고 다시 읽는다)
+                with open(self._journal_path, "a", encoding="utf-8") as f:
+                    f.truncate(0)
+
+                self._snapshot_id = self._stat_id(self._snapshot_path)
+                self._journal_offset = 0
+                self._pending_records = 0
+                self._dirty = False
+                self._last_compact = time.monotonic()
+
+    def _tick(self, now):
+        """백그라운드 스레드에서 1초마다 호출"""
+        if not self._loaded:
+            return
+        if self.fsync_policy == FSYNC_EVERYSEC:
+            self.flush()
+        if self._pending_records and (
+                self._pending_records >= self.compact_threshold
+                or now - self._last_compact >= self.compact_interval):
+            self.compact()
+
+    def close(self):
+        """남은 저널을 스냅샷으로 합치고 파일 닫기"""
+        with self._lock:
+            if not self._loaded:
+                return
+            self.flush()
+            if self._pending_records:
+                self.compact()
+            if self._journal_fd is not None:
+                os.close(self._journal_fd)
+                self._journal_fd = None
+
+
+class _FileLock:
+    """flock 기반 프로세스 간 락"""
+
+    def __init__(self, path, mode):
+        self.path = path
+        self.mode = mode
+        self.fd = None
+
+    def __enter__(self):
+        self.fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        fcntl.flock(self.fd, self.mode)
+        return self
+
+    def __exit__(self, *exc):
+        fcntl.flock(self.fd, fcntl.LOCK_UN)
+        os.close(self.fd)
+        self.fd = None
+
+
+# ---- 백그라운드 fsync / 압축 스레드 ----
+
+_background_thread = None
+_background_lock = threading.Lock()
+
+
+def _background_loop():
+    while True:
+        time.sleep(1)
+        now = time.monotonic()
+        for store in list(_stores):
+            try:
+                store._tick(now)
+            except Exception as e:
+                logger.exception(f"❌ 메모리 저장소 백그라운드 작업 오류 ({store.path}): {e}")
+
+
+def _ensure_background_thread():
+    """첫 쓰기 때 백그라운드 스레드 시작 (워커 프로세스마다 하나)"""
+    global _background_thread
+
+    if _background_thread is not None and _background_thread.is_alive():
+        return
+
+    with _background_lock:
+        if _background_thread is None or not _background_thread.is_alive():
+            _background_thread = threading.Thread(
+                target=_background_loop, name="memory-store-flusher", daemon=True)
+            _background_thread.start()
+
+
+def _after_fork_in_child():
+    """fork 후 자식 프로세스에서 락/파일 디스크립터/스레드 상태 초기화"""
+    global _background_thread, _background_lock
+
+    _background_thread = None
+    _background_lock = threading.Lock()
+    for store in list(_stores):
+        store._lock = threading.RLock()
+        store._reset_state()
+
+
+def _close_all():
+    for store in list(_stores):
+        try:
+            store.close()
+        except Exception as e:
+            logger.exception(f"❌ 메모리 저장소 종료 오류 ({store.path}): {e}")
+
+
+os.register_at_fork(after_in_child=_after_fork_in_child)
+atexit.register(_close_all)
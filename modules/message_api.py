@@ -0,0 +1,199 @@
+"""
+/api/message, /api/messages/batch 요청 처리 (Flask app.py와 ASGI asgi.py가 같이 사용)
+
+두 앱이 같은 JSON 모양을 돌려주도록 요청 검증과 응답 dict 생성을 여기 모아둔다.
+레이트 리밋(rate_limit.py)은 메모리/핸들러를 부르기 전에 메시지마다 확인한다 (배치는 메시지마다 따로).
+"""
+
+import asyncio
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from modules.memory import message_memory
+from modules.metrics import HANDLER_SECONDS
+from modules.rate_limit import get_rate_limiter, limited_result
+from modules.upstream import latency_budget
+
+# 배치 하나에 담을 수 있는 최대 메시지 수
+MAX_BATCH_SIZE = int(os.getenv("BATCH_MAX_MESSAGES", "100"))
+# 서로 다른 방을 동시에 처리할 스레드 수 (Flask 경로)
+BATCH_WORKERS = int(os.getenv("BATCH_WORKERS", "8"))
+
+_batch_executor = None
+_batch_executor_lock = threading.Lock()
+
+
+def parse_message_request(data):
+    """요청 JSON 검증, (에러 응답 dict 또는 None, msg, sender, room) 반환"""
+    if not data or not isinstance(data, dict):
+        return {"success": False, "error": "JSON 데이터가 필요하다"}, None, None, None
+
+    msg = data.get('message', '').strip()
+    sender = data.get('sender', '익명')
+    room = data.get('room', '기본방')
+
+    if not msg:
+        return {"success": False, "error": "메시지가 비어있다"}, None, None, None
+
+    return None, msg, sender, room
+
+
+def message_result(msg, sender, room, response, response_type, handler=None):
+    """응답 dict 생성 (response가 없으면 '처리할 수 없는 메시지', handler는 응답한 모듈 태그)"""
+    if not response:
+        return {
+            "success": True,
+            "data": {
+                "response": None,
+                "message": "처리할 수 없는 메시지다"
+            }
+        }
+
+    return {
+        "success": True,
+        "data": {
+            "response": response,
+            "type": response_type,
+            "sender": sender,
+            "room": room,
+            "original_message": msg,
+            "handler": handler
+        }
+    }
+
+
+def _acquire(handler, msg, sender, room, candidates):
+    """레이트 리밋 확인 → 기다려야 할 초 (0이면 통과, 아무 규칙에도 걸리지 않는 메시지는 세지 않는다)"""
+    budget = handler.rate_budget(msg, candidates)
+    if budget is None:
+        return 0.0
+    return get_rate_limiter().acquire(room, sender, budget)
+
+
+def handle_message_request(data, handler):
+    """메시지 요청 하나 처리 → 응답 dict"""
+    try:
+        error, msg, sender, room = parse_message_request(data)
+        if error:
+            return error
+
+        candidates = handler.candidates(msg)
+        retry_after = _acquire(handler, msg, sender, room, candidates)
+        if retry_after:
+            return limited_result(retry_after)
+
+        start = time.perf_counter()
+
+        # 먼저 메모리 기능 체크
+        memory_response = message_memory(msg, room, sender)
+        if memory_response:
+            HANDLER_SECONDS.observe(time.perf_counter() - start, ("memory",))
+            return message_result(msg, sender, room, memory_response, "memory", "memory")
+
+        # 메모리 기능이 없으면 일반 메시지 처리 (업스트림 대기는 지연 예산 안에서만)
+        with latency_budget():
+            response, tag = handler.process_message_tagged(msg, sender, room, candidates)
+        HANDLER_SECONDS.observe(time.perf_counter() - start, (tag,))
+        return message_result(msg, sender, room, response, "message", tag)
+
+    except Exception as e:
+        return {"success": False, "error": str(e)}
+
+
+async def handle_message_request_async(data, handler):
+    """handle_message_request의 비동기 버전 (업스트림 호출만 await)"""
+    try:
+        error, msg, sender, room = parse_message_request(data)
+        if error:
+            return error
+
+        candidates = handler.candidates(msg)
+        retry_after = _acquire(handler, msg, sender, room, candidates)
+        if retry_after:
+            return limited_result(retry_after)
+
+        start = time.perf_counter()
+
+        memory_response = message_memory(msg, room, sender)
+        if memory_response:
+            HANDLER_SECONDS.observe(time.perf_counter() - start, ("memory",))
+            return message_result(msg, sender, room, memory_response, "memory", "memory")
+
+        with latency_budget():
+            response, tag = await handler.process_message_tagged_async(msg, sender, room, candidates)
+        HANDLER_SECONDS.observe(time.perf_counter() - start, (tag,))
+        return message_result(msg, sender, room, response, "message", tag)
+
+    except Exception as e:
+        return {"success": False, "error": str(e)}
+
+
+def parse_batch_request(data):
+    """배치 요청 JSON 검증 ([...] 또는 {"messages": [...]}), (에러 응답 dict 또는 None, 메시지 목록) 반환"""
+    items = data.get('messages') if isinstance(data, dict) else data
+    if not isinstance(items, list) or not items:
+        return {"success": False, "error": "messages 배열이 필요하다"}, None
+
+    if len(items) > MAX_BATCH_SIZE:
+        return {"success": False, "error": f"한 번에 {MAX_BATCH_SIZE}개까지만 보낼 수 있다"}, None
+
+    return None, items
+
+
+def group_by_room(items):
+    """방별로 (원래 순서, 메시지) 목록 묶기 (방 안의 순서는 그대로)"""
+    groups = {}
+    for index, item in enumerate(items):
+        room = item.get('room', '기본방') if isinstance(item, dict) else None
+        groups.setdefault(room, []).append((index, item))
+    return list(groups.values())
+
+
+def _get_batch_executor():
+    global _batch_executor
+    if _batch_executor is None:
+        with _batch_executor_lock:
+            if _batch_executor is None:
+                _batch_executor = ThreadPoolExecutor(max_workers=BATCH_WORKERS, thread_name_prefix="batch")
+    return _batch_executor
+
+
+def handle_batch_request(data, handler):
+    """메시지 배치 처리 → 응답 dict (결과는 요청 순서대로, 방 안은 순서대로, 방끼리는 동시에)"""
+    error, items = parse_batch_request(data)
+    if error:
+        return error
+
+    results = [None] * len(items)
+
+    def run_room(entries):
+        for index, item in entries:
+            results[index] = handle_message_request(item, handler)
+
+    groups = group_by_room(items)
+    if len(groups) == 1:
+        run_room(groups[0])
+    else:
+        executor = _get_batch_executor()
+        for future in [executor.submit(run_room, entries) for entries in groups]:
+            future.result()
+
+    return {"success": True, "data": results}
+
+
+async def handle_batch_request_async(data, handler):
+    """handle_batch_request의 비동기 버전 (방별 코루틴을 동시에 실행)"""
+    error, items = parse_batch_request(data)
+    if error:
+        return error
+
+    results = [None] * len(items)
+
+    async def run_room(entries):
+        for index, item in entries:
+            results[index] = await handle_message_request_async(item, handler)
+
+    await asyncio.gather(*(run_room(entries) for entries in group_by_room(items)))
+    return {"success": True, "data": results}
@@ -1,273 +1,234 @@
-from modules.weather import get_weather_api
-from modules.memory import message_memory
-from message.friends import check_friends_message
-from message.graduate import check_graduate_message
+from modules.weather import get_weather_api, get_weather_api_async
+from modules.memory import register_memory_triggers
+from modules.bot_state import create_bot_state
+from modules.metrics import handler_tag
+from modules.postech_meal import get_postech_meal, get_postech_meal_async
+from modules.cau_meal import cau_meal_api
+from modules.meal_query import COMMAND_CAMPUSES, meal_range_reply, meal_range_reply_async
+from modules.dispatcher import (
+    MessageDispatcher,
+    PRIORITY_CONTROL,
+    PRIORITY_SPECIAL,
+    PRIORITY_BASIC,
+)
+from modules.response_packs import add_pack_listener, get_packs
+from modules.rate_limit import CHAT, MEAL, WEATHER
 from message.admin import check_admin_message
-from message.cry_laugh_stress import check_cry_laugh_stress_message
-from message.meme import check_meme_message
-from datetime import datetime, timedelta  # 이게 파일 맨 위에 있나?
+from message.cry_laugh_stress import register_emotion_triggers
+from datetime import datetime
+
+SILENCE_KEYWORDS = ["조용히 해", "조용히해", "닥쳐"]
+UNSILENCE_KEYWORDS = ["말해", "대답해", "말하라"]
+HELP_KEYWORDS = ["help", "도움말", "도움", "사용법", "명령어", "기능"]
+WEATHER_KEYWORDS = ["날씨", "기온", "온도", "바람", "습도"]
+
+# 포항공대 학식 명령어 → 식사 타입 (None이면 시간대별 자동)
+POSTECH_MEAL_COMMANDS = {
+    "학식": None,
+    "포항공대 학식": None,
+    "포스텍 학식": None,
+    "postech 학식": None,
+    "포항공대 아침": "아침",
+    "포스텍 아침": "아침",
+    "포항공대 점심": "점심",
+    "포스텍 점심": "점심",
+    "포항공대 저녁": "저녁",
+    "포스텍 저녁": "저녁",
+    # 기존 단순 명령어들 (기본값은 포항공대)
+    "아침": "아침",
+    "점심": "점심",
+    "저녁": "저녁",
+}
+
+# 중앙대 학식 명령어 → (캠퍼스, 식사 타입) (식사 타입이 None이면 시간대별 자동)
+CAU_MEAL_COMMANDS = {
+    "중학": ('서울', None),
+    "다학": ('안성', None),
+    "중앙대 학식": ('서울', '중식'),
+    "CAU 학식": ('서울', '중식'),
+    "cau 학식": ('서울', '중식'),
+    "중앙대 점심": ('서울', '중식'),
+    "중앙대 중식": ('서울', '중식'),
+    "중앙대 저녁": ('서울', '석식'),
+    "중앙대 석식": ('서울', '석식'),
+    "중앙대 조식": ('서울', '조식'),
+    "중앙대 아침": ('서울', '조식'),
+    # 안성캠퍼스
+    "다빈치 조식": ('안성', '조식'),
+    "다빈치 아침": ('안성', '조식'),
+    "다빈치 중식": ('안성', '중식'),
+    "다빈치 점심": ('안성', '중식'),
+    "다빈치 석식": ('안성', '석식'),
+    "다빈치 저녁": ('안성', '석식'),
+}
+
+# 업스트림을 부르는 규칙 → 레이트 리밋 예산 (다른 규칙에 걸리는 메시지는 일반 채팅 예산)
+RULE_BUDGETS = {
+    "basic:weather": WEATHER,
+    "basic:postech_meal": MEAL,
+    "basic:cau_meal": MEAL,
+    "basic:meal_range": MEAL,
+}
 
 
 class MessageHandler:
     def __init__(self):
+        # 봇 활성화 여부만 전역, 조용 모드와 아일라/요시 카운터는 방별
         self.bot_state = {
-            'ailaCount': {},
-            'yoshiCount': {},
             'isActive': True,
-            'isSilent': False,
-            'silentUntil': None
         }
+        self.room_state = create_bot_state()
+        self.dispatcher = self._build_dispatcher(get_packs())
+        add_pack_listener(self)
+
+    def reload_packs(self, packs):
+        """응답 팩이 바뀌면 새 디스패처를 다 컴파일한 뒤 통째로 바꾼다 (처리 중인 요청은 이전 것으로 끝난다)"""
+        self.dispatcher = self._build_dispatcher(packs)
+
+    def _build_dispatcher(self, packs):
+        """메시지 모듈들의 트리거와 응답 팩(친구/졸업/밈)을 모아 디스패처를 한 번만 컴파일"""
+        dispatcher = MessageDispatcher()
+
+        # 우선순위: 조용히 해 > 메모리 > 아일라/요시 > 친구 > 졸업 > 밈 > 감정 > 기본
+        dispatcher.add_substring(SILENCE_KEYWORDS, lambda msg, sender, room: self._make_silent(room),
+                                 PRIORITY_CONTROL, name="control:silence", with_context=True)
+        register_memory_triggers(dispatcher)
+        dispatcher.add_substring(["아일라", "요시"],
+                                 self._handle_special_messages,
+                                 PRIORITY_SPECIAL, name="special", with_context=True,
+                                 async_handler=self._handle_special_messages_async)
+        for pack in packs:
+            pack.register(dispatcher)
+        register_emotion_triggers(dispatcher)
+        self._register_basic_triggers(dispatcher)
+
+        return dispatcher.compile()
+
+    def candidates(self, msg):
+        """메시지에 걸리는 후보 규칙 (검색은 메시지마다 한 번, 같은 목록을 rate_budget과 process_message_tagged에 넘긴다)"""
+        return self.dispatcher.candidates(msg)
+
+    def rate_budget(self, msg, candidates=None):
+        """레이트 리밋 예산 이름
+
+        학식/날씨 규칙에 걸리는 메시지는 그 예산, 다른 규칙만 걸리면 chat,
+        아무 규칙에도 걸리지 않으면 None (응답할 게 없으므로 세지 않는다)
+        """
+        if candidates is None:
+            candidates = self.candidates(msg)
+        matched = False
+        for rule in candidates:
+            if rule.predicate is not None and not rule.predicate(msg):
+                continue
+            budget = RULE_BUDGETS.get(rule.name)
+            if budget:
+                return budget
+            matched = True
+        return CHAT if matched else None
 
     def process_message(self, msg, sender, room):
         """메시지 처리 메인 함수"""
+        response, _ = self.process_message_tagged(msg, sender, room)
+        return response
+
+    def process_message_tagged(self, msg, sender, room, candidates=None):
+        """(응답, 응답한 핸들러 태그) 반환 - 태그는 메트릭/응답 JSON용 (아무도 응답 안 하면 none)
+
+        candidates: 이미 구한 candidates(msg) (레이트 리밋 때 구한 것을 다시 검색하지 않고 쓴다)
+        """
+        gate, response = self._check_gates(msg, sender, room)
+        if gate:
+            return response, gate
+
+        # 나머지는 디스패처가 한 번에 처리
+        # (조용히 해 > 메모리 > 아일라/요시 > 친구 > 졸업 > 밈 > 감정 > 기본 메시지)
+        response, rule = self.dispatcher.dispatch_with_rule(msg, sender, room, candidates)
+        return response, handler_tag(rule.name) if rule else "none"
+
+    async def process_message_async(self, msg, sender, room):
+        """process_message의 비동기 버전 (업스트림 호출은 await)"""
+        response, _ = await self.process_message_tagged_async(msg, sender, room)
+        return response
+
+    async def process_message_tagged_async(self, msg, sender, room, candidates=None):
+        """process_message_tagged의 비동기 버전"""
+        gate, response = self._check_gates(msg, sender, room)
+        if gate:
+            return response, gate
+
+        response, rule = await self.dispatcher.dispatch_with_rule_async(msg, sender, room, candidates)
+        return response, handler_tag(rule.name) if rule else "none"
+
+    def _check_gates(self, msg, sender, room):
+        """관리자 명령어/비활성화/조용 상태 처리, (처리한 단계 또는 None, 응답) 반환"""
 
         # 관리자 명령어 먼저 체크
         admin_response = check_admin_message(msg, sender, self.bot_state)
         if admin_response:
-            return admin_response
+            return "admin", admin_response
 
         # 봇이 비활성화된 경우
         if not self.bot_state['isActive']:
-            return None
+            return "inactive", None
 
-        # 조용 상태 체크 및 해제
-        if self._is_silent():
+        # 조용 상태 체크 및 해제 (방별)
+        if self.room_state.is_silent(room):
             # 침묵 해제 명령어만 처리
-            if "말해" in msg or "대답해" in msg or "말하라" in msg:
-                self.bot_state['silentUntil'] = None
-                return "다시 대답하겠다"
-            return None  # 침묵 중이면 아무 응답 안함
-
-        # 조용히 해 명령어 체크 (새로 추가)
-        if "조용히 해" in msg or "조용히해" in msg or "닥쳐" in msg:
-            return self._make_silent()
-
-        # 메모리 기능 체크 (우선순위 높음)
-        memory_response = message_memory(msg, room, sender)
-        if memory_response:
-            return memory_response
-
-        # 특별한 상태 관리가 필요한 메시지들 (아일라, 요시)
-        special_response = self._handle_special_messages(msg, sender)
-        if special_response:
-            return special_response
-
-        # 각 message 모듈에서 순차적으로 체크
-        # 우선순위: 친구 > 졸업 > 밈 > 감정
-
-        # 친구 이름 체크
-        friends_response = check_friends_message(msg)
-        if friends_response:
-            return friends_response
-
-        # 졸업/전역 관련 체크
-        graduate_response = check_graduate_message(msg)
-        if graduate_response:
-            return graduate_response
-
-        # 밈 응답 체크
-        meme_response = check_meme_message(msg)
-        if meme_response:
-            return meme_response
-
-        # 감정 응답 체크
-        emotion_response = check_cry_laugh_stress_message(msg)
-        if emotion_response:
-            return emotion_response
-
-        # 6. 기본 메시지 체크 (하드코딩된 응답들)
-        basic_response = self._handle_basic_messages(msg)
-        if basic_response:
-            return basic_response
-
-        return None  # 처리할 수 없는 메시지
-
-    def _is_silent(self):
-        """조용 상태 확인"""
-        if not self.bot_state['isSilent']:
-            return False
-
-        if self.bot_state['silentUntil'] is None:
-            return False
-
-        # 조용 시간이 지났는지 확인
-        if datetime.now() > self.bot_state['silentUntil']:
-            self.bot_state['isSilent'] = False
-            self.bot_state['silentUntil'] = None
-            return False
-
-        return True
-
-    def _make_silent(self):
-        """조용 모드 설정"""
-        self.bot_state['isSilent'] = True
-        self.bot_state['silentUntil'] = datetime.now() + timedelta(minutes=10)
-        return "10분 동안 조용히 한다"
-
-    def _handle_basic_messages(self, msg):
-        """기본 메시지 처리 (하드코딩된 응답들)"""
-
-        # 🔥 도움말 기능 추가 (최우선 처리)
-        help_keywords = ["help", "Help",
-                         "HELP", "도움말", "도움", "사용법", "명령어", "기능"]
-        if any(keyword in msg.lower() for keyword in help_keywords):
-            return self._get_help_message()
-
-        # 🔥 날씨 관련 처리 - 지역별 지원
-        weather_keywords = ["날씨", "기온", "온도", "바람", "습도"]
-        if any(keyword in msg for keyword in weather_keywords):
-            from modules.weather import get_weather_api
-            return get_weather_api(msg)  # 메시지 전체를 전달
-
-        # 또는 더 구체적으로 처리하고 싶다면:
-        if "날씨" in msg:
-            from modules.weather import get_weather_api
-            return get_weather_api(msg)
-
-        if "포항 날씨" in msg:
-            from modules.weather import get_pohang_weather
-            return get_pohang_weather()
-
-        if "서울 날씨" in msg:
-            from modules.weather import get_seoul_weather
-            return get_seoul_weather()
-
-        if "부산 날씨" in msg:
-            from modules.weather import get_busan_weather
-            return get_busan_weather()
-
-        if msg == "KHH":
-            return "크하학 크하학"
-
-        # 🔥 학식 관련 - 대학 구분 추가
-        if msg == "학식":
-            # 기본값은 포항공대
-            from modules.postech_meal import get_postech_meal
-            return get_postech_meal()
-
-        # 포항공대 학식
-        if msg == "포항공대 학식" or msg == "포스텍 학식" or msg == "postech 학식":
-            from modules.postech_meal import get_postech_meal
-            return get_postech_meal()
-
-        if msg == "포항공대 아침" or msg == "포스텍 아침":
-            from modules.postech_meal import get_postech_meal
-            return get_postech_meal("아침")
-
-        if msg == "포항공대 점심" or msg == "포스텍 점심":
-            from modules.postech_meal import get_postech_meal
-            return get_postech_meal("점심")
-
-        if msg == "포항공대 저녁" or msg == "포스텍 저녁":
-            from modules.postech_meal import get_postech_meal
-            return get_postech_meal("저녁")
-
-        # 중앙대 학식
-        # _handle_basic_messages 함수에서 "중학" 부분 수정:
-
-        if msg == "중학":
-            from modules.cau_meal import CAUMealAPI
-            from datetime import datetime
-
-            api = CAUMealAPI()
-            current_hour = datetime.now().hour
-
-            # 시간대별 자동 식사 타입 결정
-            if 6 <= current_hour < 10:
-                meal_type = '조식'
-            elif 10 <= current_hour < 15:
-                meal_type = '중식'
-            elif 15 <= current_hour < 21:
-                meal_type = '석식'
-            else:
-                meal_type = '중식'  # 기본값
+            if any(keyword in msg for keyword in UNSILENCE_KEYWORDS):
+                self.room_state.unsilence(room)
+                return "control", "다시 대답하겠다"
+            return "silent", None  # 침묵 중이면 아무 응답 안함
 
-            # 서울캠퍼스
-            seoul_result = api.get_meal_data(campus='서울', meal_type=meal_type)
-            seoul_formatted = api.format_meal_output(seoul_result)
+        return None, None
 
-            return seoul_formatted
-
-        if msg == "다학":
-            from modules.cau_meal import CAUMealAPI
-            from datetime import datetime
+    def _make_silent(self, room):
+        """조용 모드 설정 (이 방만)"""
+        self.room_state.silence(room)
+        return "10분 동안 조용히 한다"
 
-            api = CAUMealAPI()
-            current_hour = datetime.now().hour
-
-            # 시간대별 자동 식사 타입 결정
-            if 6 <= current_hour < 10:
-                meal_type = '조식'
-            elif 10 <= current_hour < 15:
-                meal_type = '중식'
-            elif 15 <= current_hour < 21:
-                meal_type = '석식'
-            else:
-                meal_type = '중식'  # 기본값
-
-            # 안성캠퍼스
-            anseong_result = api.get_meal_data(
-                campus='안성', meal_type=meal_type)
-            anseong_formatted = api.format_meal_output(anseong_result)
-
-            return anseong_formatted
-
-        if msg == "중앙대 학식" or msg == "CAU 학식" or msg == "cau 학식":
-            from modules.cau_meal import CAUMealAPI
-            api = CAUMealAPI()
-            result = api.get_meal_data(campus='서울', meal_type='중식')
-            return api.format_meal_output(result)
-
-        if msg == "중앙대 점심" or msg == "중앙대 중식":
-            from modules.cau_meal import CAUMealAPI
-            api = CAUMealAPI()
-            result = api.get_meal_data(campus='서울', meal_type='중식')
-            return api.format_meal_output(result)
-
-        if msg == "중앙대 저녁" or msg == "중앙대 석식":
-            from modules.cau_meal import CAUMealAPI
-            api = CAUMealAPI()
-            result = api.get_meal_data(campus='서울', meal_type='석식')
-            return api.format_meal_output(result)
-
-        if msg == "중앙대 조식" or msg == "중앙대 아침":
-            from modules.cau_meal import CAUMealAPI
-            api = CAUMealAPI()
-            result = api.get_meal_data(campus='서울', meal_type='조식')
-            return api.format_meal_output(result)
-
-        # 안성캠퍼스
-        if msg == "다빈치 조식" or msg == "다빈치 아침":
-            from modules.cau_meal import CAUMealAPI
-            api = CAUMealAPI()
-            result = api.get_meal_data(campus='안성', meal_type='조식')
-            return api.format_meal_output(result)
-
-        if msg == "다빈치 중식" or msg == "다빈치 점심":
-            from modules.cau_meal import CAUMealAPI
-            api = CAUMealAPI()
-            result = api.get_meal_data(campus='안성', meal_type='중식')
-            return api.format_meal_output(result)
-
-        if msg == "다빈치 석식" or msg == "다빈치 저녁":
-            from modules.cau_meal import CAUMealAPI
-            api = CAUMealAPI()
-            result = api.get_meal_data(campus='안성', meal_type='석식')
-            return api.format_meal_output(result)
-
-        # 기존 단순 명령어들 (기본값은 포항공대)
-
-        if msg == "아침":
-            from modules.postech_meal import get_postech_meal
-            return get_postech_meal("아침")
-        if msg == "점심":
-            from modules.postech_meal import get_postech_meal
-            return get_postech_meal("점심")
-        if msg == "저녁":
-            from modules.postech_meal import get_postech_meal
-            return get_postech_meal("저녁")
-
-        return None
+    def _get_cau_meal(self, campus, meal_type=None):
+        """중앙대 학식 (meal_type이 없으면 시간대별 자동 결정)"""
+        result = cau_meal_api.get_meal_data(campus=campus, meal_type=self._cau_meal_type(meal_type))
+        return cau_meal_api.format_meal_output(result)
+
+    async def _get_cau_meal_async(self, campus, meal_type=None):
+        """_get_cau_meal의 비동기 버전"""
+        result = await cau_meal_api.get_meal_data_async(campus=campus, meal_type=self._cau_meal_type(meal_type))
+        return cau_meal_api.format_meal_output(result)
+
+    def _cau_meal_type(self, meal_type):
+        """식사 타입이 없으면 시간대별 자동 결정"""
+        if meal_type is not None:
+            return meal_type
+
+        current_hour = datetime.now().hour
+        if 6 <= current_hour < 10:
+            return '조식'
+        elif 10 <= current_hour < 15:
+            return '중식'
+        elif 15 <= current_hour < 21:
+            return '석식'
+        else:
+            return '중식'  # 기본값
+
+    def _register_basic_triggers(self, dispatcher, priority=PRIORITY_BASIC):
+        """기본 명령어 트리거 등록 (도움말 → 날씨 → KHH → 학식 → 범위 조회 순서)"""
+        dispatcher.add_substring(HELP_KEYWORDS, lambda msg: self._get_help_message(),
+                                 priority, name="basic:help", ignore_case=True)
+        dispatcher.add_substring(WEATHER_KEYWORDS, get_weather_api,
+                                 priority, name="basic:weather", async_handler=get_weather_api_async)
+        dispatcher.add_exact(["KHH"], lambda msg: "크하학 크하학",
+                             priority, name="basic:khh")
+        dispatcher.add_exact(list(POSTECH_MEAL_COMMANDS),
+                             lambda msg: get_postech_meal(POSTECH_MEAL_COMMANDS[msg]),
+                             priority, name="basic:postech_meal",
+                             async_handler=lambda msg: get_postech_meal_async(POSTECH_MEAL_COMMANDS[msg]))
+        dispatcher.add_exact(list(CAU_MEAL_COMMANDS),
+                             lambda msg: self._get_cau_meal(*CAU_MEAL_COMMANDS[msg]),
+                             priority, name="basic:cau_meal",
+                             async_handler=lambda msg: self._get_cau_meal_async(*CAU_MEAL_COMMANDS[msg]))
+        dispatcher.add_substring([f"{word} " for word in COMMAND_CAMPUSES], meal_range_reply,
+                                 priority, name="basic:meal_range", async_handler=meal_range_reply_async)
 
     def _get_help_message(self):
         """도움말 메시지 반환"""
@@ -277,6 +238,7 @@ class MessageHandler:
 
     🍱 학식 정보:
     • 학식 / 중학 / 다학
+    • 중학 내일 / 다학 이번주 점심 / 중앙대 3일
 
     🌤️ 날씨 정보:
     • 날씨 / 포항 날씨 / 서울 날씨 / 부산 날씨
@@ -297,31 +259,34 @@ class MessageHandler:
 
         return help_text
 
-    def _handle_special_messages(self, msg, sender):
+    def _handle_special_messages(self, msg, sender, room):
         """상태 관리가 필요한 특별한 메시지들"""
+        aila_count = self._count_aila(sender, room) if "아일라" in msg else None
+        if aila_count == 2:
+            return f"러닝을 가기 위한 날씨\n {get_weather_api()}\n"
+        return self._special_response(msg, sender, room, aila_count)
+
+    async def _handle_special_messages_async(self, msg, sender, room):
+        """_handle_special_messages의 비동기 버전 (날씨 조회만 await)"""
+        aila_count = self._count_aila(sender, room) if "아일라" in msg else None
+        if aila_count == 2:
+            return f"러닝을 가기 위한 날씨\n {await get_weather_api_async()}\n"
+        return self._special_response(msg, sender, room, aila_count)
 
-        # 아일라 처리 (카운팅 필요)
-        if "아일라" in msg:
-            if sender not in self.bot_state['ailaCount']:
-                self.bot_state['ailaCount'][sender] = 0
+    def _count_aila(self, sender, room):
+        """아일라 언급 횟수 증가 후 반환 (2번째면 초기화)"""
+        return self.room_state.incr(room, 'aila', sender, reset_at=2)
 
-            self.bot_state['ailaCount'][sender] += 1
+    def _special_response(self, msg, sender, room, aila_count):
+        """날씨가 필요 없는 아일라/요시 응답"""
 
-            if self.bot_state['ailaCount'][sender] == 1:
-                return "러닝 하러 가자"
-            elif self.bot_state['ailaCount'][sender] == 2:
-                weather_info = get_weather_api()
-                self.bot_state['ailaCount'][sender] = 0
-                return f"러닝을 가기 위한 날씨\n {weather_info}\n"
+        # 아일라 첫 언급
+        if aila_count == 1:
+            return "러닝 하러 가자"
 
         # 요시 처리 (카운팅 필요)
         if "요시" in msg:
-            if sender not in self.bot_state['yoshiCount']:
-                self.bot_state['yoshiCount'][sender] = 0
-
-            self.bot_state['yoshiCount'][sender] += 1
-
-            if self.bot_state['yoshiCount'][sender] >= 3:
+            if self.room_state.incr(room, 'yoshi', sender) >= 3:
                 return "요시가 화났다!!!(하하)"
             else:
                 return "또 이상한 거 만드셨네.."
@@ -0,0 +1,276 @@
+"""
+요청/핸들러/업스트림 지연 시간 메트릭 (Prometheus 텍스트 형식)
+
+- khh_http_request_seconds      라우트별 요청 처리 시간
+- khh_message_handler_seconds   /api/message를 응답한 핸들러(memory, friends, weather, ...)별 처리 시간
+- khh_upstream_request_seconds  업스트림(kma, cau, postech) 호출 시간 (결과: ok / error)
+- khh_upstream_errors_total     업스트림 호출 실패 (예외 종류별)
+- khh_upstream_rejected_total   브레이커/지연 예산 때문에 부르지 않은 호출
+- khh_upstream_hedged_total     헤지 요청 수
+- khh_prefetch_runs_total       스케줄러 미리 가져오기 작업 실행 결과
+- khh_delivery_seconds          리마인드가 전달 큐에 들어간 뒤 웹훅 전송이 끝날 때까지 걸린 시간
+- khh_delivery_attempts_total   리마인드 웹훅 전송 시도 결과
+- khh_delivery_dead_letters_total  끝내 보내지 못하고 dead letter 파일에 남긴 리마인드 묶음
+- khh_delivery_backlog          전송 대기/재시도 대기 중인 리마인드 묶음 수
+- khh_rate_limited_total        레이트 리밋에 걸려 핸들러까지 가지 않은 요청 (예산별)
+- khh_cache_*_total             업스트림 캐시 적중/미스 (cache_stats())
+
+기록은 스레드마다 따로 쌓고 /metrics를 읽을 때만 합친다 (gevent 워커에서는 그린렛이 아니라 OS 스레드마다, green.py).
+요청 경로에서는 락을 잡지 않는다 (스레드가 처음 기록할 때 한 번만 등록).
+값은 프로세스(gunicorn 워커)마다 따로다.
+"""
+
+import threading
+import time
+import weakref
+from contextlib import contextmanager
+
+from modules.cache import cache_stats
+from modules.green import os_thread_local
+
+# 기본 버킷 (초): 1ms ~ 10s
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+_metrics = []
+
+
+class _ShardOwner:
+    """스레드가 끝나면 함께 사라져서 그 스레드의 기록을 합쳐두게 하는 표식"""
+    __slots__ = ("__weakref__",)
+
+
+class _Metric:
+    """스레드별 샤드(라벨 → 값)를 가진 메트릭 공통 부분"""
+
+    kind = None
+
+    def __init__(self, name, help_text, label_names=()):
+        self.name = name
+        self.help = help_text
+        self.label_names = tuple(label_names)
+        self._local = os_thread_local()
+        self._shards = []
+        self._retired = {}
+        self._lock = threading.Lock()
+        _metrics.append(self)
+
+    def _shard(self):
+        shard = getattr(self._local, 'shard', None)
+        if shard is None:
+            shard = self._local.shard = {}
+            owner = self._local.owner = _ShardOwner()
+            with self._lock:
+                self._shards.append(shard)
+            weakref.finalize(owner, self._retire, shard)
+        return shard
+
+    def _retire(self, shard):
+        """끝난 스레드의 샤드를 _retired에 합치고 목록에서 뺀다"""
+        with self._lock:
+            self._merge(self._retired, shard)
+            self._shards = [s for s in self._shards if s is not shard]
+
+    def _collect(self):
+        """모든 샤드를 합친 라벨 → 값"""
+        with self._lock:
+            shards = list(self._shards)
+            total = {}
+            self._merge(total, self._retired)
+        for shard in shards:
+            self._merge(total, shard.copy())
+        return total
+
+    def _label_text(self, labels, extra=None):
+        pairs = list(zip(self.label_names, labels))
+        if extra:
+            pairs.append(extra)
+        if not pairs:
+            return ""
+        return "{" + ",".join(f'{key}="{_escape(value)}"' for key, value in pairs) + "}"
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, labels=(), amount=1):
+        shard = self._shard()
+        shard[labels] = shard.get(labels, 0) + amount
+
+    @staticmethod
+    def _merge(total, shard):
+        for labels, value in shard.items():
+            total[labels] = total.get(labels, 0) + value
+
+    def render(self):
+        return [f"{self.name}{self._label_text(labels)} {value}"
+                for labels, value in sorted(self._collect().items())]
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name, help_text, label_names=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, help_text, label_names)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value, labels=()):
+        shard = self._shard()
+        # [버킷별 개수..., +Inf 개수, 합계]
+        data = shard.get(labels)
+        if data is None:
+            data = shard[labels] = [0] * (len(self.buckets) + 1) + [0.0]
+        for index, bound in enumerate(self.buckets):
+            if value <= bound:
+                data[index] += 1
+                break
+        else:
+            data[len(self.buckets)] += 1
+        data[-1] += value
+
+    @contextmanager
+    def time(self, labels=()):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, labels)
+
+    @staticmethod
+    def _merge(total, shard):
+        for labels, data in shard.items():
+            data = list(data)
+            current = total.get(labels)
+            if current is None:
+                total[labels] = data
+            else:
+                for index, value in enumerate(data):
+                    current[index] += value
+
+    def render(self):
+        lines = []
+        for labels, data in sorted(self._collect().items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets, data):
+                cumulative += count
+                lines.append(f"{self.name}_bucket{self._label_text(labels, ('le', _format_bound(bound)))} {cumulative}")
+            cumulative += data[len(self.buckets)]
+            lines.append(f"{self.name}_bucket{self._label_text(labels, ('le', '+Inf'))} {cumulative}")
+            lines.append(f"{self.name}_sum{self._label_text(labels)} {data[-1]:.6f}")
+            lines.append(f"{self.name}_count{self._label_text(labels)} {cumulative}")
+        return lines
+
+
+class Gauge(_Metric):
+    """읽을 때 값을 계산하는 게이지 (set_function으로 등록한 함수가 {라벨: 값}을 돌려준다)"""
+
+    kind = "gauge"
+
+    def __init__(self, name, help_text, label_names=()):
+        super().__init__(name, help_text, label_names)
+        self._func = None
+
+    def set_function(self, func):
+        self._func = func
+
+    @staticmethod
+    def _merge(total, shard):
+        total.update(shard)
+
+    def render(self):
+        if self._func is None:
+            return []
+        return [f"{self.name}{self._label_text(labels)} {value}"
+                for labels, value in sorted(self._func().items())]
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_bound(bound):
+    return f"{bound:g}"
+
+
+# ---- 메트릭 정의 ----
+
+REQUEST_SECONDS = Histogram(
+    "khh_http_request_seconds", "라우트별 요청 처리 시간(초)", ("method", "route", "status"))
+HANDLER_SECONDS = Histogram(
+    "khh_message_handler_seconds", "메시지를 응답한 핸들러별 처리 시간(초)", ("handler",))
+UPSTREAM_SECONDS = Histogram(
+    "khh_upstream_request_seconds", "업스트림 호출 시간(초)", ("upstream", "outcome"))
+UPSTREAM_ERRORS = Counter(
+    "khh_upstream_errors_total", "업스트림 호출 실패 (예외 종류별)", ("upstream", "error"))
+UPSTREAM_REJECTED = Counter(
+    "khh_upstream_rejected_total", "부르지 않고 바로 실패한 업스트림 호출 (open: 브레이커 열림, budget: 지연 예산 소진)",
+    ("upstream", "reason"))
+UPSTREAM_HEDGES = Counter(
+    "khh_upstream_hedged_total", "응답이 늦어 하나 더 보낸 헤지 요청", ("upstream",))
+
+PREFETCH_RUNS = Counter(
+    "khh_prefetch_runs_total", "스케줄러 미리 가져오기 작업 실행 (결과: ok / retry / failed / skipped)", ("job", "outcome"))
+
+DELIVERY_SECONDS = Histogram(
+    "khh_delivery_seconds", "리마인드가 전달 큐에 들어간 뒤 전송이 끝날 때까지 걸린 시간(초, 결과: ok / dead_letter)",
+    ("outcome",), buckets=DEFAULT_BUCKETS + (30.0, 60.0, 300.0))
+DELIVERY_ATTEMPTS = Counter(
+    "khh_delivery_attempts_total", "리마인드 웹훅 전송 시도 (결과: ok / retry / failed)", ("outcome",))
+DELIVERY_DEAD_LETTERS = Counter(
+    "khh_delivery_dead_letters_total", "dead letter 파일에 남긴 리마인드 묶음 (이유: retries / rejected / queue_full / stopped)",
+    ("reason",))
+DELIVERY_BACKLOG = Gauge(
+    "khh_delivery_backlog", "전송 대기 중인 리마인드 묶음 수 (state: queued / retrying)", ("state",))
+
+RATE_LIMITED = Counter(
+    "khh_rate_limited_total", "레이트 리밋에 걸려 429로 돌려보낸 요청 (예산: chat / meal / weather)", ("budget",))
+
+
+def handler_tag(rule_name):
+    """디스패처 규칙 이름 → 핸들러 태그 (friends:하리 → friends, basic:weather → weather)"""
+    module, _, detail = rule_name.partition(":")
+    if module == "basic" and detail:
+        return detail
+    return module
+
+
+@contextmanager
+def track_upstream(upstream):
+    """업스트림 호출 시간 기록 (예외가 나면 outcome=error)"""
+    start = time.perf_counter()
+    outcome = "error"
+    try:
+        yield
+        outcome = "ok"
+    except BaseException as e:
+        UPSTREAM_ERRORS.inc((upstream, type(e).__name__))
+        raise
+    finally:
+        UPSTREAM_SECONDS.observe(time.perf_counter() - start, (upstream, outcome))
+
+
+def _render_cache_stats():
+    stats = cache_stats()
+    lines = []
+    for field, help_text in (("hits", "캐시 적중"), ("stale_hits", "만료된 값으로 응답"),
+                             ("misses", "캐시 미스"), ("coalesced", "진행 중인 로드에 합류"),
+                             ("loads", "업스트림 로드"), ("errors", "로드 실패")):
+        name = f"khh_cache_{field}_total"
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} counter")
+        for cache_name, values in sorted(stats.items()):
+            lines.append(f'{name}{{cache="{_escape(cache_name)}"}} {values.get(field, 0)}')
+    return lines
+
+
+def render_prometheus():
+    """모든 메트릭을 Prometheus 텍스트 형식으로"""
+    lines = []
+    for metric in _metrics:
+        lines.append(f"# HELP {metric.name} {metric.help}")
+        lines.append(f"# TYPE {metric.name} {metric.kind}")
+        lines.extend(metric.render())
+    lines.extend(_render_cache_stats())
+    return "\n".join(lines) + "\n"
+
@@ -1,14 +1,68 @@
+import hashlib
+import httpx
+import json
+import os
 import requests
 import re
+import threading
 from datetime import datetime, timedelta
 from typing import List, Dict, Optional, Tuple
+from urllib.parse import urlparse
+
+from modules.async_http import get_async_client
+from modules.cache import TTLCache
+from modules.snapshots import snapshot_session
+from modules.upstream import UpstreamUnavailable, get_upstream
+
+# 포항공대 메뉴 API 주소 (부하 테스트 등에서 가짜 서버로 바꿀 수 있다)
+POSTECH_MEAL_API_URL = os.getenv('POSTECH_MEAL_API_URL', "https://food.podac.poapper.com/v1/menus")
+
+# 주간 메뉴 캐시 유지 시간(초). 지난 값은 바로 돌려주고 백그라운드에서 새로 가져온다
+MENU_CACHE_TTL = float(os.getenv('POSTECH_MEAL_CACHE_TTL', '600'))
+
+# 주(월요일~일요일)별 메뉴 데이터 캐시 (서비스 인스턴스끼리 공유)
+menu_cache = TTLCache("postech_meal", ttl=MENU_CACHE_TTL, max_entries=16)
+
+# 포항공대 메뉴 API 호출 (브레이커 + 지연 예산, 열려 있는 동안은 menu_cache의 지난 값으로 응답)
+postech_upstream = get_upstream("postech", urlparse(POSTECH_MEAL_API_URL).netloc, timeout=5)
+
+# 포항공대 메뉴 API 세션 (커넥션 재사용, UPSTREAM_MODE=record/replay면 기록/재생)
+postech_session = snapshot_session(requests.Session(), "postech", POSTECH_MEAL_API_URL)
+
+# 미리 만들어 두는 식사 타입별 응답
+MEAL_TYPES = ("아침", "점심", "저녁", "전체")
+
+# 렌더링 인덱스를 들고 있을 주 수
+MAX_INDEXED_WEEKS = 4
+
+_ENGLISH_WORD = re.compile(r'\b[A-Za-z]+\b')
+_NON_MENU_CHAR = re.compile(r'[^\w\s*가-힣]')
+_KOREAN_PHRASE = re.compile(r'[가-힣*]+(?:\s+[가-힣*]+)*')
+_ITEM_SEPARATOR = re.compile(r'\s{2,}|\t')
+
+
+class MenuIndex:
+    """주간 메뉴 payload 하나를 미리 렌더링한 결과 {(YYYYMMDD, 식사 타입): 응답 텍스트}"""
+
+    __slots__ = ("source", "digest", "texts")
+
+    def __init__(self, source, digest, texts):
+        self.source = source    # 렌더링에 쓴 payload (캐시가 같은 객체를 돌려주면 해시도 생략)
+        self.digest = digest    # payload 내용 해시 (다시 받아온 내용이 같으면 재사용)
+        self.texts = texts
+
+
+def payload_digest(menu_data) -> str:
+    """주간 메뉴 payload 내용 해시"""
+    encoded = json.dumps(menu_data, sort_keys=True, ensure_ascii=False, separators=(',', ':'))
+    return hashlib.sha1(encoded.encode('utf-8')).hexdigest()
 
 
 class POSTECHMealService:
     """포항공대 학식 정보 서비스"""
 
     def __init__(self):
-        self.api_base_url = "https://food.podac.poapper.com/v1/menus"
+        self.api_base_url = POSTECH_MEAL_API_URL
         self.fallback_url = "https://dining.postech.ac.kr/weekly-menu/"
         self.day_names = ["월", "화", "수", "목", "금", "토", "일"]
         self.meal_type_mapping = {
@@ -19,6 +73,9 @@ class POSTECHMealService:
             "INTERNATIONAL": ("🌍", "국제관"),
             "STAFF": ("👨‍💼", "교직원"),
         }
+        # (월요일, 일요일) → MenuIndex
+        self._indexes = {}
+        self._index_lock = threading.Lock()
 
     def _extract_korean_menu(self, text: str) -> str:
         """한국어 메뉴만 추출"""
@@ -26,11 +83,11 @@ class POSTECHMealService:
             return ""
 
         # 영어 단어와 불필요한 문자 제거
-        cleaned = re.sub(r'\b[A-Za-z]+\b', '', text)
-        cleaned = re.sub(r'[^\w\s*가-힣]', ' ', cleaned)
+        cleaned = _ENGLISH_WORD.sub('', text)
+        cleaned = _NON_MENU_CHAR.sub(' ', cleaned)
 
         # 한글 부분만 추출
-        korean_parts = re.findall(r'[가-힣*]+(?:\s+[가-힣*]+)*', cleaned)
+        korean_parts = _KOREAN_PHRASE.findall(cleaned)
 
         if korean_parts:
             result = ' '.join(korean_parts).strip()
@@ -73,15 +130,47 @@ class POSTECHMealService:
             return "전체"
 
     def _fetch_menu_data(self, start_date: str, end_date: str) -> List[Dict]:
+        """메뉴 데이터 가져오기 (주 단위 캐시)"""
+        return menu_cache.get_or_load(
+            (start_date, end_date),
+            lambda: self._request_menu_data(start_date, end_date),
+        )
+
+    def _request_menu_data(self, start_date: str, end_date: str) -> List[Dict]:
         """API에서 메뉴 데이터 가져오기"""
         api_url = f"{self.api_base_url}/period/{start_date}/{end_date}"
         headers = {"Content-Type": "application/json"}
 
+        def send(timeout):
+            response = postech_session.get(api_url, headers=headers, timeout=timeout)
+            response.raise_for_status()
+            return response
+
         try:
-            response = requests.get(api_url, headers=headers, timeout=5)
+            return postech_upstream.call(send).json()
+        except (requests.exceptions.RequestException, UpstreamUnavailable) as e:
+            raise Exception(f"API 호출 실패: {str(e)}")
+
+    async def _fetch_menu_data_async(self, start_date: str, end_date: str) -> List[Dict]:
+        """_fetch_menu_data의 비동기 버전 (같은 캐시 사용)"""
+        return await menu_cache.get_or_load_async(
+            (start_date, end_date),
+            lambda: self._request_menu_data_async(start_date, end_date),
+        )
+
+    async def _request_menu_data_async(self, start_date: str, end_date: str) -> List[Dict]:
+        """API에서 메뉴 데이터 가져오기 (httpx)"""
+        api_url = f"{self.api_base_url}/period/{start_date}/{end_date}"
+        client = get_async_client("postech_meal", snapshot=("postech", self.api_base_url), timeout=5)
+
+        async def send(timeout):
+            response = await client.get(api_url, headers={"Content-Type": "application/json"}, timeout=timeout)
             response.raise_for_status()
-            return response.json()
-        except requests.exceptions.RequestException as e:
+            return response
+
+        try:
+            return (await postech_upstream.call_async(send)).json()
+        except (httpx.HTTPError, UpstreamUnavailable) as e:
             raise Exception(f"API 호출 실패: {str(e)}")
 
     def _filter_today_menus(self, menu_data: List[Dict], today_date: str) -> List[Dict]:
@@ -105,7 +194,7 @@ class POSTECHMealService:
 
         # name_kor에서 추출
         if food.get('name_kor'):
-            kor_items = re.split(r'\s{2,}|\t', food['name_kor'])
+            kor_items = _ITEM_SEPARATOR.split(food['name_kor'])
             for item in kor_items:
                 cleaned = self._extract_korean_menu(item)
                 if cleaned and len(cleaned) > 1:
@@ -113,7 +202,7 @@ class POSTECHMealService:
 
         # name_eng에서도 한국어 메뉴 추출 (필드 변경 대비)
         if food.get('name_eng'):
-            eng_items = re.split(r'\s{2,}|\t', food['name_eng'])
+            eng_items = _ITEM_SEPARATOR.split(food['name_eng'])
             for item in eng_items:
                 cleaned = self._extract_korean_menu(item)
                 if cleaned and len(cleaned) > 1 and cleaned not in menu_items:
@@ -132,89 +221,168 @@ class POSTECHMealService:
 
     def _format_menu_text(self, filtered_menus: List[Dict], today_name: str, meal_type: str) -> str:
         """메뉴 텍스트 포맷팅"""
-        # 헤더 생성
-        if meal_type == "전체":
-            menu_text = f"📍 포항공대 오늘({today_name})\n"
-        elif meal_type == "점심":
-            menu_text = f"📍 포항공대 오늘({today_name})\n"
-        elif meal_type == "저녁":
-            menu_text = f"📍 포항공대 오늘({today_name})\n"
-        else:
-            menu_text = f"📍 포항공대 오늘({today_name})\n"
+        # 헤더 (식사 타입과 상관없이 같다)
+        lines = [f"📍 포항공대 오늘({today_name})\n"]
 
         if not filtered_menus:
-            menu_text += "오늘 메뉴를 찾을 수 없다.\n"
-            menu_text += f"직접 확인: {self.fallback_url}"
-            return menu_text
+            lines.append("오늘 메뉴를 찾을 수 없다.\n")
+            lines.append(f"직접 확인: {self.fallback_url}")
+            return "".join(lines)
 
         # 메뉴 정보 추가
         for menu in filtered_menus:
             type_icon, type_name = self.meal_type_mapping.get(
                 menu.get('type'), ("🍴", menu.get('type', '알 수 없음'))
             )
-            menu_text += f"{type_icon} {type_name}:\n"
+            lines.append(f"{type_icon} {type_name}:\n")
 
             # 음식 목록
             foods = menu.get('foods', [])
             if foods:
                 for food in foods:
-                    menu_items = self._extract_menu_items(food)
-                    for menu_item in menu_items:
-                        menu_text += f"  • {menu_item}\n"
+                    for menu_item in self._extract_menu_items(food):
+                        lines.append(f"  • {menu_item}\n")
             else:
-                menu_text += "  • 메뉴 정보 없음\n"
+                lines.append("  • 메뉴 정보 없음\n")
 
-            # 영양 정보
             # 영양 정보
             nutrition_info = self._format_nutrition_info(menu)
             if nutrition_info:
-                # 조식A 또는 조식B인 경우에만 \n\n 추가
+                # 조식A인 경우에만 \n\n 추가
                 if menu.get('type') in ['BREAKFAST_A']:
-                    menu_text += f"{nutrition_info}\n\n"
+                    lines.append(f"{nutrition_info}\n\n")
                 else:
-                    menu_text += f"{nutrition_info}"
-
-        return menu_text
+                    lines.append(nutrition_info)
+
+        return "".join(lines)
+
+    def _build_index(self, menu_data: List[Dict], monday: datetime, digest: str) -> MenuIndex:
+        """주간 payload를 한 번 훑어 7일 × (아침/점심/저녁/전체) 응답을 모두 만들어 둔다"""
+        menus_by_date = {}
+        for menu in menu_data:
+            menus_by_date.setdefault(str(menu.get('date')), []).append(menu)
+
+        texts = {}
+        for offset in range(7):
+            day = monday + timedelta(days=offset)
+            date = self._format_date(day)
+            day_menus = menus_by_date.get(date, [])
+            for meal_type in MEAL_TYPES:
+                filtered = self._filter_by_meal_type(day_menus, meal_type)
+                texts[(date, meal_type)] = self._format_menu_text(filtered, self.day_names[day.weekday()], meal_type)
+
+        return MenuIndex(menu_data, digest, texts)
+
+    def _menu_index(self, menu_data: List[Dict], start_date: str, end_date: str) -> MenuIndex:
+        """주별 렌더링 인덱스 (payload 내용 해시가 바뀔 때만 다시 만든다)"""
+        week = (start_date, end_date)
+        index = self._indexes.get(week)
+
+        # 캐시가 같은 payload 객체를 돌려주면 해시 계산도 생략
+        if index is not None and index.source is menu_data:
+            return index
+
+        digest = payload_digest(menu_data)
+        if index is not None and index.digest == digest:
+            index.source = menu_data
+            return index
+
+        index = self._build_index(menu_data, datetime.strptime(start_date, "%Y%m%d"), digest)
+        with self._index_lock:
+            self._indexes[week] = index
+            while len(self._indexes) > MAX_INDEXED_WEEKS:
+                self._indexes.pop(min(self._indexes))
+        return index
 
     def get_meal_info(self, meal_type: Optional[str] = None) -> str:
         """포항공대 학식 정보 메인 함수"""
         try:
-            today = datetime.now()
-            monday, sunday = self._get_week_range(today)
+            request = self._build_request(meal_type)
 
-            start_date = self._format_date(monday)
-            end_date = self._format_date(sunday)
-            today_date = self._format_date(today)
-            today_name = self.day_names[today.weekday()]
+            # API에서 데이터 가져오기
+            menu_data = self._fetch_menu_data(request["start_date"], request["end_date"])
+
+            return self._render_meal_info(menu_data, request)
+
+        except Exception as e:
+            return self._format_error(e)
+
+    async def get_meal_info_async(self, meal_type: Optional[str] = None) -> str:
+        """get_meal_info의 비동기 버전"""
+        try:
+            request = self._build_request(meal_type)
+            menu_data = await self._fetch_menu_data_async(request["start_date"], request["end_date"])
+            return self._render_meal_info(menu_data, request)
 
+        except Exception as e:
+            return self._format_error(e)
+
+    def prefetch_week(self, target_date: datetime = None) -> int:
+        """이번 주 메뉴를 새로 가져와 캐시에 넣고 렌더링 인덱스까지 만들기, 끼니 수 반환"""
+        monday, sunday = self._get_week_range(target_date)
+        start_date, end_date = self._format_date(monday), self._format_date(sunday)
+
+        menu_data = menu_cache.refresh(
+            (start_date, end_date),
+            lambda: self._request_menu_data(start_date, end_date),
+        )
+        self._menu_index(menu_data, start_date, end_date)
+        return len(menu_data)
+
+    def _build_request(self, meal_type: Optional[str]) -> Dict:
+        """오늘 날짜 기준 조회 범위와 식사 타입 결정"""
+        today = datetime.now()
+        monday, sunday = self._get_week_range(today)
+
+        return {
+            "start_date": self._format_date(monday),
+            "end_date": self._format_date(sunday),
+            "today_date": self._format_date(today),
+            "today_name": self.day_names[today.weekday()],
             # 식사 타입 결정
-            meal_type = self._determine_meal_type(meal_type, today.hour)
+            "meal_type": self._determine_meal_type(meal_type, today.hour),
+        }
 
-            # API에서 데이터 가져오기
-            menu_data = self._fetch_menu_data(start_date, end_date)
+    def _render_meal_info(self, menu_data: List[Dict], request: Dict) -> str:
+        """주간 메뉴 데이터 → 응답 텍스트 (미리 만든 인덱스에서 조회)"""
+        index = self._menu_index(menu_data, request["start_date"], request["end_date"])
 
-            # 오늘 메뉴 필터링
-            today_menus = self._filter_today_menus(menu_data, today_date)
+        # 아침/점심/저녁이 아닌 타입은 전체와 같다 (_filter_by_meal_type 참고)
+        meal_type = request["meal_type"] if request["meal_type"] in MEAL_TYPES else "전체"
+        text = index.texts.get((request["today_date"], meal_type))
+        if text is not None:
+            return text
 
-            # 식사 타입별 필터링
-            filtered_menus = self._filter_by_meal_type(today_menus, meal_type)
+        # 인덱스 범위 밖 날짜 (주 경계) → 직접 렌더링
+        today_menus = self._filter_today_menus(menu_data, request["today_date"])
+        filtered_menus = self._filter_by_meal_type(today_menus, request["meal_type"])
+        return self._format_menu_text(filtered_menus, request["today_name"], request["meal_type"])
 
-            # 결과 텍스트 생성
-            return self._format_menu_text(filtered_menus, today_name, meal_type)
+    def _format_error(self, e: Exception) -> str:
+        return (
+            f"학식 정보를 가져올 수 없다.\n"
+            f"직접 확인: {self.fallback_url}\n"
+            f"에러: {str(e)}"
+        )
 
-        except Exception as e:
-            error_msg = (
-                f"학식 정보를 가져올 수 없다.\n"
-                f"직접 확인: {self.fallback_url}\n"
-                f"에러: {str(e)}"
-            )
-            return error_msg
+
+# 공용 서비스 인스턴스
+postech_service = POSTECHMealService()
 
 
 def get_postech_meal(meal_type: Optional[str] = None) -> str:
     """포항공대 학식 정보 가져오기 (기존 함수명 호환)"""
-    service = POSTECHMealService()
-    return service.get_meal_info(meal_type)
+    return postech_service.get_meal_info(meal_type)
+
+
+async def get_postech_meal_async(meal_type: Optional[str] = None) -> str:
+    """get_postech_meal의 비동기 버전"""
+    return await postech_service.get_meal_info_async(meal_type)
+
+
+def prefetch_postech_week() -> int:
+    """이번 주 메뉴 미리 가져오기 (스케줄러 작업용)"""
+    return postech_service.prefetch_week()
 
 
 def test_postech_meal():
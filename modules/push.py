@@ -0,0 +1,348 @@
+"""
+리마인드 서버 푸시 (방별 구독, SSE / long-poll)
+
+스케줄러가 리마인드가 울리는 즉시 publish_reminders()로 방별 이벤트를 올리고,
+response.js(또는 다른 구독자)는 연결 하나를 열어 두고 기다린다.
+- GET /api/push/stream?room=방1&room=방2  Server-Sent Events (ASGI 전용, 연결 하나를 계속 유지)
+- GET /api/push/poll?room=*&since=12     long-poll (Flask/ASGI 공용, 이벤트가 오거나 timeout이면 응답)
+
+이벤트는 전역 순번(id)을 갖고 최근 PUSH_BUFFER_SIZE개(최대 PUSH_RETENTION_SECONDS초)를 보관한다.
+재연결할 때 마지막으로 받은 id(SSE Last-Event-ID / long-poll since)를 주면 그 사이 이벤트를 다시 받는다.
+room=* 이면 모든 방의 이벤트를 받는다 (response.js는 이벤트의 room으로 보낼 방을 고른다).
+
+백엔드 선택 (환경 변수):
+    PUSH_BACKEND=memory (기본) - 프로세스 메모리. 이벤트와 id가 프로세스마다 따로라서 리마인드 스케줄러가 도는
+                                 프로세스 하나(ASGI 단일 워커의 /api/push/stream)에 연결해야 한다
+    PUSH_BACKEND=sqlite        - 저장소와 같은 SQLite 파일의 push_events 테이블. id를 워커끼리 공유하므로
+                                 gunicorn 워커 여러 개 중 어디로 long-poll이 가도 같은 이벤트를 같은 id로 받는다.
+                                 다른 워커가 올린 이벤트는 PUSH_SQLITE_POLL_SECONDS마다 다시 확인해서 알아챈다
+"""
+
+import asyncio
+import json
+import os
+import threading
+import time
+from collections import deque
+
+from dotenv import load_dotenv
+
+from modules.delivery import group_reminders
+from modules.storage import SqliteBackend, get_storage
+
+load_dotenv()
+
+# 다시 받기용으로 보관할 최근 이벤트 수 / 시간(초)
+PUSH_BUFFER_SIZE = int(os.getenv('PUSH_BUFFER_SIZE', '1000'))
+PUSH_RETENTION_SECONDS = float(os.getenv('PUSH_RETENTION_SECONDS', '600'))
+
+# SSE 연결 유지용 주석을 보내는 간격 / long-poll 최대 대기 시간(초)
+PUSH_KEEPALIVE_SECONDS = float(os.getenv('PUSH_KEEPALIVE_SECONDS', '15'))
+PUSH_POLL_TIMEOUT = float(os.getenv('PUSH_POLL_TIMEOUT', '25'))
+
+# SQLite 백엔드: 다른 워커가 올린 이벤트를 확인하는 간격(초)
+PUSH_SQLITE_POLL_SECONDS = float(os.getenv('PUSH_SQLITE_POLL_SECONDS', '0.5'))
+
+# 모든 방 구독
+ALL_ROOMS = "*"
+
+
+class _ThreadWaiter:
+    """스레드에서 기다리는 구독자 (Flask long-poll)"""
+
+    __slots__ = ("_event",)
+
+    def __init__(self):
+        self._event = threading.Event()
+
+    def notify(self):
+        self._event.set()
+
+    def clear(self):
+        self._event.clear()
+
+    def wait(self, timeout):
+        return self._event.wait(timeout)
+
+
+class _AsyncWaiter:
+    """이벤트 루프에서 기다리는 구독자 (SSE, ASGI long-poll), publish는 다른 스레드에서 온다"""
+
+    __slots__ = ("_loop", "_event")
+
+    def __init__(self):
+        self._loop = asyncio.get_running_loop()
+        self._event = asyncio.Event()
+
+    def notify(self):
+        self._loop.call_soon_threadsafe(self._event.set)
+
+    def clear(self):
+        self._event.clear()
+
+    async def wait(self, timeout):
+        try:
+            await asyncio.wait_for(self._event.wait(), timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+
+
+def parse_rooms(values):
+    """room 파라미터 목록 → 방 튜플 (비어 있거나 *가 있으면 모든 방)"""
+    rooms = tuple(room for room in (value.strip() for value in values or ()) if room)
+    if not rooms or ALL_ROOMS in rooms:
+        return (ALL_ROOMS,)
+    return rooms
+
+
+class PushBroker:
+    """방별 이벤트 발행/구독 (프로세스 하나 안에서)"""
+
+    name = "memory"
+
+    # 구독자가 깨지 않아도 이벤트를 다시 확인하는 간격 (None이면 publish가 깨울 때만)
+    recheck = None
+
+    def __init__(self, buffer_size=PUSH_BUFFER_SIZE, retention=PUSH_RETENTION_SECONDS):
+        self.retention = retention
+        self._events = deque(maxlen=buffer_size)   # (id, 발행 시각, 이벤트 dict)
+        self._waiters = {}                         # 방 → 구독자 집합 (ALL_ROOMS 포함)
+        self._last_id = 0
+        self._lock = threading.Lock()
+        self.published = 0
+
+    @property
+    def last_id(self):
+        with self._lock:
+            return self._last_id
+
+    def publish(self, room, event):
+        """room에 이벤트 발행 → 이벤트 id (기다리던 구독자는 바로 깨어난다)"""
+        with self._lock:
+            self._last_id += 1
+            event = {"id": self._last_id, "room": room, **event}
+            self._events.append((self._last_id, time.monotonic(), event))
+            self.published += 1
+            waiters = list(self._waiters.get(room, ())) + list(self._waiters.get(ALL_ROOMS, ()))
+
+        for waiter in waiters:
+            waiter.notify()
+        return event["id"]
+
+    def events_since(self, rooms, last_id):
+        """rooms의 이벤트 중 id가 last_id보다 큰 것 (오래된 순)"""
+        all_rooms = ALL_ROOMS in rooms
+        cutoff = time.monotonic() - self.retention
+        with self._lock:
+            if last_id >= self._last_id:
+                return []
+            return [event for event_id, published_at, event in self._events
+                    if event_id > last_id and published_at >= cutoff and (all_rooms or event["room"] in rooms)]
+
+    def _register(self, rooms, waiter):
+        with self._lock:
+            for room in rooms:
+                self._waiters.setdefault(room, set()).add(waiter)
+
+    def _unregister(self, rooms, waiter):
+        with self._lock:
+            for room in rooms:
+                waiters = self._waiters.get(room)
+                if waiters is not None:
+                    waiters.discard(waiter)
+                    if not waiters:
+                        del self._waiters[room]
+
+    def _remaining(self, deadline):
+        """다음에 기다릴 시간 (recheck 간격을 넘지 않는다)"""
+        remaining = deadline - time.monotonic()
+        return remaining if self.recheck is None else min(remaining, self.recheck)
+
+    def wait(self, rooms, last_id, timeout):
+        """last_id 이후 이벤트가 올 때까지 최대 timeout초 기다린다 (스레드용), 이벤트 목록 반환"""
+        waiter = _ThreadWaiter()
+        self._register(rooms, waiter)
+        deadline = time.monotonic() + timeout
+        try:
+            while True:
+                # 깨우기 표시를 지운 뒤에 다시 봐야 그 사이 발행된 이벤트를 놓치지 않는다
+                waiter.clear()
+                events = self.events_since(rooms, last_id)
+                remaining = self._remaining(deadline)
+                if events or remaining <= 0:
+                    return events
+                waiter.wait(remaining)
+        finally:
+            self._unregister(rooms, waiter)
+
+    async def wait_async(self, rooms, last_id, timeout):
+        """wait의 비동기 버전"""
+        waiter = _AsyncWaiter()
+        self._register(rooms, waiter)
+        deadline = time.monotonic() + timeout
+        try:
+            while True:
+                waiter.clear()
+                events = self.events_since(rooms, last_id)
+                remaining = self._remaining(deadline)
+                if events or remaining <= 0:
+                    return events
+                await waiter.wait(remaining)
+        finally:
+            self._unregister(rooms, waiter)
+
+    def status(self):
+        with self._lock:
+            return {
+                "backend": self.name,
+                "subscribers": len({waiter for waiters in self._waiters.values() for waiter in waiters}),
+                "rooms": sorted(room for room in self._waiters if room != ALL_ROOMS),
+                "published": self.published,
+                "buffered": len(self._events),
+                "last_id": self._last_id,
+            }
+
+
+class SqlitePushBroker(PushBroker):
+    """SQLite 이벤트 로그 (storage.SqliteBackend의 push_events 테이블), 워커끼리 id를 공유
+
+    구독자 등록은 프로세스마다 따로다. 같은 워커에서 발행하면 바로 깨우고,
+    다른 워커가 발행한 이벤트는 기다리는 동안 recheck 간격마다 테이블을 다시 봐서 알아챈다.
+    """
+
+    name = "sqlite"
+
+    INSERT = "INSERT INTO push_events (room, published_at, data) VALUES (?, ?, ?) RETURNING id"
+    SELECT_SINCE = (
+        "SELECT id, room, data FROM push_events WHERE id > ? AND published_at >= ? ORDER BY id LIMIT ?"
+    )
+    # 방 필터도 SQL에서 건다 (LIMIT 뒤에 거르면 다른 방 이벤트가 많을 때 빈 목록만 돌아온다).
+    # 방 목록은 JSON 배열 하나로 넘겨서 방 수와 상관없이 같은 문장을 재사용한다
+    SELECT_SINCE_ROOMS = (
+        "SELECT id, room, data FROM push_events "
+        "WHERE room IN (SELECT value FROM json_each(?)) AND id > ? AND published_at >= ? ORDER BY id LIMIT ?"
+    )
+    SELECT_LAST_ID = "SELECT coalesce(max(id), 0) FROM push_events"
+    COUNT = "SELECT count(*) FROM push_events"
+    PURGE = "DELETE FROM push_events WHERE published_at < ? OR id <= (SELECT max(id) FROM push_events) - ?"
+
+    # 오래된 이벤트 정리 주기 (초)
+    PURGE_INTERVAL = 60
+
+    def __init__(self, backend, buffer_size=PUSH_BUFFER_SIZE, retention=PUSH_RETENTION_SECONDS,
+                 recheck=PUSH_SQLITE_POLL_SECONDS):
+        super().__init__(buffer_size, retention)
+        self.backend = backend
+        self.buffer_size = buffer_size
+        self.recheck = recheck
+        self._last_purge = 0.0
+
+    @property
+    def last_id(self):
+        return self.backend.connection().execute(self.SELECT_LAST_ID).fetchone()[0]
+
+    def publish(self, room, event):
+        """room에 이벤트 발행 → 이벤트 id (id는 SQLite가 매기므로 워커끼리 겹치지 않는다)"""
+        now = time.time()
+        self._maybe_purge(now)
+        data = json.dumps(event, ensure_ascii=False)
+        event_id = self.backend.connection().execute(self.INSERT, (room, now, data)).fetchone()[0]
+
+        with self._lock:
+            self.published += 1
+            waiters = list(self._waiters.get(room, ())) + list(self._waiters.get(ALL_ROOMS, ()))
+        for waiter in waiters:
+            waiter.notify()
+        return event_id
+
+    def events_since(self, rooms, last_id):
+        cutoff = time.time() - self.retention
+        conn = self.backend.connection()
+        if ALL_ROOMS in rooms:
+            rows = conn.execute(self.SELECT_SINCE, (last_id, cutoff, self.buffer_size))
+        else:
+            rooms = json.dumps(list(rooms), ensure_ascii=False)
+            rows = conn.execute(self.SELECT_SINCE_ROOMS, (rooms, last_id, cutoff, self.buffer_size))
+        return [{"id": event_id, "room": room, **json.loads(data)} for event_id, room, data in rows]
+
+    def _maybe_purge(self, now):
+        if now - self._last_purge < self.PURGE_INTERVAL:
+            return
+        self._last_purge = now
+        self.backend.connection().execute(self.PURGE, (now - self.retention, self.buffer_size))
+
+    def status(self):
+        status = super().status()
+        conn = self.backend.connection()
+        status["buffered"] = conn.execute(self.COUNT).fetchone()[0]
+        status["last_id"] = conn.execute(self.SELECT_LAST_ID).fetchone()[0]
+        return status
+
+
+def create_push_broker(backend=None):
+    """환경 변수(PUSH_BACKEND) 또는 인자로 푸시 브로커 생성"""
+    backend = (backend or os.getenv('PUSH_BACKEND', 'memory')).lower()
+    if backend == "memory":
+        return PushBroker()
+    if backend == "sqlite":
+        storage = get_storage()
+        if not isinstance(storage, SqliteBackend):
+            storage = SqliteBackend(import_json_from=None)
+        return SqlitePushBroker(storage)
+    raise ValueError(f"지원하지 않는 푸시 백엔드다: {backend} (가능: memory, sqlite)")
+
+
+# 프로세스 공용 브로커
+push_broker = create_push_broker()
+
+
+def publish_reminders(reminders, broker=push_broker):
+    """울린 리마인드를 방별로 묶어 발행 (웹훅 payload와 같은 모양), 발행한 이벤트 수 반환"""
+    batches = group_reminders(reminders)
+    for batch in batches:
+        payload = batch.payload()
+        payload.pop("room")
+        broker.publish(batch.room, payload)
+    return len(batches)
+
+
+def parse_last_id(value, broker=push_broker):
+    """since / Last-Event-ID 값 → 정수 (없거나 잘못되면 지금부터)"""
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return broker.last_id
+
+
+def format_sse(event):
+    """이벤트 dict → SSE 메시지 문자열"""
+    return f"id: {event['id']}\nevent: {event['type']}\ndata: {json.dumps(event, ensure_ascii=False)}\n\n"
+
+
+async def sse_stream(rooms, last_id, is_disconnected, broker=push_broker, keepalive=PUSH_KEEPALIVE_SECONDS):
+    """SSE 본문 생성기 (이벤트가 없으면 keepalive 간격마다 주석 한 줄)"""
+    yield f"retry: 3000\n: 구독 {','.join(rooms)}\n\n"
+    while not await is_disconnected():
+        events = await broker.wait_async(rooms, last_id, keepalive)
+        if not events:
+            yield ": keepalive\n\n"
+            continue
+        for event in events:
+            last_id = event["id"]
+            yield format_sse(event)
+
+
+def poll_timeout(value):
+    """long-poll timeout 파라미터 → 초 (0 ~ PUSH_POLL_TIMEOUT)"""
+    try:
+        return min(max(float(value), 0.0), PUSH_POLL_TIMEOUT)
+    except (TypeError, ValueError):
+        return PUSH_POLL_TIMEOUT
+
+
+def poll_result(events, last_id):
+    """long-poll 응답 data (다음 요청의 since는 last_id)"""
+    if events:
+        last_id = events[-1]["id"]
+    return {"events": events, "last_id": last_id}
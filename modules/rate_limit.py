@@ -0,0 +1,272 @@
+"""
+서버 쪽 레이트 리밋 (도배 방지) - (방, 보낸 사람)별 토큰 버킷
+
+/api/message와 배치 메시지는 핸들러/업스트림을 부르기 전에 여기서 먼저 거른다.
+메시지 종류마다 예산이 따로다 (업스트림을 부르는 학식/날씨는 일반 채팅보다 빡빡하게).
+    RATE_LIMIT_CHAT=10/10      일반 채팅: 한 번에 10개까지, 10초에 10개씩 다시 찬다
+    RATE_LIMIT_MEAL=3/60       학식 조회 (학식, 중학, 다학 내일, ...)
+    RATE_LIMIT_WEATHER=3/60    날씨 조회
+/api/weather, /api/meal 같은 조회 API는 보낸 사람이 없으므로 접속 IP별로 같은 예산을 쓴다.
+예산을 넘으면 429와 Retry-After(초)로 응답한다.
+
+버킷 하나는 "버킷이 다시 가득 차는 시각" 숫자 하나로 저장한다 (토큰 수와 마지막 시각을 따로 두지 않는다).
+그 시각이 지난 버킷은 처음 보는 버킷과 같으므로 지워도 되고, 표가 커질 때만 그런 행을 정리한다.
+
+백엔드 선택 (환경 변수):
+    RATE_LIMIT_BACKEND=memory (기본) - 프로세스 메모리 (gunicorn 워커마다 따로 센다)
+    RATE_LIMIT_BACKEND=sqlite        - 저장소와 같은 SQLite 파일, 워커끼리 버킷을 공유한다
+    RATE_LIMIT_BACKEND=off           - 끈다
+"""
+
+import math
+import os
+import threading
+import time
+
+from dotenv import load_dotenv
+
+from modules.metrics import RATE_LIMITED
+from modules.storage import SqliteBackend, get_storage
+
+load_dotenv()
+
+CHAT = "chat"
+MEAL = "meal"
+WEATHER = "weather"
+
+DEFAULT_BUDGETS = {
+    CHAT: "10/10",
+    MEAL: "3/60",
+    WEATHER: "3/60",
+}
+
+# 조회 API 경로 → 예산 (보낸 사람 대신 접속 IP로 센다)
+ROUTE_BUDGETS = {
+    "/api/weather": WEATHER,
+    "/api/postech/meal": MEAL,
+    "/api/cau/meal": MEAL,
+    "/api/meal": MEAL,
+    "/api/meal/range": MEAL,
+}
+
+# 메모리 백엔드: 스트라이프마다 이만큼 쌓이면 다 찬 버킷을 정리한다
+SWEEP_KEYS = int(os.getenv('RATE_LIMIT_SWEEP_KEYS', '1024'))
+MAX_KEYS = int(os.getenv('RATE_LIMIT_MAX_KEYS', '65536'))
+
+
+class Budget:
+    """예산 하나: capacity개까지 몰아서 보낼 수 있고, interval초마다 하나씩 다시 찬다"""
+
+    __slots__ = ("name", "capacity", "interval", "window")
+
+    def __init__(self, name, capacity, per_seconds):
+        if capacity < 1 or per_seconds <= 0:
+            raise ValueError(f"레이트 리밋 예산이 잘못됐다: {name} ({capacity}/{per_seconds})")
+        self.name = name
+        self.capacity = capacity
+        self.interval = per_seconds / capacity
+        # 빈 버킷이 다시 가득 차기까지 걸리는 시간
+        self.window = per_seconds
+
+    @classmethod
+    def parse(cls, name, spec):
+        """'10/60' (60초에 10개) 형식"""
+        try:
+            count, seconds = spec.split("/", 1)
+            return cls(name, int(count), float(seconds))
+        except ValueError:
+            raise ValueError(f"레이트 리밋 예산 형식은 '개수/초'다: {name}={spec!r}") from None
+
+    def take(self, full_at, now):
+        """토큰 하나 쓰기 → (새 full_at, 기다려야 할 초). 기다려야 하면 full_at은 그대로 둔다"""
+        new_full_at = max(full_at, now) + self.interval
+        over = new_full_at - now - self.window
+        if over > 1e-9:
+            return full_at, over
+        return new_full_at, 0.0
+
+    def __repr__(self):
+        return f"Budget({self.name!r}, {self.capacity}/{self.window:g}s)"
+
+
+def load_budgets():
+    """환경 변수(RATE_LIMIT_<예산>)로 덮어쓴 예산들"""
+    return {name: Budget.parse(name, os.getenv(f"RATE_LIMIT_{name.upper()}", spec))
+            for name, spec in DEFAULT_BUDGETS.items()}
+
+
+class _Limiter:
+    """백엔드 공용: 예산 찾기, 거른 요청 메트릭"""
+
+    def __init__(self, budgets=None):
+        self.budgets = budgets or load_budgets()
+
+    def _budget(self, name):
+        return self.budgets.get(name) or self.budgets[CHAT]
+
+    def acquire(self, room, sender, budget=CHAT, now=None):
+        """메시지 하나 보내도 되면 0, 아니면 기다려야 할 초"""
+        budget = self._budget(budget)
+        retry_after = self._acquire(f"{budget.name}\x1f{room}\x1f{sender}", budget, now or time.time())
+        if retry_after:
+            RATE_LIMITED.inc((budget.name,))
+        return retry_after
+
+    def close(self):
+        pass
+
+
+# ---- 메모리 백엔드 ----
+
+class MemoryRateLimiter(_Limiter):
+    """프로세스 메모리 버킷 (키 → 가득 차는 시각), 스트라이프마다 락을 따로 쓴다"""
+
+    name = "memory"
+
+    def __init__(self, budgets=None, stripes=16, sweep_keys=SWEEP_KEYS, max_keys=MAX_KEYS):
+        super().__init__(budgets)
+        # 스트라이프마다 [락, 키 → full_at, 다음 정리 기준 크기]
+        self._stripes = [[threading.Lock(), {}, sweep_keys] for _ in range(stripes)]
+        self.sweep_keys = sweep_keys
+        self.max_keys_per_stripe = max(1, max_keys // stripes)
+
+    def _acquire(self, key, budget, now):
+        stripe = self._stripes[hash(key) % len(self._stripes)]
+        lock, buckets = stripe[0], stripe[1]
+        with lock:
+            full_at, retry_after = budget.take(buckets.get(key, now), now)
+            if retry_after:
+                return retry_after
+            buckets[key] = full_at
+            if len(buckets) > stripe[2]:
+                self._sweep(stripe, now)
+            return 0.0
+
+    def _sweep(self, stripe, now):
+        """다 찬 버킷 지우기 (그래도 너무 많으면 오래된 키부터), 락 안에서 호출"""
+        buckets = stripe[1]
+        for key in [key for key, full_at in buckets.items() if full_at <= now]:
+            del buckets[key]
+        if len(buckets) > self.max_keys_per_stripe:
+            # 지운 키는 가득 찬 버킷으로 다시 시작한다 (덜 막는 쪽으로 틀린다)
+            for key in list(buckets)[:len(buckets) - self.max_keys_per_stripe]:
+                del buckets[key]
+        # 남은 키가 많으면 다음 정리는 그만큼 늦춘다 (매번 전체를 훑지 않게)
+        stripe[2] = max(self.sweep_keys, len(buckets) * 2)
+
+    def __len__(self):
+        return sum(len(stripe[1]) for stripe in self._stripes)
+
+
+# ---- SQLite 백엔드 ----
+
+class SqliteRateLimiter(_Limiter):
+    """SQLite 버킷 (storage.SqliteBackend의 rate_buckets 테이블), 워커끼리 공유"""
+
+    name = "sqlite"
+
+    # 가득 차는 시각을 한 문장으로 올린다: 예산을 넘으면 갱신하지 않고 행도 돌려주지 않는다
+    TAKE = (
+        "INSERT INTO rate_buckets (key, full_at) VALUES (?1, ?2 + ?3) "
+        "ON CONFLICT (key) DO UPDATE SET full_at = max(full_at, ?2) + ?3 "
+        "WHERE max(full_at, ?2) + ?3 - ?2 <= ?4 "
+        "RETURNING full_at"
+    )
+    SELECT = "SELECT full_at FROM rate_buckets WHERE key = ?"
+    PURGE = "DELETE FROM rate_buckets WHERE full_at < ?"
+    COUNT = "SELECT count(*) FROM rate_buckets"
+
+    # 다 찬 버킷 정리 주기 (초)
+    PURGE_INTERVAL = 60
+
+    def __init__(self, backend, budgets=None):
+        super().__init__(budgets)
+        self.backend = backend
+        self._last_purge = 0.0
+
+    def _acquire(self, key, budget, now):
+        self._maybe_purge(now)
+        conn = self.backend.connection()
+        if conn.execute(self.TAKE, (key, now, budget.interval, budget.window + 1e-9)).fetchone():
+            return 0.0
+        row = conn.execute(self.SELECT, (key,)).fetchone()
+        if row is None:
+            return 0.0
+        return budget.take(row[0], now)[1]
+
+    def _maybe_purge(self, now):
+        if now - self._last_purge < self.PURGE_INTERVAL:
+            return
+        self._last_purge = now
+        self.backend.connection().execute(self.PURGE, (now,))
+
+    def __len__(self):
+        return self.backend.connection().execute(self.COUNT).fetchone()[0]
+
+
+class NullRateLimiter(_Limiter):
+    """레이트 리밋 끔 (RATE_LIMIT_BACKEND=off)"""
+
+    name = "off"
+
+    def acquire(self, room, sender, budget=CHAT, now=None):
+        return 0.0
+
+    def __len__(self):
+        return 0
+
+
+def create_rate_limiter(backend=None, budgets=None):
+    """환경 변수(RATE_LIMIT_BACKEND) 또는 인자로 레이트 리미터 생성"""
+    backend = (backend or os.getenv('RATE_LIMIT_BACKEND', 'memory')).lower()
+    if backend == "memory":
+        return MemoryRateLimiter(budgets)
+    if backend == "sqlite":
+        storage = get_storage()
+        if not isinstance(storage, SqliteBackend):
+            storage = SqliteBackend(import_json_from=None)
+        return SqliteRateLimiter(storage, budgets)
+    if backend in ("off", "none", "0"):
+        return NullRateLimiter(budgets)
+    raise ValueError(f"지원하지 않는 레이트 리밋 백엔드다: {backend} (가능: memory, sqlite, off)")
+
+
+_rate_limiter = None
+_rate_limiter_lock = threading.Lock()
+
+
+def get_rate_limiter():
+    """프로세스 전체에서 공유하는 레이트 리미터"""
+    global _rate_limiter
+
+    if _rate_limiter is None:
+        with _rate_limiter_lock:
+            if _rate_limiter is None:
+                _rate_limiter = create_rate_limiter()
+    return _rate_limiter
+
+
+def check_route(path, client_ip):
+    """조회 API 요청 하나 (예산이 없는 경로면 0, 넘었으면 기다려야 할 초)"""
+    budget = ROUTE_BUDGETS.get(path)
+    if budget is None:
+        return 0.0
+    return get_rate_limiter().acquire(f"ip:{client_ip}", "", budget)
+
+
+def limited_result(retry_after):
+    """레이트 리밋에 걸렸을 때 응답 dict"""
+    seconds = max(1, math.ceil(retry_after))
+    return {
+        "success": False,
+        "error": f"너무 자주 보냈다. {seconds}초 뒤에 다시 보내라",
+        "rateLimited": True,
+        "retryAfter": seconds,
+    }
+
+
+def http_status(result):
+    """응답 dict → (HTTP 상태, 헤더): 레이트 리밋에 걸렸으면 429 + Retry-After"""
+    if isinstance(result, dict) and result.get("rateLimited"):
+        return 429, {"Retry-After": str(result["retryAfter"])}
+    return 200, {}
@@ -0,0 +1,178 @@
+"""
+리마인드 큐
+
+리마인드를 실행 시각 기준 최소 힙에 올려두고, 방별 보조 인덱스를 함께 유지한다.
+영속화는 MemoryStore(reminders.json + 저널)가 담당하고, 다른 워커가 추가/삭제한
+리마인드는 저장소의 listener 알림으로 힙과 인덱스에 반영된다.
+
+- 실행할 리마인드 확인: 실행할 리마인드 k개에 대해 O(k log n)
+- 다음 실행 시각 확인: O(1) (지연 삭제된 항목 정리 제외)
+- 방별 조회: 방 인덱스에서 바로 조회
+"""
+
+import heapq
+import threading
+import time
+import uuid
+from datetime import datetime
+
+from modules.memory_store import MemoryStore
+
+# 실행 시각이 이보다 많이 지난 리마인드는 알리지 않고 버린다 (초)
+LATE_LIMIT_SECONDS = 300
+
+
+def upgrade_legacy_reminders(reminders):
+    """예전 reminders.json (리스트 형식)을 id → 리마인드 dict로 변환"""
+    return {f"legacy-{index}": reminder for index, reminder in enumerate(reminders)}
+
+
+def _fire_timestamp(reminder):
+    return datetime.fromisoformat(reminder["datetime"]).timestamp()
+
+
+class ReminderQueue:
+    """실행 시각 힙 + 방별 인덱스 기반 리마인드 큐"""
+
+    def __init__(self, path="reminders.json"):
+        self._lock = threading.RLock()
+        self._changed = threading.Condition(self._lock)
+        self._heap = []        # (실행 시각 timestamp, id)
+        self._reminders = {}   # id → 리마인드
+        self._fire_ts = {}     # id → 실행 시각 timestamp
+        self._by_room = {}     # 방 → {id: 리마인드} (추가된 순서)
+        self.version = 0       # 리마인드가 추가/다시 로드될 때마다 증가
+        self._store = MemoryStore(path, listener=self, upgrade=upgrade_legacy_reminders)
+
+    # ---- 저장소 알림 (MemoryStore listener) ----
+
+    def on_reload(self, data):
+        with self._lock:
+            self._reminders = {}
+            self._fire_ts = {}
+            self._by_room = {}
+            for key, reminder in data.items():
+                self._index(key, reminder)
+            self._heap = [(fire_ts, key) for key, fire_ts in self._fire_ts.items()]
+            heapq.heapify(self._heap)
+            self.version += 1
+            self._changed.notify_all()
+
+    def on_set(self, key, reminder):
+        with self._lock:
+            self._unindex(key)
+            self._index(key, reminder)
+            heapq.heappush(self._heap, (self._fire_ts[key], key))
+            self.version += 1
+            self._changed.notify_all()
+
+    def on_delete(self, key):
+        with self._lock:
+            # 힙에서는 꺼낼 때 지운다 (지연 삭제)
+            self._unindex(key)
+
+    def _index(self, key, reminder):
+        self._reminders[key] = reminder
+        self._fire_ts[key] = _fire_timestamp(reminder)
+        self._by_room.setdefault(reminder.get("room"), {})[key] = reminder
+
+    def _unindex(self, key):
+        reminder = self._reminders.pop(key, None)
+        if reminder is None:
+            return
+        del self._fire_ts[key]
+        room_index = self._by_room.get(reminder.get("room"))
+        if room_index is not None:
+            room_index.pop(key, None)
+            if not room_index:
+                del self._by_room[reminder.get("room")]
+
+    def _clean_head(self):
+        """힙 맨 앞의 이미 삭제/변경된 항목 정리 (락을 잡은 상태에서 호출)"""
+        while self._heap:
+            fire_ts, key = self._heap[0]
+            if self._fire_ts.get(key) == fire_ts:
+                return
+            heapq.heappop(self._heap)
+
+    # ---- 공개 API ----
+
+    def add(self, reminder):
+        """리마인드 추가, id 반환"""
+        key = uuid.uuid4().hex
+        self._store.set(key, reminder)
+        return key
+
+    def due(self, now=None):
+        """실행 시각이 된 리마인드를 꺼내 실행 시각 순으로 반환
+
+        LATE_LIMIT_SECONDS 넘게 지난 리마인드는 반환하지 않고 삭제만 한다.
+        여러 워커가 동시에 호출해도 리마인드 하나는 한 워커만 받는다.
+        """
+        self._store.refresh()
+        now_ts = (now or datetime.now()).timestamp()
+        triggered = []
+
+        while True:
+            with self._lock:
+                self._clean_head()
+                if not self._heap or self._heap[0][0] > now_ts:
+                    break
+                fire_ts, key = heapq.heappop(self._heap)
+
+            # 저장소에서 꺼낸 워커만 알린다
+            reminder = self._store.pop(key)
+            if reminder is not None and now_ts - fire_ts <= LATE_LIMIT_SECONDS:
+                triggered.append(reminder)
+
+        return triggered
+
+    def next_fire_time(self):
+        """다음 리마인드 실행 시각 (timestamp), 없으면 None"""
+        with self._lock:
+            self._clean_head()
+            return self._heap[0][0] if self._heap else None
+
+    def seconds_until_next(self):
+        """다음 리마인드까지 남은 시간(초), 없으면 None"""
+        self._store.refresh()
+        next_ts = self.next_fire_time()
+        if next_ts is None:
+            return None
+        return max(0.0, next_ts - time.time())
+
+    def wait(self, timeout=None, version=None):
+        """리마인드가 추가/변경되거나 timeout이 지날 때까지 대기
+
+        version을 넘기면 그 뒤로 이미 변경이 있었을 때 바로 반환한다.
+        """
+        with self._changed:
+            if version is not None and version != self.version:
+                return
+            self._changed.wait(timeout)
+
+    def wake(self):
+        """wait() 중인 스레드 깨우기"""
+        with self._changed:
+            self._changed.notify_all()
+
+    def for_room(self, room):
+        """방별 리마인드 목록 (추가된 순서)"""
+        self._store.refresh()
+        with self._lock:
+            return list(self._by_room.get(room, {}).values())
+
+    def all(self):
+        """전체 리마인드 목록 (추가된 순서)"""
+        self._store.refresh()
+        with self._lock:
+            return list(self._reminders.values())
+
+    def close(self):
+        """저널을 스냅샷으로 합치고 파일 닫기"""
+        self._store.close()
+
+    def __len__(self):
+        self._store.refresh()
+        with self._lock:
+            return len(self._reminders)
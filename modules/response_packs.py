@@ -0,0 +1,391 @@
+"""
+응답 팩 (친구/밈/졸업 응답을 코드 대신 데이터 파일로)
+
+message/packs/*.json (PyYAML이 있으면 *.yaml / *.yml도)을 읽어 디스패처 규칙으로 컴파일한다.
+응답 문구를 바꿀 때 코드 배포나 gunicorn 재시작 없이 파일만 고치면 된다.
+
+    {
+      "name": "graduate",              # 규칙 이름 앞부분 (graduate:academy), 메트릭 handler 태그
+      "priority": "graduate",          # 우선순위 대역 이름 또는 숫자
+      "rules": [                       # 위에 있는 규칙이 먼저 (first-match)
+        {"triggers": ["하리"], "responses": ["허리 조심", "담배 피러 가자"]},   # 포함되면, 랜덤 하나
+        {"exact": ["KHH"], "response": "크하학 크하학"},                         # 정확히 일치하면
+        {"name": "academy", "triggers": ["아카데미"],
+         "response": {"template": "countdown", "target": "2025-12-12T00:00:00", "before": "...", ...}}
+      ]
+    }
+
+템플릿 응답은 컴파일할 때 함수가 되고 그 응답이 뽑힌 순간에만 계산된다.
+- days: text의 {since} (date부터 지난 일수), {until} (date까지 남은 일수)
+- countdown: target까지 남았으면 before ({days} {hours} {minutes}) / 하루 안 남았으면 before_today,
+  지난 지 하루 안이면 today, 그 뒤로는 after ({days}: 지난 일수)
+
+start_pack_watcher()가 팩 디렉토리의 변경(mtime)을 보고 있다가 새 팩을 컴파일해 MessageHandler의
+디스패처를 통째로 바꾼다. 처리 중인 요청은 바꾸기 전 디스패처로 끝까지 처리된다.
+새 팩에 오류가 있으면 이전 팩을 그대로 쓰고 로그만 남긴다.
+"""
+
+import json
+import os
+import random
+import threading
+import weakref
+from datetime import date, datetime
+
+from dotenv import load_dotenv
+
+from modules.dispatcher import (
+    PRIORITY_BASIC,
+    PRIORITY_EMOTION,
+    PRIORITY_FRIENDS,
+    PRIORITY_GRADUATE,
+    PRIORITY_MEME,
+)
+from modules.logger import get_logger, fields
+
+try:
+    import yaml
+except ImportError:  # PyYAML이 없으면 JSON 팩만 읽는다
+    yaml = None
+
+load_dotenv()
+
+logger = get_logger("packs")
+
+PACK_DIR = os.getenv('RESPONSE_PACK_DIR') or os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "message", "packs")
+
+# 팩 파일 변경 확인 간격(초), 0이면 감시하지 않는다
+PACK_WATCH_SECONDS = float(os.getenv('RESPONSE_PACK_WATCH_SECONDS', '2'))
+
+PACK_EXTENSIONS = (".json", ".yaml", ".yml") if yaml is not None else (".json",)
+READ_ERRORS = (OSError, ValueError) + ((yaml.YAMLError,) if yaml is not None else ())
+
+# 팩에서 쓸 수 있는 우선순위 대역 이름
+PRIORITY_BANDS = {
+    "friends": PRIORITY_FRIENDS,
+    "graduate": PRIORITY_GRADUATE,
+    "meme": PRIORITY_MEME,
+    "emotion": PRIORITY_EMOTION,
+    "basic": PRIORITY_BASIC,
+}
+
+DAY_SECONDS = 24 * 60 * 60
+
+
+class PackError(ValueError):
+    """팩 파일 형식 오류"""
+
+
+# ---- 템플릿 ----
+
+def _parse_date(spec, key):
+    try:
+        return date.fromisoformat(spec[key])
+    except (KeyError, TypeError, ValueError):
+        raise PackError(f"{key}는 YYYY-MM-DD 형식이어야 한다: {spec.get(key)!r}")
+
+
+def _days_template(spec):
+    """date 기준 지난/남은 일수"""
+    target = _parse_date(spec, "date")
+    text = _template_text(spec, "text")
+
+    def render():
+        today = date.today()
+        return text.format(since=(today - target).days, until=(target - today).days)
+
+    return render
+
+
+def _countdown_template(spec):
+    """target 시각까지 남은 일/시/분 (지나면 today → after)"""
+    try:
+        target = datetime.fromisoformat(spec["target"])
+    except (KeyError, TypeError, ValueError):
+        raise PackError(f"target은 ISO 시각이어야 한다: {spec.get('target')!r}")
+    before = _template_text(spec, "before")
+    before_today = _template_text(spec, "before_today", before)
+    today = _template_text(spec, "today")
+    after = _template_text(spec, "after")
+
+    def render():
+        total = (target - datetime.now()).total_seconds()
+        days = int(total // DAY_SECONDS)
+        remaining = total % DAY_SECONDS
+        hours = int(remaining // 3600)
+        minutes = int((remaining % 3600) // 60)
+
+        if total > 0:
+            return (before if days > 0 else before_today).format(days=days, hours=hours, minutes=minutes)
+        if total > -DAY_SECONDS:
+            return today.format()
+        return after.format(days=abs(days))
+
+    return render
+
+
+TEMPLATES = {
+    "days": _days_template,
+    "countdown": _countdown_template,
+}
+
+
+def _template_text(spec, key, default=None):
+    text = spec.get(key, default)
+    if not isinstance(text, str):
+        raise PackError(f"템플릿에 {key} 문장이 없다")
+    return text
+
+
+def compile_response(spec):
+    """응답 하나 → 문자열 또는 호출할 때 계산되는 함수"""
+    if isinstance(spec, str):
+        return spec
+    if isinstance(spec, dict):
+        builder = TEMPLATES.get(spec.get("template"))
+        if builder is None:
+            raise PackError(f"알 수 없는 템플릿: {spec.get('template')!r} (가능: {', '.join(TEMPLATES)})")
+        render = builder(spec)
+        # 문장에 없는 {이름}이 있으면 요청을 받을 때가 아니라 읽을 때 알 수 있게 한 번 계산해 본다
+        try:
+            render()
+        except (KeyError, IndexError, ValueError) as e:
+            raise PackError(f"{spec['template']} 템플릿 문장 오류: {e!r}")
+        return render
+    raise PackError(f"응답은 문자열이나 템플릿이어야 한다: {spec!r}")
+
+
+def pick_response(responses):
+    """응답 하나 고르기 (튜플이면 랜덤, 함수면 지금 계산)"""
+    if isinstance(responses, tuple):
+        responses = random.choice(responses)
+    if callable(responses):
+        return responses()
+    return responses
+
+
+# ---- 팩 ----
+
+class PackRule:
+    """팩 규칙 하나 (트리거 + 응답 테이블)"""
+
+    __slots__ = ("name", "kind", "patterns", "responses")
+
+    def __init__(self, name, kind, patterns, responses):
+        self.name = name
+        self.kind = kind            # substring / exact
+        self.patterns = patterns
+        self.responses = responses  # 응답 하나 또는 랜덤으로 고를 튜플
+
+    def matches(self, msg):
+        if self.kind == "exact":
+            return msg in self.patterns
+        return any(pattern in msg for pattern in self.patterns)
+
+    def __call__(self, msg):
+        return pick_response(self.responses)
+
+
+class ResponsePack:
+    """컴파일된 응답 팩"""
+
+    def __init__(self, name, priority, rules, path=None):
+        self.name = name
+        self.priority = priority
+        self.rules = rules
+        self.path = path
+
+    def register(self, dispatcher):
+        """디스패처에 규칙 등록 (파일 안 순서대로)"""
+        for rule in self.rules:
+            add = dispatcher.add_exact if rule.kind == "exact" else dispatcher.add_substring
+            add(list(rule.patterns), rule, self.priority, name=f"{self.name}:{rule.name}")
+
+    def check(self, msg):
+        """규칙을 순서대로 훑어 응답 찾기 (디스패처 없이 쓸 때)"""
+        for rule in self.rules:
+            if rule.matches(msg):
+                return rule(msg)
+        return None
+
+    def __repr__(self):
+        return f"ResponsePack({self.name!r}, rules={len(self.rules)})"
+
+
+def _compile_rule(index, spec):
+    if not isinstance(spec, dict):
+        raise PackError(f"규칙 {index}: 객체여야 한다")
+
+    if "exact" in spec:
+        kind, patterns = "exact", spec["exact"]
+    else:
+        kind, patterns = "substring", spec.get("triggers")
+    if not patterns or not isinstance(patterns, list) or not all(isinstance(p, str) and p for p in patterns):
+        raise PackError(f"규칙 {index}: triggers(또는 exact)는 비어 있지 않은 문자열 목록이어야 한다")
+
+    if "responses" in spec:
+        if not spec["responses"] or not isinstance(spec["responses"], list):
+            raise PackError(f"규칙 {index}: responses는 비어 있지 않은 목록이어야 한다")
+        responses = tuple(compile_response(response) for response in spec["responses"])
+    elif "response" in spec:
+        responses = compile_response(spec["response"])
+    else:
+        raise PackError(f"규칙 {index}: response 또는 responses가 필요하다")
+
+    return PackRule(spec.get("name") or patterns[0], kind, tuple(patterns), responses)
+
+
+def compile_pack(data, path=None):
+    """팩 dict → ResponsePack"""
+    if not isinstance(data, dict) or not data.get("name"):
+        raise PackError("팩에 name이 없다")
+
+    priority = data.get("priority", data["name"])
+    if isinstance(priority, str):
+        if priority not in PRIORITY_BANDS:
+            raise PackError(f"알 수 없는 우선순위 대역: {priority!r} (가능: {', '.join(PRIORITY_BANDS)})")
+        priority = PRIORITY_BANDS[priority]
+
+    rules = [_compile_rule(index, spec) for index, spec in enumerate(data.get("rules") or [])]
+    return ResponsePack(data["name"], priority, rules, path)
+
+
+def load_pack(path):
+    """팩 파일 하나 읽어 컴파일"""
+    try:
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f) if path.endswith(".json") else yaml.safe_load(f)
+        return compile_pack(data, path)
+    except PackError as e:
+        raise PackError(f"{os.path.basename(path)}: {e}")
+    except READ_ERRORS as e:
+        raise PackError(f"{os.path.basename(path)}: 읽기 실패 ({e})")
+
+
+def pack_files(directory=PACK_DIR):
+    if not os.path.isdir(directory):
+        return []
+    return sorted(os.path.join(directory, name) for name in os.listdir(directory)
+                  if name.endswith(PACK_EXTENSIONS) and not name.startswith("."))
+
+
+def load_packs(directory=PACK_DIR):
+    """디렉토리의 팩을 모두 읽어 (우선순위, 파일 이름) 순으로 반환 - 하나라도 잘못되면 PackError"""
+    packs = [load_pack(path) for path in pack_files(directory)]
+    names = [pack.name for pack in packs]
+    duplicated = {name for name in names if names.count(name) > 1}
+    if duplicated:
+        raise PackError(f"팩 이름이 겹친다: {', '.join(sorted(duplicated))}")
+    return sorted(packs, key=lambda pack: pack.priority)
+
+
+# ---- 현재 팩 + 감시 ----
+
+_packs = None
+_packs_lock = threading.Lock()
+_listeners = weakref.WeakSet()
+_watcher = None
+
+
+def get_packs():
+    """현재 응답 팩 (처음 부를 때 한 번 읽는다)"""
+    global _packs
+    packs = _packs
+    if packs is None:
+        with _packs_lock:
+            if _packs is None:
+                _packs = load_packs()
+            packs = _packs
+    return packs
+
+
+def get_pack(name):
+    """이름으로 팩 하나 (없으면 None)"""
+    return next((pack for pack in get_packs() if pack.name == name), None)
+
+
+def add_pack_listener(listener):
+    """팩이 바뀌면 listener.reload_packs(packs)를 부른다 (약한 참조)"""
+    _listeners.add(listener)
+
+
+def reload_packs(directory=PACK_DIR):
+    """팩을 다시 읽어 바꾸고 리스너에 알림, 성공 여부 반환 (실패하면 이전 팩 유지)"""
+    global _packs
+    try:
+        packs = load_packs(directory)
+    except PackError as e:
+        logger.error(f"❌ 응답 팩을 다시 읽지 못해 이전 팩을 쓴다: {e}")
+        return False
+
+    with _packs_lock:
+        _packs = packs
+    for listener in list(_listeners):
+        listener.reload_packs(packs)
+    logger.info("🔄 응답 팩을 다시 읽었다",
+                extra=fields(packs=[pack.name for pack in packs], rules=sum(len(pack.rules) for pack in packs)))
+    return True
+
+
+class PackWatcher:
+    """팩 디렉토리 변경 감시 (mtime 폴링, 외부 의존성 없음)"""
+
+    def __init__(self, directory=PACK_DIR, interval=PACK_WATCH_SECONDS):
+        self.directory = directory
+        self.interval = interval
+        self.reloads = 0
+        self._snapshot = self.snapshot()
+        self._stop = threading.Event()
+        self.thread = threading.Thread(target=self._run, name="pack-watcher", daemon=True)
+
+    def snapshot(self):
+        """파일별 (mtime, 크기) - 추가/삭제/수정을 모두 잡는다"""
+        result = {}
+        for path in pack_files(self.directory):
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue
+            result[path] = (st.st_mtime_ns, st.st_size)
+        return result
+
+    def check(self):
+        """바뀌었으면 다시 읽기, 다시 읽었는지 반환"""
+        snapshot = self.snapshot()
+        if snapshot == self._snapshot:
+            return False
+        self._snapshot = snapshot
+        if reload_packs(self.directory):
+            self.reloads += 1
+            return True
+        return False
+
+    def start(self):
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.check()
+            except Exception as e:
+                logger.exception(f"❌ 응답 팩 감시 중 오류: {e}")
+
+
+def start_pack_watcher():
+    """응답 팩 감시 시작 (프로세스당 한 번, PACK_WATCH_SECONDS가 0이면 안 함)
+
+    gunicorn에서는 워커가 fork된 뒤에 호출해야 한다 (스레드는 fork되지 않는다).
+    """
+    global _watcher
+    if PACK_WATCH_SECONDS <= 0:
+        return None
+    with _packs_lock:
+        if _watcher is None:
+            _watcher = PackWatcher().start()
+            logger.info(f"👀 응답 팩 감시 시작: {PACK_DIR} ({PACK_WATCH_SECONDS:g}초 간격)")
+        return _watcher
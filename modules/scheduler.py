@@ -1,100 +1,336 @@
+import os
+import random
 import schedule
 import time
 import threading
-import requests
 from datetime import datetime
-from modules.memory import check_reminders
+from modules.delivery import ReminderDelivery
+from modules.memory import format_reminder, pop_due_reminders, reminder_queue
+from modules.push import publish_reminders, push_broker
+from modules.metrics import PREFETCH_RUNS
+from modules.logger import get_logger, fields
+
+try:
+    import fcntl
+except ImportError:  # Windows: 프로세스 하나로 돌린다고 보고 잠금 없이 맡는다
+    fcntl = None
+
+logger = get_logger("scheduler")
+
+# 다른 워커가 추가한 리마인드를 놓치지 않도록 이 시간마다는 한 번씩 깨어난다 (초)
+RESYNC_SECONDS = 60
+
+# 미리 가져오기 작업: 실행 전 0~N초 무작위 대기 (워커/인스턴스끼리 업스트림 호출이 몰리지 않도록)
+PREFETCH_JITTER_SECONDS = float(os.getenv('PREFETCH_JITTER_SECONDS', '60'))
+
+# 실패 시 재시도: 30초, 60초, 120초, ... (최대 15분), 5번까지
+PREFETCH_MAX_RETRIES = 5
+PREFETCH_BACKOFF_BASE = 30
+PREFETCH_BACKOFF_MAX = 900
+
+# 중앙대 학식 갱신 시각: 식사 시간대 경계(0/10/15시) 직후 + 조식/중식/석식 시작 전
+CAU_PREFETCH_TIMES = [t.strip() for t in os.getenv(
+    'CAU_PREFETCH_TIMES', '00:05,07:00,10:05,11:00,15:05,17:00').split(',') if t.strip()]
+
+# 포항공대 주간 메뉴 갱신 주기(분), 월요일 00:05에는 새 주 메뉴를 따로 가져온다
+POSTECH_PREFETCH_MINUTES = int(os.getenv('POSTECH_PREFETCH_MINUTES', '30'))
+
+# 미리 가져오기와 리마인드 스케줄러는 gunicorn 워커 중 하나만 돌린다: 이 파일에 배타 잠금을 잡은 워커가 맡는다
+PREFETCH_LOCK_PATH = os.getenv('PREFETCH_LOCK_PATH', os.getenv('STORAGE_SQLITE_PATH', 'khh.db') + '.prefetch.lock')
+# 잠금을 못 잡은 워커가 다시 잡아 보는 간격(초). 맡던 워커가 재시작하면 이 안에 다른 워커가 이어받는다
+PREFETCH_LEADER_RETRY_SECONDS = float(os.getenv('PREFETCH_LEADER_RETRY_SECONDS', '30'))
+
+
+class PrefetchFailed(Exception):
+    """미리 가져오기 작업 일부가 실패함 (재시도 대상)"""
+
+
+class PrefetchJob:
+    """업스트림 데이터를 미리 가져와 캐시에 넣는 작업 하나
+
+    실행은 작업마다 별도 스레드에서 한다 (리마인드 체크를 막지 않도록).
+    시작 전에 0~jitter초 기다리고, 실패하면 지수 백오프로 max_retries번까지 다시 시도한다.
+    이전 실행이 아직 끝나지 않았으면 이번 실행은 건너뛴다.
+    """
+
+    def __init__(self, name, func, jitter=PREFETCH_JITTER_SECONDS, max_retries=PREFETCH_MAX_RETRIES,
+                 backoff_base=PREFETCH_BACKOFF_BASE, backoff_max=PREFETCH_BACKOFF_MAX):
+        self.name = name
+        self.func = func
+        self.jitter = jitter
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+
+        self._running = threading.Lock()
+        self._cancelled = threading.Event()
+
+        self.runs = 0
+        self.failures = 0
+        self.last_run = None
+        self.last_success = None
+        self.last_error = None
+
+    def __call__(self, jitter=True):
+        """schedule에서 부르는 진입점 (실행 스레드를 띄우고 바로 반환)"""
+        if not self._running.acquire(blocking=False):
+            PREFETCH_RUNS.inc((self.name, "skipped"))
+            logger.info("⏭️ 이전 실행이 끝나지 않아 건너뛴다", extra=fields(job=self.name))
+            return
+        threading.Thread(target=self._run, args=(jitter,), name=f"prefetch-{self.name}", daemon=True).start()
+
+    def cancel(self):
+        """대기/재시도 중인 실행 중단"""
+        self._cancelled.set()
+
+    def backoff_delay(self, attempt):
+        """attempt번째 재시도 전 대기 시간(초), ±20% 무작위"""
+        delay = min(self.backoff_max, self.backoff_base * (2 ** attempt))
+        return delay * random.uniform(0.8, 1.2)
+
+    def _run(self, jitter):
+        try:
+            if jitter and self.jitter > 0 and self._cancelled.wait(random.uniform(0, self.jitter)):
+                return
+
+            for attempt in range(self.max_retries + 1):
+                self.runs += 1
+                self.last_run = datetime.now()
+                start = time.perf_counter()
+                try:
+                    self.func()
+                except Exception as e:
+                    self.failures += 1
+                    self.last_error = str(e)
+                    if attempt >= self.max_retries:
+                        PREFETCH_RUNS.inc((self.name, "failed"))
+                        logger.warning(f"❌ 미리 가져오기 실패, 다음 예정 시각까지 기다린다: {e}",
+                                       extra=fields(job=self.name, attempts=attempt + 1))
+                        return
+
+                    delay = self.backoff_delay(attempt)
+                    PREFETCH_RUNS.inc((self.name, "retry"))
+                    logger.warning(f"🔄 미리 가져오기 실패, 다시 시도한다: {e}",
+                                   extra=fields(job=self.name, attempt=attempt + 1, retry_in=round(delay, 1)))
+                    if self._cancelled.wait(delay):
+                        return
+                    continue
+
+                self.last_success = datetime.now()
+                self.last_error = None
+                PREFETCH_RUNS.inc((self.name, "ok"))
+                logger.info("📦 미리 가져오기 완료", extra=fields(
+                    job=self.name, elapsed_ms=round((time.perf_counter() - start) * 1000, 1)))
+                return
+        finally:
+            self._running.release()
+
+    def status(self):
+        return {
+            "name": self.name,
+            "running": self._running.locked(),
+            "runs": self.runs,
+            "failures": self.failures,
+            "last_run": self.last_run.isoformat(timespec="seconds") if self.last_run else None,
+            "last_success": self.last_success.isoformat(timespec="seconds") if self.last_success else None,
+            "last_error": self.last_error,
+        }
+
+
+class PrefetchLeader:
+    """미리 가져오기/리마인드 스케줄러를 맡을 프로세스 정하기 (파일 배타 잠금)
+
+    잠금은 프로세스가 살아 있는 동안 유지되고, 워커가 죽거나 max_requests로 재시작하면 OS가 푼다.
+    잠금 파일에는 맡은 프로세스의 pid를 적는다.
+    """
+
+    def __init__(self, path=PREFETCH_LOCK_PATH):
+        self.path = path
+        self._file = None
+        self._pid = None
+
+    @property
+    def held(self):
+        return self._pid == os.getpid()
+
+    def acquire(self):
+        """잠금을 잡았거나 이미 잡고 있으면 True (기다리지 않는다)"""
+        if self.held:
+            return True
+        if fcntl is None:
+            self._pid = os.getpid()
+            return True
+
+        lock_file = open(self.path, "a+")
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            lock_file.close()
+            return False
+        lock_file.truncate(0)
+        lock_file.write(str(os.getpid()))
+        lock_file.flush()
+        self._file, self._pid = lock_file, os.getpid()
+        return True
 
 
 class ReminderScheduler:
     def __init__(self, callback_url=None):
         """
-        리마인드 스케줄러 초기화
+        리마인드 + 미리 가져오기 작업 스케줄러 초기화
 
         Args:
             callback_url: 리마인드 알림을 보낼 콜백 URL (선택사항)
         """
         self.callback_url = callback_url
-        self.is_running = False
+        self.delivery = None        # 웹훅 전달 파이프라인 (callback_url이 있을 때 처음 보낼 때 생성)
+        self.is_running = False     # 리마인드 체크 여부
         self.thread = None
+        self.jobs = schedule.Scheduler()
+        self.prefetch_jobs = {}
+        self._lock = threading.Lock()
 
     def start(self):
-        """스케줄러 시작"""
+        """리마인드 체크 시작"""
         if self.is_running:
-            print("⚠️  스케줄러가 이미 실행 중이다")
+            logger.warning("⚠️  스케줄러가 이미 실행 중이다")
             return
 
         self.is_running = True
+        self._ensure_thread()
 
-        # 매분마다 리마인드 체크
-        schedule.every().minute.do(self._check_and_notify)
-
-        # 백그라운드 스레드에서 실행
-        self.thread = threading.Thread(target=self._run_scheduler, daemon=True)
-        self.thread.start()
-
-        print("⏰ 리마인드 스케줄러가 시작됐다")
+        logger.info("⏰ 리마인드 스케줄러가 시작됐다")
 
     def stop(self):
-        """스케줄러 정지"""
+        """리마인드 체크 정지 (미리 가져오기 작업은 계속 돈다, 전달 큐에 남은 리마인드는 보내고 멈춘다)"""
         self.is_running = False
-        schedule.clear()
-        print("⏰ 리마인드 스케줄러가 정지됐다")
+        reminder_queue.wake()
+        with self._lock:
+            delivery, self.delivery = self.delivery, None
+        if delivery is not None:
+            delivery.stop()
+        logger.info("⏰ 리마인드 스케줄러가 정지됐다")
+
+    def add_prefetch_job(self, name, func, triggers, run_now=True, **options):
+        """미리 가져오기 작업 등록 (같은 이름은 한 번만)
+
+        Args:
+            name: 작업 이름 (상태/메트릭에 표시)
+            func: 실패하면 예외를 올리는 함수
+            triggers: schedule.Scheduler를 받아 실행 시각을 정한 schedule.Job을 돌려주는 함수 목록
+                      예) lambda jobs: jobs.every().monday.at("00:05")
+            run_now: 등록하자마자 한 번 실행 (지터 없이)
+            **options: PrefetchJob 옵션 (jitter, max_retries, ...)
+        """
+        with self._lock:
+            job = self.prefetch_jobs.get(name)
+            if job is not None:
+                return job
+            job = self.prefetch_jobs[name] = PrefetchJob(name, func, **options)
+            for trigger in triggers:
+                trigger(self.jobs).do(job).tag(name)
+
+        self._ensure_thread()
+        reminder_queue.wake()  # 다음에 깨어날 시각 다시 계산
+        if run_now:
+            job(jitter=False)
+        return job
+
+    def clear_prefetch_jobs(self):
+        """미리 가져오기 작업 모두 해제"""
+        with self._lock:
+            self.jobs.clear()
+            for job in self.prefetch_jobs.values():
+                job.cancel()
+            self.prefetch_jobs.clear()
+        reminder_queue.wake()
+
+    def job_status(self):
+        """미리 가져오기 작업별 상태 + 다음 예정 시각"""
+        statuses = []
+        with self._lock:
+            for name, job in self.prefetch_jobs.items():
+                status = job.status()
+                next_runs = [scheduled.next_run for scheduled in self.jobs.get_jobs(name) if scheduled.next_run]
+                status["next_run"] = min(next_runs).isoformat(timespec="seconds") if next_runs else None
+                statuses.append(status)
+        return statuses
+
+    def _ensure_thread(self):
+        """스케줄러 스레드가 없으면 시작"""
+        with self._lock:
+            if self.thread is not None and self.thread.is_alive():
+                return
+            # 백그라운드 스레드에서 실행
+            self.thread = threading.Thread(target=self._run_scheduler, name="scheduler", daemon=True)
+            self.thread.start()
 
     def _run_scheduler(self):
-        """스케줄러 메인 루프"""
-        while self.is_running:
+        """스케줄러 메인 루프 (다음 리마인드 / 다음 작업 시각까지 정확히 잠든다)"""
+        while self.is_running or self.jobs.jobs:
             try:
-                schedule.run_pending()
-                time.sleep(1)  # 1초마다 체크
+                version = reminder_queue.version
+                if self.is_running:
+                    self._check_and_notify()
+                with self._lock:
+                    self.jobs.run_pending()
+
+                # 새 리마인드가 추가되면 wait()가 바로 깨어나 대기 시간을 다시 계산한다
+                reminder_queue.wait(self._seconds_until_next_wakeup(), version)
             except Exception as e:
-                print(f"❌ 스케줄러 실행 중 오류: {e}")
+                logger.exception(f"❌ 스케줄러 실행 중 오류: {e}")
                 time.sleep(10)  # 오류 시 10초 대기
 
+    def _seconds_until_next_wakeup(self):
+        """다음 리마인드 / 다음 작업 / 재동기화 중 가장 빠른 시각까지 남은 시간"""
+        candidates = [RESYNC_SECONDS]
+
+        next_reminder = reminder_queue.seconds_until_next() if self.is_running else None
+        if next_reminder is not None:
+            candidates.append(next_reminder)
+
+        with self._lock:
+            next_job = self.jobs.idle_seconds
+        if next_job is not None:
+            candidates.append(next_job)
+
+        return max(0.0, min(candidates))
+
     def _check_and_notify(self):
-        """리마인드 체크 및 알림 발송"""
+        """리마인드 체크 및 알림 발송 (웹훅 전송은 전달 파이프라인 워커가 한다)"""
         try:
-            current_time = datetime.now()
-            print(f"🔍 리마인드 체크 중... ({current_time.strftime('%H:%M:%S')})")
+            logger.debug("🔍 리마인드 체크 중")
+
+            reminders = pop_due_reminders()
 
-            reminder_message = check_reminders()
+            if reminders:
+                reminder_message = "\n".join(format_reminder(reminder) for reminder in reminders)
+                logger.info("⏰ 리마인드 발견", extra=fields(
+                    count=len(reminders), rooms=len({reminder.get("room") for reminder in reminders})))
 
-            if reminder_message:
-                print(f"⏰ 리마인드 발견: {reminder_message}")
+                # 구독 중인 클라이언트(response.js)에 바로 푸시
+                publish_reminders(reminders)
 
-                # 콜백 URL이 있으면 웹훅으로 전송
+                # 콜백 URL이 있으면 방별로 묶어 웹훅 전달 큐에 넣는다
                 if self.callback_url:
-                    self._send_webhook(reminder_message)
+                    self._get_delivery().submit(reminders)
 
                 # 로그에도 출력
                 self._log_reminder(reminder_message)
 
         except Exception as e:
-            print(f"❌ 리마인드 체크 중 오류: {e}")
-
-    def _send_webhook(self, message):
-        """웹훅으로 리마인드 전송"""
-        try:
-            payload = {
-                "type": "reminder",
-                "message": message,
-                "timestamp": datetime.now().isoformat()
-            }
-
-            response = requests.post(
-                self.callback_url,
-                json=payload,
-                timeout=5,
-                headers={'Content-Type': 'application/json'}
-            )
-
-            if response.status_code == 200:
-                print(f"✅ 웹훅 전송 성공")
-            else:
-                print(f"❌ 웹훅 전송 실패: {response.status_code}")
-
-        except requests.exceptions.RequestException as e:
-            print(f"❌ 웹훅 전송 오류: {e}")
+            logger.exception(f"❌ 리마인드 체크 중 오류: {e}")
+
+    def _get_delivery(self):
+        """callback_url로 보내는 전달 파이프라인 (URL이 바뀌면 새로 만든다)"""
+        with self._lock:
+            delivery = self.delivery
+            if delivery is not None and delivery.url == self.callback_url:
+                return delivery
+            current = self.delivery = ReminderDelivery(self.callback_url)
+        if delivery is not None:
+            delivery.stop()
+        return current
 
     def _log_reminder(self, message):
         """리마인드를 로그 파일에 기록"""
@@ -103,40 +339,146 @@ class ReminderScheduler:
                 timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
                 f.write(f"[{timestamp}] {message}\n")
         except Exception as e:
-            print(f"❌ 로그 기록 오류: {e}")
+            logger.warning(f"❌ 로그 기록 오류: {e}")
 
 
-# 전역 스케줄러 인스턴스
+# 전역 스케줄러 인스턴스 (프로세스마다 하나)
 reminder_scheduler = None
+_instance_lock = threading.Lock()
 
+# 미리 가져오기 담당 잠금 (프로세스마다 하나)
+prefetch_leader = PrefetchLeader()
 
-def start_reminder_scheduler(callback_url=None):
-    """리마인드 스케줄러 시작"""
+
+def get_scheduler():
+    """프로세스 공용 스케줄러 (없으면 생성)"""
     global reminder_scheduler
 
-    if reminder_scheduler is None:
-        reminder_scheduler = ReminderScheduler(callback_url)
+    with _instance_lock:
+        if reminder_scheduler is None:
+            reminder_scheduler = ReminderScheduler()
+        return reminder_scheduler
+
+
+def start_reminder_scheduler(callback_url=None):
+    """리마인드 스케줄러 시작"""
+    scheduler = get_scheduler()
+    if callback_url:
+        scheduler.callback_url = callback_url
 
-    reminder_scheduler.start()
-    return reminder_scheduler
+    scheduler.start()
+    return scheduler
 
 
 def stop_reminder_scheduler():
     """리마인드 스케줄러 정지"""
-    global reminder_scheduler
-
     if reminder_scheduler:
         reminder_scheduler.stop()
 
 
+def _prefetch_cau_meals():
+    from modules.cau_meal import prefetch_meals
+
+    failed = prefetch_meals()
+    if failed:
+        raise PrefetchFailed(f"중앙대 학식 {failed}건을 가져오지 못했다")
+
+
+def _prefetch_weather():
+    from modules.weather import prefetch_all_locations
+
+    failed = prefetch_all_locations()
+    if failed:
+        raise PrefetchFailed(f"날씨 {failed}개 지역을 가져오지 못했다")
+
+
+def _prefetch_postech_week():
+    from modules.postech_meal import prefetch_postech_week
+
+    prefetch_postech_week()
+
+
+def start_prefetch_jobs():
+    """학식/날씨 미리 가져오기 작업 등록 (등록 즉시 한 번씩 실행)
+
+    - postech_meal: 월요일 00:05 새 주 메뉴 + POSTECH_PREFETCH_MINUTES분마다 갱신
+    - cau_meal: CAU_PREFETCH_TIMES마다 두 캠퍼스 × 조식/중식/석식
+    - weather: 매시 HH:45 (관측값 발표 직후)
+
+    gunicorn에서는 워커가 fork된 뒤에 호출해야 한다 (세션 커넥션을 워커끼리 공유하지 않도록).
+    워커마다 부르지만 작업은 PREFETCH_LOCK_PATH 잠금을 잡은 워커 하나만 등록한다 (업스트림 호출이 워커 수만큼 늘지 않도록).
+    나머지 워커는 PREFETCH_LEADER_RETRY_SECONDS마다 잠금을 다시 잡아 보고, 잡으면 그때 작업을 등록한다.
+    """
+    scheduler = get_scheduler()
+    _run_as_leader("prefetch", "미리 가져오기", lambda: _add_prefetch_jobs(scheduler))
+    return scheduler
+
+
+def start_leader_reminder_scheduler(callback_url=None):
+    """리마인드 스케줄러를 잠금(PREFETCH_LOCK_PATH)을 잡은 워커 하나에서만 시작 (gunicorn 워커용)
+
+    미리 가져오기와 같은 잠금을 쓰므로 맡은 워커가 둘 다 돌리고, 그 워커가 재시작하면 다른 워커가 함께 이어받는다.
+    /api/scheduler/start로 다른 워커에서 더 시작해도 울릴 리마인드는 트랜잭션으로 꺼내므로 두 번 울리지 않는다.
+    """
+    scheduler = get_scheduler()
+    _run_as_leader("reminders", "리마인드 스케줄러", lambda: start_reminder_scheduler(callback_url))
+    return scheduler
+
+
+def _run_as_leader(name, label, start):
+    """잠금을 잡았으면 start()를 바로 부르고, 못 잡았으면 잡힐 때까지 PREFETCH_LEADER_RETRY_SECONDS마다 다시 본다"""
+    if prefetch_leader.acquire():
+        start()
+        return
+
+    logger.info(f"📦 다른 워커가 {label}을(를) 맡고 있다", extra=fields(lock=prefetch_leader.path))
+    scheduler = get_scheduler()
+
+    def standby():
+        if not prefetch_leader.acquire():
+            return None
+        logger.info(f"📦 {label}을(를) 이어받는다", extra=fields(lock=prefetch_leader.path))
+        # run_pending()이 스케줄러 락을 잡은 채로 부르므로 시작은 다른 스레드에서 한다
+        threading.Thread(target=start, name=f"{name}-takeover", daemon=True).start()
+        return schedule.CancelJob
+
+    tag = f"leader:{name}"
+    with scheduler._lock:
+        if scheduler.jobs.get_jobs(tag):
+            return
+        scheduler.jobs.every(PREFETCH_LEADER_RETRY_SECONDS).seconds.do(standby).tag(tag)
+    scheduler._ensure_thread()
+    reminder_queue.wake()
+
+
+def _add_prefetch_jobs(scheduler):
+    scheduler.add_prefetch_job("postech_meal", _prefetch_postech_week, [
+        lambda jobs: jobs.every().monday.at("00:05"),
+        lambda jobs: jobs.every(POSTECH_PREFETCH_MINUTES).minutes,
+    ])
+    scheduler.add_prefetch_job("cau_meal", _prefetch_cau_meals, [
+        (lambda jobs, at=at: jobs.every().day.at(at)) for at in CAU_PREFETCH_TIMES
+    ])
+    scheduler.add_prefetch_job("weather", _prefetch_weather, [
+        lambda jobs: jobs.every().hour.at(":45"),
+    ])
+    return scheduler
+
+
 def get_scheduler_status():
     """스케줄러 상태 확인"""
-    global reminder_scheduler
+    jobs = reminder_scheduler.job_status() if reminder_scheduler else []
+    delivery = reminder_scheduler.delivery if reminder_scheduler else None
+    delivery = delivery.status() if delivery else None
+    push = push_broker.status()
+    leader = prefetch_leader.held
 
     if reminder_scheduler and reminder_scheduler.is_running:
-        return {"status": "running", "message": "스케줄러가 실행 중이다"}
+        return {"status": "running", "message": "스케줄러가 실행 중이다", "jobs": jobs, "prefetch_leader": leader,
+                "delivery": delivery, "push": push}
     else:
-        return {"status": "stopped", "message": "스케줄러가 정지됐다"}
+        return {"status": "stopped", "message": "스케줄러가 정지됐다", "jobs": jobs, "prefetch_leader": leader,
+                "delivery": delivery, "push": push}
 
 
 # 직접 실행 시 테스트
@@ -0,0 +1,505 @@
+"""
+업스트림 응답 기록/재생 (중앙대 포털, 포항공대 메뉴 API, 기상청)
+
+개발/부하 테스트 때마다 실제 업스트림을 부르면 느리고 상대 서버에도 부담이 가고, 네트워크가 없으면 아예 못 한다.
+HTTP 세션(requests 어댑터)과 httpx transport 자리에 끼워서
+    UPSTREAM_MODE=record  실제로 부르고, 요청 지문과 응답을 디스크에 gzip으로 남긴다
+    UPSTREAM_MODE=replay  부르지 않고 남겨 둔 응답을 돌려준다 (없는 요청은 연결 실패)
+    UPSTREAM_MODE=live    (기본) 아무것도 끼우지 않는다
+를 고른다. 위쪽(브레이커, 지연 예산, 캐시, 파싱)은 모드와 상관없이 그대로 돈다.
+
+요청 지문: 업스트림 이름 + 메서드 + 기준 URL 뒤의 경로 + 정렬한 쿼리 (serviceKey 같은 키는 뺀다) + 본문(JSON 정렬).
+기준 URL을 빼므로 실제 서버에서 기록한 것을 가짜 서버 주소로 재생해도 맞는다.
+날짜가 바뀌면 같은 지문이 없으므로, 날짜(YYYYMMDD, YYYY-MM-DD, base_date/base_time)만 다른 기록을 대신 쓰고
+응답 본문의 날짜도 그 차이만큼 옮긴다 (지난주에 기록한 포항공대 메뉴가 이번 주 메뉴로 보이게).
+
+재생 옵션 (환경 변수):
+    UPSTREAM_SNAPSHOT_DIR=upstream_snapshots  기록 디렉토리 (업스트림별 하위 디렉토리, 응답 하나 = 파일 하나)
+    UPSTREAM_REPLAY_LATENCY=0                 응답마다 기다릴 시간(초), recorded면 기록할 때 걸린 시간
+    UPSTREAM_REPLAY_ERROR_RATE=0              이 비율만큼 일부러 실패시킨다 (0~1)
+    UPSTREAM_REPLAY_ERROR=connect             실패 종류: connect (연결 실패) / timeout (timeout만큼 기다린 뒤) / 500
+    UPSTREAM_REPLAY_SEED=                     실패를 고르는 난수 시드 (같은 시드면 같은 순서로 실패)
+
+기록 확인: python -m modules.snapshots list [디렉토리]
+"""
+
+import asyncio
+import base64
+import gzip
+import hashlib
+import json
+import os
+import random
+import re
+import sys
+import threading
+import time
+from datetime import datetime, timedelta
+from urllib.parse import parse_qsl, urlsplit
+
+import httpx
+import requests
+from dotenv import load_dotenv
+from requests.adapters import BaseAdapter
+from requests.structures import CaseInsensitiveDict
+
+from modules.logger import get_logger, fields
+
+load_dotenv()
+
+logger = get_logger("snapshots")
+
+LIVE = "live"
+RECORD = "record"
+REPLAY = "replay"
+MODES = (LIVE, RECORD, REPLAY)
+
+ERROR_KINDS = ("connect", "timeout", "500")
+
+# 지문에서 빼는 쿼리 파라미터 (인증 키는 기록하지 않는다)
+SECRET_PARAMS = {"servicekey", "apikey", "key"}
+# 날짜만 다른 기록을 찾을 때 무시하는 파라미터
+LOOSE_PARAMS = {"base_date", "base_time"}
+# 응답에서 그대로 남기는 헤더 (본문은 이미 풀어서 저장하므로 content-encoding 등은 버린다)
+KEPT_HEADERS = ("content-type",)
+
+_COMPACT_DATE = re.compile(r"(?<!\d)(20\d{2})(\d{2})(\d{2})(?!\d)")
+_DASHED_DATE = re.compile(r"(?<!\d)(20\d{2})-(\d{2})-(\d{2})(?!\d)")
+
+
+class SnapshotMiss(requests.ConnectionError):
+    """재생 모드인데 기록에 없는 요청"""
+
+
+# ---- 요청 지문 ----
+
+class RequestKey:
+    """요청 하나의 지문 (exact: 그대로, loose: 날짜를 지운 것, anchor: 요청에 있던 첫 날짜)"""
+
+    __slots__ = ("upstream", "method", "path", "exact", "loose", "anchor")
+
+    def __init__(self, upstream, method, path, exact, loose, anchor):
+        self.upstream = upstream
+        self.method = method
+        self.path = path
+        self.exact = exact
+        self.loose = loose
+        self.anchor = anchor
+
+    @property
+    def digest(self):
+        return hashlib.sha1(self.exact.encode("utf-8")).hexdigest()[:24]
+
+    def __repr__(self):
+        return f"RequestKey({self.upstream} {self.method} {self.path})"
+
+
+def _canonical_body(body):
+    if not body:
+        return ""
+    if isinstance(body, bytes):
+        body = body.decode("utf-8", errors="replace")
+    try:
+        return json.dumps(json.loads(body), ensure_ascii=False, sort_keys=True)
+    except ValueError:
+        return body
+
+
+def _mask_dates(text):
+    return _DASHED_DATE.sub("*", _COMPACT_DATE.sub("*", text))
+
+
+def _first_date(*texts):
+    """요청에 있는 첫 날짜 (YYYYMMDD로 맞춘다)"""
+    for text in texts:
+        match = _COMPACT_DATE.search(text) or _DASHED_DATE.search(text)
+        if match:
+            return "".join(match.groups())
+    return None
+
+
+def request_key(upstream, base_url, method, url, body=None):
+    """요청 → RequestKey (base_url 뒤의 경로만 쓴다)"""
+    parts = urlsplit(url)
+    base_path = urlsplit(base_url).path.rstrip("/")
+    path = parts.path[len(base_path):] if base_path and parts.path.startswith(base_path) else parts.path
+    params = sorted((name, value) for name, value in parse_qsl(parts.query, keep_blank_values=True)
+                    if name.lower() not in SECRET_PARAMS)
+    body = _canonical_body(body)
+    method = method.upper()
+
+    exact = json.dumps([upstream, method, path, params, body], ensure_ascii=False)
+    loose_params = [(name, "*" if name in LOOSE_PARAMS else _mask_dates(value)) for name, value in params]
+    loose = json.dumps([upstream, method, _mask_dates(path), loose_params, _mask_dates(body)], ensure_ascii=False)
+    anchor = _first_date(path, *(value for _, value in params), body)
+    return RequestKey(upstream, method, path, exact, loose, anchor)
+
+
+def shift_dates(text, days):
+    """본문 안의 날짜(YYYYMMDD, YYYY-MM-DD)를 days일 옮긴다 (날짜가 아닌 숫자는 그대로)"""
+    if not days:
+        return text
+
+    def shift(match, pattern):
+        try:
+            date = datetime(int(match.group(1)), int(match.group(2)), int(match.group(3)))
+        except ValueError:
+            return match.group(0)
+        return (date + timedelta(days=days)).strftime(pattern)
+
+    text = _COMPACT_DATE.sub(lambda m: shift(m, "%Y%m%d"), text)
+    return _DASHED_DATE.sub(lambda m: shift(m, "%Y-%m-%d"), text)
+
+
+def _days_between(recorded, requested):
+    if not recorded or not requested:
+        return 0
+    return (datetime.strptime(requested, "%Y%m%d") - datetime.strptime(recorded, "%Y%m%d")).days
+
+
+# ---- 저장소 ----
+
+class Snapshot:
+    """기록된 응답 하나"""
+
+    __slots__ = ("status", "headers", "content", "elapsed")
+
+    def __init__(self, status, headers, content, elapsed):
+        self.status = status
+        self.headers = headers
+        self.content = content
+        self.elapsed = elapsed
+
+
+class SnapshotStore:
+    """디렉토리/업스트림/<지문>.json.gz 파일들 (파일마다 os.replace로 써서 워커 여러 개가 같이 기록해도 안전)"""
+
+    def __init__(self, directory, mode=RECORD, latency=0.0, error_rate=0.0, error_kind="connect", seed=None):
+        if mode not in MODES:
+            raise ValueError(f"지원하지 않는 업스트림 모드다: {mode} (가능: {', '.join(MODES)})")
+        if error_kind not in ERROR_KINDS:
+            raise ValueError(f"지원하지 않는 재생 실패 종류다: {error_kind} (가능: {', '.join(ERROR_KINDS)})")
+        self.directory = directory
+        self.mode = mode
+        # None이면 기록할 때 걸린 시간만큼 기다린다
+        self.latency = latency
+        self.error_rate = error_rate
+        self.error_kind = error_kind
+        self._random = random.Random(seed)
+
+        self._lock = threading.Lock()
+        self._exact = None
+        self._loose = None
+        self._missed = set()
+
+        self.recorded = 0
+        self.replayed = 0
+        self.misses = 0
+        self.injected = 0
+
+    # ---- 읽기 ----
+
+    def _ensure_loaded(self):
+        if self._exact is not None:
+            return
+        with self._lock:
+            if self._exact is not None:
+                return
+            exact, loose = {}, {}
+            for record in iter_records(self.directory):
+                exact[record["key"]] = record
+                # 날짜만 다른 기록이 여럿이면 가장 최근 것
+                current = loose.get(record["loose"])
+                if current is None or current["recorded_at"] < record["recorded_at"]:
+                    loose[record["loose"]] = record
+            self._exact, self._loose = exact, loose
+            logger.info("🎞️ 업스트림 기록 읽음", extra=fields(directory=self.directory, records=len(exact)))
+
+    def lookup(self, key):
+        """RequestKey → Snapshot (없으면 None)"""
+        self._ensure_loaded()
+        record = self._exact.get(key.exact)
+        days = 0
+        if record is None:
+            record = self._loose.get(key.loose)
+            if record is None:
+                self.misses += 1
+                if key.exact not in self._missed:
+                    self._missed.add(key.exact)
+                    logger.warning("🎞️ 기록에 없는 업스트림 요청", extra=fields(
+                        upstream=key.upstream, method=key.method, path=key.path))
+                return None
+            days = _days_between(record.get("anchor"), key.anchor)
+
+        self.replayed += 1
+        if "text" in record:
+            content = shift_dates(record["text"], days).encode("utf-8")
+        else:
+            content = base64.b64decode(record["b64"])
+        return Snapshot(record["status"], record["headers"], content, record.get("elapsed", 0.0))
+
+    # ---- 쓰기 ----
+
+    def save(self, key, status, headers, content, elapsed):
+        """응답 하나 기록 (같은 지문은 덮어쓴다)"""
+        record = {
+            "upstream": key.upstream,
+            "method": key.method,
+            "path": key.path,
+            "key": key.exact,
+            "loose": key.loose,
+            "anchor": key.anchor,
+            "status": status,
+            "headers": {name: headers[name] for name in KEPT_HEADERS if name in headers},
+            "elapsed": round(elapsed, 4),
+            "recorded_at": datetime.now().isoformat(timespec="seconds"),
+        }
+        try:
+            record["text"] = content.decode("utf-8")
+        except UnicodeDecodeError:
+            record["b64"] = base64.b64encode(content).decode("ascii")
+
+        directory = os.path.join(self.directory, key.upstream)
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, f"{key.digest}.json.gz")
+        tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with gzip.open(tmp, "wt", encoding="utf-8") as f:
+            json.dump(record, f, ensure_ascii=False)
+        os.replace(tmp, path)
+
+        with self._lock:
+            self.recorded += 1
+            if self._exact is not None:
+                self._exact[key.exact] = record
+                self._loose[key.loose] = record
+
+    # ---- 재생 시 지연/실패 ----
+
+    def plan(self, snapshot):
+        """(기다릴 초, 실패 종류 또는 None)"""
+        delay = snapshot.elapsed if self.latency is None else self.latency
+        if self.error_rate and self._random.random() < self.error_rate:
+            self.injected += 1
+            return delay, self.error_kind
+        return delay, None
+
+    def status(self):
+        return {
+            "mode": self.mode,
+            "directory": self.directory,
+            "recorded": self.recorded,
+            "replayed": self.replayed,
+            "misses": self.misses,
+            "injected_errors": self.injected,
+        }
+
+
+def iter_records(directory):
+    """디렉토리 아래 기록 모두 (깨진 파일은 건너뛴다)"""
+    if not os.path.isdir(directory):
+        return
+    for upstream in sorted(os.listdir(directory)):
+        sub = os.path.join(directory, upstream)
+        if not os.path.isdir(sub):
+            continue
+        for name in sorted(os.listdir(sub)):
+            if not name.endswith(".json.gz"):
+                continue
+            try:
+                with gzip.open(os.path.join(sub, name), "rt", encoding="utf-8") as f:
+                    yield json.load(f)
+            except (OSError, ValueError) as e:
+                logger.warning("🎞️ 깨진 업스트림 기록", extra=fields(file=name, error=str(e)))
+
+
+def _timeout_seconds(timeout):
+    """requests timeout (숫자 / (connect, read) / None) → 읽기 timeout 초"""
+    if isinstance(timeout, tuple):
+        timeout = timeout[-1]
+    return timeout
+
+
+# ---- requests 어댑터 ----
+
+class SnapshotAdapter(BaseAdapter):
+    """세션에 끼우는 어댑터: record면 원래 어댑터로 보내고 기록, replay면 기록으로 응답"""
+
+    def __init__(self, upstream, base_url, inner):
+        super().__init__()
+        self.upstream = upstream
+        self.base_url = base_url
+        self.inner = inner
+
+    def send(self, request, stream=False, timeout=None, verify=True, cert=None, proxies=None):
+        store = get_snapshot_store()
+        key = request_key(self.upstream, self.base_url, request.method, request.url, request.body)
+
+        if store.mode == REPLAY:
+            snapshot = store.lookup(key)
+            if snapshot is None:
+                raise SnapshotMiss(f"기록에 없는 요청이다: {key.method} {key.path}", request=request)
+            delay, error = store.plan(snapshot)
+            timeout = _timeout_seconds(timeout)
+            if error == "timeout" or (timeout is not None and delay > timeout):
+                time.sleep(timeout or 0)
+                raise requests.exceptions.ReadTimeout(f"재생 timeout ({timeout}초)", request=request)
+            if delay:
+                time.sleep(delay)
+            if error == "connect":
+                raise requests.ConnectionError("재생 중 일부러 낸 연결 실패", request=request)
+            if error == "500":
+                return self._build_response(request, Snapshot(500, {}, b"", 0.0))
+            return self._build_response(request, snapshot)
+
+        start = time.perf_counter()
+        response = self.inner.send(request, stream=stream, timeout=timeout, verify=verify, cert=cert, proxies=proxies)
+        if store.mode == RECORD:
+            store.save(key, response.status_code, response.headers, response.content, time.perf_counter() - start)
+        return response
+
+    @staticmethod
+    def _build_response(request, snapshot):
+        response = requests.Response()
+        response.status_code = snapshot.status
+        response.headers = CaseInsensitiveDict(snapshot.headers)
+        response._content = snapshot.content
+        response.encoding = requests.utils.get_encoding_from_headers(response.headers)
+        response.url = request.url
+        response.request = request
+        response.reason = "Replayed"
+        return response
+
+    def close(self):
+        self.inner.close()
+
+
+# ---- httpx transport ----
+
+class SnapshotTransport(httpx.AsyncBaseTransport):
+    """httpx.AsyncClient에 끼우는 transport (SnapshotAdapter와 같은 동작)"""
+
+    def __init__(self, upstream, base_url, inner):
+        self.upstream = upstream
+        self.base_url = base_url
+        self.inner = inner
+
+    async def handle_async_request(self, request):
+        store = get_snapshot_store()
+        body = await request.aread()
+        key = request_key(self.upstream, self.base_url, request.method, str(request.url), body)
+
+        if store.mode == REPLAY:
+            snapshot = store.lookup(key)
+            if snapshot is None:
+                raise httpx.ConnectError(f"기록에 없는 요청이다: {key.method} {key.path}", request=request)
+            delay, error = store.plan(snapshot)
+            timeout = request.extensions.get("timeout", {}).get("read")
+            if error == "timeout" or (timeout is not None and delay > timeout):
+                await asyncio.sleep(timeout or 0)
+                raise httpx.ReadTimeout(f"재생 timeout ({timeout}초)", request=request)
+            if delay:
+                await asyncio.sleep(delay)
+            if error == "connect":
+                raise httpx.ConnectError("재생 중 일부러 낸 연결 실패", request=request)
+            if error == "500":
+                return httpx.Response(500, content=b"", request=request)
+            return httpx.Response(snapshot.status, headers=snapshot.headers, content=snapshot.content, request=request)
+
+        start = time.perf_counter()
+        response = await self.inner.handle_async_request(request)
+        content = await response.aread()
+        headers = {name: response.headers[name] for name in KEPT_HEADERS if name in response.headers}
+        if store.mode == RECORD:
+            store.save(key, response.status_code, headers, content, time.perf_counter() - start)
+        # 본문은 이미 풀었으므로 content-encoding 없이 새로 만든다
+        return httpx.Response(response.status_code, headers=headers, content=content, request=request,
+                              extensions=response.extensions)
+
+    async def aclose(self):
+        await self.inner.aclose()
+
+
+# ---- 모드 선택 ----
+
+def upstream_mode():
+    mode = os.getenv('UPSTREAM_MODE', LIVE).lower()
+    if mode not in MODES:
+        raise ValueError(f"지원하지 않는 업스트림 모드다: {mode} (가능: {', '.join(MODES)})")
+    return mode
+
+
+def snapshots_enabled():
+    return upstream_mode() != LIVE
+
+
+def create_snapshot_store(mode=None):
+    """환경 변수로 기록/재생 저장소 생성"""
+    latency = os.getenv('UPSTREAM_REPLAY_LATENCY', '0')
+    return SnapshotStore(
+        os.getenv('UPSTREAM_SNAPSHOT_DIR', 'upstream_snapshots'),
+        mode or upstream_mode(),
+        latency=None if latency == "recorded" else float(latency),
+        error_rate=float(os.getenv('UPSTREAM_REPLAY_ERROR_RATE', '0')),
+        error_kind=os.getenv('UPSTREAM_REPLAY_ERROR', 'connect'),
+        seed=os.getenv('UPSTREAM_REPLAY_SEED') or None,
+    )
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_snapshot_store():
+    """프로세스 전체에서 공유하는 기록/재생 저장소"""
+    global _store
+
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = create_snapshot_store()
+    return _store
+
+
+def set_snapshot_store(store):
+    """저장소 바꾸기 (테스트에서 기록 → 재생으로 넘어갈 때), 이전 저장소 반환"""
+    global _store
+
+    with _store_lock:
+        previous, _store = _store, store
+    return previous
+
+
+def snapshot_session(session, upstream, base_url):
+    """UPSTREAM_MODE가 live가 아니면 세션의 어댑터들을 기록/재생 어댑터로 감싼다"""
+    if snapshots_enabled():
+        for prefix, adapter in list(session.adapters.items()):
+            session.mount(prefix, SnapshotAdapter(upstream, base_url, adapter))
+        logger.info("🎞️ 업스트림 기록/재생", extra=fields(upstream=upstream, mode=upstream_mode()))
+    return session
+
+
+def snapshot_transport(upstream, base_url, **transport_kwargs):
+    """httpx용 기록/재생 transport (transport_kwargs는 실제 AsyncHTTPTransport 설정: verify, limits ...)"""
+    return SnapshotTransport(upstream, base_url, httpx.AsyncHTTPTransport(**transport_kwargs))
+
+
+def _print_records(directory):
+    counts = {}
+    for record in iter_records(directory):
+        upstream = counts.setdefault(record["upstream"], {"records": 0, "bytes": 0, "statuses": {}})
+        upstream["records"] += 1
+        upstream["bytes"] += len(record.get("text") or record.get("b64") or "")
+        upstream["statuses"][record["status"]] = upstream["statuses"].get(record["status"], 0) + 1
+    if not counts:
+        print(f"기록이 없다: {directory}")
+        return
+    for name, info in sorted(counts.items()):
+        statuses = ", ".join(f"{status}: {count}" for status, count in sorted(info["statuses"].items()))
+        print(f"{name:10} 응답 {info['records']}개 (본문 {info['bytes'] / 1024:.1f}KB, {statuses})")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) >= 2 and sys.argv[1] == "list":
+        _print_records(sys.argv[2] if len(sys.argv) >= 3 else os.getenv('UPSTREAM_SNAPSHOT_DIR', 'upstream_snapshots'))
+    else:
+        print("사용법: python -m modules.snapshots list [디렉토리]")
@@ -0,0 +1,421 @@
+"""
+메모/리마인드 저장소 백엔드
+
+memory.py는 백엔드가 무엇이든 같은 인터페이스만 사용한다.
+    storage.room_memories      - 방별 메모 (키: 방)
+    storage.personal_memories  - 개인 메모 (키: 보낸 사람)
+    storage.reminders          - 리마인드 큐
+SQLite 파일에는 방별 봇 상태(bot_state.py의 room_state / room_counters),
+레이트 리밋 버킷(rate_limit.py의 rate_buckets), 리마인드 푸시 이벤트(push.py의 push_events)도 같이 둔다.
+
+백엔드 선택 (환경 변수):
+    STORAGE_BACKEND=sqlite (기본) - SQLite(WAL) 파일 하나, 여러 gunicorn 워커가 동시에 써도 안전
+    STORAGE_BACKEND=json          - rem.json / mem.json / reminders.json (+ 저널) 방식
+    STORAGE_SQLITE_PATH=khh.db    - SQLite 파일 경로
+
+SQLite 백엔드는 처음 열릴 때 기존 JSON 파일이 있으면 한 번만 가져온다.
+직접 실행도 가능하다: python -m modules.storage migrate [JSON 디렉토리]
+"""
+
+import json
+import os
+import sqlite3
+import sys
+import threading
+import time
+import uuid
+from datetime import datetime
+
+from dotenv import load_dotenv
+
+from modules.green import os_thread_local
+from modules.logger import get_logger, fields
+from modules.memory_store import MemoryStore
+from modules.reminder_queue import LATE_LIMIT_SECONDS, ReminderQueue, upgrade_legacy_reminders
+
+load_dotenv()
+
+logger = get_logger("storage")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS room_memories (
+    room TEXT PRIMARY KEY,
+    content TEXT NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS personal_memories (
+    sender TEXT PRIMARY KEY,
+    content TEXT NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS reminders (
+    id TEXT PRIMARY KEY,
+    fire_time REAL NOT NULL,
+    room TEXT,
+    sender TEXT,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_reminders_fire_time ON reminders (fire_time);
+CREATE INDEX IF NOT EXISTS idx_reminders_room ON reminders (room);
+CREATE INDEX IF NOT EXISTS idx_reminders_sender ON reminders (sender);
+CREATE TABLE IF NOT EXISTS room_state (
+    room TEXT PRIMARY KEY,
+    silent_until REAL,
+    touched_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS room_counters (
+    room TEXT NOT NULL,
+    counter TEXT NOT NULL,
+    sender TEXT NOT NULL,
+    value INTEGER NOT NULL,
+    touched_at REAL NOT NULL,
+    PRIMARY KEY (room, counter, sender)
+);
+CREATE INDEX IF NOT EXISTS idx_room_counters_touched ON room_counters (touched_at);
+CREATE TABLE IF NOT EXISTS rate_buckets (
+    key TEXT PRIMARY KEY,
+    full_at REAL NOT NULL
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS push_events (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    room TEXT NOT NULL,
+    published_at REAL NOT NULL,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_push_events_room ON push_events (room, id);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+_MISSING = object()
+
+
+# ---- JSON 백엔드 (예전 방식) ----
+
+class JsonBackend:
+    """rem.json / mem.json / reminders.json 기반 백엔드"""
+
+    name = "json"
+
+    def __init__(self, directory="."):
+        self.room_memories = MemoryStore(os.path.join(directory, "rem.json"))
+        self.personal_memories = MemoryStore(os.path.join(directory, "mem.json"))
+        self.reminders = ReminderQueue(os.path.join(directory, "reminders.json"))
+
+    def close(self):
+        self.room_memories.close()
+        self.personal_memories.close()
+        self.reminders.close()
+
+
+# ---- SQLite 백엔드 ----
+
+class SqliteBackend:
+    """SQLite(WAL) 기반 백엔드
+
+    연결은 프로세스/스레드마다 하나씩 만든다 (gunicorn fork 이후에도 안전).
+    gevent 워커에서는 그린렛(요청)마다가 아니라 OS 스레드마다 하나다 (green.py).
+    SQL 문은 모두 고정 문자열 + 파라미터라서 sqlite3 모듈의 문장 캐시에
+    준비된(prepared) 상태로 재사용된다.
+    """
+
+    name = "sqlite"
+
+    def __init__(self, path=None, import_json_from="."):
+        self.path = path or os.getenv('STORAGE_SQLITE_PATH', 'khh.db')
+        self.import_json_from = import_json_from
+        self._local = os_thread_local()
+        self._init_lock = threading.Lock()
+        self._initialized_pid = None
+
+        self.room_memories = SqliteKeyValue(self, "room_memories", "room")
+        self.personal_memories = SqliteKeyValue(self, "personal_memories", "sender")
+        self.reminders = SqliteReminderQueue(self)
+
+    def connection(self):
+        """현재 프로세스/스레드용 연결"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None and self._local.pid == os.getpid():
+            return conn
+
+        conn = sqlite3.connect(os.path.abspath(self.path), timeout=30,
+                               isolation_level=None, check_same_thread=False,
+                               cached_statements=256)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("PRAGMA busy_timeout=30000")
+        self._local.conn = conn
+        self._local.pid = os.getpid()
+
+        self._ensure_schema(conn)
+        return conn
+
+    def _ensure_schema(self, conn):
+        """테이블 생성 + 기존 JSON 한 번 가져오기 (프로세스마다 한 번)"""
+        if self._initialized_pid == os.getpid():
+            return
+
+        with self._init_lock:
+            if self._initialized_pid == os.getpid():
+                return
+            conn.executescript(SCHEMA)
+            if self.import_json_from is not None:
+                migrate_json_to_sqlite(self, self.import_json_from, conn=conn)
+            self._initialized_pid = os.getpid()
+
+    def transaction(self):
+        """쓰기 트랜잭션 (BEGIN IMMEDIATE로 시작해 워커 간 쓰기를 직렬화)"""
+        return _Transaction(self.connection())
+
+    def close(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+
+class _Transaction:
+    def __init__(self, conn):
+        self.conn = conn
+
+    def __enter__(self):
+        self.conn.execute("BEGIN IMMEDIATE")
+        return self.conn
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.conn.execute("COMMIT")
+        else:
+            self.conn.execute("ROLLBACK")
+
+
+class SqliteKeyValue:
+    """MemoryStore와 같은 인터페이스의 SQLite 키-값 테이블"""
+
+    def __init__(self, backend, table, key_column):
+        self.backend = backend
+        self._select = f"SELECT content FROM {table} WHERE {key_column} = ?"
+        self._select_all = f"SELECT {key_column}, content FROM {table} ORDER BY rowid"
+        self._count = f"SELECT COUNT(*) FROM {table}"
+        self._upsert = (
+            f"INSERT INTO {table} ({key_column}, content, updated_at) VALUES (?, ?, ?) "
+            f"ON CONFLICT ({key_column}) DO UPDATE SET content = excluded.content, "
+            f"updated_at = excluded.updated_at"
+        )
+        self._delete = f"DELETE FROM {table} WHERE {key_column} = ?"
+
+    def get(self, key, default=None):
+        row = self.backend.connection().execute(self._select, (key,)).fetchone()
+        return row[0] if row else default
+
+    def __contains__(self, key):
+        return self.get(key, _MISSING) is not _MISSING
+
+    def __len__(self):
+        return self.backend.connection().execute(self._count).fetchone()[0]
+
+    def snapshot(self):
+        return dict(self.backend.connection().execute(self._select_all).fetchall())
+
+    def set(self, key, value):
+        self.backend.connection().execute(self._upsert, (key, value, time.time()))
+
+    def pop(self, key, default=None):
+        with self.backend.transaction() as conn:
+            row = conn.execute(self._select, (key,)).fetchone()
+            if row is None:
+                return default
+            conn.execute(self._delete, (key,))
+            return row[0]
+
+    def delete(self, key):
+        return self.backend.connection().execute(self._delete, (key,)).rowcount > 0
+
+    def close(self):
+        pass
+
+
+class SqliteReminderQueue:
+    """ReminderQueue와 같은 인터페이스의 SQLite 리마인드 큐 (fire_time 인덱스 사용)"""
+
+    SELECT_DUE = "SELECT id, fire_time, data FROM reminders WHERE fire_time <= ? ORDER BY fire_time, rowid"
+    DELETE_DUE = "DELETE FROM reminders WHERE fire_time <= ?"
+    SELECT_NEXT = "SELECT MIN(fire_time) FROM reminders"
+    SELECT_ROOM = "SELECT data FROM reminders WHERE room = ? ORDER BY rowid"
+    SELECT_ALL = "SELECT data FROM reminders ORDER BY rowid"
+    COUNT = "SELECT COUNT(*) FROM reminders"
+    INSERT = "INSERT OR IGNORE INTO reminders (id, fire_time, room, sender, data) VALUES (?, ?, ?, ?, ?)"
+
+    def __init__(self, backend):
+        self.backend = backend
+        self._changed = threading.Condition()
+        self.version = 0
+
+    def add(self, reminder, key=None):
+        key = key or uuid.uuid4().hex
+        self.backend.connection().execute(self.INSERT, _reminder_row(key, reminder))
+        with self._changed:
+            self.version += 1
+            self._changed.notify_all()
+        return key
+
+    def due(self, now=None):
+        """실행 시각이 된 리마인드를 꺼내 실행 시각 순으로 반환 (한 트랜잭션에서 조회 + 삭제)"""
+        now_ts = (now or datetime.now()).timestamp()
+        with self.backend.transaction() as conn:
+            rows = conn.execute(self.SELECT_DUE, (now_ts,)).fetchall()
+            if rows:
+                conn.execute(self.DELETE_DUE, (now_ts,))
+
+        return [json.loads(data) for _, fire_ts, data in rows
+                if now_ts - fire_ts <= LATE_LIMIT_SECONDS]
+
+    def next_fire_time(self):
+        return self.backend.connection().execute(self.SELECT_NEXT).fetchone()[0]
+
+    def seconds_until_next(self):
+        next_ts = self.next_fire_time()
+        if next_ts is None:
+            return None
+        return max(0.0, next_ts - time.time())
+
+    def wait(self, timeout=None, version=None):
+        with self._changed:
+            if version is not None and version != self.version:
+                return
+            self._changed.wait(timeout)
+
+    def wake(self):
+        with self._changed:
+            self._changed.notify_all()
+
+    def for_room(self, room):
+        rows = self.backend.connection().execute(self.SELECT_ROOM, (room,)).fetchall()
+        return [json.loads(data) for (data,) in rows]
+
+    def all(self):
+        rows = self.backend.connection().execute(self.SELECT_ALL).fetchall()
+        return [json.loads(data) for (data,) in rows]
+
+    def __len__(self):
+        return self.backend.connection().execute(self.COUNT).fetchone()[0]
+
+    def close(self):
+        pass
+
+
+def _reminder_row(key, reminder):
+    fire_ts = datetime.fromisoformat(reminder["datetime"]).timestamp()
+    return (key, fire_ts, reminder.get("room"), reminder.get("sender"),
+            json.dumps(reminder, ensure_ascii=False))
+
+
+# ---- JSON → SQLite 마이그레이션 ----
+
+def migrate_json_to_sqlite(backend, directory=".", conn=None, force=False):
+    """rem.json / mem.json / reminders.json을 SQLite로 한 번만 가져오기
+
+    이미 가져왔으면(meta에 기록) 아무것도 하지 않는다. 반환값: 가져온 개수 dict
+    """
+    conn = conn or backend.connection()
+
+    row = conn.execute("SELECT value FROM meta WHERE key = 'json_migrated_at'").fetchone()
+    if row and not force:
+        return None
+
+    paths = {name: os.path.join(directory, name)
+             for name in ("rem.json", "mem.json", "reminders.json")}
+    counts = {"room_memories": 0, "personal_memories": 0, "reminders": 0}
+
+    now = time.time()
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        # 트랜잭션 안에서 다시 확인 (다른 워커가 먼저 가져왔을 수 있다)
+        row = conn.execute("SELECT value FROM meta WHERE key = 'json_migrated_at'").fetchone()
+        if row and not force:
+            conn.execute("ROLLBACK")
+            return None
+
+        if _exists(paths["rem.json"]):
+            for room, content in _read_json_store(paths["rem.json"]).items():
+                conn.execute("INSERT OR IGNORE INTO room_memories (room, content, updated_at) "
+                             "VALUES (?, ?, ?)", (room, content, now))
+                counts["room_memories"] += 1
+
+        if _exists(paths["mem.json"]):
+            for sender, content in _read_json_store(paths["mem.json"]).items():
+                conn.execute("INSERT OR IGNORE INTO personal_memories (sender, content, updated_at) "
+                             "VALUES (?, ?, ?)", (sender, content, now))
+                counts["personal_memories"] += 1
+
+        if _exists(paths["reminders.json"]):
+            reminders = _read_json_store(paths["reminders.json"], upgrade=upgrade_legacy_reminders)
+            for key, reminder in reminders.items():
+                conn.execute(SqliteReminderQueue.INSERT, _reminder_row(key, reminder))
+                counts["reminders"] += 1
+
+        conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('json_migrated_at', ?)",
+                     (datetime.now().isoformat(),))
+        conn.execute("COMMIT")
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+
+    if any(counts.values()):
+        logger.info("📦 JSON → SQLite 마이그레이션 완료", extra=fields(**counts))
+    return counts
+
+
+def _read_json_store(path, upgrade=None):
+    """저널까지 반영된 JSON 저장소 내용 읽기"""
+    store = MemoryStore(path, upgrade=upgrade)
+    try:
+        return store.snapshot()
+    finally:
+        store.close()
+
+
+def _exists(path):
+    return os.path.isfile(path) or os.path.isfile(path + ".journal")
+
+
+# ---- 백엔드 선택 ----
+
+_storage = None
+_storage_lock = threading.Lock()
+
+
+def create_storage(backend=None):
+    """환경 변수(STORAGE_BACKEND) 또는 인자로 백엔드 생성"""
+    backend = (backend or os.getenv('STORAGE_BACKEND', 'sqlite')).lower()
+    if backend == "sqlite":
+        return SqliteBackend()
+    if backend == "json":
+        return JsonBackend()
+    raise ValueError(f"지원하지 않는 저장소 백엔드다: {backend} (가능: sqlite, json)")
+
+
+def get_storage():
+    """프로세스 전체에서 공유하는 저장소 백엔드"""
+    global _storage
+
+    if _storage is None:
+        with _storage_lock:
+            if _storage is None:
+                _storage = create_storage()
+    return _storage
+
+
+if __name__ == "__main__":
+    if len(sys.argv) >= 2 and sys.argv[1] == "migrate":
+        source = sys.argv[2] if len(sys.argv) >= 3 else "."
+        target = SqliteBackend(import_json_from=None)
+        result = migrate_json_to_sqlite(target, source, force="--force" in sys.argv)
+        if result is None:
+            print("이미 마이그레이션했다 (다시 하려면 --force)")
+        else:
+            print(f"✅ {target.path}로 가져왔다: {result}")
+    else:
+        print("사용법: python -m modules.storage migrate [JSON 디렉토리] [--force]")
@@ -0,0 +1,374 @@
+"""
+업스트림 호출 공통 계층 (기상청, 중앙대 포털, 포항공대 메뉴 API)
+
+각 모듈은 자기 세션/클라이언트로 요청을 보내되, 호출은 Upstream.call(요청 함수)로 감싼다.
+- 서킷 브레이커: 호스트별로 연속 실패가 쌓이면 열려서 한동안 호출하지 않고 바로 UpstreamUnavailable
+  (열린 동안 각 모듈은 마지막으로 성공한 캐시 값으로 응답한다). 시간이 지나면 시험 호출 하나로 확인
+- 지연 예산: latency_budget() 안에서는 남은 예산만큼만 timeout을 준다 (채팅 요청 하나가 업스트림을 기다리는 총시간 제한)
+- 헤지 요청 (선택): 응답이 최근 p95보다 늦으면 같은 요청을 하나 더 보내고 먼저 온 성공 응답을 쓴다
+
+환경 변수:
+    UPSTREAM_BUDGET_SECONDS=5          채팅 요청 하나의 업스트림 지연 예산(초)
+    UPSTREAM_BREAKER_FAILURES=5        브레이커가 열리는 연속 실패 수
+    UPSTREAM_BREAKER_RESET_SECONDS=30  열린 뒤 시험 호출까지 기다리는 시간(초)
+    UPSTREAM_HEDGE=kma,postech         헤지 요청을 쓸 업스트림 (기본: 없음)
+"""
+
+import asyncio
+import contextvars
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from contextlib import contextmanager
+
+from dotenv import load_dotenv
+
+from modules.logger import get_logger, fields
+from modules.metrics import UPSTREAM_HEDGES, UPSTREAM_REJECTED, track_upstream
+
+load_dotenv()
+
+logger = get_logger("upstream")
+
+BUDGET_SECONDS = float(os.getenv('UPSTREAM_BUDGET_SECONDS', '5'))
+BREAKER_FAILURES = int(os.getenv('UPSTREAM_BREAKER_FAILURES', '5'))
+BREAKER_RESET_SECONDS = float(os.getenv('UPSTREAM_BREAKER_RESET_SECONDS', '30'))
+HEDGED_UPSTREAMS = {name.strip() for name in os.getenv('UPSTREAM_HEDGE', '').split(',') if name.strip()}
+
+# 예산 때문에 이보다 짧아진 timeout으로 실패한 호출은 브레이커 실패로 세지 않는다 (업스트림 탓이 아니므로)
+MIN_COUNTED_TIMEOUT = 1.0
+
+# 헤지: p95를 믿을 수 있을 만큼 성공 기록이 쌓인 뒤에만, 최소 이만큼은 기다린 뒤 보낸다
+HEDGE_MIN_SAMPLES = 20
+HEDGE_MIN_DELAY = 0.05
+HEDGE_WORKERS = 16
+
+CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+# 이름 → Upstream (상태 조회용)
+_upstreams = {}
+_upstreams_lock = threading.Lock()
+
+# 현재 요청의 업스트림 마감 시각 (time.monotonic 기준, None이면 예산 없음)
+_deadline = contextvars.ContextVar("upstream_deadline", default=None)
+
+_hedge_executor = None
+_hedge_executor_lock = threading.Lock()
+
+
+class UpstreamUnavailable(Exception):
+    """브레이커가 열려 있거나 지연 예산을 다 써서 업스트림을 부르지 않음"""
+
+
+class CircuitBreaker:
+    """연속 실패 수 기반 서킷 브레이커 (closed → open → half_open → closed)"""
+
+    def __init__(self, failure_threshold=BREAKER_FAILURES, reset_timeout=BREAKER_RESET_SECONDS):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = CLOSED
+        self.failures = 0
+        self.opened_at = None
+        self.last_error = None
+        self._trial_running = False
+        self._lock = threading.Lock()
+
+    def allow(self):
+        """지금 호출해도 되는지 (half_open에서는 시험 호출 하나만 허용)"""
+        with self._lock:
+            if self.state == CLOSED:
+                return True
+            if self.state == OPEN:
+                if time.monotonic() - self.opened_at < self.reset_timeout:
+                    return False
+                self.state = HALF_OPEN
+                self._trial_running = False
+            if self._trial_running:
+                return False
+            self._trial_running = True
+            return True
+
+    def record_success(self):
+        """성공 기록, 이번 성공으로 브레이커가 닫혔으면 True"""
+        with self._lock:
+            reopened = self.state != CLOSED
+            self.state = CLOSED
+            self.failures = 0
+            self._trial_running = False
+            return reopened
+
+    def record_failure(self, error):
+        """실패 기록, 이번 실패로 브레이커가 열렸으면 True"""
+        with self._lock:
+            self.failures += 1
+            self.last_error = f"{type(error).__name__}: {error}"
+            self._trial_running = False
+            if self.state == HALF_OPEN or (self.state == CLOSED and self.failures >= self.failure_threshold):
+                self.state = OPEN
+                self.opened_at = time.monotonic()
+                return True
+            return False
+
+    def release_trial(self):
+        """시험 호출이 결과 없이 끝남 (예산 부족 등) → 다음 호출이 다시 시험하게 한다"""
+        with self._lock:
+            self._trial_running = False
+
+    def status(self):
+        with self._lock:
+            retry_in = None
+            if self.state == OPEN:
+                retry_in = round(max(0.0, self.opened_at + self.reset_timeout - time.monotonic()), 1)
+            return {
+                "state": self.state,
+                "consecutive_failures": self.failures,
+                "retry_in": retry_in,
+                "last_error": self.last_error,
+            }
+
+
+class LatencyTracker:
+    """최근 성공 호출 지연 시간으로 p95 계산 (헤지 시점용)"""
+
+    def __init__(self, size=256):
+        self._samples = deque(maxlen=size)
+        self._p95 = None
+        self._since_update = 0
+        self._lock = threading.Lock()
+
+    def observe(self, seconds):
+        with self._lock:
+            self._samples.append(seconds)
+            self._since_update += 1
+            # 정렬은 16번에 한 번만
+            if self._p95 is None or self._since_update >= 16:
+                ordered = sorted(self._samples)
+                self._p95 = ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))]
+                self._since_update = 0
+
+    def p95(self):
+        with self._lock:
+            if len(self._samples) < HEDGE_MIN_SAMPLES:
+                return None
+            return self._p95
+
+    def __len__(self):
+        with self._lock:
+            return len(self._samples)
+
+
+def _is_upstream_failure(error):
+    """브레이커 실패로 셀 예외인지 (4xx 응답은 요청 쪽 문제라 세지 않는다)"""
+    response = getattr(error, "response", None)
+    status_code = getattr(response, "status_code", None)
+    return status_code is None or status_code >= 500
+
+
+def _is_timeout(error):
+    return isinstance(error, TimeoutError) or "Timeout" in type(error).__name__
+
+
+@contextmanager
+def latency_budget(seconds=None):
+    """이 블록 안의 업스트림 호출들이 합쳐서 seconds초 안에 끝나도록 timeout을 줄인다 (중첩 시 더 빠른 마감)"""
+    seconds = BUDGET_SECONDS if seconds is None else seconds
+    deadline = time.monotonic() + seconds
+    current = _deadline.get()
+    token = _deadline.set(deadline if current is None else min(current, deadline))
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+
+def remaining_budget():
+    """남은 지연 예산(초), 예산이 없으면 None"""
+    deadline = _deadline.get()
+    if deadline is None:
+        return None
+    return deadline - time.monotonic()
+
+
+def _get_hedge_executor():
+    global _hedge_executor
+    if _hedge_executor is None:
+        with _hedge_executor_lock:
+            if _hedge_executor is None:
+                _hedge_executor = ThreadPoolExecutor(max_workers=HEDGE_WORKERS, thread_name_prefix="hedge")
+    return _hedge_executor
+
+
+class Upstream:
+    """업스트림 하나 (브레이커 + 지연 기록 + 헤지 설정)"""
+
+    def __init__(self, name, host, timeout, hedge=None):
+        self.name = name
+        self.host = host
+        self.timeout = timeout
+        self.hedge = name in HEDGED_UPSTREAMS if hedge is None else hedge
+        self.breaker = CircuitBreaker()
+        self.latency = LatencyTracker()
+
+        self.calls = 0
+        self.rejected = 0
+        self.hedged = 0
+
+    # ---- 공통 ----
+
+    def _before_call(self):
+        """이번 호출의 timeout 반환, 부를 수 없으면 UpstreamUnavailable"""
+        remaining = remaining_budget()
+        if remaining is not None and remaining <= 0:
+            self._reject("budget")
+            raise UpstreamUnavailable(f"{self.name} 지연 예산을 다 썼다")
+
+        if not self.breaker.allow():
+            self._reject("open")
+            raise UpstreamUnavailable(f"{self.name} 서킷 브레이커가 열려 있다")
+
+        self.calls += 1
+        timeout = self.timeout if remaining is None else min(self.timeout, remaining)
+        return timeout
+
+    def _reject(self, reason):
+        self.rejected += 1
+        UPSTREAM_REJECTED.inc((self.name, reason))
+
+    def _after_call(self, error, timeout, elapsed):
+        if error is None:
+            self.latency.observe(elapsed)
+
+        if error is None or not _is_upstream_failure(error):
+            # 4xx도 호스트는 응답한 것이므로 브레이커 입장에서는 성공
+            if self.breaker.record_success():
+                logger.info("✅ 업스트림 브레이커 닫힘", extra=fields(upstream=self.name, host=self.host))
+            return
+
+        if _is_timeout(error) and timeout < min(self.timeout, MIN_COUNTED_TIMEOUT):
+            self.breaker.release_trial()
+            return
+
+        if self.breaker.record_failure(error):
+            logger.warning("🔌 업스트림 브레이커 열림", extra=fields(
+                upstream=self.name, host=self.host, error=f"{type(error).__name__}: {error}",
+                retry_in=self.breaker.reset_timeout))
+
+    def _hedge_delay(self, timeout):
+        """헤지 요청을 보낼 시각(초), 헤지하지 않으면 None"""
+        if not self.hedge:
+            return None
+        p95 = self.latency.p95()
+        if p95 is None:
+            return None
+        delay = max(HEDGE_MIN_DELAY, p95)
+        return delay if delay < timeout else None
+
+    # ---- 동기 ----
+
+    def call(self, request):
+        """request(timeout) 호출 → 결과 (응답 상태 확인은 request 안에서 raise_for_status로)"""
+        timeout = self._before_call()
+        start = time.perf_counter()
+        error = None
+        try:
+            with track_upstream(self.name):
+                hedge_delay = self._hedge_delay(timeout)
+                if hedge_delay is None:
+                    return request(timeout)
+                return self._call_hedged(request, timeout, hedge_delay)
+        except Exception as e:
+            error = e
+            raise
+        finally:
+            self._after_call(error, timeout, time.perf_counter() - start)
+
+    def _call_hedged(self, request, timeout, hedge_delay):
+        """첫 요청이 hedge_delay 안에 안 끝나면 하나 더 보내고 먼저 성공한 결과 반환"""
+        executor = _get_hedge_executor()
+        pending = {executor.submit(request, timeout)}
+        done, pending = wait(pending, timeout=hedge_delay)
+        if not done:
+            self.hedged += 1
+            UPSTREAM_HEDGES.inc((self.name,))
+            pending.add(executor.submit(request, max(0.0, timeout - hedge_delay)))
+
+        error = None
+        while True:
+            for future in done:
+                if future.exception() is None:
+                    return future.result()
+                error = future.exception()
+            if not pending:
+                raise error
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+
+    # ---- 비동기 ----
+
+    async def call_async(self, request):
+        """call의 비동기 버전 (request(timeout)은 코루틴 함수)"""
+        timeout = self._before_call()
+        start = time.perf_counter()
+        error = None
+        try:
+            with track_upstream(self.name):
+                hedge_delay = self._hedge_delay(timeout)
+                if hedge_delay is None:
+                    return await request(timeout)
+                return await self._call_hedged_async(request, timeout, hedge_delay)
+        except Exception as e:
+            error = e
+            raise
+        finally:
+            self._after_call(error, timeout, time.perf_counter() - start)
+
+    async def _call_hedged_async(self, request, timeout, hedge_delay):
+        pending = {asyncio.ensure_future(request(timeout))}
+        done, pending = await asyncio.wait(pending, timeout=hedge_delay)
+        if not done:
+            self.hedged += 1
+            UPSTREAM_HEDGES.inc((self.name,))
+            pending.add(asyncio.ensure_future(request(max(0.0, timeout - hedge_delay))))
+
+        error = None
+        try:
+            while True:
+                for task in done:
+                    if task.exception() is None:
+                        return task.result()
+                    error = task.exception()
+                if not pending:
+                    raise error
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            for task in pending:
+                task.cancel()
+
+    def status(self):
+        p95 = self.latency.p95()
+        return {
+            "host": self.host,
+            **self.breaker.status(),
+            "calls": self.calls,
+            "rejected": self.rejected,
+            "hedge": self.hedge,
+            "hedged": self.hedged,
+            "p95_ms": round(p95 * 1000, 1) if p95 is not None else None,
+        }
+
+
+def get_upstream(name, host, timeout, hedge=None):
+    """이름별 공용 Upstream (처음 부를 때의 설정으로 생성)"""
+    with _upstreams_lock:
+        upstream = _upstreams.get(name)
+        if upstream is None:
+            upstream = _upstreams[name] = Upstream(name, host, timeout, hedge)
+        return upstream
+
+
+def upstream_status():
+    """업스트림별 브레이커 상태 {이름: status}"""
+    with _upstreams_lock:
+        upstreams = list(_upstreams.values())
+    return {upstream.name: upstream.status() for upstream in upstreams}
@@ -1,14 +1,37 @@
+import asyncio
+import httpx
+import json
 import requests
 import xml.etree.ElementTree as ET
 from datetime import datetime, timedelta
-from urllib.parse import quote
+from urllib.parse import quote, urlparse
 import ssl
 import urllib3
 import os
 from dotenv import load_dotenv
 
+from modules.async_http import get_async_client
+from modules.logger import get_logger, fields
+from modules.snapshots import snapshot_session
+from modules.cache import TTLCache
+from modules.upstream import UpstreamUnavailable, get_upstream
+
 load_dotenv()
 
+logger = get_logger("weather")
+
+# 기상청 단기예보 API 주소 (부하 테스트 등에서 가짜 서버로 바꿀 수 있다)
+KMA_API_BASE_URL = os.getenv('KMA_API_BASE_URL', "https://apis.data.go.kr/1360000/VilageFcstInfoService_2.0")
+
+# 초단기실황 응답 형식: JSON(기본) / XML. 파서는 응답 본문을 보고 고르므로 에러 응답이 XML이어도 된다
+KMA_DATA_TYPE = os.getenv('KMA_DATA_TYPE', 'JSON').upper()
+
+# 응답에 쓰는 실황 항목 (다 모이면 파싱을 멈춘다)
+OBSERVATION_CATEGORIES = frozenset(("T1H", "PTY", "REH", "WSD"))
+
+# XML 풀 파서에 한 번에 넣는 크기 (바이트)
+XML_FEED_CHUNK = 4096
+
 # SSL 검증 완전 비활성화
 urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
 
@@ -19,16 +42,38 @@ LOCATIONS = {
     "부산": {"nx": 99, "ny": 75, "name": "부산"}
 }
 
+# 기상청 초단기실황은 매시 정각 관측값이 HH:40쯤 올라온다. 여유를 두고 HH:45부터 그 시각 값을 쓴다
+OBSERVATION_PUBLISH_MINUTE = 45
+
+# (지역, base_date, base_time) → 날씨 문자열. 한 시각의 관측값은 바뀌지 않으므로 다음 발표까지만 두면 된다
+weather_cache = TTLCache("weather", ttl=2 * 3600, max_entries=64)
+
+# 기상청 호출 (브레이커 + 지연 예산)
+kma_upstream = get_upstream("kma", urlparse(KMA_API_BASE_URL).netloc, timeout=15)
+
+# 지역 → (base_date, base_time, 날씨 문자열): 마지막으로 성공한 관측값 (브레이커가 열렸을 때 응답용)
+_last_observations = {}
+
+
+class NoObservationData(Exception):
+    """해당 시각 관측값이 아직 없음 (캐시에 저장하지 않기 위해 사용)"""
+
+
 # 레거시 SSL 지원을 위한 어댑터
 
 
+def legacy_ssl_context():
+    """기상청 서버용 SSL 설정 (낮은 보안 레벨, 인증서 검증 안 함)"""
+    context = ssl.create_default_context()
+    context.set_ciphers('DEFAULT@SECLEVEL=1')
+    context.check_hostname = False
+    context.verify_mode = ssl.CERT_NONE
+    return context
+
+
 class SSLAdapter(requests.adapters.HTTPAdapter):
     def init_poolmanager(self, *args, **kwargs):
-        context = ssl.create_default_context()
-        context.set_ciphers('DEFAULT@SECLEVEL=1')
-        context.check_hostname = False
-        context.verify_mode = ssl.CERT_NONE
-        kwargs['ssl_context'] = context
+        kwargs['ssl_context'] = legacy_ssl_context()
         return super().init_poolmanager(*args, **kwargs)
 
 
@@ -62,146 +107,320 @@ def parse_location_from_message(message):
     return None
 
 
-def parse_weather_xml_sync(xml_data):
-    """동기 버전의 XML 파싱 함수"""
-    try:
-        root = ET.fromstring(xml_data)
-        items = root.findall(".//item")
-        data = {}
-
-        for item in items:
-            category_elem = item.find("category")
-            value_elem = item.find("obsrValue")
-
-            if category_elem is not None and value_elem is not None:
-                category = category_elem.text
-                value = value_elem.text
-
-                if category == "T1H":  # 기온
-                    data["temp"] = f"{value}℃"
-                elif category == "PTY":  # 강수형태
-                    data["rainType"] = get_rain_type(value)
-                elif category == "REH":  # 습도
-                    data["humidity"] = f"{value}%"
-                elif category == "WSD":  # 풍속
-                    data["wind"] = f"{value}m/s"
-
-        result = (
-            f"🌡️ 기온: {data.get('temp', '-')}\n"
-            f"💧 습도: {data.get('humidity', '-')}\n"
-            f"🌬️ 풍속: {data.get('wind', '-')}\n"
-            f"☔ 강수: {data.get('rainType', '-')}"
-        )
-
-        return result
-
-    except ET.ParseError as e:
-        return f"❌ XML 파싱 실패: {str(e)}"
-    except Exception as e:
-        return f"❌ 파싱 중 오류: {str(e)}"
+def _add_observation(data, category, value):
+    """실황 항목 하나를 관측값 dict에 반영 (쓰지 않는 항목은 무시)"""
+    if category == "T1H":  # 기온
+        data["temp"] = f"{value}℃"
+    elif category == "PTY":  # 강수형태
+        data["rainType"] = get_rain_type(value)
+    elif category == "REH":  # 습도
+        data["humidity"] = f"{value}%"
+    elif category == "WSD":  # 풍속
+        data["wind"] = f"{value}m/s"
+
+
+def parse_weather_data(xml_data):
+    """XML에서 관측값 dict 추출 (기온/습도/풍속/강수)
+
+    전체 트리를 만들지 않고 풀 파서에 조금씩 넣으며 item을 하나씩 읽고 버린다.
+    필요한 항목이 다 모이면 나머지는 파싱하지 않는다.
+    """
+    if isinstance(xml_data, str):
+        xml_data = xml_data.encode("utf-8")
+
+    parser = ET.XMLPullParser(events=("end",))
+    data = {}
+    missing = set(OBSERVATION_CATEGORIES)
+
+    for offset in range(0, len(xml_data), XML_FEED_CHUNK):
+        parser.feed(xml_data[offset:offset + XML_FEED_CHUNK])
+        for _, elem in parser.read_events():
+            if elem.tag != "item":
+                continue
+
+            category = elem.findtext("category")
+            value_elem = elem.find("obsrValue")
+            if category is not None and value_elem is not None:
+                _add_observation(data, category, value_elem.text)
+                missing.discard(category)
+            elem.clear()
+
+            if not missing:
+                return data
+
+    parser.close()
+    return data
+
+
+def parse_weather_json(json_data):
+    """JSON(dataType=JSON)에서 관측값 dict 추출"""
+    body = json.loads(json_data).get("response", {}).get("body") or {}
+    items = body.get("items") or {}
+    items = items.get("item", []) if isinstance(items, dict) else []
+
+    data = {}
+    for item in items:
+        category, value = item.get("category"), item.get("obsrValue")
+        if category is not None and value is not None:
+            _add_observation(data, category, value)
+    return data
+
+
+def parse_observation(payload):
+    """응답 본문(bytes/str) → 관측값 dict, JSON이면 JSON 파서, 아니면 XML 파서"""
+    head = payload.lstrip()[:1]
+    if head in (b"{", "{"):
+        return parse_weather_json(payload)
+    return parse_weather_data(payload)
+
+
+def format_weather_data(data):
+    """관측값 dict를 응답 문자열로 변환"""
+    return (
+        f"🌡️ 기온: {data.get('temp', '-')}\n"
+        f"💧 습도: {data.get('humidity', '-')}\n"
+        f"🌬️ 풍속: {data.get('wind', '-')}\n"
+        f"☔ 강수: {data.get('rainType', '-')}"
+    )
+
+
+def _build_session():
+    """기상청 API용 세션 (레거시 SSL 어댑터 + 커넥션 풀)"""
+    session = requests.Session()
+    session.mount('https://', SSLAdapter(pool_connections=1, pool_maxsize=10))
+    session.verify = False
+    session.headers.update({
+        'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
+        'Accept': 'application/json, application/xml, text/xml, */*',
+        'Accept-Language': 'ko-KR,ko;q=0.9,en;q=0.8',
+        'Cache-Control': 'no-cache',
+        'Connection': 'keep-alive'
+    })
+    return session
+
 
+# 공용 세션 (요청마다 새로 만들지 않는다)
+weather_session = snapshot_session(_build_session(), "kma", KMA_API_BASE_URL)
 
-def get_weather_fallback(base_date, current_hour, location="포항"):
-    """데이터가 없을 때 1시간 전 데이터로 재시도"""
-    fallback_hour = current_hour - 1
 
-    # 0시인 경우 전날 23시로 설정
-    if fallback_hour < 0:
-        fallback_hour = 23
-        yesterday = datetime.now() - timedelta(days=1)
-        base_date = yesterday.strftime("%Y%m%d")
+def latest_base_time(now=None):
+    """지금 조회할 수 있는 가장 최근 관측 시각 (base_date, base_time)"""
+    now = now or datetime.now()
+    base = now.replace(minute=0, second=0, microsecond=0)
+    if now.minute < OBSERVATION_PUBLISH_MINUTE:
+        base -= timedelta(hours=1)
+    return base.strftime("%Y%m%d"), base.strftime("%H00")
 
-    base_time = f"{fallback_hour:02d}00"
-    print(f"📅 재시도 - 기준 날짜: {base_date}, 기준 시간: {base_time}")
 
-    # 지역 정보 가져오기
-    location_info = LOCATIONS.get(location, LOCATIONS["포항"])
+def _previous_base_time(base_date, base_time):
+    """한 시간 전 관측 시각"""
+    base = datetime.strptime(base_date + base_time, "%Y%m%d%H%M") - timedelta(hours=1)
+    return base.strftime("%Y%m%d"), base.strftime("%H00")
+
+
+def _observation_url(location, base_date, base_time):
+    """초단기실황 조회 URL"""
+    location_info = LOCATIONS[location]
     nx, ny = location_info["nx"], location_info["ny"]
 
+    logger.debug("📍 초단기실황 요청", extra=fields(
+        location=location_info['name'], nx=nx, ny=ny, base_date=base_date, base_time=base_time))
+
+    # 한 격자에 실황 항목은 8개뿐이라 numOfRows는 작게
     service_key = os.getenv('WEATHER_API_KEY')
-    url = f"https://apis.data.go.kr/1360000/VilageFcstInfoService_2.0/getUltraSrtNcst?serviceKey={quote(service_key)}&pageNo=1&numOfRows=1000&dataType=XML&base_date={base_date}&base_time={base_time}&nx={nx}&ny={ny}"
+    return f"{KMA_API_BASE_URL}/getUltraSrtNcst?serviceKey={quote(service_key)}&pageNo=1&numOfRows=10&dataType={KMA_DATA_TYPE}&base_date={base_date}&base_time={base_time}&nx={nx}&ny={ny}"
 
-    try:
-        response = requests.get(url, timeout=5)
+
+def _observation_from_payload(payload, base_date, base_time):
+    """응답 본문 (JSON/XML) → 날씨 문자열 (관측값이 없으면 NoObservationData)"""
+    data = parse_observation(payload)
+    if not data:
+        raise NoObservationData(f"{base_date} {base_time} 관측값이 없다")
+    return format_weather_data(data)
+
+
+def _remember_observation(location, base_date, base_time, weather_info):
+    """마지막으로 성공한 관측값 갱신 (더 최근 시각일 때만)"""
+    last = _last_observations.get(location)
+    if last is None or (last[0], last[1]) <= (base_date, base_time):
+        _last_observations[location] = (base_date, base_time, weather_info)
+    return weather_info
+
+
+def _fetch_observation(location, base_date, base_time):
+    """기상청 초단기실황 조회 (캐시 loader), 날씨 문자열 반환"""
+    url = _observation_url(location, base_date, base_time)
+
+    def send(timeout):
+        response = weather_session.get(url, timeout=timeout, allow_redirects=True)
         response.raise_for_status()
+        return response
 
-        weather_info = parse_weather_xml_sync(response.text)
-        print(f"🌤️ {location} 현재 날씨 ({fallback_hour}시 기준):\n{weather_info}")
-        return weather_info
+    response = kma_upstream.call(send)
+    weather_info = _observation_from_payload(response.content, base_date, base_time)
+    return _remember_observation(location, base_date, base_time, weather_info)
 
-    except requests.exceptions.RequestException as e:
-        error_msg = f"❌ 재시도도 실패: {str(e)}"
-        print(error_msg)
-        return error_msg
-    except Exception as e:
-        error_msg = f"❌ 재시도 중 오류: {str(e)}"
-        print(error_msg)
-        return error_msg
+
+_legacy_context = None
+
+
+def _async_ssl_context():
+    """비동기 클라이언트용 SSL 설정 (인증서 로드 비용이 커서 한 번만 만든다)"""
+    global _legacy_context
+    if _legacy_context is None:
+        _legacy_context = legacy_ssl_context()
+    return _legacy_context
+
+
+async def _fetch_observation_async(location, base_date, base_time):
+    """_fetch_observation의 비동기 버전"""
+    client = get_async_client("weather", snapshot=("kma", KMA_API_BASE_URL), verify=_async_ssl_context(),
+                              timeout=15, follow_redirects=True, headers=dict(weather_session.headers))
+    url = _observation_url(location, base_date, base_time)
+
+    async def send(timeout):
+        response = await client.get(url, timeout=timeout)
+        response.raise_for_status()
+        return response
+
+    response = await kma_upstream.call_async(send)
+    weather_info = _observation_from_payload(response.content, base_date, base_time)
+    return _remember_observation(location, base_date, base_time, weather_info)
+
+
+def _load_weather(location, base_date, base_time):
+    """캐시를 거쳐 관측값 조회"""
+    return weather_cache.get_or_load(
+        (location, base_date, base_time),
+        lambda: _fetch_observation(location, base_date, base_time),
+    )
 
 
 def get_weather_by_location(location="포항"):
-    """지역별 날씨 정보 가져오기"""
+    """지역별 날씨 정보 가져오기
+
+    가장 최근 발표 시각의 관측값을 캐시에서 돌려준다. 새 시각 값이 아직 캐시에 없으면
+    직전 시각 값을 바로 돌려주고 백그라운드에서 새 값을 가져온다.
+    """
     # 지역 정보 확인
     if location not in LOCATIONS:
         return f"❌ 지원하지 않는 지역이다. 사용 가능한 지역: {', '.join(LOCATIONS.keys())}"
 
-    location_info = LOCATIONS[location]
-    nx, ny = location_info["nx"], location_info["ny"]
-    location_name = location_info["name"]
+    base_date, base_time = latest_base_time()
+    previous_date, previous_time = _previous_base_time(base_date, base_time)
 
-    now = datetime.now()
-    base_date = now.strftime("%Y%m%d")
-    current_hour = now.hour
-    base_time = f"{current_hour:02d}00"
+    try:
+        previous_info = _previous_if_missing(location, base_date, base_time, previous_date, previous_time)
+        if previous_info is not None:
+            weather_cache.refresh_in_background(
+                (location, base_date, base_time),
+                lambda: _fetch_observation(location, base_date, base_time),
+            )
+            weather_info, base_time = previous_info, previous_time
+        else:
+            try:
+                weather_info = _load_weather(location, base_date, base_time)
+            except NoObservationData:
+                # 발표가 늦어진 경우 1시간 전 데이터로 재시도
+                logger.info("🔄 1시간 전 데이터로 재시도", extra=fields(location=location))
+                weather_info = _load_weather(location, previous_date, previous_time)
+                base_time = previous_time
+
+        return _format_result(location, base_time, weather_info)
+
+    except UpstreamUnavailable as e:
+        return _last_good_result(location, e)
+    except Exception as e:
+        return _format_error(e)
 
-    print(f"🕐 현재 시간: {now.hour}시 {now.minute}분")
-    print(f"📅 기준 날짜: {base_date}, 기준 시간: {base_time}")
-    print(f"📍 위치: {location_name} (nx={nx}, ny={ny})")
 
-    service_key = os.getenv('WEATHER_API_KEY')
-    url = f"https://apis.data.go.kr/1360000/VilageFcstInfoService_2.0/getUltraSrtNcst?serviceKey={quote(service_key)}&pageNo=1&numOfRows=1000&dataType=XML&base_date={base_date}&base_time={base_time}&nx={nx}&ny={ny}"
+async def get_weather_by_location_async(location="포항"):
+    """get_weather_by_location의 비동기 버전 (httpx, 같은 캐시 사용)"""
+    if location not in LOCATIONS:
+        return f"❌ 지원하지 않는 지역이다. 사용 가능한 지역: {', '.join(LOCATIONS.keys())}"
 
-    # 강화된 SSL 설정을 위한 세션
-    session = requests.Session()
-    session.mount('https://', SSLAdapter())
-    session.verify = False
-    session.headers.update({
-        'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
-        'Accept': 'application/xml, text/xml, */*',
-        'Accept-Language': 'ko-KR,ko;q=0.9,en;q=0.8',
-        'Cache-Control': 'no-cache',
-        'Connection': 'keep-alive'
-    })
+    base_date, base_time = latest_base_time()
+    previous_date, previous_time = _previous_base_time(base_date, base_time)
+
+    def load(date, hour):
+        return weather_cache.get_or_load_async(
+            (location, date, hour), lambda: _fetch_observation_async(location, date, hour))
 
-    response = None
     try:
-        response = session.get(url, timeout=15, allow_redirects=True)
-        response.raise_for_status()
+        previous_info = _previous_if_missing(location, base_date, base_time, previous_date, previous_time)
+        if previous_info is not None:
+            asyncio.ensure_future(_refresh_quietly(load(base_date, base_time)))
+            weather_info, base_time = previous_info, previous_time
+        else:
+            try:
+                weather_info = await load(base_date, base_time)
+            except NoObservationData:
+                logger.info("🔄 1시간 전 데이터로 재시도", extra=fields(location=location))
+                weather_info = await load(previous_date, previous_time)
+                base_time = previous_time
 
-        weather_info = parse_weather_xml_sync(response.text)
-        result_msg = f"🌤️ {location_name} 현재 날씨 ({current_hour}시 기준):\n{weather_info}"
-        print(result_msg)
-        return result_msg
+        return _format_result(location, base_time, weather_info)
 
-    except requests.exceptions.SSLError as e:
-        print(f"❌ SSL 에러: {str(e)}")
-        return f"❌ SSL 연결 오류: {str(e)}"
+    except UpstreamUnavailable as e:
+        return _last_good_result(location, e)
+    except Exception as e:
+        return _format_error(e)
 
-    except requests.exceptions.RequestException as e:
-        error_msg = f"❌ 날씨 조회 실패: {str(e)}"
-        print(error_msg)
 
-        # 데이터가 없을 경우 1시간 전 데이터로 재시도
-        if "NO_DATA" in str(e) or (response and response.status_code == 200):
-            print("🔄 1시간 전 데이터로 재시도...")
-            return get_weather_fallback(base_date, current_hour, location)
+async def _refresh_quietly(coro):
+    """백그라운드 갱신 (실패는 다음 요청에서 다시 시도)"""
+    try:
+        await coro
+    except Exception as e:
+        logger.warning(f"❌ 날씨 백그라운드 갱신 실패: {e}")
+
 
-        return error_msg
+def _previous_if_missing(location, base_date, base_time, previous_date, previous_time):
+    """최신 시각 값이 캐시에 없고 직전 시각 값이 있으면 직전 값, 아니면 None"""
+    if weather_cache.peek((location, base_date, base_time)) is not None:
+        return None
+    return weather_cache.peek((location, previous_date, previous_time))
 
-    except Exception as e:
+
+def _format_result(location, base_time, weather_info):
+    location_name = LOCATIONS[location]["name"]
+    return f"🌤️ {location_name} 현재 날씨 ({int(base_time[:2])}시 기준):\n{weather_info}"
+
+
+def _last_good_result(location, e):
+    """기상청을 부를 수 없을 때 마지막으로 성공한 관측값으로 응답 (없으면 에러)"""
+    last = _last_observations.get(location)
+    if last is None:
+        return _format_error(e)
+    logger.debug("🔌 마지막 관측값으로 응답", extra=fields(location=location, base_time=last[1], reason=str(e)))
+    return _format_result(location, last[1], last[2])
+
+
+def _format_error(e):
+    """예외 → 사용자용 에러 메시지 (❌로 시작)"""
+    if isinstance(e, (requests.exceptions.SSLError, ssl.SSLError)):
+        logger.warning(f"❌ SSL 에러: {str(e)}")
+        return f"❌ SSL 연결 오류: {str(e)}"
+
+    if isinstance(e, (requests.exceptions.RequestException, httpx.HTTPError)):
+        error_msg = f"❌ 날씨 조회 실패: {str(e)}"
+    else:
         error_msg = f"❌ 날씨 조회 중 오류: {str(e)}"
-        print(error_msg)
-        return error_msg
+    logger.warning(error_msg)
+    return error_msg
+
+
+def prefetch_all_locations():
+    """모든 지역의 최신 관측값을 캐시에 올리기, 실패한 지역 수 반환"""
+    base_date, base_time = latest_base_time()
+    failed = 0
+    for location in LOCATIONS:
+        try:
+            _load_weather(location, base_date, base_time)
+        except Exception as e:
+            failed += 1
+            logger.warning(f"❌ {location} 날씨 미리 가져오기 실패: {e}")
+    return failed
 
 
 # 기존 함수들 (호환성 유지)
@@ -243,6 +462,25 @@ def get_weather_api(message="날씨"):
         return f"날씨 API 호출 중 오류가 발생했다.\n에러: {str(e)}"
 
 
+async def get_weather_api_async(message="날씨"):
+    """get_weather_api의 비동기 버전"""
+    try:
+        location = parse_location_from_message(message)
+
+        if location is None:
+            return "지원하지 않는 지역이다. 사용 가능한 지역: 포항, 서울, 부산"
+
+        weather_result = await get_weather_by_location_async(location)
+
+        if "❌" in weather_result:
+            return "날씨 정보를 가져올 수 없다."
+        else:
+            return weather_result
+
+    except Exception as e:
+        return f"날씨 API 호출 중 오류가 발생했다.\n에러: {str(e)}"
+
+
 # 지역별 개별 함수들 (편의용)
 def get_pohang_weather():
     """포항 날씨"""
@@ -2,17 +2,31 @@
 
 const API_BASE_URL = CONFIG.API_BASE_URL || "http://localhost:8080";
 
+// 배치 모드: 이 시간(ms) 안에 들어온 메시지를 모아 /api/messages/batch 한 번으로 보낸다 (0이면 끔)
+const BATCH_WINDOW_MS = CONFIG.BATCH_WINDOW_MS || 0;
+const BATCH_MAX_MESSAGES = CONFIG.BATCH_MAX_MESSAGES || 50;
+
+// 배치 대기열 ({room, msg, sender, replier}), 보내기 예약 여부
+const pendingMessages = new java.util.concurrent.ConcurrentLinkedQueue();
+const flushScheduled = new java.util.concurrent.atomic.AtomicBoolean(false);
+
+// 리마인드 푸시: 서버(/api/push/poll)에 연결을 열어 두고 리마인드가 울리면 바로 해당 방에 보낸다
+// 기본은 끔 (CONFIG.PUSH_ENABLED = true로 켠다). 서버가 ASGI 단일 워커이거나 PUSH_BACKEND=sqlite여야 한다
+// (gunicorn 워커 여러 개 + PUSH_BACKEND=memory면 워커마다 이벤트와 id가 따로라 리마인드를 놓친다)
+const PUSH_ENABLED = CONFIG.PUSH_ENABLED === true;
+const PUSH_POLL_TIMEOUT_S = CONFIG.PUSH_POLL_TIMEOUT_S || 25;
+
+// 방 → 마지막 replier (Api.replyRoom이 안 될 때 사용), 푸시 스레드 실행 여부
+const roomRepliers = {};
+const pushRunning = new java.util.concurrent.atomic.AtomicBoolean(false);
+
 // 상태 관리 객체 (간단하게)
 let botState = {
     isActive: true,
-    lastRequestTime: {},
 };
 
 function response(room, msg, sender, isGroupChat, replier) {
-    // 요청 제한 (도배 방지)
-    if (!checkRateLimit(sender)) {
-        return;
-    }
+    roomRepliers[room] = replier;
 
     // 봇 비활성화 상태면 관리자 명령어만 처리
     if (!botState.isActive) {
@@ -26,51 +40,127 @@ function response(room, msg, sender, isGroupChat, replier) {
         return;
     }
 
+    // 배치 모드면 대기열에 넣고 나중에 한 번에 전송
+    if (BATCH_WINDOW_MS > 0) {
+        enqueueMessage(room, msg, sender, replier);
+        return;
+    }
+
     // Flask API로 메시지 전송
     try {
         const apiResponse = callFlaskAPI(msg, sender, room);
-        
-        if (apiResponse && apiResponse.success) {
-            const responseData = apiResponse.data;
-            
-            if (responseData.response) {
-                replier.reply(responseData.response);
-            }
-            
-            // 관리자 명령어 처리
-            if (responseData.type === "admin" && sender === "박정욱") {
-                if (msg === "크하학 종료") {
-                    botState.isActive = false;
-                }
-            }
-        } else {
-            // API 호출 실패시 기본 응답
-            handleOfflineResponse(msg, sender, replier);
-        }
+        handleAPIResponse(apiResponse, msg, sender, replier);
     } catch (e) {
         // 네트워크 오류시 기본 응답
         handleOfflineResponse(msg, sender, replier);
     }
 }
 
+function handleAPIResponse(apiResponse, msg, sender, replier) {
+    // 도배 방지는 서버가 한다 (429) - 걸린 메시지는 조용히 넘긴다
+    if (apiResponse && apiResponse.rateLimited) {
+        return;
+    }
+
+    if (apiResponse && apiResponse.success) {
+        const responseData = apiResponse.data;
+
+        if (responseData.response) {
+            replier.reply(responseData.response);
+        }
+
+        // 관리자 명령어 처리
+        if (responseData.type === "admin" && sender === "박정욱") {
+            if (msg === "크하학 종료") {
+                botState.isActive = false;
+            }
+        }
+    } else {
+        // API 호출 실패시 기본 응답
+        handleOfflineResponse(msg, sender, replier);
+    }
+}
+
+function enqueueMessage(room, msg, sender, replier) {
+    pendingMessages.add({ room: room, msg: msg, sender: sender, replier: replier });
+
+    // 보내기 스레드가 이미 있으면 (기다리는 중이든 보내는 중이든) 그 스레드가 같이 보낸다
+    if (!flushScheduled.compareAndSet(false, true)) {
+        return;
+    }
+
+    new java.lang.Thread(new java.lang.Runnable({
+        run: runFlusher
+    })).start();
+}
+
+// 보내기 스레드는 한 번에 하나만 돈다 (둘이 겹치면 같은 방의 나중 배치가 먼저 답할 수 있다)
+function runFlusher() {
+    do {
+        try {
+            java.lang.Thread.sleep(BATCH_WINDOW_MS);
+        } catch (e) {
+        }
+        try {
+            flushMessages();
+        } finally {
+            // 큐를 비우고 요청도 끝난 뒤에만 내려놓는다
+            flushScheduled.set(false);
+        }
+        // 내려놓기 직전에 들어온 메시지는 enqueueMessage가 스레드를 띄우지 않았으므로 여기서 다시 맡는다
+    } while (!pendingMessages.isEmpty() && flushScheduled.compareAndSet(false, true));
+}
+
+function flushMessages() {
+    while (!pendingMessages.isEmpty()) {
+        const batch = [];
+        let item;
+        while (batch.length < BATCH_MAX_MESSAGES && (item = pendingMessages.poll()) !== null) {
+            batch.push(item);
+        }
+
+        const apiResponse = callBatchAPI(batch);
+        for (let i = 0; i < batch.length; i++) {
+            const entry = batch[i];
+            try {
+                const result = apiResponse && apiResponse.success ? apiResponse.data[i] : null;
+                handleAPIResponse(result, entry.msg, entry.sender, entry.replier);
+            } catch (e) {
+                handleOfflineResponse(entry.msg, entry.sender, entry.replier);
+            }
+        }
+    }
+}
+
 function callFlaskAPI(message, sender, room) {
-    try {
-        const payload = {
-            message: message,
-            sender: sender,
-            room: room
-        };
+    const payload = {
+        message: message,
+        sender: sender,
+        room: room
+    };
+    return postJSON("/api/message", payload, 5000); // 5초 타임아웃
+}
 
+function callBatchAPI(batch) {
+    const messages = batch.map(function (entry) {
+        return { message: entry.msg, sender: entry.sender, room: entry.room };
+    });
+    return postJSON("/api/messages/batch", { messages: messages }, 10000);
+}
+
+function postJSON(path, payload, timeout) {
+    try {
         // HTTP POST 요청
-        const response = org.jsoup.Jsoup.connect(API_BASE_URL + "/api/message")
+        const response = org.jsoup.Jsoup.connect(API_BASE_URL + path)
             .method(org.jsoup.Connection.Method.POST)
             .header("Content-Type", "application/json")
             .requestBody(JSON.stringify(payload))
-            .timeout(5000) // 5초 타임아웃
+            .timeout(timeout)
             .ignoreContentType(true)
+            .ignoreHttpErrors(true)
             .execute();
 
-        if (response.statusCode() === 200) {
+        if (response.statusCode() === 200 || response.statusCode() === 429) {
             return JSON.parse(response.body());
         } else {
             console.log("API 응답 오류: " + response.statusCode());
@@ -82,6 +172,93 @@ function callFlaskAPI(message, sender, room) {
     }
 }
 
+function getJSON(path, timeout) {
+    try {
+        const response = org.jsoup.Jsoup.connect(API_BASE_URL + path)
+            .timeout(timeout)
+            .ignoreContentType(true)
+            .execute();
+
+        if (response.statusCode() === 200) {
+            return JSON.parse(response.body());
+        }
+        console.log("API 응답 오류: " + response.statusCode());
+        return null;
+    } catch (e) {
+        console.log("API 호출 실패: " + e.message);
+        return null;
+    }
+}
+
+function startPushListener() {
+    // 이미 돌고 있으면 그대로 둔다
+    if (!pushRunning.compareAndSet(false, true)) {
+        return;
+    }
+
+    new java.lang.Thread(new java.lang.Runnable({
+        run: function () {
+            let since = null;
+            let failures = 0;
+
+            while (pushRunning.get()) {
+                let path = "/api/push/poll?room=*&timeout=" + PUSH_POLL_TIMEOUT_S;
+                if (since !== null) {
+                    path += "&since=" + since;
+                }
+
+                const result = getJSON(path, (PUSH_POLL_TIMEOUT_S + 10) * 1000);
+                if (result && result.success) {
+                    failures = 0;
+                    const events = result.data.events;
+                    for (let i = 0; i < events.length; i++) {
+                        deliverPushEvent(events[i]);
+                    }
+                    since = result.data.last_id;
+                    continue;
+                }
+
+                // 서버가 안 되면 1초, 2초, 4초, ... 최대 1분 기다렸다 다시 연결
+                failures++;
+                try {
+                    java.lang.Thread.sleep(Math.min(60000, 1000 * Math.pow(2, failures - 1)));
+                } catch (e) {
+                }
+            }
+        }
+    })).start();
+}
+
+function deliverPushEvent(event) {
+    if (!botState.isActive) {
+        return;
+    }
+
+    try {
+        if (Api.replyRoom(event.room, event.message)) {
+            return;
+        }
+    } catch (e) {
+    }
+
+    // 알림을 못 받은 방이면 그 방에서 마지막으로 받은 replier로 보낸다
+    const replier = roomRepliers[event.room];
+    if (replier) {
+        replier.reply(event.message);
+    } else {
+        console.log("리마인드를 보낼 방을 찾지 못했다: " + event.room);
+    }
+}
+
+// 스크립트를 다시 컴파일하면 이전 푸시 스레드는 멈춘다
+function onStartCompile() {
+    pushRunning.set(false);
+}
+
+if (PUSH_ENABLED) {
+    startPushListener();
+}
+
 function handleOfflineResponse(msg, sender, replier) {
     // API가 안될 때 기본 응답들
     const offlineResponses = {
@@ -127,19 +304,6 @@ function handleOfflineResponse(msg, sender, replier) {
     }
 }
 
-function checkRateLimit(sender) {
-    const now = Date.now();
-    const lastTime = botState.lastRequestTime[sender] || 0;
-    
-    // 1초에 한 번만 처리
-    if (now - lastTime < 1000) {
-        return false;
-    }
-    
-    botState.lastRequestTime[sender] = now;
-    return true;
-}
-
 // 헬스체크용 함수
 function checkAPIHealth() {
     try {
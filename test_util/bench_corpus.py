@@ -0,0 +1,416 @@
+# test_util/bench_corpus.py
+"""
+채팅 코퍼스 재생 벤치마크 (서버 없이 MessageHandler를 직접 부른다)
+
+test_api.py는 떠 있는 서버에 메시지 하나를 보내 보는 스모크 테스트라서 성능 회귀는 잡지 못한다.
+여기서는 방 여러 개의 채팅을 만들거나(시드 고정) 기록된 JSONL을 읽어
+MessageHandler.process_message_tagged와 message_memory에 순서대로 넣고
+- 처리량 (메시지/s)
+- 응답한 핸들러(friends, weather, memory, ...)별 p50/p95/p99 지연 시간
+- 메시지 하나 처리하면서 새로 잡은 메모리(tracemalloc 최대치)와 남긴 메모리
+를 보여 준다. --save로 결과를 JSON 기준선으로 남기고, 코드를 바꾼 뒤 --compare로 비교하면
+기준선보다 느려지거나 메모리를 더 잡은 핸들러를 알려 주고 실패(exit 1)한다.
+
+업스트림(기상청/포항공대/중앙대)은 지연 시간을 정할 수 있는 가짜 서버(load_asgi.build_mock_upstream)로 바꾸고
+업스트림 캐시는 끈다 (--cache로 켤 수 있다). 저장소는 임시 디렉토리의 SQLite를 쓴다.
+--record 디렉토리로 가짜 업스트림 응답을 기록해 두면 --replay 디렉토리로 가짜 서버 없이 재생한다 (modules/snapshots.py,
+지연은 --upstream-ms만큼 넣는다). 실제 업스트림에서 UPSTREAM_MODE=record로 기록한 디렉토리도 그대로 재생할 수 있다.
+
+만든 코퍼스의 메시지 비율 (대략):
+  ㅋㅋ 35%, 잡담 22%, 친구 이름 12%, 감정(ㅠㅠ, 졸려, 배고파 ...) 10%, 학식 7%, 날씨 5%,
+  메모/리마인드 4%, 아일라/요시 2%, 도움말 1%, 조용히 해 → 말해 1%, 긴 도배 1%
+
+기록된 코퍼스는 한 줄에 {"room": ..., "sender": ..., "message": ...} 하나다 (--dump로 만든 코퍼스도 같은 형식).
+
+실행: python test_util/bench_corpus.py [메시지 수] [--upstream-ms 지연] [--corpus 기록.jsonl] [--dump 저장.jsonl]
+                                       [--save 기준선.json] [--compare 기준선.json] [--threshold 0.25]
+                                       [--record 기록디렉토리 | --replay 기록디렉토리]
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import platform
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from collections import defaultdict
+from datetime import datetime
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+TEST_UTIL = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(ROOT)
+sys.path.insert(0, TEST_UTIL)
+
+from load_asgi import free_port, percentile, wait_for_port  # noqa: E402
+
+# 가짜 업스트림 주소와 임시 저장소는 모듈을 import하기 전에 정한다 (모듈이 import할 때 환경 변수를 읽는다)
+START_DIR = os.getcwd()
+WORKDIR = tempfile.mkdtemp(prefix="khh-corpus-")
+MOCK_PORT = free_port()
+MOCK_URL = f"http://127.0.0.1:{MOCK_PORT}"
+os.environ.update(
+    KMA_API_BASE_URL=f"{MOCK_URL}/kma",
+    POSTECH_MEAL_API_URL=f"{MOCK_URL}/postech",
+    CAU_MEAL_API_URL=f"{MOCK_URL}/cau",
+    WEATHER_API_KEY="bench-corpus",
+    STORAGE_SQLITE_PATH=os.path.join(WORKDIR, "khh.db"),
+    LOG_LEVEL=os.getenv("LOG_LEVEL", "WARNING"),
+)
+if "--cache" not in sys.argv:
+    os.environ["UPSTREAM_CACHE_DISABLED"] = "1"
+# 기록/재생 어댑터는 세션을 만들 때 끼우므로 모드도 미리 정한다 (디렉토리와 지연은 main에서)
+if "--replay" in sys.argv:
+    os.environ["UPSTREAM_MODE"] = "replay"
+elif "--record" in sys.argv:
+    os.environ["UPSTREAM_MODE"] = "record"
+os.chdir(WORKDIR)
+
+from modules.memory import message_memory  # noqa: E402
+from modules.message_handler import MessageHandler  # noqa: E402
+from modules.response_packs import get_pack  # noqa: E402
+from modules.snapshots import RECORD, REPLAY, SnapshotStore, set_snapshot_store  # noqa: E402
+
+# 기준선과 비교할 때: 이만큼(비율) 넘게 나빠지고, 차이가 바닥값보다 커야 회귀로 본다 (짧은 핸들러의 잡음 거르기)
+DEFAULT_THRESHOLD = 0.25
+LATENCY_FLOOR_S = 0.00001
+ALLOC_FLOOR_BYTES = 512
+MIN_COMPARE_COUNT = 30
+
+BASELINE_VERSION = 1
+
+# ---- 코퍼스 ----
+
+ROOM_COUNT = 12
+SENDERS = ["민수", "지현", "도윤", "서연", "하준", "예린", "현우", "수아", "준호", "다은"]
+
+LAUGHS = ["ㅋㅋ", "ㅋㅋㅋ", "ㅋㅋㅋㅋㅋ", "ㅋㅋㅋㅋㅋㅋㅋㅋ", "ㅎㅎ", "ㅋㄱㅋㄱㅋㄱ"]
+CHAT = [
+    "그래서 언제 출발해?", "회의 끝나고 집에 가는 중", "어디야", "나 지금 도착", "그거 진짜임?",
+    "내일 발표 준비해야 됨", "오늘 뭐함", "주말에 뭐해", "아 그거 봤어", "이따 연락할게",
+    "버스 놓쳤다", "과제 다 했어?", "ㅇㅇ", "ㄴㄴ", "굿", "헐", "알겠어", "몇 시에 봐",
+]
+EMOTION = [
+    "ㅠㅠ 시험 망했어", "졸려 죽겠다", "배고파", "아.. 망했다", "헉 대박!!!", "ㅡㅡ 화나네",
+    "뭐먹지", "공부하기 싫다", "비 온다", "봇아 뭐해", "너 최고야", "뿌잉뿌잉", "???? 이게 뭐임",
+    "WHAT ARE YOU DOING", "아 진짜;;;;", "사고싶다 이거", "응애",
+]
+FRIEND_TEMPLATES = ["{} 어디야", "{} 오늘 뭐함", "{} 왔다", "{}", "{} 또 늦음 ㅋㅋ", "아 {} 연락 안 되네"]
+MEALS = ["학식", "점심", "저녁", "아침", "포스텍 학식", "중학", "다학", "중앙대 점심", "다빈치 석식",
+         "중학 내일", "다학 이번주 점심", "중앙대 3일"]
+WEATHER = ["날씨", "서울 날씨", "포항 날씨", "오늘 기온", "바람 많이 부나", "부산 날씨 어때"]
+SPECIAL = ["아일라", "요시", "아일라 어디감"]
+HELP = ["도움말", "명령어", "help"]
+
+# (비율, 종류)
+MIX = [
+    (0.35, "laugh"), (0.22, "chat"), (0.12, "friend"), (0.10, "emotion"), (0.07, "meal"), (0.05, "weather"),
+    (0.04, "memory"), (0.02, "special"), (0.01, "help"), (0.01, "silence"), (0.01, "spam"),
+]
+
+
+def friend_names():
+    """친구 팩에 있는 이름들 (코퍼스가 팩을 따라간다)"""
+    names = []
+    for rule in get_pack("friends").rules:
+        names.extend(rule.patterns)
+    return names
+
+
+def memory_message(rng, room):
+    roll = rng.random()
+    if roll < 0.35:
+        return f"!리마인드 내일 {rng.randint(0, 23):02d}:{rng.choice(['00', '30'])} {room} 회의"
+    if roll < 0.6:
+        return f"!기억 {rng.choice(['다음 모임 토요일', '회비 만원', '장소 강남역'])}"
+    if roll < 0.85:
+        return rng.choice(["뭐였지", "그거 뭐였더라", "뭐더라"])
+    return "!삭제"
+
+
+def build_corpus(count, seed=22):
+    """방 여러 개의 채팅 (방은 앞쪽 방일수록 시끄럽다), [(방, 보낸 사람, 메시지)]"""
+    rng = random.Random(seed)
+    names = friend_names()
+    room_weights = [1 / (i + 1) for i in range(ROOM_COUNT)]
+    kinds, weights = zip(*((kind, weight) for weight, kind in MIX))
+    corpus = []
+    while len(corpus) < count:
+        room = f"방{rng.choices(range(ROOM_COUNT), room_weights)[0]}"
+        sender = rng.choice(SENDERS)
+        kind = rng.choices(kinds, weights)[0]
+        if kind == "laugh":
+            msg = rng.choice(LAUGHS) if rng.random() < 0.6 else f"{rng.choice(CHAT)} {rng.choice(LAUGHS)}"
+        elif kind == "chat":
+            msg = rng.choice(CHAT)
+        elif kind == "friend":
+            msg = rng.choice(FRIEND_TEMPLATES).format(rng.choice(names))
+        elif kind == "emotion":
+            msg = rng.choice(EMOTION)
+        elif kind == "meal":
+            msg = rng.choice(MEALS)
+        elif kind == "weather":
+            msg = rng.choice(WEATHER)
+        elif kind == "memory":
+            msg = memory_message(rng, room)
+        elif kind == "special":
+            msg = rng.choice(SPECIAL)
+        elif kind == "help":
+            msg = rng.choice(HELP)
+        elif kind == "silence":
+            # 조용히 해 → 그 방 메시지 몇 개 → 말해
+            corpus.append((room, sender, "조용히 해"))
+            corpus.extend((room, rng.choice(SENDERS), rng.choice(CHAT)) for _ in range(rng.randint(0, 3)))
+            msg = "말해"
+        else:
+            msg = rng.choice("ㅋㅎㅠ!") * rng.randint(200, 2000)
+        corpus.append((room, sender, msg))
+    return corpus[:count]
+
+
+def load_corpus(path):
+    with open(path, encoding="utf-8") as f:
+        rows = [json.loads(line) for line in f if line.strip()]
+    return [(row["room"], row["sender"], row["message"]) for row in rows]
+
+
+def dump_corpus(corpus, path):
+    with open(path, "w", encoding="utf-8") as f:
+        for room, sender, msg in corpus:
+            f.write(json.dumps({"room": room, "sender": sender, "message": msg}, ensure_ascii=False) + "\n")
+
+
+def fingerprint(corpus):
+    digest = hashlib.sha1()
+    for room, sender, msg in corpus:
+        digest.update(f"{room}\0{sender}\0{msg}\n".encode("utf-8"))
+    return digest.hexdigest()[:16]
+
+
+# ---- 가짜 업스트림 ----
+
+def start_mock_process(delay):
+    """가짜 업스트림을 다른 프로세스로 띄운다 (tracemalloc에 가짜 서버 메모리가 섞이지 않게)"""
+    code = (
+        "import sys, uvicorn; sys.path.insert(0, sys.argv[1]); from load_asgi import build_mock_upstream; "
+        "uvicorn.run(build_mock_upstream(float(sys.argv[2])), host='127.0.0.1', port=int(sys.argv[3]), "
+        "log_level='warning')"
+    )
+    proc = subprocess.Popen([sys.executable, "-c", code, TEST_UTIL, str(delay), str(MOCK_PORT)],
+                            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    wait_for_port(MOCK_PORT)
+    return proc
+
+
+# ---- 측정 ----
+
+def replay(handler, corpus):
+    """코퍼스를 순서대로 처리하고 (전체 시간, 핸들러별 지연 시간 목록, 응답 수)"""
+    latencies = defaultdict(list)
+    answered = 0
+    clock = time.perf_counter
+    start = clock()
+    for room, sender, msg in corpus:
+        began = clock()
+        response, tag = handler.process_message_tagged(msg, sender, room)
+        latencies[tag].append(clock() - began)
+        if response:
+            answered += 1
+    return clock() - start, latencies, answered
+
+
+def measure_allocations(handler, corpus):
+    """메시지마다 tracemalloc으로 (새로 잡은 최대 바이트, 처리 후 남은 바이트)를 핸들러별로 모은다"""
+    allocations = defaultdict(list)
+    tracemalloc.start()
+    try:
+        for room, sender, msg in corpus:
+            tracemalloc.reset_peak()
+            before, _ = tracemalloc.get_traced_memory()
+            _, tag = handler.process_message_tagged(msg, sender, room)
+            current, peak = tracemalloc.get_traced_memory()
+            allocations[tag].append((peak - before, current - before))
+    finally:
+        tracemalloc.stop()
+    return allocations
+
+
+def measure_memory_direct(corpus):
+    """메모/리마인드 메시지만 골라 message_memory를 바로 불렀을 때의 지연 시간"""
+    latencies = []
+    for room, sender, msg in corpus:
+        began = time.perf_counter()
+        message_memory(msg, room, sender)
+        latencies.append(time.perf_counter() - began)
+    return latencies
+
+
+def summarize(latencies, allocations):
+    handlers = {}
+    for tag, values in latencies.items():
+        allocs = allocations.get(tag, [])
+        handlers[tag] = {
+            "count": len(values),
+            "p50": percentile(values, 0.5),
+            "p95": percentile(values, 0.95),
+            "p99": percentile(values, 0.99),
+            "alloc_bytes": sum(peak for peak, _ in allocs) / len(allocs) if allocs else None,
+            "retained_bytes": sum(kept for _, kept in allocs) / len(allocs) if allocs else None,
+        }
+    return handlers
+
+
+def print_report(result):
+    print(f"  처리량 {result['throughput']:.0f} 메시지/s (응답 {result['answered']}/{result['messages']}개)")
+    print(f"  {'핸들러':<14}{'메시지':>7}{'p50':>10}{'p95':>10}{'p99':>10}{'할당/메시지':>13}{'남김':>9}")
+    for tag, row in sorted(result["handlers"].items(), key=lambda item: -item[1]["count"]):
+        alloc = f"{row['alloc_bytes'] / 1024:.1f}KB" if row["alloc_bytes"] is not None else "-"
+        kept = f"{row['retained_bytes']:.0f}B" if row["retained_bytes"] is not None else "-"
+        print(f"  {tag:<14}{row['count']:>7}{row['p50'] * 1e6:>8.0f}µs{row['p95'] * 1e6:>8.0f}µs"
+              f"{row['p99'] * 1e6:>8.0f}µs{alloc:>13}{kept:>9}")
+    memory = result["message_memory"]
+    if memory["count"]:
+        print(f"  message_memory 직접 호출 {memory['count']}개: p50 {memory['p50'] * 1e6:.0f}µs, "
+              f"p99 {memory['p99'] * 1e6:.0f}µs")
+
+
+# ---- 기준선 ----
+
+def regressions(result, baseline, threshold):
+    """기준선보다 나빠진 항목 설명 목록"""
+    found = []
+    limit = 1 + threshold
+    if result["throughput"] * limit < baseline["throughput"]:
+        found.append(f"처리량 {baseline['throughput']:.0f} → {result['throughput']:.0f} 메시지/s")
+
+    for tag, old in baseline["handlers"].items():
+        new = result["handlers"].get(tag)
+        if not new or min(new["count"], old["count"]) < MIN_COMPARE_COUNT:
+            continue
+        for key in ("p50", "p95"):
+            if new[key] > old[key] * limit and new[key] - old[key] > LATENCY_FLOOR_S:
+                found.append(f"{tag} {key} {old[key] * 1e6:.0f} → {new[key] * 1e6:.0f}µs")
+        if old["alloc_bytes"] is not None and new["alloc_bytes"] is not None:
+            if new["alloc_bytes"] > old["alloc_bytes"] * limit and new["alloc_bytes"] - old["alloc_bytes"] > ALLOC_FLOOR_BYTES:
+                found.append(f"{tag} 할당 {old['alloc_bytes'] / 1024:.1f} → {new['alloc_bytes'] / 1024:.1f}KB/메시지")
+    return found
+
+
+def load_baseline(path):
+    with open(path, encoding="utf-8") as f:
+        baseline = json.load(f)
+    if baseline.get("version") != BASELINE_VERSION:
+        raise ValueError(f"기준선 형식이 다르다 (version {baseline.get('version')})")
+    return baseline
+
+
+def save_baseline(result, path):
+    tmp = f"{path}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(result, f, ensure_ascii=False, indent=2)
+    os.replace(tmp, path)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="채팅 코퍼스 재생 벤치마크")
+    parser.add_argument("count", nargs="?", type=int, default=5000, help="만들 메시지 수 (--corpus면 무시)")
+    parser.add_argument("--upstream-ms", type=float, default=5.0, help="가짜 업스트림 응답 지연 (ms)")
+    parser.add_argument("--corpus", help="기록된 코퍼스 JSONL (없으면 시드 고정으로 만든다)")
+    parser.add_argument("--seed", type=int, default=22)
+    parser.add_argument("--dump", help="재생한 코퍼스를 JSONL로 저장")
+    parser.add_argument("--alloc-sample", type=int, default=2000, help="메모리 할당을 잴 메시지 수 (앞에서부터)")
+    parser.add_argument("--save", help="결과를 기준선 JSON으로 저장")
+    parser.add_argument("--compare", help="기준선 JSON과 비교 (나빠지면 exit 1)")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD, help="회귀로 볼 비율 (0.25 = 25%%)")
+    parser.add_argument("--cache", action="store_true", help="업스트림 캐시를 켠다")
+    snapshots = parser.add_mutually_exclusive_group()
+    snapshots.add_argument("--record", help="가짜 업스트림 응답을 이 디렉토리에 기록")
+    snapshots.add_argument("--replay", help="가짜 업스트림 대신 이 디렉토리의 기록으로 응답 (지연은 --upstream-ms)")
+    args = parser.parse_args()
+    # 작업 디렉토리를 임시 디렉토리로 옮겼으므로 상대 경로는 실행한 곳 기준으로 바꾼다
+    for name in ("corpus", "dump", "save", "compare", "record", "replay"):
+        if getattr(args, name):
+            setattr(args, name, os.path.join(START_DIR, getattr(args, name)))
+    return args
+
+
+def main():
+    args = parse_args()
+    corpus = load_corpus(args.corpus) if args.corpus else build_corpus(args.count, args.seed)
+    if args.dump:
+        dump_corpus(corpus, args.dump)
+    baseline = load_baseline(args.compare) if args.compare else None
+
+    if args.replay:
+        set_snapshot_store(SnapshotStore(args.replay, REPLAY, latency=args.upstream_ms / 1000))
+        mock = None
+    else:
+        if args.record:
+            set_snapshot_store(SnapshotStore(args.record, RECORD))
+        mock = start_mock_process(args.upstream_ms / 1000)
+    try:
+        handler = MessageHandler()
+        # 워밍업: 업스트림 연결, 팩 템플릿, 감정 특징 캐시 등을 한 번씩 거친다 (다른 방에서)
+        replay(handler, [(f"워밍업{room}", sender, msg) for room, sender, msg in corpus[:300]])
+
+        elapsed, latencies, answered = replay(handler, corpus)
+        allocations = measure_allocations(handler, corpus[:args.alloc_sample])
+        memory_corpus = [row for row in corpus if row[2].startswith(("!기억", "!리마인드", "!삭제"))
+                         or "뭐였" in row[2] or "뭐더라" in row[2]]
+        memory_latencies = measure_memory_direct(memory_corpus)
+    finally:
+        if mock:
+            mock.terminate()
+            mock.wait(timeout=30)
+        shutil.rmtree(WORKDIR, ignore_errors=True)
+
+    result = {
+        "version": BASELINE_VERSION,
+        "created": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "corpus": {"messages": len(corpus), "fingerprint": fingerprint(corpus), "source": args.corpus or f"seed {args.seed}"},
+        "upstream_ms": args.upstream_ms,
+        "cache": args.cache,
+        "upstream": "replay" if args.replay else "mock",
+        "messages": len(corpus),
+        "answered": answered,
+        "throughput": len(corpus) / elapsed,
+        "handlers": summarize(latencies, allocations),
+        "message_memory": {
+            "count": len(memory_latencies),
+            "p50": percentile(memory_latencies, 0.5) if memory_latencies else None,
+            "p99": percentile(memory_latencies, 0.99) if memory_latencies else None,
+        },
+    }
+
+    print(f"📊 코퍼스 {result['corpus']['source']} 메시지 {len(corpus)}개 (방 {len({row[0] for row in corpus})}개), "
+          f"{'기록 재생' if args.replay else '가짜 업스트림'} 지연 {args.upstream_ms:.0f}ms, 캐시 {'켬' if args.cache else '끔'}")
+    print_report(result)
+
+    if args.save:
+        save_baseline(result, args.save)
+        print(f"💾 기준선 저장: {args.save}")
+
+    if baseline is None:
+        return
+    if baseline["corpus"]["fingerprint"] != result["corpus"]["fingerprint"]:
+        print("⚠️ 기준선과 코퍼스가 다르다 (같은 메시지 수/시드 또는 같은 기록 파일로 비교해야 정확하다)")
+    if (baseline["upstream_ms"], baseline["cache"], baseline.get("upstream", "mock")) != \
+            (args.upstream_ms, args.cache, result["upstream"]):
+        print("⚠️ 기준선과 업스트림 지연/캐시 설정이 다르다")
+    found = regressions(result, baseline, args.threshold)
+    if found:
+        print(f"❌ 실패: 기준선({baseline['created']})보다 {args.threshold:.0%} 넘게 나빠짐")
+        for line in found:
+            print(f"  {line}")
+        sys.exit(1)
+    print(f"✅ 기준선({baseline['created']}) 대비 {args.threshold:.0%} 안쪽")
+
+
+if __name__ == "__main__":
+    main()
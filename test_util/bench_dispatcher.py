@@ -0,0 +1,176 @@
+# test_util/bench_dispatcher.py
+"""
+디스패처 벤치마크
+
+대부분 아무 트리거에도 걸리지 않는 합성 한국어 채팅을 흘려보내면서
+기존 if 체인(process_message 순차 호출)과 컴파일된 디스패처를 비교한다.
+같은 난수 시드로 두 경로를 돌려 응답이 모두 같은지도 확인한다.
+
+실행: python test_util/bench_dispatcher.py [메시지 수]
+
+참고: 기존 체인 쪽도 이미 친구 응답 테이블을 모듈 레벨로 올린 뒤의 코드를 쓰므로
+(호출마다 dict를 다시 만들지 않음) 여기서 나오는 속도 차이는 보수적인 값이다.
+"""
+
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import modules.message_handler as message_handler_module  # noqa: E402
+from modules.message_handler import (  # noqa: E402
+    CAU_MEAL_COMMANDS, HELP_KEYWORDS, POSTECH_MEAL_COMMANDS, SILENCE_KEYWORDS, WEATHER_KEYWORDS, MessageHandler,
+)
+from modules.meal_query import COMMAND_CAMPUSES, meal_range_reply  # noqa: E402
+from modules.postech_meal import get_postech_meal  # noqa: E402
+from modules.memory import message_memory  # noqa: E402
+from message.admin import check_admin_message  # noqa: E402
+from modules.response_packs import get_pack  # noqa: E402
+from message.cry_laugh_stress import check_cry_laugh_stress_message  # noqa: E402
+
+# 어떤 트리거에도 걸리지 않는 단어들
+NEUTRAL_WORDS = [
+    "그래서", "진짜", "언제", "퇴근", "회의", "집에", "가는", "중이야", "오후에",
+    "다들", "주말", "영화", "보러", "갈까", "지금", "출발", "했어", "내가", "할게",
+    "그거", "어디", "있어", "확인", "해볼게", "문서", "보냈어", "방금", "도착", "완료",
+]
+
+# 실제로 응답이 나가는 메시지들 (네트워크를 타지 않는 것만)
+TRIGGER_MESSAGES = [
+    "ㅋㅋㅋㅋㅋㅋ", "ㅠㅠ", "하리 어디야", "체대 준수 왔다", "배고파", "아.. 망했다",
+    "졸려 죽겠다", "시험 망함", "헉 대박", "뭐먹지", "우진 전역 언제", "아카데미 언제 끝나",
+    "아일라", "요시", "HELP", "KHH", "야옹", "ㅇㅇ", "크하학", "좋아 가자",
+]
+
+
+def build_corpus(size, hit_ratio=0.15, seed=42):
+    """합성 채팅 코퍼스 생성 (hit_ratio 만큼만 트리거 메시지)"""
+    rng = random.Random(seed)
+    corpus = []
+    for _ in range(size):
+        if rng.random() < hit_ratio:
+            msg = rng.choice(TRIGGER_MESSAGES)
+        else:
+            msg = " ".join(rng.choice(NEUTRAL_WORDS) for _ in range(rng.randint(2, 10)))
+        sender = f"사용자{rng.randint(1, 30)}"
+        room = f"방{rng.randint(1, 5)}"
+        corpus.append((msg, sender, room))
+    return corpus
+
+
+def legacy_basic_messages(handler, msg):
+    """디스패처 도입 전 MessageHandler._handle_basic_messages (비교 기준으로 그대로 둔다)"""
+    if any(keyword in msg.lower() for keyword in HELP_KEYWORDS):
+        return handler._get_help_message()
+
+    if any(keyword in msg for keyword in WEATHER_KEYWORDS):
+        return message_handler_module.get_weather_api(msg)
+
+    if msg == "KHH":
+        return "크하학 크하학"
+
+    if msg in POSTECH_MEAL_COMMANDS:
+        return get_postech_meal(POSTECH_MEAL_COMMANDS[msg])
+
+    if msg in CAU_MEAL_COMMANDS:
+        campus, meal_type = CAU_MEAL_COMMANDS[msg]
+        return handler._get_cau_meal(campus, meal_type)
+
+    if msg.split(' ', 1)[0] in COMMAND_CAMPUSES:
+        return meal_range_reply(msg)
+
+    return None
+
+
+def legacy_process_message(handler, msg, sender, room):
+    """디스패처 도입 전 process_message와 같은 순서의 if 체인"""
+    admin_response = check_admin_message(msg, sender, handler.bot_state)
+    if admin_response:
+        return admin_response
+
+    if not handler.bot_state['isActive']:
+        return None
+
+    if handler.room_state.is_silent(room):
+        if "말해" in msg or "대답해" in msg or "말하라" in msg:
+            handler.room_state.unsilence(room)
+            return "다시 대답하겠다"
+        return None
+
+    if any(keyword in msg for keyword in SILENCE_KEYWORDS):
+        return handler._make_silent(room)
+
+    for check in (
+        lambda: message_memory(msg, room, sender),
+        lambda: handler._handle_special_messages(msg, sender, room),
+        lambda: get_pack("friends").check(msg),
+        lambda: get_pack("graduate").check(msg),
+        lambda: get_pack("meme").check(msg),
+        lambda: check_cry_laugh_stress_message(msg),
+        lambda: legacy_basic_messages(handler, msg),
+    ):
+        response = check()
+        if response:
+            return response
+
+    return None
+
+
+def run(corpus, process):
+    """코퍼스 재생, (소요 시간, 응답 리스트) 반환"""
+    responses = []
+    start = time.perf_counter()
+    for index, (msg, sender, room) in enumerate(corpus):
+        random.seed(index)
+        responses.append(process(msg, sender, room))
+    return time.perf_counter() - start, responses
+
+
+def main():
+    size = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+
+    # 두 번째 "아일라"가 날씨 API를 부르지 않도록 가짜로 교체
+    message_handler_module.get_weather_api = lambda message="날씨": "🌤️ 가짜 날씨"
+
+    # 메모리/리마인드 파일이 저장소를 더럽히지 않도록 임시 디렉토리에서 실행
+    workdir = tempfile.mkdtemp(prefix="khh-bench-")
+    os.chdir(workdir)
+
+    corpus = build_corpus(size)
+
+    legacy_handler = MessageHandler()
+    dispatch_handler = MessageHandler()
+
+    # 워밍업
+    run(corpus[:500], lambda m, s, r: legacy_process_message(MessageHandler(), m, s, r))
+
+    legacy_time, legacy_responses = run(
+        corpus, lambda m, s, r: legacy_process_message(legacy_handler, m, s, r))
+    dispatch_time, dispatch_responses = run(corpus, dispatch_handler.process_message)
+
+    mismatches = [
+        (corpus[i][0], a, b)
+        for i, (a, b) in enumerate(zip(legacy_responses, dispatch_responses))
+        if a != b
+    ]
+    no_match = sum(1 for response in dispatch_responses if response is None)
+
+    print(f"📊 메시지 {size}개 (무응답 {no_match}개, {no_match / size:.0%})")
+    print(f"  기존 체인  : {legacy_time:.3f}s  ({legacy_time / size * 1e6:.1f}µs/msg)")
+    print(f"  디스패처   : {dispatch_time:.3f}s  ({dispatch_time / size * 1e6:.1f}µs/msg)")
+    print(f"  속도 향상  : {legacy_time / dispatch_time:.2f}x")
+
+    if mismatches:
+        print(f"❌ 응답 불일치 {len(mismatches)}건")
+        for msg, a, b in mismatches[:10]:
+            print(f"  {msg!r}: {a!r} != {b!r}")
+        sys.exit(1)
+
+    print("✅ 모든 응답이 기존 체인과 같다")
+
+
+if __name__ == "__main__":
+    main()
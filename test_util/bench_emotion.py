@@ -0,0 +1,225 @@
+# test_util/bench_emotion.py
+"""
+감정 표현 체크 벤치마크 (message/cry_laugh_stress.py)
+
+- 기존 방식: 체크마다 메시지를 다시 훑는다 (msg.count를 글자 종류마다, set(msg)의 글자마다 msg.count, 대문자 리스트)
+- 특징 추출: 메시지를 한 번 훑어 글자별 개수(Counter)와 나온 키워드를 만들고, 체크는 그것만 본다
+check_all_patterns(전체 체크)로 보통 채팅과 긴 도배 메시지(ㅋ 5천 개 등)의 메시지당 시간을 비교하고
+같은 난수 시드에서 응답이 같은지 확인한다.
+
+글자 반복 체크는 기존 방식이 set 순서(실행마다 다름)로 글자를 골랐으므로,
+5번 넘게 나온 글자가 여럿이면 고른 글자가 달라도 둘 다 조건을 만족하면 같은 것으로 본다.
+
+실행: python test_util/bench_emotion.py [반복 수]
+"""
+
+import datetime
+import os
+import random
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import message.cry_laugh_stress as emotion  # noqa: E402
+from message.cry_laugh_stress import (  # noqa: E402
+    AEGYO_WORDS, ANGER_CHARS, BOT_KEYWORDS, COMPLIMENTS, FOOD_QUESTION_KEYWORDS, FOOD_WORDS,
+    SLEEP_KEYWORDS, STUDY_WORDS, SURPRISE_WORDS, TYPO_PATTERNS, WEATHER_WORDS,
+)
+
+
+# ---- 기존 방식 (체크마다 다시 훑기) ----
+
+def legacy_check_all(msg):
+    """특징 추출 전 check_all_patterns와 같은 동작 (잠 체크 두 번 포함)"""
+    if "나가" in msg:
+        return "죄송합니다"
+    for check in (legacy_sleep, legacy_basic, legacy_food, legacy_sleep, legacy_study, legacy_anger,
+                  legacy_surprise, legacy_caps, legacy_repeat, legacy_question, legacy_aegyo, legacy_typos,
+                  lambda m: emotion.check_time_sensitive(m, datetime.datetime.now().hour),
+                  legacy_weather, legacy_bot, legacy_compliment):
+        result = check(msg)
+        if result:
+            return result
+    return None
+
+
+def legacy_basic(msg):
+    if "ㅠ" in msg or "ㅜ" in msg:
+        if sum(msg.count(char) for char in "ㅠㅜ") >= 2:
+            return random.choice(["ㅠㅠㅠㅜㅜㅠ", "왜 우시는 거예요?", "ㅋㅋ얘 운다"])
+    elif "ㅋ" in msg or "ㅎ" in msg:
+        if sum(msg.count(char) for char in "ㅋㄱㄲㄴㅌㅎ") >= 5:
+            return random.choice(["뭘 웃어요;;", "ㅋㄱㅋㄱㅋㄱㅋㄱㅋㄱㅋㄱㅋㅋ", "이게 웃겨요?"])
+    elif ";" in msg:
+        if sum(msg.count(char) for char in ";:,.") >= 4:
+            return "어림도 없지"
+    return None
+
+
+def legacy_anger(msg):
+    if sum(msg.count(char) for char in ANGER_CHARS) >= 3:
+        return random.choice(["화내지 마세요", "진정하세요", "왜 화나셨어요"])
+    return None
+
+
+def legacy_surprise(msg):
+    if msg.count("!") >= 3 or any(word in msg for word in SURPRISE_WORDS):
+        return random.choice(["뭘 그렇게 놀라요", "놀랄 일도 아닌데", "헉 뭐가 놀라워요"])
+    return None
+
+
+def legacy_caps(msg):
+    if len([c for c in msg if c.isupper()]) >= len(msg) * 0.7 and len(msg) > 5:
+        return "소리 지르지 마세요"
+    return None
+
+
+def legacy_repeat(msg):
+    for char in set(msg):
+        if msg.count(char) >= 5 and char.isalpha():
+            return f"{char} 그만 써요"
+    return None
+
+
+def legacy_question(msg):
+    if msg.count("?") >= 3 or msg.count("？") >= 3:
+        return "질문이 너무 많아요"
+    return None
+
+
+def legacy_aegyo(msg):
+    if any(word in msg for word in AEGYO_WORDS):
+        return random.choice(["애교 그만;;", "귀여운척 하지 마세요;;", "응애 나 애기"])
+    return None
+
+
+def legacy_typos(msg):
+    for typo, correction in TYPO_PATTERNS.items():
+        if typo in msg:
+            return f"{correction}이라고 하세요"
+    return None
+
+
+def legacy_sleep(msg):
+    if any(word in msg for word in SLEEP_KEYWORDS):
+        return emotion.check_sleep_mention("잠")
+    return None
+
+
+def legacy_weather(msg):
+    for word, response in WEATHER_WORDS.items():
+        if word in msg:
+            return response
+    return None
+
+
+def legacy_bot(msg):
+    if any(word in msg for word in BOT_KEYWORDS):
+        return random.choice(["저를 부르셨나요?", "네 뭐든지 물어보세요", "크하학입니다", "왜요?"])
+    return None
+
+
+def legacy_compliment(msg):
+    if any(word in msg for word in COMPLIMENTS):
+        return random.choice(["고마워요 헤헤", "저도 좋아해요", "칭찬 고마워요", "기분 좋네요"])
+    return None
+
+
+def legacy_food(msg):
+    if any(word in msg for word in FOOD_QUESTION_KEYWORDS):
+        return emotion.check_food_mention("뭐먹")
+    if any(word in msg for word in FOOD_WORDS):
+        return random.choice(["저도 먹고 싶어요", "맛있겠네요", "배고프시나봐요", "뭘 드실 건가요?"])
+    return None
+
+
+def legacy_study(msg):
+    if any(word in msg for word in STUDY_WORDS):
+        return random.choice(["화이팅하세요!", "열심히 하시네요", "공부 힘들죠", "파이팅!"])
+    return None
+
+
+# ---- 코퍼스 ----
+
+CHAT = [
+    "오늘 뭐먹지", "ㅋㅋㅋㅋㅋ 진짜 웃기다", "ㅠㅠ 시험 망했어", "헉 대박!!!", "졸려 죽겠다",
+    "그래서 언제 출발해?", "아 진짜;;;;", "ㅡㅡ 화나네 ㅗㅗ", "WHAT ARE YOU DOING", "뿌잉뿌잉",
+    "ㅇㄱㄹㅇ 실화냐", "비 온다", "봇아 뭐해", "너 최고야", "회의 끝나고 집에 가는 중", "aaaaaa 뭐야",
+    "???? 이게 뭐임", "내일 발표 준비해야 됨", "맛있는 거 먹고싶다", "점심 먹으러 갈 사람",
+]
+
+
+def spam_messages():
+    """긴 도배 메시지 (이름, 메시지)"""
+    rng = random.Random(7)
+    return [
+        ("ㅋ × 5000", "ㅋ" * 5000),
+        ("ㅋㅎ 섞어서 5000", "".join(rng.choice("ㅋㅎㄱ") for _ in range(5000))),
+        ("!? 섞은 한글 5000", "".join(rng.choice("다라마사!?ㅋ ") for _ in range(5000))),
+        ("대문자 5000", "".join(rng.choice("BCDEFGHJK") for _ in range(5000))),
+        ("여러 글자 반복 5000", "".join(rng.choice("다라마사타파하abcdefgh") for _ in range(5000))),
+        # 서로 다른 글자가 많으면 기존 글자 반복 체크가 (글자 종류 × 길이)로 커진다
+        ("서로 다른 글자 5000", "".join(chr(0x4E00 + rng.randrange(20000)) for _ in range(5000))),
+    ]
+
+
+def per_call(func, messages, count):
+    start = time.perf_counter()
+    for _ in range(count):
+        for msg in messages:
+            emotion.message_features.cache_clear()
+            func(msg)
+    return (time.perf_counter() - start) / (count * len(messages))
+
+
+def same_response(msg, legacy, new):
+    if legacy == new:
+        return True
+    # 반복 글자가 여럿이면 고른 글자만 다를 수 있다
+    if legacy and new and legacy.endswith(" 그만 써요") and new.endswith(" 그만 써요"):
+        return all(msg.count(r[0]) >= 5 and r[0].isalpha() for r in (legacy, new))
+    return False
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+
+    # 결과 확인: 코퍼스 + 무작위 조합 + 도배 메시지
+    rng = random.Random(3)
+    samples = CHAT + [" ".join(rng.choice(CHAT) for _ in range(rng.randint(1, 4))) for _ in range(5000)]
+    samples += [msg for _, msg in spam_messages()]
+    mismatches = []
+    for index, msg in enumerate(samples):
+        random.seed(index)
+        legacy = legacy_check_all(msg)
+        random.seed(index)
+        emotion.message_features.cache_clear()
+        new = emotion.check_all_patterns(msg)
+        if not same_response(msg, legacy, new):
+            mismatches.append((msg[:30], legacy, new))
+
+    print("📊 check_all_patterns, 메시지당 시간 (캐시 없이 매번 특징 추출)")
+    rows = [("보통 채팅 20개", CHAT, count)] + [(label, [msg], max(1, count // 20)) for label, msg in spam_messages()]
+    for label, messages, repeat in rows:
+        legacy = per_call(legacy_check_all, messages, repeat)
+        new = per_call(emotion.check_all_patterns, messages, repeat)
+        print(f"  {label:<18} 기존 {legacy * 1e6:9.1f}µs  특징 추출 {new * 1e6:8.1f}µs  {legacy / new:6.1f}x")
+
+    # 체크 수와 상관없이 메시지 길이에만 비례하는지 (길이를 두 배씩)
+    scaling = []
+    for length in (1000, 2000, 4000, 8000):
+        msg = ("ㅋㅎ가나!" * length)[:length]
+        scaling.append(f"{length}자 {per_call(emotion.check_all_patterns, [msg], 50) * 1e6:.0f}µs")
+    print(f"  길이별 (특징 추출): {', '.join(scaling)}")
+
+    if mismatches:
+        print(f"❌ 응답 불일치 {len(mismatches)}건")
+        for msg, a, b in mismatches[:10]:
+            print(f"  {msg!r}: {a!r} != {b!r}")
+        sys.exit(1)
+    print(f"✅ 메시지 {len(samples)}개 모두 기존 방식과 같은 응답")
+
+
+if __name__ == "__main__":
+    main()
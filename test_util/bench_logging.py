@@ -0,0 +1,108 @@
+# test_util/bench_logging.py
+"""
+요청당 로깅 비용 벤치마크: print() vs 큐 기반 로거
+
+예전 요청 경로의 로그(접속 로그 print + 중앙대 학식 요청 파라미터 print 2줄)와
+modules.logger(접속 로그 1줄 + 샘플링되는 DEBUG 2줄)를 비교한다.
+stdout은 파이프로 바꿔 다른 프로세스가 읽게 한다 (journald 등으로 보내는 상황과 비슷하게).
+
+- 호출 스레드 비용: 요청 처리 스레드가 로그 때문에 쓰는 시간
+- 전체 비용: 큐에 쌓인 로그를 모두 쓸 때까지 포함한 시간
+
+실행: python test_util/bench_logging.py [요청 수] [스레드 수]
+"""
+
+import os
+import subprocess
+import sys
+import threading
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+os.environ.setdefault('LOG_DEBUG_SAMPLE', '0.01')
+
+from modules.logger import fields, get_logger, stop_logging  # noqa: E402
+
+access_logger = get_logger("access")
+cau_logger = get_logger("cau_meal")
+
+PARAMS = {'tabs': '1', 'tabs2': '20', 'daily': 0}
+
+
+def legacy_request(i):
+    """예전 log_request_info + CAUMealAPI 요청 print"""
+    timestamp = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+    log_message = f"🌐 접속: 127.0.0.1 → POST /api/message | User-Agent: MessengerBot/{i}"
+    print(f"[{timestamp}] {log_message}")
+    print("API 요청: https://mportal.cau.ac.kr/portlet/p005/p005.ajax")
+    print(f"파라미터: {PARAMS}")
+
+
+def structured_request(i):
+    """modules.logger 접속 로그 + DEBUG 요청 파라미터"""
+    access_logger.info("🌐 접속", extra=fields(
+        ip="127.0.0.1", method="POST", path="/api/message", status=200,
+        elapsed_ms=1.23, user_agent=f"MessengerBot/{i}"))
+    cau_logger.debug("API 요청", extra=fields(url="https://mportal.cau.ac.kr/portlet/p005/p005.ajax",
+                                             params=PARAMS))
+
+
+def run(request, count, threads):
+    """스레드 threads개로 count번 호출, 호출 스레드 기준 요청당 시간(µs) 반환"""
+    per_thread = count // threads
+    spent = []
+
+    def worker():
+        start = time.perf_counter()
+        for i in range(per_thread):
+            request(i)
+        spent.append(time.perf_counter() - start)
+
+    workers = [threading.Thread(target=worker) for _ in range(threads)]
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+    return sum(spent) / (per_thread * threads) * 1e6
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    threads = int(sys.argv[2]) if len(sys.argv) > 2 else 4
+
+    # stdout → 파이프 (다른 프로세스가 읽어서 버린다)
+    reader = subprocess.Popen(["cat"], stdin=subprocess.PIPE, stdout=subprocess.DEVNULL)
+    original_stdout = os.dup(1)
+    sys.stdout.flush()
+    os.dup2(reader.stdin.fileno(), 1)
+
+    results = {}
+    try:
+        for name, request in (("print()", legacy_request), ("큐 로거", structured_request)):
+            for n_threads in (1, threads):
+                start = time.perf_counter()
+                caller = run(request, count, n_threads)
+                if request is structured_request:
+                    stop_logging()  # 큐에 남은 로그까지 모두 쓰기
+                sys.stdout.flush()
+                total = (time.perf_counter() - start) / count * 1e6
+                results[(name, n_threads)] = (caller, total)
+                if request is structured_request:
+                    from modules import logger as logger_module
+                    logger_module._start_listener()
+    finally:
+        sys.stdout.flush()
+        os.dup2(original_stdout, 1)
+        reader.stdin.close()
+        reader.wait()
+
+    print(f"📊 요청 {count}개 (요청당 로그 3줄, DEBUG 샘플링 {os.environ['LOG_DEBUG_SAMPLE']})")
+    for (name, n_threads), (caller, total) in results.items():
+        print(f"  {name} / 스레드 {n_threads}개")
+        print(f"    호출 스레드 {caller:7.2f}µs/요청, 전체 {total:7.2f}µs/요청")
+
+
+if __name__ == "__main__":
+    main()
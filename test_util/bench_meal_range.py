@@ -0,0 +1,85 @@
+# test_util/bench_meal_range.py
+"""
+중앙대 학식 범위 조회 벤치마크: 순차 호출 vs 동시 호출
+
+가짜 업스트림(요청마다 지연)을 띄우고 7일 × 2캠퍼스 × 3끼 = 42칸을
+- 기존 방식 (get_meal_data를 하나씩 차례로)
+- CAUMealAPI.get_meals (스레드 풀)
+- CAUMealAPI.get_meals_async (httpx + asyncio.gather)
+로 조회해 걸린 시간과 결과를 비교한다. 캐시는 끄고 잰다.
+
+실행: python test_util/bench_meal_range.py [업스트림 지연(초)]
+"""
+
+import asyncio
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from load_asgi import start_mock  # noqa: E402
+
+
+def legacy_fetch(api, targets):
+    """기존 get_all_meals_today_with_offset처럼 한 칸씩 차례로 조회"""
+    return [api.get_meal_data(campus=campus, meal_type=meal_type, date_offset=offset)
+            for campus, meal_type, offset in targets]
+
+
+def timed(func):
+    start = time.perf_counter()
+    result = func()
+    return time.perf_counter() - start, result
+
+
+def main():
+    delay = float(sys.argv[1]) if len(sys.argv) > 1 else 0.2
+
+    _, port = start_mock(delay)
+    os.environ['CAU_MEAL_API_URL'] = f"http://127.0.0.1:{port}/cau"
+    os.environ['UPSTREAM_CACHE_DISABLED'] = '1'
+
+    from modules.cau_meal import MEAL_FETCH_WORKERS, cau_meal_api
+    from modules.meal_query import MealRangeQuery, build_range_result, format_meal_range
+
+    query = MealRangeQuery(range(7))
+    targets = query.targets()
+
+    # 커넥션을 미리 맺어 둔다 (첫 연결 비용 제외)
+    cau_meal_api.get_meals(targets)
+
+    legacy_time, legacy = timed(lambda: legacy_fetch(cau_meal_api, targets))
+    pool_time, pooled = timed(lambda: cau_meal_api.get_meals(targets))
+
+    async def run_async():
+        await cau_meal_api.get_meals_async(targets)  # 커넥션 미리 맺기
+        start = time.perf_counter()
+        result = await cau_meal_api.get_meals_async(targets)
+        return time.perf_counter() - start, result
+
+    async_time, async_results = asyncio.run(run_async())
+
+    single_times = []
+    for target in targets[:6]:
+        elapsed, _ = timed(lambda: cau_meal_api.get_meal_data(*target))
+        single_times.append(elapsed)
+
+    print(f"📊 {len(targets)}칸 조회 (7일 × 2캠퍼스 × 3끼, 업스트림 지연 {delay * 1000:.0f}ms, 동시 호출 {MEAL_FETCH_WORKERS})")
+    print(f"  단일 호출 (최대) : {max(single_times) * 1000:8.1f}ms")
+    print(f"  순차 호출        : {legacy_time * 1000:8.1f}ms")
+    print(f"  스레드 풀        : {pool_time * 1000:8.1f}ms  ({legacy_time / pool_time:.1f}x)")
+    print(f"  asyncio          : {async_time * 1000:8.1f}ms  ({legacy_time / async_time:.1f}x)")
+
+    if not (legacy == pooled == async_results) or any(result is None for result in legacy):
+        print("❌ 조회 결과가 다르다")
+        sys.exit(1)
+
+    text = format_meal_range(build_range_result(query, pooled))
+    print(f"✅ 세 방식의 결과가 같다 (응답 {len(text)}자, 날짜 → 캠퍼스 → 식사 순서)")
+
+
+if __name__ == "__main__":
+    main()
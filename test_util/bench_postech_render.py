@@ -0,0 +1,171 @@
+# test_util/bench_postech_render.py
+"""
+포항공대 학식 응답 렌더링 벤치마크
+
+합성 주간 메뉴(7일 × 조식A/조식B/점심/저녁/국제관/교직원)를 두고
+기존 방식(요청마다 오늘 메뉴 필터링 + 정규식 정리 + 문자열 이어 붙이기)과
+미리 렌더링한 인덱스 조회를 비교한다. 7일 × 4개 식사 타입의 응답이 모두 같은지도 확인한다.
+
+실행: python test_util/bench_postech_render.py [요청 수]
+"""
+
+import os
+import random
+import re
+import sys
+import time
+from datetime import timedelta
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from modules.postech_meal import MEAL_TYPES, POSTECHMealService  # noqa: E402
+
+DISHES = [
+    ("김치찌개", "Kimchi Stew"), ("제육볶음", "Spicy Pork"), ("계란말이", "Rolled Omelette"),
+    ("쌀밥", "Rice"), ("된장국", "Soybean Paste Soup"), ("돈까스*", "Pork Cutlet"),
+    ("샐러드바", "Salad Bar"), ("깍두기", "Radish Kimchi"), ("우동", "Udon"),
+    ("닭갈비", "Dakgalbi"), ("미역국", "Seaweed Soup"), ("잡채", "Japchae"),
+]
+MEAL_CODES = ["BREAKFAST_A", "BREAKFAST_B", "LUNCH", "DINNER", "INTERNATIONAL", "STAFF"]
+
+
+def build_week(service, monday, seed=7):
+    """합성 주간 메뉴 payload"""
+    rng = random.Random(seed)
+    payload = []
+    for offset in range(7):
+        date = service._format_date(monday + timedelta(days=offset))
+        for code in MEAL_CODES:
+            foods = []
+            for _ in range(rng.randint(1, 3)):
+                picked = rng.sample(DISHES, rng.randint(3, 6))
+                foods.append({
+                    "name_kor": "  ".join(f"{kor}({eng})" for kor, eng in picked),
+                    "name_eng": "  ".join(eng for _, eng in picked),
+                })
+            payload.append({"date": date, "type": code, "foods": foods,
+                            "kcal": rng.randint(500, 1100), "protein": rng.randint(15, 50)})
+    return payload
+
+
+def legacy_render(service, menu_data, today_date, today_name, meal_type):
+    """인덱스 도입 전 _render_meal_info와 같은 동작 (요청마다 정규식 + 문자열 이어 붙이기)"""
+
+    def extract_korean_menu(text):
+        if not text or not text.strip():
+            return ""
+        cleaned = re.sub(r'\b[A-Za-z]+\b', '', text)
+        cleaned = re.sub(r'[^\w\s*가-힣]', ' ', cleaned)
+        korean_parts = re.findall(r'[가-힣*]+(?:\s+[가-힣*]+)*', cleaned)
+        if korean_parts:
+            result = ' '.join(korean_parts).strip()
+            if len(result) >= 2:
+                return result
+        return ""
+
+    def extract_menu_items(food):
+        menu_items = []
+        if food.get('name_kor'):
+            for item in re.split(r'\s{2,}|\t', food['name_kor']):
+                cleaned = extract_korean_menu(item)
+                if cleaned and len(cleaned) > 1:
+                    menu_items.append(cleaned)
+        if food.get('name_eng'):
+            for item in re.split(r'\s{2,}|\t', food['name_eng']):
+                cleaned = extract_korean_menu(item)
+                if cleaned and len(cleaned) > 1 and cleaned not in menu_items:
+                    menu_items.append(cleaned)
+        return menu_items
+
+    today_menus = [menu for menu in menu_data if str(menu.get('date')) == today_date]
+    filtered_menus = service._filter_by_meal_type(today_menus, meal_type)
+
+    menu_text = f"📍 포항공대 오늘({today_name})\n"
+    if not filtered_menus:
+        menu_text += "오늘 메뉴를 찾을 수 없다.\n"
+        menu_text += f"직접 확인: {service.fallback_url}"
+        return menu_text
+
+    for menu in filtered_menus:
+        type_icon, type_name = service.meal_type_mapping.get(
+            menu.get('type'), ("🍴", menu.get('type', '알 수 없음')))
+        menu_text += f"{type_icon} {type_name}:\n"
+        foods = menu.get('foods', [])
+        if foods:
+            for food in foods:
+                for menu_item in extract_menu_items(food):
+                    menu_text += f"  • {menu_item}\n"
+        else:
+            menu_text += "  • 메뉴 정보 없음\n"
+        nutrition_info = service._format_nutrition_info(menu)
+        if nutrition_info:
+            if menu.get('type') in ['BREAKFAST_A']:
+                menu_text += f"{nutrition_info}\n\n"
+            else:
+                menu_text += f"{nutrition_info}"
+    return menu_text
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+
+    service = POSTECHMealService()
+    monday, sunday = service._get_week_range()
+    start_date, end_date = service._format_date(monday), service._format_date(sunday)
+    payload = build_week(service, monday)
+
+    requests = []
+    for offset in range(7):
+        day = monday + timedelta(days=offset)
+        for meal_type in MEAL_TYPES:
+            requests.append({
+                "start_date": start_date, "end_date": end_date,
+                "today_date": service._format_date(day),
+                "today_name": service.day_names[day.weekday()],
+                "meal_type": meal_type,
+            })
+
+    # 응답이 모두 같은지 확인
+    mismatches = [
+        request for request in requests
+        if service._render_meal_info(payload, request) != legacy_render(
+            service, payload, request["today_date"], request["today_name"], request["meal_type"])
+    ]
+
+    start = time.perf_counter()
+    for i in range(count):
+        request = requests[i % len(requests)]
+        legacy_render(service, payload, request["today_date"], request["today_name"], request["meal_type"])
+    legacy_time = time.perf_counter() - start
+
+    # 인덱스 첫 생성 (payload가 바뀌었을 때 한 번 드는 비용)
+    fresh = POSTECHMealService()
+    start = time.perf_counter()
+    fresh._render_meal_info(payload, requests[0])
+    build_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for i in range(count):
+        fresh._render_meal_info(payload, requests[i % len(requests)])
+    index_time = time.perf_counter() - start
+
+    # 캐시가 같은 내용의 새 payload 객체를 돌려준 경우 (해시만 계산하고 재사용)
+    reloaded = build_week(service, monday)
+    start = time.perf_counter()
+    fresh._render_meal_info(reloaded, requests[0])
+    rehash_time = time.perf_counter() - start
+
+    print(f"📊 요청 {count}개 (7일 × {len(MEAL_TYPES)}개 식사 타입 순환, payload {len(payload)}끼)")
+    print(f"  기존 렌더링   : {legacy_time / count * 1e6:8.1f}µs/요청")
+    print(f"  인덱스 조회   : {index_time / count * 1e6:8.1f}µs/요청  ({legacy_time / index_time:.0f}x)")
+    print(f"  인덱스 생성   : {build_time * 1e3:8.2f}ms (payload 내용이 바뀔 때만)")
+    print(f"  같은 내용 재수신: {rehash_time * 1e3:8.2f}ms (해시만 계산)")
+
+    if mismatches:
+        print(f"❌ 응답이 다른 요청 {len(mismatches)}개: {mismatches[:3]}")
+        sys.exit(1)
+    print("✅ 7일 × 식사 타입 응답이 모두 기존과 같다")
+
+
+if __name__ == "__main__":
+    main()
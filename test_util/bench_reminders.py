@@ -0,0 +1,133 @@
+# test_util/bench_reminders.py
+"""
+리마인드 큐 벤치마크
+
+대기 중인 리마인드 N개(기본 100,000개)를 두고
+기존 방식(reminders.json 전체 로드 + 전부 파싱 + 만료 시 전체 재작성)과
+힙 기반 ReminderQueue를 비교한다.
+
+실행: python test_util/bench_reminders.py [리마인드 수]
+"""
+
+import json
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from modules.reminder_queue import ReminderQueue  # noqa: E402
+
+
+def legacy_check_reminders(path):
+    """ReminderQueue 도입 전 check_reminders와 같은 동작"""
+    with open(path, "r", encoding="utf-8") as f:
+        reminders = json.load(f)
+
+    current_time = datetime.now()
+    triggered, remaining = [], []
+    for reminder in reminders:
+        time_diff = (current_time - datetime.fromisoformat(reminder["datetime"])).total_seconds()
+        if 0 <= time_diff <= 300:
+            triggered.append(reminder)
+        elif time_diff < 0:
+            remaining.append(reminder)
+
+    if len(remaining) != len(reminders):
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(json.dumps(remaining, ensure_ascii=False, indent=4))
+
+    return triggered
+
+
+def legacy_get_all_reminders(path, room):
+    """ReminderQueue 도입 전 get_all_reminders의 조회 부분"""
+    with open(path, "r", encoding="utf-8") as f:
+        reminders = json.load(f)
+    return [r for r in reminders if r.get("room") == room]
+
+
+def build_reminders(count, due_count, rooms=1000, seed=7):
+    rng = random.Random(seed)
+    now = datetime.now()
+    reminders = []
+    for i in range(count):
+        if i < due_count:
+            fire = now - timedelta(seconds=rng.randint(1, 200))
+        else:
+            fire = now + timedelta(seconds=rng.randint(600, 7 * 24 * 3600))
+        reminders.append({
+            "datetime": fire.replace(microsecond=0).isoformat(),
+            "content": f"리마인드 {i}",
+            "room": f"방{rng.randrange(rooms)}",
+            "sender": f"사용자{rng.randrange(200)}",
+            "created_at": now.isoformat(),
+        })
+    rng.shuffle(reminders)
+    return reminders
+
+
+def timed(func, repeat=1):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = func()
+    return (time.perf_counter() - start) / repeat, result
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    due_count = 50
+
+    workdir = tempfile.mkdtemp(prefix="khh-bench-reminders-")
+    try:
+        reminders = build_reminders(count, due_count)
+        legacy_path = os.path.join(workdir, "legacy_reminders.json")
+        queue_path = os.path.join(workdir, "reminders.json")
+        for path in (legacy_path, queue_path):
+            with open(path, "w", encoding="utf-8") as f:
+                f.write(json.dumps(reminders, ensure_ascii=False, indent=4))
+
+        print(f"📊 대기 중인 리마인드 {count:,}개 (실행할 것 {due_count}개)")
+
+        # 기존 방식
+        legacy_due_time, legacy_due = timed(lambda: legacy_check_reminders(legacy_path))
+        legacy_idle_time, _ = timed(lambda: legacy_check_reminders(legacy_path), repeat=3)
+        legacy_room_time, _ = timed(lambda: legacy_get_all_reminders(legacy_path, "방1"), repeat=3)
+
+        # 힙 기반 큐
+        queue = ReminderQueue(queue_path)
+        load_time, _ = timed(lambda: len(queue))
+        queue_due_time, queue_due = timed(queue.due)
+        queue_idle_time, _ = timed(queue.due, repeat=1000)
+        queue_room_time, _ = timed(lambda: queue.for_room("방1"), repeat=1000)
+        next_time, _ = timed(queue.next_fire_time, repeat=1000)
+
+        print(f"  최초 로드 (큐, 한 번만)       : {load_time * 1e3:9.2f} ms")
+        print(f"  실행할 리마인드 체크 (k={due_count})")
+        print(f"    기존 방식                   : {legacy_due_time * 1e3:9.2f} ms")
+        print(f"    힙 큐                       : {queue_due_time * 1e3:9.2f} ms")
+        print("  실행할 게 없을 때 체크")
+        print(f"    기존 방식                   : {legacy_idle_time * 1e3:9.2f} ms")
+        print(f"    힙 큐                       : {queue_idle_time * 1e6:9.2f} µs")
+        print(f"  다음 실행 시각 (큐)           : {next_time * 1e6:9.2f} µs")
+        print("  방별 조회")
+        print(f"    기존 방식                   : {legacy_room_time * 1e3:9.2f} ms")
+        print(f"    방 인덱스                   : {queue_room_time * 1e6:9.2f} µs")
+
+        legacy_contents = sorted(r["content"] for r in legacy_due)
+        queue_contents = sorted(r["content"] for r in queue_due)
+        if legacy_contents != queue_contents:
+            print("❌ 두 방식의 실행 리마인드가 다르다")
+            sys.exit(1)
+        print("✅ 두 방식이 같은 리마인드를 실행했다")
+        queue.close()
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
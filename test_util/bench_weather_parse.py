@@ -0,0 +1,111 @@
+# test_util/bench_weather_parse.py
+"""
+기상청 초단기실황 응답 파싱 벤치마크
+
+test_util/fixtures/의 기록된 응답(XML/JSON, 정상/NO_DATA)으로
+- 기존 방식 (response.text → ET.fromstring 전체 트리 → findall('.//item'))
+- 풀 파서 (XMLPullParser에 조금씩 넣으며 item을 읽고 버리고, 필요한 항목이 다 모이면 멈춤)
+- JSON (dataType=JSON)
+의 파싱 시간과 결과를 비교한다. 조기 종료 효과를 보려고 numOfRows=1000처럼
+필요 없는 항목이 뒤에 잔뜩 붙은 합성 응답도 같이 잰다.
+
+실행: python test_util/bench_weather_parse.py [반복 수]
+"""
+
+import os
+import sys
+import time
+import xml.etree.ElementTree as ET
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(os.path.dirname(HERE))
+
+from modules.weather import get_rain_type, parse_observation  # noqa: E402
+
+FIXTURES = os.path.join(HERE, "fixtures")
+
+
+def legacy_parse(xml_bytes):
+    """기존 parse_weather_data와 같은 동작 (응답 문자열 디코딩 + 전체 트리)"""
+    root = ET.fromstring(xml_bytes.decode("utf-8"))
+    data = {}
+    for item in root.findall(".//item"):
+        category_elem = item.find("category")
+        value_elem = item.find("obsrValue")
+        if category_elem is not None and value_elem is not None:
+            category, value = category_elem.text, value_elem.text
+            if category == "T1H":
+                data["temp"] = f"{value}℃"
+            elif category == "PTY":
+                data["rainType"] = get_rain_type(value)
+            elif category == "REH":
+                data["humidity"] = f"{value}%"
+            elif category == "WSD":
+                data["wind"] = f"{value}m/s"
+    return data
+
+
+def load(name):
+    with open(os.path.join(FIXTURES, name), "rb") as f:
+        return f.read()
+
+
+def padded(xml_bytes, rows=1000):
+    """필요한 항목 뒤에 쓰지 않는 항목을 덧붙인 합성 응답 (numOfRows=1000 요청 모양)"""
+    extra = b"".join(
+        b"<item><baseDate>20250602</baseDate><baseTime>1400</baseTime><category>UUU</category>"
+        b"<nx>61</nx><ny>84</ny><obsrValue>-1.2</obsrValue></item>"
+        for _ in range(rows))
+    return xml_bytes.replace(b"</items>", extra + b"</items>")
+
+
+def per_call(func, payload, count):
+    start = time.perf_counter()
+    for _ in range(count):
+        func(payload)
+    return (time.perf_counter() - start) / count
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+
+    xml_ok = load("kma_ultra_srt_ncst.xml")
+    json_ok = load("kma_ultra_srt_ncst.json")
+    xml_none = load("kma_no_data.xml")
+    json_none = load("kma_no_data.json")
+    xml_large = padded(xml_ok)
+
+    # 결과 확인: XML/JSON/기존 방식이 같은 관측값, NO_DATA는 빈 dict
+    expected = legacy_parse(xml_ok)
+    checks = {
+        "XML (풀 파서)": parse_observation(xml_ok) == expected,
+        "XML 문자열": parse_observation(xml_ok.decode("utf-8")) == expected,
+        "JSON": parse_observation(json_ok) == expected,
+        "합성 1000행": parse_observation(xml_large) == legacy_parse(xml_large) == expected,
+        "NO_DATA XML": parse_observation(xml_none) == legacy_parse(xml_none) == {},
+        "NO_DATA JSON": parse_observation(json_none) == {},
+    }
+
+    rows = [
+        ("기존 (8행 XML)", per_call(legacy_parse, xml_ok, count)),
+        ("풀 파서 (8행 XML)", per_call(parse_observation, xml_ok, count)),
+        ("JSON (8행)", per_call(parse_observation, json_ok, count)),
+        ("기존 (합성 1000행)", per_call(legacy_parse, xml_large, max(1, count // 100))),
+        ("풀 파서 (합성 1000행)", per_call(parse_observation, xml_large, max(1, count // 100))),
+    ]
+
+    print(f"📊 반복 {count}번 (응답 {len(xml_ok)}B XML / {len(json_ok)}B JSON, 합성 {len(xml_large) // 1024}KB)")
+    legacy_small, legacy_large = rows[0][1], rows[3][1]
+    for label, seconds in rows:
+        baseline = legacy_large if "1000행" in label else legacy_small
+        print(f"  {seconds * 1e6:8.1f}µs  {baseline / seconds:5.1f}x  {label}")
+
+    failed = [name for name, ok in checks.items() if not ok]
+    if failed:
+        print(f"❌ 결과가 다르다: {', '.join(failed)}")
+        sys.exit(1)
+    print(f"✅ 모든 파서의 결과가 같다: {expected}")
+
+
+if __name__ == "__main__":
+    main()
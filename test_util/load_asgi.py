@@ -0,0 +1,248 @@
+# test_util/load_asgi.py
+"""
+Flask(gunicorn) vs ASGI(uvicorn) 부하 테스트
+
+업스트림(기상청/포항공대/중앙대)을 느린 가짜 서버로 바꿔두고
+같은 메시지 묶음을 동시에 보내 p50/p99 지연 시간과 처리량을 비교한다.
+
+- Flask: gunicorn -c gunicorn.conf.py app:app (sync 워커 4개)
+- ASGI : uvicorn asgi:app (프로세스 1개)
+- 업스트림 캐시는 끈다 (UPSTREAM_CACHE_DISABLED=1) → 매 요청이 가짜 업스트림을 기다린다
+
+실행: python test_util/load_asgi.py [요청 수] [동시 요청 수] [업스트림 지연(초)]
+"""
+
+import asyncio
+import json
+import os
+import random
+import shutil
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta
+
+import uvicorn
+from fastapi import FastAPI
+from fastapi.responses import Response
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# 업스트림을 부르는 메시지 / CPU만 쓰는 메시지
+UPSTREAM_MESSAGES = ["날씨", "서울 날씨", "학식", "점심", "중학", "다학"]
+LOCAL_MESSAGES = ["ㅋㅋㅋㅋㅋ", "배고파", "KHH", "우진 전역 언제", "오늘 회의 몇시야", "그래서 어디로 가"]
+
+
+def build_mock_upstream(delay):
+    """느린 가짜 업스트림 (기상청 XML, 포항공대 JSON, 중앙대 JSON)"""
+    mock = FastAPI()
+
+    @mock.get("/kma/getUltraSrtNcst")
+    async def kma():
+        await asyncio.sleep(delay)
+        items = "".join(
+            f"<item><category>{category}</category><obsrValue>{value}</obsrValue></item>"
+            for category, value in [("T1H", "18.2"), ("REH", "60"), ("WSD", "2.1"), ("PTY", "0")]
+        )
+        return Response(f"<response><body><items>{items}</items></body></response>",
+                        media_type="application/xml")
+
+    @mock.get("/postech/period/{start}/{end}")
+    async def postech(start: str, end: str):
+        await asyncio.sleep(delay)
+        monday = datetime.strptime(start, "%Y%m%d")
+        return [
+            {"date": (monday + timedelta(days=day)).strftime("%Y%m%d"), "type": meal_type,
+             "foods": [{"name_kor": "김치찌개  계란말이  쌀밥"}], "kcal": 800, "protein": 30}
+            for day in range(7) for meal_type in ("BREAKFAST_A", "LUNCH", "DINNER")
+        ]
+
+    @mock.post("/cau/portlet/p005/p005.ajax")
+    async def cau():
+        await asyncio.sleep(delay)
+        return {"isEmpty": "N", "list": [
+            {"rest": "참슬기식당", "course": "A", "price": "5000", "time": "11:30~13:30",
+             "menuDetail": "제육볶음,된장국,쌀밥"},
+        ]}
+
+    return mock
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def wait_for_port(port, timeout=30):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            with socket.create_connection(("127.0.0.1", port), timeout=0.5):
+                return
+        except OSError:
+            time.sleep(0.1)
+    raise RuntimeError(f"{port} 포트 서버가 뜨지 않았다")
+
+
+def start_mock(delay):
+    port = free_port()
+    config = uvicorn.Config(build_mock_upstream(delay), host="127.0.0.1", port=port,
+                            log_level="warning", backlog=4096)
+    server = uvicorn.Server(config)
+    threading.Thread(target=server.run, daemon=True).start()
+    wait_for_port(port)
+    return server, port
+
+
+def start_server(kind, port, env, workdir):
+    if kind == "flask":
+        cmd = ["gunicorn", "-c", os.path.join(ROOT, "gunicorn.conf.py"),
+               "--chdir", ROOT, "-b", f"127.0.0.1:{port}", "app:app"]
+    else:
+        cmd = [sys.executable, "-m", "uvicorn", "--app-dir", ROOT, "asgi:app",
+               "--host", "127.0.0.1", "--port", str(port), "--log-level", "warning"]
+    proc = subprocess.Popen(cmd, cwd=workdir, env=env,
+                            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    wait_for_port(port)
+    return proc
+
+
+def build_requests(count, seed=3):
+    rng = random.Random(seed)
+    payloads = []
+    for i in range(count):
+        pool = UPSTREAM_MESSAGES if rng.random() < 0.4 else LOCAL_MESSAGES
+        payloads.append({"message": rng.choice(pool), "sender": f"사용자{i % 50}", "room": f"방{i % 10}"})
+    return payloads
+
+
+async def post_message(port, payload):
+    """POST /api/message 한 번 (요청마다 새 연결, Connection: close) → 응답 JSON
+
+    부하 발생기 쪽이 먼저 병목이 되지 않도록 HTTP 클라이언트 라이브러리 대신 소켓을 직접 쓴다.
+    """
+    body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    try:
+        writer.write(
+            b"POST /api/message HTTP/1.1\r\n"
+            b"Host: 127.0.0.1\r\n"
+            b"Content-Type: application/json\r\n"
+            b"Connection: close\r\n"
+            b"Content-Length: " + str(len(body)).encode() + b"\r\n\r\n" + body
+        )
+        await writer.drain()
+        raw = await reader.read()
+    finally:
+        writer.close()
+
+    head, _, content = raw.partition(b"\r\n\r\n")
+    status = int(head.split(b" ", 2)[1])
+    if b"transfer-encoding: chunked" in head.lower():
+        content = _unchunk(content)
+    return status, json.loads(content)
+
+
+def _unchunk(content):
+    chunks = []
+    while content:
+        size_line, _, rest = content.partition(b"\r\n")
+        size = int(size_line, 16)
+        if size == 0:
+            break
+        chunks.append(rest[:size])
+        content = rest[size + 2:]
+    return b"".join(chunks)
+
+
+async def run_load(port, payloads, concurrency):
+    """동시 요청 concurrency개로 payloads를 모두 보내고 (지연 시간 목록, 전체 시간, 실패 수) 반환"""
+    latencies = []
+    failures = 0
+    queue = asyncio.Queue()
+    for payload in payloads:
+        queue.put_nowait(payload)
+
+    async def worker():
+        nonlocal failures
+        while not queue.empty():
+            payload = queue.get_nowait()
+            start = time.perf_counter()
+            try:
+                status, data = await post_message(port, payload)
+                if status != 200 or not data.get("success"):
+                    failures += 1
+            except (OSError, ValueError):
+                failures += 1
+            latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+
+    return latencies, elapsed, failures
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    concurrency = int(sys.argv[2]) if len(sys.argv) > 2 else 100
+    delay = float(sys.argv[3]) if len(sys.argv) > 3 else 0.2
+
+    mock, mock_port = start_mock(delay)
+    workdir = tempfile.mkdtemp(prefix="khh-load-")
+    mock_url = f"http://127.0.0.1:{mock_port}"
+    env = dict(
+        os.environ,
+        KMA_API_BASE_URL=f"{mock_url}/kma",
+        POSTECH_MEAL_API_URL=f"{mock_url}/postech",
+        CAU_MEAL_API_URL=f"{mock_url}/cau",
+        WEATHER_API_KEY="load-test",
+        UPSTREAM_CACHE_DISABLED="1",
+        STORAGE_SQLITE_PATH=os.path.join(workdir, "khh.db"),
+        # 같은 사람이 연달아 보내므로 레이트 리밋은 끈다 (처리 성능만 잰다)
+        RATE_LIMIT_BACKEND="off",
+    )
+
+    payloads = build_requests(count)
+    print(f"📊 요청 {count}개, 동시 {concurrency}개, 업스트림 지연 {delay * 1000:.0f}ms "
+          f"(업스트림 호출 메시지 약 40%)")
+
+    results = {}
+    try:
+        for kind in ("flask", "asgi"):
+            port = free_port()
+            proc = start_server(kind, port, env, workdir)
+            try:
+                # 워밍업
+                asyncio.run(run_load(port, payloads[:50], 10))
+                results[kind] = asyncio.run(run_load(port, payloads, concurrency))
+            finally:
+                proc.terminate()
+                proc.wait(timeout=30)
+    finally:
+        mock.should_exit = True
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    labels = {"flask": "Flask (gunicorn sync ×4)", "asgi": "ASGI (uvicorn ×1)"}
+    for kind, (latencies, elapsed, failures) in results.items():
+        print(f"  {labels[kind]:26} p50 {statistics.median(latencies) * 1e3:8.1f}ms  "
+              f"p99 {percentile(latencies, 0.99) * 1e3:8.1f}ms  "
+              f"처리량 {len(latencies) / elapsed:8.1f} req/s  실패 {failures}")
+
+    if any(failures for _, _, failures in results.values()):
+        print("❌ 실패한 요청이 있다")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
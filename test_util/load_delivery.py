@@ -0,0 +1,224 @@
+# test_util/load_delivery.py
+"""
+리마인드 웹훅 전달 부하 테스트: 기존 방식 vs 전달 파이프라인 (modules/delivery.py)
+
+느린 가짜 웹훅 수신 서버를 띄우고, 스케줄러가 깨어날 때마다 여러 방의 리마인드가 한꺼번에 울리는 상황을 만든다.
+- 기존 방식: 전부 합친 문자열 하나를 requests.post로 보낸다 (스케줄러 스레드가 응답까지 기다림, 방 정보 없음)
+- 파이프라인: submit()만 하고 돌아온다, 워커가 방별 묶음으로 보낸다
+스케줄러 스레드가 막힌 시간, 전달 완료까지 걸린 시간, 방별로 제대로 도착했는지 비교하고
+수신 서버가 자주 실패할 때(재시도), 계속 실패할 때(dead letter), 큐가 넘칠 때도 확인한다.
+
+실행: python test_util/load_delivery.py [스케줄러 틱 수] [틱당 방 수] [수신 지연(초)]
+"""
+
+import json
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import requests
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from load_asgi import free_port  # noqa: E402
+
+REMINDERS_PER_ROOM = 3
+
+
+class Receiver:
+    """수신 서버 상태 (모드: ok / flaky / down)"""
+    mode = "ok"
+    delay = 0.1
+    fail_ratio = 0.3
+    rng = random.Random(5)
+    lock = threading.Lock()
+    payloads = []
+    attempts = 0
+
+
+class ReceiverHandler(BaseHTTPRequestHandler):
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        time.sleep(Receiver.delay)
+
+        with Receiver.lock:
+            Receiver.attempts += 1
+            fail = Receiver.mode == "down" or (Receiver.mode == "flaky" and Receiver.rng.random() < Receiver.fail_ratio)
+            if not fail:
+                Receiver.payloads.append(json.loads(body))
+
+        self.send_response(503 if fail else 200)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def log_message(self, *args):
+        pass
+
+
+def start_receiver():
+    port = free_port()
+    server = ThreadingHTTPServer(("127.0.0.1", port), ReceiverHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return f"http://127.0.0.1:{port}/api/webhook/reminder"
+
+
+def reset_receiver(mode="ok"):
+    with Receiver.lock:
+        Receiver.mode = mode
+        Receiver.payloads = []
+        Receiver.attempts = 0
+        Receiver.rng = random.Random(5)
+
+
+def build_ticks(ticks, rooms):
+    """틱마다 rooms개 방 × REMINDERS_PER_ROOM개 리마인드 (내용은 모두 다르다)"""
+    base = datetime.now().replace(second=0, microsecond=0)
+    result = []
+    for tick in range(ticks):
+        due = []
+        for minute in range(REMINDERS_PER_ROOM):
+            for room in range(rooms):
+                due.append({
+                    "datetime": (base + timedelta(minutes=tick)).isoformat(),
+                    "content": f"틱{tick} 방{room} 할일{minute}",
+                    "room": f"방{room}",
+                    "sender": "테스트",
+                    "created_at": base.isoformat(),
+                })
+        result.append(due)
+    return result
+
+
+def legacy_send(url, reminders):
+    """기존 ReminderScheduler._send_webhook과 같은 동작 (합친 문자열, 방 정보 없음)"""
+    from modules.memory import format_reminder
+
+    payload = {"type": "reminder", "message": "\n".join(format_reminder(r) for r in reminders),
+               "timestamp": datetime.now().isoformat()}
+    try:
+        requests.post(url, json=payload, timeout=5, headers={'Content-Type': 'application/json'})
+    except requests.exceptions.RequestException:
+        pass
+
+
+def received_by_room():
+    """수신한 리마인드 (방, 내용) 목록"""
+    return [(payload.get("room"), reminder["content"])
+            for payload in Receiver.payloads for reminder in payload.get("reminders", [])]
+
+
+def expected_by_room(ticks):
+    return sorted((reminder["room"], reminder["content"]) for due in ticks for reminder in due)
+
+
+def dead_letter_contents(path):
+    if not os.path.exists(path):
+        return []
+    with open(path, encoding="utf-8") as f:
+        return [(record["room"], reminder["content"], record["reason"])
+                for record in map(json.loads, f) for reminder in record["reminders"]]
+
+
+def main():
+    tick_count = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    rooms = int(sys.argv[2]) if len(sys.argv) > 2 else 10
+    Receiver.delay = float(sys.argv[3]) if len(sys.argv) > 3 else 0.1
+
+    url = start_receiver()
+    workdir = tempfile.mkdtemp(prefix="khh-delivery-")
+
+    from modules.delivery import ReminderDelivery
+
+    ticks = build_ticks(tick_count, rooms)
+    expected = expected_by_room(ticks)
+    checks = {}
+
+    # 1) 기존 방식
+    reset_receiver()
+    legacy_blocked = []
+    start = time.perf_counter()
+    for due in ticks:
+        tick_start = time.perf_counter()
+        legacy_send(url, due)
+        legacy_blocked.append(time.perf_counter() - tick_start)
+    legacy_total = time.perf_counter() - start
+    legacy_lines = sum(payload["message"].count("\n") + 1 for payload in Receiver.payloads)
+    legacy_with_room = sum(1 for payload in Receiver.payloads if payload.get("room"))
+
+    # 2) 파이프라인 (수신 정상)
+    reset_receiver()
+    delivery = ReminderDelivery(url, dead_letter_path=os.path.join(workdir, "ok.jsonl"))
+    blocked = []
+    start = time.perf_counter()
+    for due in ticks:
+        tick_start = time.perf_counter()
+        delivery.submit(due)
+        blocked.append(time.perf_counter() - tick_start)
+    delivery.join(timeout=120)
+    total = time.perf_counter() - start
+    requests_sent = len(Receiver.payloads)
+    checks["정상: 모든 리마인드가 자기 방으로 한 번씩"] = sorted(received_by_room()) == expected
+    delivery.stop()
+
+    print(f"📊 틱 {tick_count}개 × 방 {rooms}개 × 리마인드 {REMINDERS_PER_ROOM}개 "
+          f"= {len(expected)}개, 수신 지연 {Receiver.delay * 1000:.0f}ms")
+    print(f"  기존 방식  : 스케줄러 틱당 {sum(legacy_blocked) / tick_count * 1000:7.2f}ms 막힘, "
+          f"전체 {legacy_total:5.2f}s, 요청 {tick_count}개, 방 정보 있는 요청 {legacy_with_room}개 (리마인드 {legacy_lines}줄)")
+    print(f"  파이프라인 : 스케줄러 틱당 {sum(blocked) / tick_count * 1000:7.2f}ms 막힘, "
+          f"전체 {total:5.2f}s, 요청 {requests_sent}개 (방별 묶음, 워커 {delivery.status()['workers']}개)")
+
+    # 3) 자주 실패하는 수신 서버 → 재시도로 모두 도착
+    reset_receiver("flaky")
+    delivery = ReminderDelivery(url, backoff_base=0.05, max_retries=8,
+                                dead_letter_path=os.path.join(workdir, "flaky.jsonl"))
+    for due in ticks:
+        delivery.submit(due)
+    delivery.join(timeout=120)
+    status = delivery.status()
+    checks["실패 30%: 재시도로 모두 도착, 중복 없음"] = sorted(received_by_room()) == expected and status["dead_letters"] == 0
+    print(f"  실패 {Receiver.fail_ratio:.0%}   : 시도 {Receiver.attempts}번 → 전달 {status['delivered_reminders']}개, "
+          f"dead letter {status['dead_letters']}")
+    delivery.stop()
+
+    # 4) 계속 실패 → dead letter
+    reset_receiver("down")
+    dead_path = os.path.join(workdir, "down.jsonl")
+    delivery = ReminderDelivery(url, backoff_base=0.01, max_retries=2, dead_letter_path=dead_path)
+    delivery.submit(ticks[0])
+    delivery.join(timeout=60)
+    dead = dead_letter_contents(dead_path)
+    checks["수신 불가: 재시도 뒤 dead letter"] = sorted((room, content) for room, content, _ in dead) == \
+        expected_by_room(ticks[:1]) and all(reason == "retries" for _, _, reason in dead)
+    print(f"  수신 불가  : 시도 {Receiver.attempts}번 (묶음당 3번) → dead letter 리마인드 {len(dead)}개")
+    delivery.stop()
+
+    # 5) 큐가 넘침 → 넘친 묶음은 dead letter, 나머지는 전달
+    reset_receiver()
+    overflow_path = os.path.join(workdir, "overflow.jsonl")
+    delivery = ReminderDelivery(url, workers=1, queue_size=5, dead_letter_path=overflow_path)
+    delivery.submit(ticks[0])
+    delivery.join(timeout=60)
+    overflow = dead_letter_contents(overflow_path)
+    delivered = received_by_room()
+    checks["큐 넘침: 전달 + dead letter = 전체"] = sorted(delivered + [(room, content) for room, content, _ in overflow]) \
+        == expected_by_room(ticks[:1]) and all(reason == "queue_full" for _, _, reason in overflow)
+    print(f"  큐 넘침    : 큐 5칸 → 전달 {len(delivered)}개, dead letter {len(overflow)}개")
+    delivery.stop()
+
+    failed = [name for name, ok in checks.items() if not ok]
+    if failed:
+        print(f"❌ 실패: {', '.join(failed)}")
+        sys.exit(1)
+    print("✅ " + " / ".join(checks))
+
+
+if __name__ == "__main__":
+    main()
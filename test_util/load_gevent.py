@@ -0,0 +1,178 @@
+# test_util/load_gevent.py
+"""
+gunicorn sync 워커 vs gevent 워커 부하 테스트 (업스트림이 느릴 때 /api/message를 계속 보낸다)
+
+- 업스트림(기상청/포항공대/중앙대)은 느린 가짜 서버 (기본 0.5초), 업스트림 캐시와 레이트 리밋은 끈다
+- 워커 4개씩, 동시 요청 N개를 정해진 시간 동안 계속 유지하며 보낸다 (업스트림 메시지 40%, 나머지는 CPU만 쓰는 메시지)
+- gevent 쪽은 부하를 거는 동안 리마인드 long-poll(/api/push/poll)도 잡아 둔다 (sync 워커라면 워커를 통째로 잡는다)
+
+확인하는 것:
+- gevent 워커가 같은 워커 수로 sync보다 훨씬 많이 처리하는지, 실패가 없는지
+- 업스트림을 기다리는 요청이 많아도 CPU만 쓰는 메시지는 바로 응답하는지
+- 스케줄러 미리 가져오기 작업(그린렛)이 패치된 requests로 가짜 업스트림을 불러 성공했는지
+
+실행: python test_util/load_gevent.py [동시 요청 수] [시간(초)] [업스트림 지연(초)]
+"""
+
+import asyncio
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from load_asgi import (  # noqa: E402
+    UPSTREAM_MESSAGES, build_requests, free_port, percentile, post_message, start_mock, start_server,
+)
+
+WORKERS = 4
+LONG_POLLS = 100
+
+
+async def get_json(port, path):
+    """GET 한 번 → (상태 코드, JSON)"""
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    try:
+        writer.write(f"GET {path} HTTP/1.1\r\nHost: 127.0.0.1\r\nConnection: close\r\n\r\n".encode())
+        await writer.drain()
+        raw = await reader.read()
+    finally:
+        writer.close()
+    head, _, content = raw.partition(b"\r\n\r\n")
+    return int(head.split(b" ", 2)[1]), json.loads(content)
+
+
+async def sustain(port, payloads, concurrency, duration):
+    """동시 요청 concurrency개를 duration초 동안 유지 → [(업스트림 메시지 여부, 지연, 성공, 끝난 시각)]"""
+    results = []
+    start = time.perf_counter()
+    deadline = start + duration
+
+    async def worker(index):
+        while time.perf_counter() < deadline:
+            payload = payloads[index % len(payloads)]
+            index += concurrency
+            began = time.perf_counter()
+            try:
+                status, data = await post_message(port, payload)
+                ok = status == 200 and data.get("success")
+            except (OSError, ValueError):
+                ok = False
+            finished = time.perf_counter()
+            results.append((payload["message"] in UPSTREAM_MESSAGES, finished - began, ok, finished - start))
+
+    await asyncio.gather(*(worker(i) for i in range(concurrency)))
+    return results
+
+
+async def wait_for_prefetch(port, timeout=30):
+    """워커가 시작하며 돌린 미리 가져오기 작업이 끝날 때까지 기다린다 → 작업 상태 목록"""
+    deadline = time.perf_counter() + timeout
+    while True:
+        _, status = await get_json(port, "/api/scheduler/status")
+        jobs = status["data"]["jobs"]
+        if (jobs and not any(job["running"] for job in jobs)) or time.perf_counter() > deadline:
+            return jobs
+        await asyncio.sleep(0.5)
+
+
+async def run_case(port, payloads, concurrency, duration, long_polls):
+    jobs = await wait_for_prefetch(port)
+    polls = [asyncio.create_task(get_json(port, f"/api/push/poll?room=부하방{i}&timeout={duration + 5:.0f}"))
+             for i in range(long_polls)]
+    await asyncio.sleep(0.5 if long_polls else 0)
+    results = await sustain(port, payloads, concurrency, duration)
+    # long-poll은 부하가 끝날 때까지 응답 없이 잡혀 있어야 한다 (이벤트가 없으므로)
+    held = sum(1 for poll in polls if not poll.done())
+    for poll in polls:
+        poll.cancel()
+    await asyncio.gather(*polls, return_exceptions=True)
+    return results, held, jobs
+
+
+def run_server(worker_class, mock_url, payloads, concurrency, duration):
+    workdir = tempfile.mkdtemp(prefix=f"khh-{worker_class}-")
+    env = dict(
+        os.environ,
+        GUNICORN_WORKER_CLASS=worker_class,
+        GUNICORN_WORKERS=str(WORKERS),
+        KMA_API_BASE_URL=f"{mock_url}/kma",
+        POSTECH_MEAL_API_URL=f"{mock_url}/postech",
+        CAU_MEAL_API_URL=f"{mock_url}/cau",
+        WEATHER_API_KEY="load-test",
+        UPSTREAM_CACHE_DISABLED="1",
+        RATE_LIMIT_BACKEND="off",
+        PREFETCH_JITTER_SECONDS="0",
+        STORAGE_SQLITE_PATH=os.path.join(workdir, "khh.db"),
+        LOG_LEVEL="WARNING",
+    )
+    port = free_port()
+    proc = start_server("flask", port, env, workdir)
+    try:
+        long_polls = LONG_POLLS if worker_class == "gevent" else 0
+        return asyncio.run(run_case(port, payloads, concurrency, duration, long_polls))
+    finally:
+        proc.terminate()
+        proc.wait(timeout=30)
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+def summarize(worker_class, results, duration):
+    completed = [row for row in results if row[3] <= duration]
+    upstream = [row[1] for row in results if row[0]]
+    local = [row[1] for row in results if not row[0]]
+    failures = sum(1 for row in results if not row[2])
+    throughput = len(completed) / duration
+    print(f"  {worker_class:6} 처리량 {throughput:7.1f} 메시지/s | "
+          f"업스트림 메시지 p50 {percentile(upstream, 0.5) * 1000:6.0f}ms p99 {percentile(upstream, 0.99) * 1000:6.0f}ms | "
+          f"CPU만 쓰는 메시지 p50 {percentile(local, 0.5) * 1000:6.0f}ms p99 {percentile(local, 0.99) * 1000:6.0f}ms | "
+          f"실패 {failures}개")
+    return throughput, percentile(upstream, 0.5), percentile(local, 0.5), failures
+
+
+def main():
+    concurrency = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    duration = float(sys.argv[2]) if len(sys.argv) > 2 else 10.0
+    delay = float(sys.argv[3]) if len(sys.argv) > 3 else 0.5
+
+    payloads = build_requests(5000)
+    mock, mock_port = start_mock(delay)
+    mock_url = f"http://127.0.0.1:{mock_port}"
+    print(f"📊 gunicorn 워커 {WORKERS}개, 동시 요청 {concurrency}개를 {duration:.0f}초 동안, 업스트림 지연 {delay}초")
+
+    try:
+        summary = {}
+        for worker_class in ("sync", "gevent"):
+            results, held, jobs = run_server(worker_class, mock_url, payloads, concurrency, duration)
+            summary[worker_class] = summarize(worker_class, results, duration)
+            if worker_class == "gevent":
+                job_text = ", ".join(f"{job['name']} 성공 {bool(job['last_success'])}" for job in jobs)
+                print(f"         부하 중 잡아 둔 long-poll {held}/{LONG_POLLS}개, 미리 가져오기 작업: {job_text}")
+                summary["held"], summary["jobs"] = held, jobs
+    finally:
+        mock.should_exit = True
+
+    sync_throughput = summary["sync"][0]
+    throughput, upstream_p50, local_p50, failures = summary["gevent"]
+    checks = {
+        f"gevent가 sync보다 5배 이상 처리 ({throughput / sync_throughput:.0f}배)": throughput >= sync_throughput * 5,
+        "gevent 실패 없음": failures == 0,
+        "업스트림을 기다려도 지연은 업스트림 지연 근처": upstream_p50 < delay + 0.3,
+        "CPU만 쓰는 메시지는 업스트림을 기다리지 않음": local_p50 < delay and local_p50 * 10 < summary["sync"][2],
+        "long-poll을 잡아 둔 채로 처리": summary["held"] == LONG_POLLS,
+        "스케줄러 미리 가져오기 성공": bool(summary["jobs"]) and all(job["last_success"] for job in summary["jobs"]),
+    }
+
+    failed = [name for name, ok in checks.items() if not ok]
+    if failed:
+        print(f"❌ 실패: {', '.join(failed)}")
+        sys.exit(1)
+    print("✅ " + " / ".join(checks))
+
+
+if __name__ == "__main__":
+    main()
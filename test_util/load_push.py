@@ -0,0 +1,184 @@
+# test_util/load_push.py
+"""
+리마인드 푸시 부하 테스트: uvicorn 워커 하나에 SSE 구독자 500개 (modules/push.py)
+
+asgi:app을 띄우고 여러 방에 나눠 /api/push/stream 연결을 열어 둔 채로
+- 연결만 유지할 때 서버 메모리(RSS)와 CPU 사용량
+- 그동안 /api/message 응답 시간 (연결이 많아도 일반 요청이 느려지지 않는지)
+- 다음 정각(분)에 울리는 리마인드를 몇 개 방에 걸어 두고, 울린 뒤 구독자에게 도착하기까지 걸린 시간
+- 그 방 구독자는 정확히 한 번씩 받고 다른 방 구독자는 받지 않는지
+를 확인한다. 같은 시간 동안 구독자마다 /api/reminders/check를 5초마다 불렀다면 보냈을 요청 수와도 비교한다.
+
+실행: python test_util/load_push.py [구독자 수] [방 수] [리마인드 걸 방 수]
+"""
+
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+import httpx
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from load_asgi import free_port, percentile, start_server  # noqa: E402
+
+LEGACY_POLL_SECONDS = 5
+CLOCK_TICKS = os.sysconf("SC_CLK_TCK")
+
+
+def proc_usage(pid):
+    """(RSS MB, 누적 CPU 초) - /proc에서 읽는다"""
+    with open(f"/proc/{pid}/status") as f:
+        rss_kb = next(int(line.split()[1]) for line in f if line.startswith("VmRSS:"))
+    with open(f"/proc/{pid}/stat") as f:
+        fields = f.read().rsplit(")", 1)[1].split()
+    return rss_kb / 1024, (int(fields[11]) + int(fields[12])) / CLOCK_TICKS
+
+
+class Subscriber:
+    """SSE 연결 하나 (받은 리마인드 이벤트와 도착 시각을 모은다)"""
+
+    def __init__(self, room):
+        self.room = room
+        self.events = []
+        self.connected = asyncio.Event()
+
+    async def run(self, client):
+        async with client.stream("GET", "/api/push/stream", params={"room": self.room}) as response:
+            self.connected.set()
+            data = None
+            async for line in response.aiter_lines():
+                if line.startswith("data: "):
+                    data = json.loads(line[6:])
+                elif line == "" and data is not None:
+                    self.events.append((time.time(), data))
+                    data = None
+
+
+async def add_reminder(client, room, fire_at):
+    response = await client.post("/api/message", json={
+        "message": f"!리마인드 오늘 {fire_at:%H:%M} {room} 알림",
+        "sender": "부하테스트",
+        "room": room,
+    })
+    return response.json()["success"]
+
+
+async def measure_messages(client, count):
+    latencies = []
+    for i in range(count):
+        start = time.perf_counter()
+        await client.post("/api/message", json={"message": "크하학", "sender": f"사람{i}", "room": "측정"})
+        latencies.append(time.perf_counter() - start)
+    return latencies
+
+
+async def run(port, pid, subscriber_count, room_count, reminder_rooms):
+    limits = httpx.Limits(max_connections=subscriber_count + 50, max_keepalive_connections=subscriber_count + 50)
+    timeout = httpx.Timeout(10, read=None)
+    base_url = f"http://127.0.0.1:{port}"
+
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=timeout) as client, \
+            httpx.AsyncClient(base_url=base_url, timeout=10) as probe:
+        rss_before, _ = proc_usage(pid)
+        baseline = await measure_messages(probe, 200)
+
+        subscribers = [Subscriber(f"방{i % room_count}") for i in range(subscriber_count)]
+        tasks = [asyncio.create_task(subscriber.run(client)) for subscriber in subscribers]
+        await asyncio.wait_for(asyncio.gather(*(s.connected.wait() for s in subscribers)), 60)
+
+        # 응답 헤더가 온 뒤 서버가 구독을 등록하기까지 잠깐 걸린다
+        deadline = time.time() + 30
+        while True:
+            status = (await probe.get("/api/scheduler/status")).json()["data"]["push"]
+            if status["subscribers"] >= subscriber_count or time.time() > deadline:
+                break
+            await asyncio.sleep(0.2)
+        print(f"  연결 {subscriber_count}개 → 서버 구독자 {status['subscribers']}명, 방 {len(status['rooms'])}개")
+
+        # 다음 정각에 울릴 리마인드 (정각까지 15초도 안 남았으면 그다음 분)
+        now = datetime.now()
+        fire_at = now.replace(second=0, microsecond=0) + timedelta(minutes=1)
+        if (fire_at - now).total_seconds() < 15:
+            fire_at += timedelta(minutes=1)
+        targets = [f"방{i}" for i in range(reminder_rooms)]
+        added = [await add_reminder(probe, room, fire_at) for room in targets]
+
+        # 연결만 유지할 때 (리마인드가 울리기 전까지)
+        rss_idle, cpu_start = proc_usage(pid)
+        idle_start = time.time()
+        loaded = await measure_messages(probe, 200)
+        await asyncio.sleep(max(0.0, fire_at.timestamp() - time.time() - 1))
+        rss_after, cpu_end = proc_usage(pid)
+        idle_seconds = time.time() - idle_start
+        cpu_ratio = (cpu_end - cpu_start) / idle_seconds
+
+        # 정각 이후 도착 기다리기
+        await asyncio.sleep(3)
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    fired = fire_at.timestamp()
+    delays = [arrived - fired for subscriber in subscribers for arrived, _ in subscriber.events]
+    expected = {room for room in targets}
+    exactly_once = all(
+        [event["reminders"][0]["content"] for _, event in subscriber.events] == [f"{subscriber.room} 알림"]
+        if subscriber.room in expected else not subscriber.events
+        for subscriber in subscribers)
+    receivers = sum(1 for subscriber in subscribers if subscriber.room in expected)
+    legacy_requests = int(subscriber_count * idle_seconds / LEGACY_POLL_SECONDS)
+
+    print(f"  서버 RSS {rss_before:.1f}MB → 구독 중 {rss_idle:.1f}MB → {rss_after:.1f}MB "
+          f"(구독자당 {(rss_idle - rss_before) * 1024 / subscriber_count:.1f}KB), "
+          f"대기 {idle_seconds:.0f}초 동안 CPU {cpu_ratio:.1%}")
+    print(f"  /api/message p50/p99: 구독 전 {percentile(baseline, 0.5) * 1000:.1f}/{percentile(baseline, 0.99) * 1000:.1f}ms, "
+          f"구독 중 {percentile(loaded, 0.5) * 1000:.1f}/{percentile(loaded, 0.99) * 1000:.1f}ms")
+    if delays:
+        print(f"  {fire_at:%H:%M} 리마인드 {len(targets)}개 방 → 구독자 {len(delays)}명 도착, 정각 기준 "
+              f"p50 {percentile(delays, 0.5) * 1000:.0f}ms / 최대 {max(delays) * 1000:.0f}ms")
+    print(f"  같은 {idle_seconds:.0f}초 동안 {LEGACY_POLL_SECONDS}초 polling이었다면 요청 {legacy_requests}개, "
+          f"푸시는 연결 {subscriber_count}개 + 이벤트 {len(delays)}개")
+
+    return {
+        f"리마인드 {len(targets)}개 등록": all(added),
+        f"구독자 {subscriber_count}명 모두 연결": status["subscribers"] == subscriber_count,
+        f"해당 방 구독자 {receivers}명이 한 번씩, 나머지는 받지 않음": exactly_once and len(delays) == receivers,
+    }
+
+
+def main():
+    subscriber_count = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    room_count = int(sys.argv[2]) if len(sys.argv) > 2 else 50
+    reminder_rooms = int(sys.argv[3]) if len(sys.argv) > 3 else 5
+
+    workdir = tempfile.mkdtemp(prefix="khh-push-")
+    env = dict(
+        os.environ,
+        STORAGE_SQLITE_PATH=os.path.join(workdir, "khh.db"),
+        PUSH_KEEPALIVE_SECONDS="15",
+    )
+
+    print(f"📊 uvicorn 워커 1개, SSE 구독자 {subscriber_count}개 (방 {room_count}개), 리마인드 방 {reminder_rooms}개")
+    port = free_port()
+    proc = start_server("asgi", port, env, workdir)
+    try:
+        checks = asyncio.run(run(port, proc.pid, subscriber_count, room_count, reminder_rooms))
+    finally:
+        proc.terminate()
+        proc.wait(timeout=30)
+
+    failed = [name for name, ok in checks.items() if not ok]
+    if failed:
+        print(f"❌ 실패: {', '.join(failed)}")
+        sys.exit(1)
+    print("✅ " + " / ".join(checks))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,175 @@
+# test_util/stress_packs.py
+"""
+응답 팩 핫 리로드 스트레스 테스트 (modules/response_packs.py)
+
+message/packs를 임시 디렉토리로 복사해 감시를 켜고, 스레드 여러 개가 쉬지 않고 메시지를 처리하는 동안
+- 친구 응답 문구를 바꾼다 (임시 파일에 쓰고 os.replace)
+- 새 친구 트리거를 추가한다
+- 깨진 JSON을 쓴다 (이전 팩을 그대로 써야 한다) → 다시 고친다
+를 반복한다. 바꾸는 도중에도 모든 메시지가 응답을 받는지(요청이 끊기지 않는지),
+새 문구가 얼마 만에 반영되는지, 다시 컴파일하는 데 걸린 시간을 확인한다.
+
+실행: python test_util/stress_packs.py [라운드 수] [스레드 수]
+"""
+
+import json
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(ROOT)
+
+WORKDIR = tempfile.mkdtemp(prefix="khh-packs-")
+PACK_DIR = os.path.join(WORKDIR, "packs")
+shutil.copytree(os.path.join(ROOT, "message", "packs"), PACK_DIR)
+os.environ["RESPONSE_PACK_DIR"] = PACK_DIR
+os.environ["RESPONSE_PACK_WATCH_SECONDS"] = "0.1"
+os.environ["STORAGE_SQLITE_PATH"] = os.path.join(WORKDIR, "khh.db")
+os.chdir(WORKDIR)
+
+from modules.message_handler import MessageHandler  # noqa: E402
+from modules.response_packs import start_pack_watcher  # noqa: E402
+
+FRIENDS_PATH = os.path.join(PACK_DIR, "friends.json")
+MESSAGES = ["하리 어디야", "아.. 망했다", "체대 준수 왔다", "아카데미 언제 끝나", "배고파"]
+
+
+def write_atomic(path, text):
+    tmp = f"{path}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        f.write(text)
+    os.replace(tmp, path)
+
+
+def friends_pack(round_no, extra_friend=None):
+    with open(os.path.join(ROOT, "message", "packs", "friends.json"), encoding="utf-8") as f:
+        pack = json.load(f)
+    pack["rules"][0]["responses"] = [f"하리 {round_no}번째 문구"]
+    if extra_friend:
+        pack["rules"].append({"triggers": [extra_friend], "response": f"{extra_friend} 등장 {round_no}"})
+    return json.dumps(pack, ensure_ascii=False)
+
+
+class Traffic:
+    """쉬지 않고 메시지를 처리하는 스레드들"""
+
+    def __init__(self, handler, threads):
+        self.handler = handler
+        self.stop = threading.Event()
+        self.lock = threading.Lock()
+        self.processed = 0
+        self.missing = []
+        self.errors = []
+        self.threads = [threading.Thread(target=self._run, args=(i,), daemon=True) for i in range(threads)]
+
+    def _run(self, index):
+        count = 0
+        while not self.stop.is_set():
+            msg = MESSAGES[count % len(MESSAGES)]
+            try:
+                response = self.handler.process_message(msg, f"사람{index}", f"방{index}")
+            except Exception as e:
+                with self.lock:
+                    self.errors.append(repr(e))
+                continue
+            if not response:
+                with self.lock:
+                    self.missing.append(msg)
+            count += 1
+        with self.lock:
+            self.processed += count
+
+    def __enter__(self):
+        for thread in self.threads:
+            thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.stop.set()
+        for thread in self.threads:
+            thread.join()
+
+
+def wait_for(handler, msg, expected, timeout=5):
+    """handler가 msg에 expected로 답할 때까지 걸린 시간 (시간 초과면 None)"""
+    start = time.perf_counter()
+    while time.perf_counter() - start < timeout:
+        if handler.process_message(msg, "확인", "확인방") == expected:
+            return time.perf_counter() - start
+        time.sleep(0.005)
+    return None
+
+
+def main():
+    rounds = int(sys.argv[1]) if len(sys.argv) > 1 else 10
+    thread_count = int(sys.argv[2]) if len(sys.argv) > 2 else 8
+
+    handler = MessageHandler()
+    watcher = start_pack_watcher()
+
+    swap_times = []
+    added_seen = []
+    broken_kept = []
+    compile_times = []
+
+    start = time.perf_counter()
+    with Traffic(handler, thread_count) as traffic:
+        for round_no in range(1, rounds + 1):
+            # 1) 문구 변경
+            write_atomic(FRIENDS_PATH, friends_pack(round_no))
+            swap_times.append(wait_for(handler, "하리 어디야", f"하리 {round_no}번째 문구"))
+
+            # 2) 새 트리거 추가
+            friend = f"새친구{round_no}"
+            write_atomic(FRIENDS_PATH, friends_pack(round_no, friend))
+            added_seen.append(wait_for(handler, f"{friend} 왔다", f"{friend} 등장 {round_no}") is not None)
+
+            # 3) 깨진 JSON → 이전 팩 유지
+            reloads = watcher.reloads
+            write_atomic(FRIENDS_PATH, '{"name": "friends", "rules": [')
+            time.sleep(0.3)
+            broken_kept.append(watcher.reloads == reloads and
+                               handler.process_message(f"{friend} 왔다", "확인", "확인방") == f"{friend} 등장 {round_no}")
+
+        # 다시 컴파일하는 데 걸리는 시간 (디스패처 전체)
+        from modules.response_packs import get_packs
+        for _ in range(20):
+            compile_start = time.perf_counter()
+            handler.reload_packs(get_packs())
+            compile_times.append(time.perf_counter() - compile_start)
+    elapsed = time.perf_counter() - start
+    watcher.stop()
+
+    seen = [t for t in swap_times if t is not None]
+    print(f"📊 라운드 {rounds}번 × (문구 변경, 트리거 추가, 깨진 파일), 처리 스레드 {thread_count}개")
+    print(f"  처리한 메시지 {traffic.processed}개 ({traffic.processed / elapsed:.0f}/s), "
+          f"응답 없음 {len(traffic.missing)}개, 예외 {len(traffic.errors)}개")
+    if seen:
+        print(f"  새 문구 반영까지 평균 {sum(seen) / len(seen) * 1000:.0f}ms / 최대 {max(seen) * 1000:.0f}ms "
+              f"(감시 간격 100ms)")
+    print(f"  디스패처 다시 컴파일 {sum(compile_times) / len(compile_times) * 1000:.2f}ms, "
+          f"리로드 {watcher.reloads}번")
+
+    checks = {
+        "바꾸는 동안 모든 메시지가 응답": not traffic.missing and not traffic.errors,
+        "새 문구 반영": len(seen) == rounds,
+        "새 트리거 반영": all(added_seen),
+        "깨진 파일이면 이전 팩 유지": all(broken_kept),
+    }
+    shutil.rmtree(WORKDIR, ignore_errors=True)
+
+    failed = [name for name, ok in checks.items() if not ok]
+    if failed:
+        print(f"❌ 실패: {', '.join(failed)}")
+        if traffic.errors:
+            print(f"  예: {traffic.errors[0]}")
+        sys.exit(1)
+    print("✅ " + " / ".join(checks))
+
+
+if __name__ == "__main__":
+    main()
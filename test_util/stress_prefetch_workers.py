@@ -0,0 +1,140 @@
+# test_util/stress_prefetch_workers.py
+"""
+gunicorn 워커 여러 개에서 학식/날씨 미리 가져오기가 한 번만 도는지 테스트 (기본 배포: sync 워커 4개)
+
+- 업스트림(기상청/포항공대/중앙대)은 가짜 서버로 바꾸고 경로별 호출 수를 센다
+- 워커가 모두 뜬 뒤 업스트림 호출 수가 미리 가져오기 한 번 분량인지 (워커 수만큼이 아닌지) 본다
+- 잠금 파일에 적힌 pid(맡은 워커)를 죽이면 다른 워커가 이어받아 딱 한 번 더 가져오는지 본다
+
+실행: python test_util/stress_prefetch_workers.py
+"""
+
+import asyncio
+import os
+import shutil
+import signal
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+
+import httpx
+import uvicorn
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from load_asgi import build_mock_upstream, free_port, start_server, wait_for_port  # noqa: E402
+
+WORKERS = 4
+STATUS_SAMPLES = 20
+
+# 미리 가져오기 한 번에 부르는 업스트림: 날씨 3개 지역, 포항공대 주간 메뉴 1번, 중앙대 두 캠퍼스 × 조식/중식/석식
+ROUND = {"kma": 3, "postech": 1, "cau": 6}
+
+
+def start_counting_mock():
+    """경로 첫 부분(kma/postech/cau)별 호출 수를 세는 가짜 업스트림 → (서버, 포트, 카운터)"""
+    mock = build_mock_upstream(0)
+    hits = Counter()
+
+    @mock.middleware("http")
+    async def count(request, call_next):
+        hits[request.url.path.split("/")[1]] += 1
+        return await call_next(request)
+
+    port = free_port()
+    server = uvicorn.Server(uvicorn.Config(mock, host="127.0.0.1", port=port, log_level="warning"))
+    threading.Thread(target=server.run, daemon=True).start()
+    wait_for_port(port)
+    return server, port, hits
+
+
+def wait_until(condition, timeout=30):
+    deadline = time.time() + timeout
+    while not condition():
+        if time.time() > deadline:
+            return False
+        time.sleep(0.2)
+    return True
+
+
+def read_leader(lock_path):
+    try:
+        with open(lock_path) as f:
+            return int(f.read().strip() or 0)
+    except (OSError, ValueError):
+        return 0
+
+
+async def sample_status(port):
+    """연결마다 다른 워커가 받는 상태 응답 → 미리 가져오기를 맡았다는 응답 수"""
+    limits = httpx.Limits(max_keepalive_connections=0)
+    async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{port}", limits=limits, timeout=10) as client:
+        samples = [(await client.get("/api/scheduler/status")).json()["data"] for _ in range(STATUS_SAMPLES)]
+    return sum(1 for status in samples if status["prefetch_leader"])
+
+
+def main():
+    mock, mock_port, hits = start_counting_mock()
+    mock_url = f"http://127.0.0.1:{mock_port}"
+    workdir = tempfile.mkdtemp(prefix="khh-prefetch-")
+    lock_path = os.path.join(workdir, "khh.db.prefetch.lock")
+    env = dict(
+        os.environ,
+        GUNICORN_WORKER_CLASS="sync",
+        GUNICORN_WORKERS=str(WORKERS),
+        KMA_API_BASE_URL=f"{mock_url}/kma",
+        POSTECH_MEAL_API_URL=f"{mock_url}/postech",
+        CAU_MEAL_API_URL=f"{mock_url}/cau",
+        WEATHER_API_KEY="stress-test",
+        PREFETCH_JITTER_SECONDS="0",
+        PREFETCH_LEADER_RETRY_SECONDS="1",
+        STORAGE_SQLITE_PATH=os.path.join(workdir, "khh.db"),
+        LOG_LEVEL="WARNING",
+    )
+    print(f"📊 gunicorn sync 워커 {WORKERS}개, 미리 가져오기 한 번 = {dict(ROUND)}")
+
+    port = free_port()
+    proc = start_server("flask", port, env, workdir)
+    checks = {}
+    try:
+        # 워커가 모두 뜨고 (미리 가져오기는 바로 한 번 돈다) 몇 초 더 기다려도 한 번 분량인지
+        first_round = wait_until(lambda: all(hits[name] >= count for name, count in ROUND.items()))
+        time.sleep(3)
+        started = dict(hits)
+        leaders = asyncio.run(sample_status(port))
+        print(f"  시작 후 업스트림 호출 {started} (워커마다 했다면 "
+              f"{ {name: count * WORKERS for name, count in ROUND.items()} }), "
+              f"상태 {STATUS_SAMPLES}번 중 맡은 워커 응답 {leaders}번")
+        checks["시작할 때 업스트림 호출은 한 번 분량"] = first_round and started == ROUND
+        checks["맡은 워커는 하나"] = 0 < leaders < STATUS_SAMPLES
+
+        # 맡은 워커를 죽이면 다른 워커가 이어받는다
+        leader = read_leader(lock_path)
+        os.kill(leader, signal.SIGKILL)
+        start = time.time()
+        taken_over = wait_until(lambda: read_leader(lock_path) not in (0, leader)
+                                and all(hits[name] >= count * 2 for name, count in ROUND.items()))
+        takeover_seconds = time.time() - start
+        time.sleep(3)
+        after = dict(hits)
+        new_leader = read_leader(lock_path)
+        print(f"  맡은 워커 {leader} 종료 → {new_leader}가 {takeover_seconds:.1f}초 만에 이어받음, 업스트림 호출 {after}")
+        checks["워커가 죽으면 다른 워커가 이어받음"] = taken_over and new_leader != leader
+        checks["이어받은 뒤에도 한 번만 더"] = after == {name: count * 2 for name, count in ROUND.items()}
+    finally:
+        proc.terminate()
+        proc.wait(timeout=30)
+        mock.should_exit = True
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    failed = [name for name, ok in checks.items() if not ok]
+    if failed:
+        print(f"❌ 실패: {', '.join(failed)}")
+        sys.exit(1)
+    print("✅ " + " / ".join(checks))
+
+
+if __name__ == "__main__":
+    main()
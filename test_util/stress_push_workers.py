@@ -0,0 +1,171 @@
+# test_util/stress_push_workers.py
+"""
+gunicorn 워커 여러 개에서 리마인드 푸시 long-poll 테스트 (기본 배포: sync 워커 4개)
+
+- 리마인드 스케줄러는 잠금을 잡은 워커 하나가 시작한다 (/api/scheduler/start를 부르지 않는다)
+- response.js처럼 /api/push/poll?room=*&since=...를 계속 보내는 구독자 N개를 띄운다
+  (요청마다 연결을 새로 열어 워커 여럿에 흩어진다, 다음 since는 직전 응답의 last_id)
+- 다음 정각에 울릴 리마인드를 방 여러 개에 걸고, 구독자마다 받은 이벤트를 센다
+- PUSH_BACKEND=memory와 sqlite를 차례로 돌린다
+
+확인하는 것:
+- sqlite: 어느 워커로 poll이 가도 구독자마다 모든 방의 이벤트를 id 순서대로 한 번씩, 정각 직후에 받는지
+- memory: 워커마다 이벤트가 따로라 놓치거나 늦게 받는 것을 같이 출력한다 (비교용)
+
+실행: python test_util/stress_push_workers.py [구독자 수] [리마인드 걸 방 수]
+"""
+
+import asyncio
+import os
+import shutil
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+import httpx
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from load_asgi import free_port, percentile, start_mock, start_server  # noqa: E402
+
+WORKERS = 4
+POLL_TIMEOUT = 3
+STATUS_SAMPLES = 20
+
+
+class Poller:
+    """response.js의 푸시 스레드와 같은 long-poll 반복 (받은 이벤트와 도착 시각을 모은다)"""
+
+    def __init__(self):
+        self.events = []
+        self.polls = 0
+        self.failures = 0
+
+    async def run(self, client, until):
+        since = None
+        while time.time() < until:
+            params = {"room": "*", "timeout": POLL_TIMEOUT}
+            if since is not None:
+                params["since"] = since
+            try:
+                data = (await client.get("/api/push/poll", params=params)).json()["data"]
+            except (httpx.HTTPError, KeyError, ValueError):
+                self.failures += 1
+                await asyncio.sleep(0.2)
+                continue
+            self.polls += 1
+            arrived = time.time()
+            self.events.extend((arrived, event) for event in data["events"])
+            since = data["last_id"]
+
+
+async def run(port, poller_count, targets):
+    # 요청마다 연결을 새로 열어 어느 워커가 받을지 gunicorn에 맡긴다
+    limits = httpx.Limits(max_connections=poller_count + 10, max_keepalive_connections=0)
+    async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{port}", limits=limits, timeout=30) as client:
+        # 다음 정각에 울릴 리마인드 (정각까지 15초도 안 남았으면 그다음 분)
+        now = datetime.now()
+        fire_at = now.replace(second=0, microsecond=0) + timedelta(minutes=1)
+        if (fire_at - now).total_seconds() < 15:
+            fire_at += timedelta(minutes=1)
+        added = []
+        for room in targets:
+            response = await client.post("/api/message", json={
+                "message": f"!리마인드 오늘 {fire_at:%H:%M} {room} 알림", "sender": "부하테스트", "room": room})
+            added.append(response.json()["success"])
+
+        pollers = [Poller() for _ in range(poller_count)]
+        until = fire_at.timestamp() + POLL_TIMEOUT * 3
+        await asyncio.gather(*(poller.run(client, until) for poller in pollers))
+
+        # 워커마다 본 스케줄러/푸시 상태 (연결마다 다른 워커가 받는다)
+        samples = [(await client.get("/api/scheduler/status")).json()["data"] for _ in range(STATUS_SAMPLES)]
+
+    return all(added), fire_at, pollers, samples
+
+
+def summarize(backend, fire_at, pollers, samples, targets):
+    expected = [f"{room} 알림" for room in targets]
+    fired = fire_at.timestamp()
+    received = [[event["reminders"][0]["content"] for _, event in poller.events] for poller in pollers]
+    delays = [arrived - fired for poller in pollers for arrived, _ in poller.events]
+    exactly_once = all(sorted(contents) == sorted(expected) for contents in received)
+    in_order = all(
+        [event["id"] for _, event in poller.events] == sorted({event["id"] for _, event in poller.events})
+        for poller in pollers)
+    missing = sum(len(set(expected) - set(contents)) for contents in received)
+    duplicated = sum(len(contents) - len(set(contents)) for contents in received)
+    seen_by = sum(1 for status in samples if status["push"]["last_id"] > 0)
+    running = sum(1 for status in samples if status["status"] == "running")
+
+    delay_text = (f"정각 기준 p50 {percentile(delays, 0.5) * 1000:.0f}ms / 최대 {max(delays) * 1000:.0f}ms"
+                  if delays else "도착 없음")
+    print(f"  {backend:6} 구독자 {len(pollers)}명 × 방 {len(targets)}개: 받음 {sum(map(len, received))}개 "
+          f"(놓침 {missing}, 중복 {duplicated}), {delay_text}, poll {sum(p.polls for p in pollers)}번 "
+          f"(실패 {sum(p.failures for p in pollers)}) | 상태 {STATUS_SAMPLES}번 중 이벤트가 보인 응답 {seen_by}번, "
+          f"스케줄러가 도는 워커 응답 {running}번")
+    return exactly_once, in_order, delays, seen_by, running
+
+
+def run_backend(backend, mock_url, poller_count, targets):
+    workdir = tempfile.mkdtemp(prefix=f"khh-push-{backend}-")
+    env = dict(
+        os.environ,
+        GUNICORN_WORKER_CLASS="sync",
+        GUNICORN_WORKERS=str(WORKERS),
+        PUSH_BACKEND=backend,
+        KMA_API_BASE_URL=f"{mock_url}/kma",
+        POSTECH_MEAL_API_URL=f"{mock_url}/postech",
+        CAU_MEAL_API_URL=f"{mock_url}/cau",
+        WEATHER_API_KEY="stress-test",
+        RATE_LIMIT_BACKEND="off",
+        PREFETCH_JITTER_SECONDS="0",
+        STORAGE_SQLITE_PATH=os.path.join(workdir, "khh.db"),
+        LOG_LEVEL="WARNING",
+    )
+    port = free_port()
+    proc = start_server("flask", port, env, workdir)
+    try:
+        return asyncio.run(run(port, poller_count, targets))
+    finally:
+        proc.terminate()
+        proc.wait(timeout=30)
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+def main():
+    poller_count = int(sys.argv[1]) if len(sys.argv) > 1 else 2
+    room_count = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+    targets = [f"방{i}" for i in range(room_count)]
+
+    mock, mock_port = start_mock(0)
+    print(f"📊 gunicorn sync 워커 {WORKERS}개, long-poll 구독자 {poller_count}명 (timeout {POLL_TIMEOUT}초), "
+          f"리마인드 방 {room_count}개")
+    try:
+        results = {}
+        for backend in ("memory", "sqlite"):
+            ready, fire_at, pollers, samples = run_backend(backend, f"http://127.0.0.1:{mock_port}", poller_count, targets)
+            results[backend] = (ready,) + summarize(backend, fire_at, pollers, samples, targets)
+    finally:
+        mock.should_exit = True
+
+    ready, exactly_once, in_order, delays, seen_by, running = results["sqlite"]
+    checks = {
+        "리마인드 등록": ready and results["memory"][0],
+        "리마인드 스케줄러는 워커 하나에서만 돈다": 0 < running < STATUS_SAMPLES,
+        "sqlite: 구독자마다 모든 방의 이벤트를 한 번씩": exactly_once,
+        "sqlite: id 순서대로": in_order,
+        "sqlite: 정각 뒤 2초 안에 도착": bool(delays) and max(delays) < 2.0,
+        "sqlite: 모든 워커가 같은 이벤트를 봄": seen_by == STATUS_SAMPLES,
+    }
+
+    failed = [name for name, ok in checks.items() if not ok]
+    if failed:
+        print(f"❌ 실패: {', '.join(failed)}")
+        sys.exit(1)
+    print("✅ " + " / ".join(checks))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,199 @@
+# test_util/stress_rate_limit.py
+"""
+서버 쪽 레이트 리밋 스트레스 테스트 (modules/rate_limit.py)
+
+1) 같은 (방, 보낸 사람)에 스레드 8개 / 프로세스 4개가 같은 순간에 몰려도 예산만큼만 통과하는지
+   (메모리 백엔드는 스레드, SQLite 백엔드는 같은 파일을 쓰는 프로세스로 확인)
+2) 보낸 사람 수십만 명이 지나가도 메모리 표가 다 찬 버킷을 지우며 작게 유지되는지, 호출당 시간
+3) gunicorn sync 워커 4개에 한 사람이 날씨를 동시에 보낼 때
+   - SQLite 백엔드: 워커가 4개여도 날씨 예산(3개)만 통과
+   - 메모리 백엔드: 워커마다 따로 세므로 최대 예산 × 4
+   - 걸린 요청은 가짜 업스트림(지연 0.2초)을 부르지 않으므로, 전체가 통과한 요청만큼의 업스트림 대기로 끝나는지
+     (리밋이 없으면 요청 수 / 워커 수 × 0.2초)
+
+실행: python test_util/stress_rate_limit.py [동시 요청 수]
+"""
+
+import asyncio
+import multiprocessing
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+WORKDIR = tempfile.mkdtemp(prefix="khh-ratelimit-")
+os.environ["STORAGE_SQLITE_PATH"] = os.path.join(WORKDIR, "khh.db")
+os.chdir(WORKDIR)
+
+from load_asgi import free_port, percentile, post_message, start_mock, start_server  # noqa: E402
+from modules.rate_limit import (  # noqa: E402
+    CHAT, WEATHER, Budget, MemoryRateLimiter, SqliteRateLimiter, load_budgets,
+)
+from modules.storage import SqliteBackend  # noqa: E402
+
+NOW = 1_000_000.0
+GUNICORN_WORKERS = 4
+UPSTREAM_DELAY = 0.2
+
+
+def race_threads(limiter, threads=8, per_thread=500):
+    """같은 키, 같은 시각에 스레드 여러 개가 몰릴 때 통과한 수"""
+    allowed = []
+    barrier = threading.Barrier(threads)
+
+    def run():
+        barrier.wait()
+        allowed.append(sum(1 for _ in range(per_thread) if not limiter.acquire("방", "도배", CHAT, now=NOW)))
+
+    workers = [threading.Thread(target=run) for _ in range(threads)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    return sum(allowed)
+
+
+def _race_process(path, per_process, start, results):
+    limiter = SqliteRateLimiter(SqliteBackend(path, import_json_from=None))
+    start.wait()
+    results.put(sum(1 for _ in range(per_process) if not limiter.acquire("방", "도배", CHAT, now=NOW)))
+
+
+def race_processes(path, processes=4, per_process=200):
+    """같은 SQLite 파일을 쓰는 프로세스 여러 개가 같은 키에 몰릴 때 통과한 수"""
+    context = multiprocessing.get_context("spawn")
+    start = context.Event()
+    results = context.Queue()
+    workers = [context.Process(target=_race_process, args=(path, per_process, start, results))
+               for _ in range(processes)]
+    for worker in workers:
+        worker.start()
+    time.sleep(1)
+    start.set()
+    total = sum(results.get(timeout=60) for _ in workers)
+    for worker in workers:
+        worker.join()
+    return total
+
+
+def churn(limiter, senders=200_000, per_second=2000):
+    """보낸 사람이 계속 바뀔 때 (초당 per_second명) 표 크기 최댓값과 호출당 시간"""
+    peak = 0
+    start = time.perf_counter()
+    for i in range(senders):
+        limiter.acquire(f"방{i % 100}", f"사람{i}", CHAT, now=NOW + i / per_second)
+        if i % 1000 == 0:
+            peak = max(peak, len(limiter))
+    return peak, (time.perf_counter() - start) / senders
+
+
+async def flood(port, count):
+    """한 사람이 날씨를 count개 동시에 보낸다 → [(상태 코드, 걸린 시간)]"""
+    payload = {"message": "서울 날씨", "sender": "도배", "room": "부하방"}
+
+    async def one():
+        start = time.perf_counter()
+        status, _ = await post_message(port, payload)
+        return status, time.perf_counter() - start
+
+    start = time.perf_counter()
+    results = await asyncio.gather(*(one() for _ in range(count)))
+    return results, time.perf_counter() - start
+
+
+def run_gunicorn(backend, count, mock_url):
+    workdir = tempfile.mkdtemp(prefix=f"khh-ratelimit-{backend}-")
+    env = dict(
+        os.environ,
+        KMA_API_BASE_URL=f"{mock_url}/kma",
+        WEATHER_API_KEY="stress-test",
+        UPSTREAM_CACHE_DISABLED="1",
+        STORAGE_SQLITE_PATH=os.path.join(workdir, "khh.db"),
+        RATE_LIMIT_BACKEND=backend,
+    )
+    port = free_port()
+    proc = start_server("flask", port, env, workdir)
+    try:
+        results, elapsed = asyncio.run(flood(port, count))
+    finally:
+        proc.terminate()
+        proc.wait(timeout=30)
+        shutil.rmtree(workdir, ignore_errors=True)
+    passed = [elapsed for status, elapsed in results if status == 200]
+    limited = [elapsed for status, elapsed in results if status == 429]
+    return passed, limited, len(results) - len(passed) - len(limited), elapsed
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    budgets = load_budgets()
+    chat, weather = budgets[CHAT], budgets[WEATHER]
+    checks = {}
+
+    print(f"📊 예산: {', '.join(repr(budget) for budget in budgets.values())}")
+
+    # 1) 같은 순간에 몰릴 때
+    memory_allowed = race_threads(MemoryRateLimiter(budgets))
+    sqlite_allowed = race_processes(os.environ["STORAGE_SQLITE_PATH"])
+    print(f"  같은 순간 4000번 (스레드 8개): 메모리 백엔드 통과 {memory_allowed}개")
+    print(f"  같은 순간 800번 (프로세스 4개, SQLite 공유): 통과 {sqlite_allowed}개")
+    checks[f"동시에 몰려도 예산({chat.capacity}개)만 통과"] = memory_allowed == sqlite_allowed == chat.capacity
+
+    # 2) 보낸 사람이 계속 바뀔 때
+    memory = MemoryRateLimiter(budgets)
+    peak, per_call = churn(memory)
+    sqlite = SqliteRateLimiter(SqliteBackend(os.path.join(WORKDIR, "churn.db"), import_json_from=None), budgets)
+    sqlite_peak, sqlite_per_call = churn(sqlite, senders=20_000)
+    # 한 번만 보낸 사람의 버킷은 interval(1초) 뒤에 다 차므로 살아 있는 키는 대략 초당 사람 수 × 1초
+    live = int(2000 * chat.interval) + 1
+    print(f"  보낸 사람 20만 명 (초당 2000명): 메모리 표 최대 {peak}개 (다 안 찬 버킷 약 {live}개), "
+          f"호출당 {per_call * 1e6:.1f}µs")
+    print(f"  보낸 사람 2만 명, SQLite: 표 최대 {sqlite_peak}개, 호출당 {sqlite_per_call * 1e6:.1f}µs")
+    checks["메모리 표가 다 찬 버킷을 지우며 작게 유지"] = peak <= memory.sweep_keys * len(memory._stripes) + live
+
+    # 3) gunicorn 워커 4개
+    mock, mock_port = start_mock(UPSTREAM_DELAY)
+    try:
+        mock_url = f"http://127.0.0.1:{mock_port}"
+        for backend in ("sqlite", "memory"):
+            passed, limited, other, elapsed = run_gunicorn(backend, count, mock_url)
+            rounds = -(-len(passed) // GUNICORN_WORKERS)
+            print(f"  gunicorn ×{GUNICORN_WORKERS}, {backend:6} 백엔드: 날씨 {count}개 동시 → 통과 {len(passed)}개, "
+                  f"429 {len(limited)}개, 기타 {other}개 | 전체 {elapsed:.2f}초 "
+                  f"(리밋 없으면 약 {count / GUNICORN_WORKERS * UPSTREAM_DELAY:.0f}초), "
+                  f"429 p50 {percentile(limited, 0.5) * 1000:.0f}ms")
+            checks[f"{backend}: 걸린 요청은 업스트림을 기다리지 않음"] = elapsed < (rounds + 1) * UPSTREAM_DELAY + 1.0
+            if backend == "sqlite":
+                checks[f"SQLite: 워커 {GUNICORN_WORKERS}개가 예산 {weather.capacity}개를 나눠 씀"] = len(passed) == weather.capacity
+            else:
+                checks[f"메모리: 워커마다 따로 (최대 {weather.capacity * GUNICORN_WORKERS}개)"] = \
+                    weather.capacity <= len(passed) <= weather.capacity * GUNICORN_WORKERS
+            checks[f"{backend}: 나머지는 모두 429"] = other == 0 and len(limited) == count - len(passed)
+    finally:
+        mock.should_exit = True
+        shutil.rmtree(WORKDIR, ignore_errors=True)
+
+    # 버킷 계산 자체 (Budget.take) - 10초에 10개: 11번째는 1초 기다려야 한다
+    budget = Budget("check", 10, 10)
+    full_at = NOW
+    waits = []
+    for _ in range(11):
+        full_at, wait = budget.take(full_at, NOW)
+        waits.append(wait)
+    checks["11번째 요청은 1초 기다림"] = waits[:10] == [0.0] * 10 and abs(waits[10] - 1.0) < 1e-6
+
+    failed = [name for name, ok in checks.items() if not ok]
+    if failed:
+        print(f"❌ 실패: {', '.join(failed)}")
+        sys.exit(1)
+    print("✅ " + " / ".join(checks))
+
+
+if __name__ == "__main__":
+    main()
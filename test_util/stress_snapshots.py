@@ -0,0 +1,191 @@
+# test_util/stress_snapshots.py
+"""
+업스트림 기록/재생 테스트 (modules/snapshots.py)
+
+1) UPSTREAM_MODE=record로 느린 가짜 업스트림(지연 0.2초)을 불러 응답을 기록한다
+   (requests 세션 경로와 httpx 비동기 경로 모두, 기상청/포항공대/중앙대)
+2) 가짜 업스트림을 끄고 재생으로 바꿔 같은 호출을 하면
+   - 응답이 기록할 때와 똑같은지, 네트워크 없이 얼마나 빨라지는지
+   - UPSTREAM_REPLAY_LATENCY처럼 지연을 넣으면 그만큼 걸리는지
+   - 기록에 없는 요청은 바로 연결 실패로 끝나는지 (실제 주소로 나가지 않음)
+   - 일부러 낸 실패가 시드대로 나오고, 위쪽(브레이커/에러 응답)이 예외 없이 처리하는지
+3) 날짜만 다른 요청 (지난주에 기록한 주간 메뉴 → 이번 주)은 본문 날짜를 옮겨서 돌려주는지
+
+실행: python test_util/stress_snapshots.py [반복 수]
+"""
+
+import asyncio
+import gzip
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from load_asgi import start_mock  # noqa: E402
+
+UPSTREAM_DELAY = 0.2
+REPLAY_LATENCY = 0.05
+
+# 가짜 업스트림 주소와 기록 모드는 모듈을 import하기 전에 정한다
+WORKDIR = tempfile.mkdtemp(prefix="khh-snapshots-")
+SNAPSHOT_DIR = os.path.join(WORKDIR, "upstream_snapshots")
+MOCK, MOCK_PORT = start_mock(UPSTREAM_DELAY)
+MOCK_URL = f"http://127.0.0.1:{MOCK_PORT}"
+os.environ.update(
+    KMA_API_BASE_URL=f"{MOCK_URL}/kma",
+    POSTECH_MEAL_API_URL=f"{MOCK_URL}/postech",
+    CAU_MEAL_API_URL=f"{MOCK_URL}/cau",
+    WEATHER_API_KEY="stress-test",
+    STORAGE_SQLITE_PATH=os.path.join(WORKDIR, "khh.db"),
+    UPSTREAM_CACHE_DISABLED="1",
+    UPSTREAM_MODE="record",
+    UPSTREAM_SNAPSHOT_DIR=SNAPSHOT_DIR,
+    LOG_LEVEL=os.getenv("LOG_LEVEL", "ERROR"),
+)
+os.chdir(WORKDIR)
+
+from modules.async_http import close_async_clients  # noqa: E402
+from modules.cau_meal import CAUMealAPI  # noqa: E402
+from modules.postech_meal import get_postech_meal, get_postech_meal_async  # noqa: E402
+from modules.snapshots import REPLAY, SnapshotStore, iter_records, request_key, set_snapshot_store  # noqa: E402
+from modules.upstream import upstream_status  # noqa: E402
+from modules.weather import get_weather_api, get_weather_api_async  # noqa: E402
+
+cau = CAUMealAPI()
+
+
+def calls_sync():
+    return [
+        get_weather_api("서울 날씨"),
+        get_weather_api("포항 날씨"),
+        get_postech_meal("점심"),
+        cau.get_meal_data("서울", "중식", 0),
+        cau.get_meal_data("안성", "석식", 1),
+    ]
+
+
+async def calls_async():
+    try:
+        return [
+            await get_weather_api_async("서울 날씨"),
+            await get_weather_api_async("포항 날씨"),
+            await get_postech_meal_async("점심"),
+            await cau.get_meal_data_async("서울", "중식", 0),
+            await cau.get_meal_data_async("안성", "석식", 1),
+        ]
+    finally:
+        await close_async_clients()
+
+
+def run_all():
+    """동기 경로 + 비동기 경로 → (결과 목록, 걸린 시간)"""
+    start = time.perf_counter()
+    results = calls_sync() + asyncio.run(calls_async())
+    return results, time.perf_counter() - start
+
+
+def replay_store(**kwargs):
+    store = SnapshotStore(SNAPSHOT_DIR, REPLAY, **kwargs)
+    set_snapshot_store(store)
+    return store
+
+
+def date_shift_check():
+    """지난주 주간 메뉴 기록으로 이번 주 요청에 응답 (본문 날짜가 7일 옮겨지는지)"""
+    store = SnapshotStore(os.path.join(WORKDIR, "shift"))
+    recorded = request_key("postech", "http://h/v1/menus", "GET", "http://h/v1/menus/period/20240101/20240107")
+    body = '[{"date": "20240101", "type": "LUNCH", "id": 20240101123}, {"date": "2024-01-07"}]'
+    store.save(recorded, 200, {"content-type": "application/json"}, body.encode("utf-8"), 0.1)
+
+    replayer = SnapshotStore(store.directory, REPLAY)
+    wanted = request_key("postech", "http://other/v1/menus", "GET", "http://other/v1/menus/period/20240108/20240114")
+    snapshot = replayer.lookup(wanted)
+    return snapshot and snapshot.content.decode("utf-8")
+
+
+def main():
+    rounds = int(sys.argv[1]) if len(sys.argv) > 1 else 3
+    checks = {}
+
+    # 1) 기록
+    try:
+        recorded, record_elapsed = run_all()
+    finally:
+        MOCK.should_exit = True
+    time.sleep(0.5)
+
+    records = list(iter_records(SNAPSHOT_DIR))
+    files = [os.path.join(dirpath, name) for dirpath, _, names in os.walk(SNAPSHOT_DIR) for name in names]
+    on_disk = sum(os.path.getsize(path) for path in files)
+    raw = sum(len(gzip.open(path).read()) for path in files)
+    upstreams = sorted({record["upstream"] for record in records})
+    print(f"📼 기록: 호출 {len(recorded)}번 {record_elapsed:.2f}초 → 응답 {len(records)}개 ({', '.join(upstreams)}), "
+          f"디스크 {on_disk / 1024:.1f}KB (압축 전 {raw / 1024:.1f}KB)")
+    checks["세 업스트림 모두 기록"] = upstreams == ["cau", "kma", "postech"]
+
+    # 2) 재생 (가짜 업스트림은 꺼져 있다)
+    store = replay_store()
+    replay_times = []
+    for _ in range(rounds):
+        replayed, elapsed = run_all()
+        replay_times.append(elapsed)
+    best = min(replay_times)
+    print(f"▶️ 재생 (지연 0): {best * 1000:.1f}ms (기록 때의 {record_elapsed / best:.0f}배 빠름), "
+          f"재생 {store.replayed}번, 없음 {store.misses}번")
+    checks["재생 응답이 기록과 같음"] = replayed == recorded and store.misses == 0
+    checks["네트워크 없이 기록보다 20배 이상 빠름"] = best * 20 < record_elapsed
+
+    store = replay_store(latency=REPLAY_LATENCY)
+    _, elapsed = run_all()
+    expected = store.replayed * REPLAY_LATENCY
+    print(f"⏱️ 재생 (지연 {REPLAY_LATENCY * 1000:.0f}ms): {elapsed:.2f}초 (업스트림 호출 {store.replayed}번 → 최소 {expected:.2f}초)")
+    checks["넣은 지연만큼 걸림"] = expected <= elapsed < expected + 1.0
+
+    store = replay_store()
+    start = time.perf_counter()
+    missing = get_weather_api("부산 날씨")
+    elapsed = time.perf_counter() - start
+    print(f"🕳️ 기록에 없는 요청: {elapsed * 1000:.1f}ms, 없음 {store.misses}번 → {missing.splitlines()[0]!r}")
+    checks["기록에 없는 요청은 바로 실패"] = store.misses >= 1 and elapsed < 1.0
+
+    # 일부러 낸 실패: 같은 시드면 같은 순서, 위쪽은 예외 없이 에러 응답
+    sequences = []
+    for _ in range(2):
+        seeded = SnapshotStore(SNAPSHOT_DIR, REPLAY, error_rate=0.3, seed=7, latency=0)
+        sequences.append([seeded.plan(None)[1] for _ in range(200)])
+    failures = sequences[0].count("connect")
+    print(f"🎲 실패 비율 0.3, 시드 7: 200번 중 {failures}번 실패, 두 번 돌려도 같은 순서 {sequences[0] == sequences[1]}")
+    checks["시드가 같으면 같은 실패 순서"] = sequences[0] == sequences[1] and 30 <= failures <= 90
+
+    store = replay_store(error_rate=1.0, error_kind="500")
+    try:
+        failed = calls_sync()
+        raised = None
+    except Exception as e:
+        failed, raised = None, e
+    breakers = {name: status["state"] for name, status in upstream_status().items()}
+    print(f"💥 모두 500으로 재생: 예외 {raised!r}, 일부러 낸 실패 {store.injected}번, 브레이커 {breakers}")
+    checks["일부러 낸 실패도 위쪽에서 처리"] = raised is None and store.injected >= 1 and failed != recorded
+
+    # 3) 날짜 옮기기
+    shifted = date_shift_check()
+    print(f"📅 지난주 기록 → 이번 주 요청: {shifted}")
+    checks["날짜만 다른 요청은 본문 날짜를 옮김"] = (
+        shifted is not None and '"20240108"' in shifted and '"2024-01-14"' in shifted and "20240101123" in shifted)
+
+    shutil.rmtree(WORKDIR, ignore_errors=True)
+
+    failed_checks = [name for name, ok in checks.items() if not ok]
+    if failed_checks:
+        print(f"❌ 실패: {', '.join(failed_checks)}")
+        sys.exit(1)
+    print("✅ " + " / ".join(checks))
+
+
+if __name__ == "__main__":
+    main()
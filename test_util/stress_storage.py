@@ -0,0 +1,157 @@
+# test_util/stress_storage.py
+"""
+저장소 백엔드 스트레스 테스트
+
+1) 여러 프로세스(gunicorn 워커 흉내)가 동시에 메모 저장/리마인드 추가/메모 꺼내기를
+   해도 잃어버리는 쓰기나 두 번 꺼내지는 메모가 없는지 확인한다.
+2) 방 10,000개가 있을 때 연산별 지연 시간(평균, p99)을 잰다.
+
+json / sqlite 두 백엔드를 모두 돌린다.
+
+실행: python test_util/stress_storage.py [프로세스 수] [프로세스당 연산 수]
+"""
+
+import multiprocessing
+import os
+import shutil
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from modules.storage import JsonBackend, SqliteBackend  # noqa: E402
+
+ROOMS = 10_000
+
+
+def open_backend(name, workdir):
+    if name == "sqlite":
+        return SqliteBackend(os.path.join(workdir, "khh.db"), import_json_from=None)
+    return JsonBackend(workdir)
+
+
+def make_reminder(room, sender, content, fire):
+    return {
+        "datetime": fire.replace(microsecond=0).isoformat(),
+        "content": content,
+        "room": room,
+        "sender": sender,
+        "created_at": datetime.now().isoformat(),
+    }
+
+
+def worker(name, workdir, worker_id, ops, claimed_queue):
+    """워커 하나: 메모 저장 + 리마인드 추가 + 공용 메모 꺼내기"""
+    backend = open_backend(name, workdir)
+    fire = datetime.now() + timedelta(days=1)
+    claimed = []
+    for i in range(ops):
+        backend.room_memories.set(f"방{worker_id}-{i}", f"메모 {worker_id}-{i}")
+        backend.personal_memories.set(f"사용자{worker_id}", f"마지막 {i}")
+        backend.reminders.add(make_reminder(f"방{i % 50}", f"사용자{worker_id}", f"{worker_id}-{i}", fire))
+        # 모든 워커가 같은 공용 메모를 꺼내려고 경쟁한다
+        value = backend.personal_memories.pop(f"공용{i}")
+        if value is not None:
+            claimed.append(value)
+    backend.close()
+    claimed_queue.put(claimed)
+
+
+def stress(name, processes, ops):
+    workdir = tempfile.mkdtemp(prefix=f"khh-stress-{name}-")
+    try:
+        backend = open_backend(name, workdir)
+        for i in range(ops):
+            backend.personal_memories.set(f"공용{i}", f"공용 메모 {i}")
+        backend.close()
+
+        ctx = multiprocessing.get_context("fork")
+        claimed_queue = ctx.Queue()
+        start = time.perf_counter()
+        procs = [ctx.Process(target=worker, args=(name, workdir, w, ops, claimed_queue))
+                 for w in range(processes)]
+        for proc in procs:
+            proc.start()
+        claimed = []
+        for _ in procs:
+            claimed.extend(claimed_queue.get())
+        for proc in procs:
+            proc.join()
+        elapsed = time.perf_counter() - start
+
+        backend = open_backend(name, workdir)
+        rooms = len(backend.room_memories)
+        reminders = len(backend.reminders)
+        leftovers = sum(1 for i in range(ops) if f"공용{i}" in backend.personal_memories)
+        backend.close()
+
+        expected = processes * ops
+        ok = (rooms == expected and reminders == expected
+              and len(claimed) == len(set(claimed)) == ops and leftovers == 0)
+        print(f"  [{name:6}] {processes}개 프로세스 × {ops}회, {elapsed:.2f}s")
+        print(f"           방 메모 {rooms}/{expected}, 리마인드 {reminders}/{expected}, "
+              f"공용 메모 꺼냄 {len(claimed)}/{ops} (중복 {len(claimed) - len(set(claimed))})")
+        return ok
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+def measure(func, args_list):
+    samples = []
+    for args in args_list:
+        start = time.perf_counter()
+        func(*args)
+        samples.append(time.perf_counter() - start)
+    samples.sort()
+    return sum(samples) / len(samples), samples[int(len(samples) * 0.99) - 1]
+
+
+def latency(name, samples=2000):
+    workdir = tempfile.mkdtemp(prefix=f"khh-latency-{name}-")
+    try:
+        backend = open_backend(name, workdir)
+        fire = datetime.now() + timedelta(days=1)
+        for i in range(ROOMS):
+            backend.room_memories.set(f"방{i}", f"메모 {i}")
+            backend.reminders.add(make_reminder(f"방{i}", f"사용자{i % 200}", f"리마인드 {i}", fire))
+
+        keys = [(f"방{i * 7 % ROOMS}",) for i in range(samples)]
+        results = [
+            ("메모 조회", measure(backend.room_memories.get, keys)),
+            ("메모 저장", measure(lambda room: backend.room_memories.set(room, "새 메모"), keys)),
+            ("메모 꺼내기", measure(backend.room_memories.pop, keys)),
+            ("리마인드 추가", measure(
+                lambda room: backend.reminders.add(make_reminder(room, "사용자", "추가", fire)), keys)),
+            ("방별 리마인드", measure(backend.reminders.for_room, keys)),
+            ("실행할 리마인드", measure(backend.reminders.due, [()] * samples)),
+        ]
+
+        print(f"  [{name:6}] 방 {ROOMS:,}개")
+        for label, (mean, p99) in results:
+            print(f"           {label:10} 평균 {mean * 1e6:8.1f}µs  p99 {p99 * 1e6:8.1f}µs")
+        backend.close()
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+def main():
+    processes = int(sys.argv[1]) if len(sys.argv) > 1 else 4
+    ops = int(sys.argv[2]) if len(sys.argv) > 2 else 300
+
+    print("🔥 동시 쓰기 테스트")
+    ok = all([stress("json", processes, ops), stress("sqlite", processes, ops)])
+
+    print("⏱️ 연산별 지연 시간")
+    latency("json")
+    latency("sqlite")
+
+    if not ok:
+        print("❌ 잃어버린 쓰기 또는 중복으로 꺼낸 메모가 있다")
+        sys.exit(1)
+    print("✅ 두 백엔드 모두 잃어버린 쓰기가 없다")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,223 @@
+# test_util/stress_upstream.py
+"""
+업스트림 장애 스트레스 테스트: 서킷 브레이커 / 마지막 관측값 응답 / 헤지 요청
+
+모드를 바꿀 수 있는 가짜 기상청 서버를 띄우고
+1) 장애(응답 없음) 동안 기존 방식(매번 timeout까지 대기)과 브레이커의 요청당 지연을 비교
+2) 브레이커가 열린 동안 날씨 응답이 마지막 관측값으로 바로 나오는지, 복구 후 닫히는지 확인
+3) 느린 꼬리(일부 요청만 느림)에서 헤지 요청 유무의 p50/p99 비교
+를 한다. 업스트림 캐시는 끈다 (매 요청이 업스트림을 부른다).
+
+실행: python test_util/stress_upstream.py [장애 구간 요청 수]
+"""
+
+import os
+import random
+import statistics
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import requests
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from load_asgi import free_port  # noqa: E402
+
+# 장애 구간에서 기존 방식이 기다리는 timeout (실제 기상청 호출은 15초)
+OUTAGE_TIMEOUT = 0.5
+
+# 느린 꼬리: 이 비율의 요청만 TAIL_DELAY만큼 걸린다
+TAIL_RATIO = 0.05
+TAIL_DELAY = 0.4
+FAST_DELAY = 0.01
+
+KMA_XML = ("<response><body><items>"
+           + "".join(f"<item><category>{category}</category><obsrValue>{value}</obsrValue></item>"
+                     for category, value in [("T1H", "18.2"), ("REH", "60"), ("WSD", "2.1"), ("PTY", "0")])
+           + "</items></body></response>").encode()
+
+
+class MockState:
+    mode = "ok"      # ok / hang / error / tail
+    hits = 0
+    rng = random.Random(11)
+    lock = threading.Lock()
+
+
+class MockHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        with MockState.lock:
+            MockState.hits += 1
+            slow = MockState.rng.random() < TAIL_RATIO
+
+        if MockState.mode == "hang":
+            time.sleep(OUTAGE_TIMEOUT * 4)
+        elif MockState.mode == "tail":
+            time.sleep(TAIL_DELAY if slow else FAST_DELAY)
+
+        if MockState.mode == "error":
+            self.send_response(503)
+            self.end_headers()
+            return
+
+        try:
+            self.send_response(200)
+            self.send_header("Content-Type", "application/xml")
+            self.send_header("Content-Length", str(len(KMA_XML)))
+            self.end_headers()
+            self.wfile.write(KMA_XML)
+        except OSError:
+            pass  # 헤지로 버려진 요청
+
+    def log_message(self, *args):
+        pass
+
+
+def start_mock():
+    port = free_port()
+    server = ThreadingHTTPServer(("127.0.0.1", port), MockHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return port
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+def timed_calls(func, count):
+    """func()를 count번 호출, (요청별 지연 목록, 실패 수)"""
+    latencies, failures = [], 0
+    for _ in range(count):
+        start = time.perf_counter()
+        try:
+            func()
+        except Exception:
+            failures += 1
+        latencies.append(time.perf_counter() - start)
+    return latencies, failures
+
+
+def outage(url, count):
+    """장애 구간: 기존 방식 vs 브레이커"""
+    from modules.upstream import Upstream
+
+    session = requests.Session()
+
+    def send(timeout):
+        response = session.get(url, timeout=timeout)
+        response.raise_for_status()
+        return response
+
+    MockState.mode = "hang"
+    legacy, legacy_failed = timed_calls(lambda: send(OUTAGE_TIMEOUT), count)
+
+    upstream = Upstream("stress_outage", "127.0.0.1", timeout=OUTAGE_TIMEOUT)
+    hits_before = MockState.hits
+    guarded, guarded_failed = timed_calls(lambda: upstream.call(send), count)
+    guarded_hits = MockState.hits - hits_before
+
+    print(f"📊 장애 구간 요청 {count}개 (업스트림 응답 없음, timeout {OUTAGE_TIMEOUT * 1000:.0f}ms)")
+    print(f"  기존 방식 : 합계 {sum(legacy):6.2f}s, p50 {percentile(legacy, 0.5) * 1000:7.1f}ms, "
+          f"업스트림 호출 {count}번, 실패 {legacy_failed}")
+    print(f"  브레이커  : 합계 {sum(guarded):6.2f}s, p50 {percentile(guarded, 0.5) * 1000:7.1f}ms, "
+          f"업스트림 호출 {guarded_hits}번, 실패 {guarded_failed} (상태 {upstream.breaker.state})")
+    return upstream.breaker.state == "open" and guarded_hits == upstream.breaker.failure_threshold
+
+
+def stale_weather():
+    """브레이커가 열린 동안 날씨는 마지막 관측값으로 바로 응답, 복구 후 닫힘"""
+    from modules import weather
+
+    MockState.mode = "ok"
+    fresh = weather.get_weather_by_location("포항")
+
+    upstream = weather.kma_upstream
+    upstream.timeout = OUTAGE_TIMEOUT
+    upstream.breaker.reset_timeout = 1.0
+
+    MockState.mode = "error"
+    for _ in range(upstream.breaker.failure_threshold):
+        weather.get_weather_by_location("포항")
+
+    latencies, stale = [], []
+    for _ in range(20):
+        start = time.perf_counter()
+        stale.append(weather.get_weather_by_location("포항"))
+        latencies.append(time.perf_counter() - start)
+    opened = upstream.breaker.state
+
+    MockState.mode = "ok"
+    time.sleep(upstream.breaker.reset_timeout)
+    recovered = weather.get_weather_by_location("포항")
+
+    print(f"📊 날씨 응답 (업스트림 503 → 브레이커 {opened})")
+    print(f"  열린 동안 응답 20개 : p50 {percentile(latencies, 0.5) * 1e6:7.1f}µs, "
+          f"마지막 관측값과 같음 {sum(text == fresh for text in stale)}/20")
+    print(f"  복구 후             : 브레이커 {upstream.breaker.state}")
+    return opened == "open" and all(text == fresh for text in stale) \
+        and recovered == fresh and upstream.breaker.state == "closed"
+
+
+def hedging(url, count):
+    """느린 꼬리: 헤지 없음 vs 헤지 (p95 이후 한 번 더)"""
+    from modules.upstream import Upstream
+
+    session = requests.Session()
+    session.mount("http://", requests.adapters.HTTPAdapter(pool_maxsize=32))
+
+    def send(timeout):
+        response = session.get(url, timeout=timeout)
+        response.raise_for_status()
+        return response.content
+
+    MockState.mode = "tail"
+    results = {}
+    for hedge in (False, True):
+        upstream = Upstream(f"stress_tail_{hedge}", "127.0.0.1", timeout=2.0, hedge=hedge)
+        MockState.rng = random.Random(11)
+        timed_calls(lambda: upstream.call(send), 40)  # p95 준비
+        MockState.rng = random.Random(23)
+        latencies, failures = timed_calls(lambda: upstream.call(send), count)
+        results[hedge] = (latencies, failures, upstream.hedged)
+
+    print(f"📊 느린 꼬리 요청 {count}개 ({TAIL_RATIO:.0%}가 {TAIL_DELAY * 1000:.0f}ms, "
+          f"나머지 {FAST_DELAY * 1000:.0f}ms)")
+    for hedge, label in ((False, "헤지 없음"), (True, "헤지    ")):
+        latencies, failures, hedged = results[hedge]
+        print(f"  {label} : p50 {percentile(latencies, 0.5) * 1000:6.1f}ms, "
+              f"p99 {percentile(latencies, 0.99) * 1000:6.1f}ms, "
+              f"평균 {statistics.mean(latencies) * 1000:6.1f}ms, 추가 요청 {hedged}번, 실패 {failures}")
+    return all(failures == 0 for _, failures, _ in results.values()) \
+        and percentile(results[True][0], 0.99) < percentile(results[False][0], 0.99)
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 30
+
+    port = start_mock()
+    os.environ['KMA_API_BASE_URL'] = f"http://127.0.0.1:{port}/kma"
+    os.environ['WEATHER_API_KEY'] = os.getenv('WEATHER_API_KEY') or "stress"
+    os.environ['UPSTREAM_CACHE_DISABLED'] = '1'
+    url = f"http://127.0.0.1:{port}/kma/getUltraSrtNcst"
+
+    checks = {
+        "브레이커가 열린 뒤 업스트림을 부르지 않음": outage(url, count),
+        "열린 동안 마지막 관측값으로 응답, 복구 후 닫힘": stale_weather(),
+        "헤지로 p99 감소": hedging(url, max(count, 200)),
+    }
+
+    failed = [name for name, ok in checks.items() if not ok]
+    if failed:
+        print(f"❌ 실패: {', '.join(failed)}")
+        sys.exit(1)
+    print("✅ " + " / ".join(checks))
+
+
+if __name__ == "__main__":
+    main()